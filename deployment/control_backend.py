@@ -8,18 +8,133 @@ Production-ready fixes included:
 包含生产就绪的修复：
 - API contracts aligned with the provided frontend index.html:
   API契约与提供的前端index.html保持一致：
-  - GET /api/models -> {models:[{filename,type,size_bytes,mtime_epoch,meta?,path?},...]}
+  - GET /api/models -> {models:[{filename,type,size_bytes,mtime_epoch,meta?,path?,sha256?},...]}
+      (?offset=&limit= pages it, ?sha256= looks up by content hash)
   - POST /api/upload_model accepts:
       - file (.pth)            [REQUIRED]   (frontend sends "file")
       - model_type / type      [OPTIONAL]   (frontend sends "model_type")
       - meta file              [OPTIONAL]   (accepts "meta" or "meta_file")
       - meta json string       [OPTIONAL]   ("meta_json" or "meta")
   - POST /api/load_model expects {model_type, filename}
+  - resumable chunked upload: POST /api/upload_model/init, PUT /api/upload_model/<id>?offset=N,
+    POST /api/upload_model/<id>/complete
 
 - Dojo endpoints tolerant to UI calls missing session_id:
   Dojo端点可容忍UI调用缺少session_id：
   - /api/ingest_frame, /api/ingest_input, /api/stop_capture fallback to last session
 
+- Write-behind frame ingestion (deployment/ingest_writer.py):
+  异步帧写入：
+  - /api/ingest_frame acknowledges immediately; a bounded writer pool decodes and writes
+  - JPEG payloads are stored as-is (magic bytes), others re-encoded once
+  - 429 when the writer queue is full; queue depth/backpressure in /api/metrics ("ingest")
+
+- Bulk frame upload: POST /api/ingest_frames?session_id=... accepts many frames per request as
+  multipart parts ("frames", timestamp from "timestamps" field or filename) or an
+  application/octet-stream of length-prefixed records (see ingest_writer.pack_frames);
+  written through the same writer pool and layout as /api/ingest_frame
+  批量帧上传：multipart 或长度前缀二进制流
+
+- Packed frame storage (deployment/frame_archive.py), CAPTURE_STORAGE=archive (default) | files:
+  frames are appended to <session>/frames.pack with a timestamp->offset index (frames.idx)
+  instead of one file per frame; dataset builds and /api/stop_capture read the archive directly.
+  Convert with `python deployment/frame_archive.py import|export <session_dir>`.
+  帧打包存储：单个归档文件 + 时间戳索引
+
+- Session export (deployment/session_export.py): /api/stop_capture starts a background ZIP job
+  (JPEG/pack members stored, text members deflated; {"export": false} skips it);
+  GET /api/export_status/<session_id> -> progress, GET /api/export/<session_id> -> the ZIP,
+  streamed while it is produced when no finished export exists
+  会话导出：后台打包、进度查询、流式下载
+
+- Training scheduler (deployment/job_scheduler.py): TRAIN_SLOTS concurrent jobs, the rest queued
+  by priority then FIFO; each job gets TRAIN_THREADS_PER_JOB CPU threads and its own workdir
+  (data/processed/jobs/<job_id>); POST /api/train_cancel/<id>, POST /api/train_kill/<id>;
+  /api/train_status/<id> adds queue_position and eta_sec; GET /api/train_queue
+  训练调度：并发槽位、优先级队列、取消/终止、排队位置与预计时间
+
+- Training logs: per-job ring buffer with line offsets (deployment/log_ring.py), tqdm-style
+  carriage-return progress bars collapsed; /api/train_status/<id>?cursor=N returns only newer lines,
+  GET /api/train_log/<id>/events?cursor=N follows them over SSE
+  训练日志：环形缓冲、游标增量读取、SSE
+
+- Dataset builds (deployment/dataset_builder.py): frame bytes featurized directly on a process
+  pool, inputs aligned with a vectorized nearest-timestamp search, features written as a
+  memory-mapped binary dataset directory (models/transformer/dataset_store.py, optional CSV
+  export) that the training script reads; /api/train_status reports dataset_fps
+  数据集构建：多进程特征提取，训练状态中报告帧率
+
+- Buffered input log: one long-lived writer per capture session (size/time flush, flushed on
+  /api/stop_capture); POST /api/ingest_input_batch accepts {session_id, events:[{keys,timestamp},...]}
+  输入事件日志：每会话一个缓冲写入器；支持批量端点
+
+- Stream sessions (deployment/stream_sessions.py StreamManager):
+  流会话：
+  - POST /api/stream/start, GET /api/stream/sessions, GET /api/stream/<id>, POST /api/stream/stop
+  - GET /api/stream/events/<id> -> Server-Sent Events (unbuffered, needs a threaded server)
+  - capped by STREAM_MAX_SESSIONS and STREAM_MAX_TOTAL_FPS (429 when full)
+
+- Model service proxy (deployment/model_proxy.py): /api/predict pipes the request body to the
+  model service over a pooled keep-alive session and streams the response back unparsed
+  (router metadata in X-Active-Model / X-Router-Latency-Ms headers); a background health monitor
+  keeps a cached up/degraded/down state (in /api/status) so predictions skip the /health round trip
+  模型服务代理：连接池、流式转发、后台健康检查
+
+- System metrics (deployment/metrics_sampler.py): a background sampler records CPU, RAM, GPU,
+  model-service RSS, request rate and latency every METRICS_INTERVAL_SEC into a fixed-size ring;
+  GET /api/metrics answers from the latest sample, GET /api/metrics?since=<unix ts> adds the history
+  系统指标：后台采样线程与环形缓冲，指标接口直接返回缓存值并支持时间序列查询
+
+- Request telemetry (deployment/request_telemetry.py): before/after_request hooks record per-route
+  counts, status classes, bytes and a bucketed latency histogram; rates over rolling windows;
+  GET /api/telemetry (JSON, busiest routes first) or ?format=prometheus
+  请求遥测：按路由统计次数、状态码、延迟直方图与滚动速率
+
+- Service logs (deployment/log_tail.py): /api/service_log/<name> tails from the end of the file and
+  pages by byte offset (?offset=&file_id=), /api/service_log/<name>/events follows over SSE;
+  rotation and truncation restart from the new file, multi-byte characters are never split
+  服务日志：从文件末尾读取、按字节偏移增量读取、SSE 跟随，支持日志轮转
+
+- Model catalog (deployment/model_catalog.py): checkpoints are indexed in memory at startup and
+  kept current by upload/delete/training/activation hooks plus a periodic mtime reconcile;
+  /api/models, load_model and delete_model never rescan the model tree
+  模型目录：启动时建立内存索引，按文件名/内容哈希常数时间查找，支持分页
+
+- Model blob store (deployment/model_store.py): uploads are hashed while they stream to disk and
+  stored once per content hash; filenames and the active weights are hard links to the blob
+  (re-uploads deduplicate, activation is link + atomic rename instead of a byte copy)
+  模型存储：按内容哈希去重、流式上传、可断点续传、原子激活
+
+- Registries (deployment/record_store.py): capture sessions, training jobs and stream session
+  history live in SQLite (WAL, REGISTRY_DB) behind a bounded in-memory hot set; finished entries
+  leave memory after REGISTRY_TTL_SEC, history survives restarts (jobs that were running are
+  marked "interrupted"); GET /api/jobs, /api/sessions, /api/stream/history query it by status/time
+  会话与作业注册表：SQLite 持久化、内存热集合有界、按状态与时间查询
+
+- Warm standby (deployment/service_supervisor.py): next to the serving model process a standby
+  has already imported torch and loaded the active weights; it takes over the port on failure,
+  /api/start_transformer and /api/load_model (which reloads the standby first, so the old
+  process serves until the switch). Readiness comes over a pipe, time-to-ready is in /api/status
+  热备模型服务：故障或切换模型时直接提升预热进程，管道通知就绪并报告就绪耗时
+
+- Replica pool (deployment/replica_pool.py): MODEL_REPLICAS local model services on consecutive
+  ports (MODEL_REPLICA_PORTS) plus remote ones (MODEL_REMOTE_REPLICAS); /api/predict goes to the
+  replica with the fewest outstanding requests, ?session_id= / X-Session-Id keeps a session on one
+  replica; unhealthy replicas are ejected until their health probe passes again, model switches
+  roll through the replicas one by one; per-replica load is in /api/status
+  模型服务副本池：最少未完成请求路由、会话亲和、健康剔除与恢复、支持远程节点
+
+- Same-host transport (deployment/shm_transport.py): MODEL_TRANSPORT=shm sends /predict to local
+  replicas through a shared-memory slot ring with a Unix-socket doorbell instead of loopback HTTP
+  (HTTP remains for health, reload and as the fallback); raw float32 bodies skip JSON entirely
+  同主机共享内存传输：共享内存槽位环 + Unix 套接字门铃，HTTP 作为回退
+
+- App factory (create_app): importing this module starts no threads and imports no OpenCV/PIL/psutil;
+  create_app() builds the background services once and registers the routes (a Blueprint).
+  Heavy dependencies are imported on first use; GET /health carries the startup report
+  (deployment/startup_profile.py: import times, phases, time to ready)
+  应用工厂：导入即轻量，重依赖按需导入，/health 报告启动耗时
+
 - Robust service orchestration:
   强大的服务编排：
   - detects port collisions / 检测端口冲突
@@ -40,46 +155,91 @@ import base64
 import io
 import json
 import os
-import shutil
-import signal
 import socket
 import subprocess
 import sys
 import time
 import uuid
-import zipfile
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from threading import Lock, Thread
+from threading import Lock
 from typing import Any, Dict, List, Optional, Tuple
 
-import psutil
-import requests
-from flask import Flask, jsonify, request, send_from_directory
-from flask_cors import CORS
-from PIL import Image
-from werkzeug.utils import secure_filename
-
-
 # ---------------------------------------------------------------------
 # Paths / Project root
 # ---------------------------------------------------------------------
 ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from deployment.startup_profile import profile  # noqa: E402  (first: times the imports below)
+
+import requests  # noqa: E402
+from flask import (  # noqa: E402
+    Blueprint,
+    Flask,
+    Request,
+    Response,
+    g,
+    jsonify,
+    request,
+    send_file,
+    send_from_directory,
+    stream_with_context,
+)
+from flask_cors import CORS  # noqa: E402
+from werkzeug.utils import secure_filename  # noqa: E402
+
+from deployment.frame_archive import ArchiveRegistry, frame_ts_from_path  # noqa: E402
+from deployment.ingest_writer import (  # noqa: E402
+    IngestWriter,
+    InputLogRegistry,
+    iter_packed_frames,
+    strip_dataurl,
+)
+from deployment.job_scheduler import JobContext, TrainingScheduler  # noqa: E402
+from deployment.log_ring import LogRing  # noqa: E402
+from deployment.log_tail import LogFollower, read_since, tail  # noqa: E402
+from deployment.metrics_sampler import MetricsSampler  # noqa: E402
+from deployment.feature_extractor import FEATURES_CONTENT_TYPE  # noqa: E402
+from deployment.model_catalog import ModelCatalog  # noqa: E402
+from deployment.model_proxy import ModelServiceClient  # noqa: E402
+from deployment.model_store import HashingSpool, ModelBlobStore, UploadError, is_sha256  # noqa: E402
+from deployment.record_store import RecordDB, RecordRegistry  # noqa: E402
+from deployment.replica_pool import (  # noqa: E402
+    NoReplicaError,
+    Replica,
+    ReplicaPool,
+    remote_replica_urls,
+    replica_ports,
+)
+from deployment.request_telemetry import RequestTelemetry  # noqa: E402
+from deployment.service_supervisor import ServiceSupervisor  # noqa: E402
+from deployment.session_export import SessionExporter, iter_session_zip  # noqa: E402
+from deployment.shm_transport import (  # noqa: E402
+    MODEL_TRANSPORT,
+    ShmModelClient,
+    socket_path,
+    supported as shm_supported,
+)
+from deployment.stream_sessions import (  # noqa: E402
+    StreamCapacityError,
+    StreamManager,
+    check_client_source,
+    check_session_id,
+    make_default_manager,
+)
 
 FRONTEND_DIR = ROOT_DIR / "frontend"
 LOG_DIR = ROOT_DIR / "logs"
-LOG_DIR.mkdir(exist_ok=True)
 
 DATA_DIR = ROOT_DIR / "data"
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = DATA_DIR / "processed"
-RAW_DIR.mkdir(parents=True, exist_ok=True)
-PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
 MODELS_DIR = ROOT_DIR / "models"
 TR_MODELS_DIR = MODELS_DIR / "transformer"
 TR_UPLOADS_DIR = TR_MODELS_DIR / "uploads"
-TR_UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 
 TR_ACTIVE_WEIGHTS = TR_MODELS_DIR / "transformer_model_finetuned.pth"
 
@@ -89,6 +249,14 @@ TRANSFORMER_PORT = int(os.environ.get("TRANSFORMER_PORT", "5001"))
 
 TRANSFORMER_SCRIPT = ROOT_DIR / "deployment" / "deploy_transformer.py"
 
+CAPTURE_STORAGE = os.environ.get("CAPTURE_STORAGE", "archive").strip().lower()  # "archive" | "files"
+
+STREAM_MAX_SESSIONS = int(os.environ.get("STREAM_MAX_SESSIONS", "4"))
+STREAM_MAX_TOTAL_FPS = float(os.environ.get("STREAM_MAX_TOTAL_FPS", "32"))
+STREAM_LOCAL_ROOT = os.environ.get("STREAM_LOCAL_ROOT", "").strip()  # 允许的本地视频/图片目录（空 = 禁止本地源）
+
+REGISTRY_DB = Path(os.environ.get("REGISTRY_DB", str(PROCESSED_DIR / "registry.sqlite3")))
+
 BACKEND_HOST = os.environ.get("HOST", "0.0.0.0")
 BACKEND_PORT = int(os.environ.get("PORT", "8000"))
 
@@ -96,10 +264,17 @@ START_TIME = time.time()
 
 
 # ---------------------------------------------------------------------
-# Flask app
+# Flask app (built by create_app)
 # ---------------------------------------------------------------------
-app = Flask(__name__, static_folder=str(FRONTEND_DIR), static_url_path="")
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+class ControlRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # checkpoint uploads are spooled straight into the blob store and hashed on the way in
+        if self.path == "/api/upload_model" and filename and Path(filename).suffix.lower() in ALLOWED_MODEL_EXTENSIONS:
+            return model_store.spool()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+bp = Blueprint("control", __name__)
 
 
 # ---------------------------------------------------------------------
@@ -111,14 +286,167 @@ active_model = "transformer"  # 当前模型
 
 _last_session_id: str | None = None  # 最后会话ID
 
-_req_times = deque(maxlen=5000)  # 请求时间戳
-_req_lock = Lock()  # 请求锁
+_TERMINAL_JOB_STATES = ("completed", "failed", "cancelled", "killed", "interrupted")
+
+_jobs_lock = Lock()  # 作业日志锁
+_job_logs: Dict[str, LogRing] = {}  # 作业日志环形缓冲（随作业离开内存热集合而释放）
+
+
+def _drop_job_log(job_id: str, job: Dict[str, Any]) -> None:
+    if job.get("status") in _TERMINAL_JOB_STATES:
+        with _jobs_lock:
+            _job_logs.pop(job_id, None)
+
+
+def _forget_capture(session_id: str, session: Dict[str, Any]) -> None:
+    # a stopped session's record keeps refusing frames/inputs (409), so the ingest registries
+    # can drop their closed marker once it leaves memory instead of keeping one per session forever
+    if session.get("status") == "stopped":
+        frame_archives.forget(session_id)
+        input_logs.forget(session_id)
+
+
+# Background services: built by create_app() (_init_state), so importing this module starts nothing
+# 后台服务：由 create_app() 创建并启动，导入本模块不会启动任何线程
+registry_db: Optional[RecordDB] = None  # 注册表数据库（SQLite WAL）
+capture_sessions: Optional[RecordRegistry] = None  # 采集会话
+job_registry: Optional[RecordRegistry] = None  # 训练作业
+stream_history: Optional[RecordRegistry] = None  # 流会话历史
+frame_archives: Optional[ArchiveRegistry] = None  # 帧归档（每会话）
+ingest_writer: Optional[IngestWriter] = None  # 帧写入线程池
+input_logs: Optional[InputLogRegistry] = None  # 输入事件日志
+session_exports: Optional[SessionExporter] = None  # 会话导出作业
+model_store: Optional[ModelBlobStore] = None  # 模型内容寻址存储
+model_catalog: Optional[ModelCatalog] = None  # 模型目录索引
+model_pool: Optional[ReplicaPool] = None  # 模型服务副本池（本地进程 + 远程节点，后台健康探测）
+metrics_sampler: Optional[MetricsSampler] = None  # 系统指标采样
+request_telemetry = RequestTelemetry()  # 按路由的请求遥测
+training_scheduler: Optional[TrainingScheduler] = None  # 训练作业调度器
+stream_manager: Optional[StreamManager] = None  # 流会话管理器
+
+_state_lock = Lock()  # 后台服务初始化锁
+_state_ready = False
+
+INPUT_BATCH_MAX = int(os.environ.get("INPUT_BATCH_MAX", "5000"))
+INGEST_BATCH_BLOCK_SEC = float(os.environ.get("INGEST_BATCH_BLOCK_SEC", "2.0"))
+
+
+def _store_frame(session_id: str, dest: Path, data: bytes) -> None:
+    """
+    IngestWriter sink. dest is the per-file path; archive sessions append to frames.pack instead.
+    The session's "frames" counter is bumped here, so it counts frames actually stored.
+    """
+    info = capture_sessions.get(session_id) or {}
+    if info.get("status") == "stopped":
+        raise ValueError(f"capture session {session_id} is stopped")
+    if info.get("storage", CAPTURE_STORAGE) == "files":
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+    else:
+        frame_archives.get(session_id, dest.parent.parent).append(frame_ts_from_path(dest), data)
+    capture_sessions.incr(session_id, "frames")
+
+
+def _not_recording(session_id: str):
+    """Error response for ingest into an unknown (400) or no longer recording (409) session; None if ok."""
+    info = capture_sessions.get(session_id)
+    if info is None:
+        return jsonify({"status": "error", "message": "invalid session_id"}), 400
+    if info.get("status") != "recording":
+        return jsonify({"status": "error", "message": f"session is {info.get('status')}, not recording"}), 409
+    return None
+
+
+def _track_primary(proc: Optional[subprocess.Popen]) -> None:
+    service_processes["transformer"] = proc
+
+
+def _replica_supervisor(port: int, primary: bool) -> ServiceSupervisor:
+    return ServiceSupervisor(
+        [sys.executable, str(TRANSFORMER_SCRIPT)],
+        ROOT_DIR,
+        env_fn=lambda: _service_env(port),
+        log_fn=lambda: _service_log("transformer"),
+        health_fn=lambda: is_service_running(port),
+        on_primary=_track_primary if primary else None,
+    )
+
+
+def _local_client(port: int):
+    http = ModelServiceClient(f"http://127.0.0.1:{port}")
+    if MODEL_TRANSPORT == "shm" and shm_supported():
+        return ShmModelClient(http, socket_path(port))  # /predict over shared memory, HTTP for the rest
+    return http
 
-_sessions_lock = Lock()  # 会话锁
-_sessions: Dict[str, Dict[str, Any]] = {}  # 会话字典
 
-_jobs_lock = Lock()  # 作业锁
-_jobs: Dict[str, Dict[str, Any]] = {}  # 作业字典
+def _model_service_pid() -> Optional[int]:
+    proc = service_processes.get("transformer")
+    return proc.pid if proc is not None and proc.poll() is None else None
+
+
+def _init_state() -> None:
+    """Create the directories and background services and start their threads (once per process)."""
+    global registry_db, capture_sessions, job_registry, stream_history, frame_archives, ingest_writer
+    global input_logs, session_exports, model_store, model_catalog, model_pool, metrics_sampler
+    global training_scheduler, stream_manager, _state_ready
+    with _state_lock:
+        if _state_ready:
+            return
+        for d in (LOG_DIR, RAW_DIR, PROCESSED_DIR, TR_UPLOADS_DIR):
+            d.mkdir(parents=True, exist_ok=True)
+
+        registry_db = RecordDB(REGISTRY_DB)
+        capture_sessions = RecordRegistry(
+            registry_db, "capture", terminal=("stopped",), on_evict=_forget_capture
+        ).start()
+        job_registry = RecordRegistry(
+            registry_db, "job", terminal=_TERMINAL_JOB_STATES, on_evict=_drop_job_log
+        ).start()
+        job_registry.recover("interrupted", error="control backend restarted while the job was active")
+        stream_history = RecordRegistry(
+            registry_db, "stream", terminal=("stopped", "error", "interrupted"), time_key="started_at"
+        ).start()
+        stream_history.recover("interrupted")
+
+        frame_archives = ArchiveRegistry()
+        ingest_writer = IngestWriter(sink=_store_frame)
+        input_logs = InputLogRegistry()
+        session_exports = SessionExporter()
+
+        model_store = ModelBlobStore(TR_MODELS_DIR / "blobs")
+        model_store.expire_uploads()
+        model_catalog = ModelCatalog(
+            TR_MODELS_DIR, ROOT_DIR, "transformer", index_path=PROCESSED_DIR / "model_catalog_hashes.json"
+        ).start()
+
+        model_pool = ReplicaPool(
+            [
+                Replica(
+                    f"local:{port}",
+                    f"http://127.0.0.1:{port}",
+                    port=port,
+                    supervisor=_replica_supervisor(port, i == 0),
+                    client=_local_client(port),
+                )
+                for i, port in enumerate(replica_ports(TRANSFORMER_PORT))
+            ]
+            + [Replica(url, url) for url in remote_replica_urls()]
+        ).start()
+        metrics_sampler = MetricsSampler(model_pid=_model_service_pid).start()
+
+        training_scheduler = TrainingScheduler(
+            PROCESSED_DIR / "jobs", on_update=lambda job_id, **kw: _set_job(job_id, **kw)
+        )
+        stream_manager = make_default_manager(
+            ROOT_DIR,
+            TRANSFORMER_PORT,
+            max_sessions=STREAM_MAX_SESSIONS,
+            max_total_fps=STREAM_MAX_TOTAL_FPS,
+            history=stream_history,
+            router=model_pool,
+        )
+        atexit.register(cleanup)
+        _state_ready = True
 
 
 # ---------------------------------------------------------------------
@@ -136,10 +464,6 @@ def _health_url(port: int) -> str:
     return f"http://127.0.0.1:{port}/health"
 
 
-def _predict_url(port: int) -> str:
-    return f"http://127.0.0.1:{port}/predict"
-
-
 def _port_in_use(port: int) -> bool:
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.settimeout(0.35)
@@ -147,6 +471,10 @@ def _port_in_use(port: int) -> bool:
 
 
 def is_service_running(port: int) -> bool:
+    """Fresh /health probe (pooled connection for a local replica port; also refreshes its health)."""
+    replica = model_pool.get(port)
+    if replica is not None:
+        return replica.health.check_now() == "up"
     try:
         r = requests.get(_health_url(port), timeout=1.0)
         return r.status_code == 200
@@ -159,52 +487,6 @@ def _open_service_log(service_name: str) -> io.TextIOWrapper:
     return open(p, "a", buffering=1, encoding="utf-8")  # line-buffered
 
 
-def _record_request_for_rps() -> None:
-    now = time.time()
-    with _req_lock:
-        _req_times.append(now)
-
-
-def _compute_rps(window_sec: int = 5) -> float:
-    now = time.time()
-    cutoff = now - float(window_sec)
-    with _req_lock:
-        n = 0
-        for t in reversed(_req_times):
-            if t < cutoff:
-                break
-            n += 1
-    return n / float(window_sec)
-
-
-def _read_json_sidecar(pth_path: Path) -> Optional[dict]:
-    sidecar = pth_path.with_suffix(pth_path.suffix + ".json")
-    if not sidecar.exists():
-        return None
-    try:
-        return json.loads(sidecar.read_text(encoding="utf-8", errors="replace"))
-    except Exception:
-        return None
-
-
-def _file_meta_frontend(p: Path, model_type: str) -> Dict[str, Any]:
-    st = p.stat()
-    return {
-        "filename": p.name,
-        "type": "transformer",
-        "size_bytes": int(st.st_size),
-        "mtime_epoch": int(st.st_mtime),
-        "meta": _read_json_sidecar(p),
-        "path": str(p.resolve().relative_to(ROOT_DIR.resolve()).as_posix()),
-    }
-
-
-def _model_dir_for(model_type: str) -> Path:
-    if model_type in ("transformer", "tf"):
-        return TR_MODELS_DIR
-    raise ValueError("model_type must be 'transformer'")
-
-
 def _uploads_dir_for(model_type: str) -> Path:
     if model_type in ("transformer", "tf"):
         return TR_UPLOADS_DIR
@@ -217,36 +499,18 @@ def _active_weights_for(model_type: str) -> Path:
     raise ValueError("model_type must be 'transformer'")
 
 
-def _atomic_copy(src: Path, dst: Path) -> None:
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    tmp = dst.with_suffix(dst.suffix + ".tmp")
-    shutil.copy2(src, tmp)
-    tmp.replace(dst)
-
-
-def _list_models_flat() -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    for t in ("transformer",):
-        base = _model_dir_for(t)
-        if not base.exists():
-            continue
-        for p in base.rglob("*.pth"):
-            if p.is_file():
-                out.append(_file_meta_frontend(p, t))
-    out.sort(key=lambda d: (d.get("type", ""), d.get("mtime_epoch", 0)), reverse=True)
-    return out
+def _catalog_for(model_type: str) -> ModelCatalog:
+    if model_type in ("transformer", "tf"):
+        return model_catalog
+    raise ValueError("model_type must be 'transformer'")
 
 
 def _resolve_model_file(model_type: str, filename: str) -> Optional[Path]:
+    """Newest indexed checkpoint with this basename (no filesystem scan)."""
     name = Path(filename).name  # basename only (no traversal)
-    if not name.lower().endswith(".pth"):
+    if Path(name).suffix.lower() not in ALLOWED_MODEL_EXTENSIONS:
         return None
-    base = _model_dir_for(model_type)
-    candidates = [p for p in base.rglob(name) if p.is_file() and p.suffix.lower() in ALLOWED_MODEL_EXTENSIONS]
-    if not candidates:
-        return None
-    candidates.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-    return candidates[0]
+    return _catalog_for(model_type).resolve(name)
 
 
 def _try_kill_process_holding_port(port: int) -> Tuple[bool, str]:
@@ -254,6 +518,8 @@ def _try_kill_process_holding_port(port: int) -> Tuple[bool, str]:
     If port is in use, attempt to find and kill the process ONLY if it looks like
     one of our python services (deploy_transformer.py).
     """
+    import psutil
+
     try:
         for proc in psutil.process_iter(["pid", "name", "cmdline"]):
             try:
@@ -276,93 +542,94 @@ def _try_kill_process_holding_port(port: int) -> Tuple[bool, str]:
     return False, f"port {port} in use but process not found"
 
 
-def start_service(service_name: str, script_path: Path, port: int) -> Tuple[bool, Optional[int], str]:
-    """
-    Returns (ok, pid, message)
-    """
-    if service_name not in ("transformer",):
-        return False, None, "invalid service_name"
-
-    proc = service_processes.get(service_name)
-    if proc is not None and proc.poll() is None:
-        return True, proc.pid, "already running (tracked)"
+def _service_env(port: int = TRANSFORMER_PORT) -> Dict[str, str]:
+    env = os.environ.copy()
+    pythonpath = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = str(ROOT_DIR) + os.pathsep + pythonpath if pythonpath else str(ROOT_DIR)
+    env["PYTHONUNBUFFERED"] = "1"
+    env["TRANSFORMER_PORT"] = str(port)
+    return env
 
-    if is_service_running(port):
-        return True, None, "already running (external)"
 
-    if not script_path.exists():
-        return False, None, f"script not found: {script_path}"
+def _service_log(service_name: str) -> io.TextIOWrapper:
+    lf = service_logs.get(service_name)
+    if lf is None or lf.closed:
+        lf = service_logs[service_name] = _open_service_log(service_name)
+    return lf
 
-    if _port_in_use(port):
-        killed, msg = _try_kill_process_holding_port(port)
-        if not killed:
-            return False, None, f"port {port} is in use ({msg})"
-        time.sleep(0.3)
 
-    try:
-        lf = service_logs.get(service_name)
-        if lf is None or lf.closed:
-            service_logs[service_name] = _open_service_log(service_name)
-        lf = service_logs[service_name]
-    except Exception as e:
-        return False, None, f"failed to open log file: {e}"
+def _start_replica(replica: Replica, script_path: Path, reload: bool) -> Tuple[bool, Optional[int], str]:
+    sup, port = replica.supervisor, replica.port
+    if sup.running() and not reload:
+        return True, sup.primary.pid, "already running (tracked)"
 
-    env = os.environ.copy()
-    env["PYTHONPATH"] = str(ROOT_DIR) + (os.pathsep + env.get("PYTHONPATH", "")) if env.get("PYTHONPATH") else str(ROOT_DIR)
-    env["PYTHONUNBUFFERED"] = "1"
+    if not sup.running():
+        if is_service_running(port):
+            return True, None, "already running (external)"
 
-    try:
-        preexec = os.setsid if (not _is_windows()) else None
-        proc = subprocess.Popen(
-            [sys.executable, str(script_path)],
-            cwd=str(ROOT_DIR),
-            env=env,
-            stdout=lf,
-            stderr=lf,
-            preexec_fn=preexec,
-        )
-        service_processes[service_name] = proc
+        if not script_path.exists():
+            return False, None, f"script not found: {script_path}"
 
-        deadline = time.time() + 12.0
-        while time.time() < deadline:
-            if proc.poll() is not None:
-                return False, None, f"{service_name} exited early (rc={proc.returncode})"
-            if is_service_running(port):
-                return True, proc.pid, "started"
-            time.sleep(0.35)
+        if _port_in_use(port):
+            killed, msg = _try_kill_process_holding_port(port)
+            if not killed:
+                return False, None, f"port {port} is in use ({msg})"
+            time.sleep(0.3)
 
-        return False, None, f"{service_name} did not become healthy in time"
-    except Exception as e:
-        return False, None, f"failed to spawn: {e}"
+    ok, pid, msg = sup.start(reload=reload)
+    replica.health.check_now()
+    if not ok:
+        return False, None, f"transformer {msg}"
+    return True, pid, msg
 
 
-def stop_service(service_name: str) -> Tuple[bool, str]:
-    proc = service_processes.get(service_name)
-    if proc is None or proc.poll() is not None:
-        service_processes[service_name] = None
-        return True, "already stopped"
+def start_service(
+    service_name: str, script_path: Path, port: int, reload: bool = False
+) -> Tuple[bool, Optional[int], str]:
+    """
+    Returns (ok, pid, message) of the replica on `port` (the first local one if none is there); the
+    other local replicas are brought up alongside it. Promotes warm standbys where there are any.
+    reload=True restarts the replicas on freshly loaded weights (model switch), one at a time so
+    the rest keep serving.
+    """
+    if service_name not in ("transformer",):
+        return False, None, "invalid service_name"
 
     try:
-        if not _is_windows():
-            os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-        else:
-            proc.terminate()
+        _service_log(service_name)
+    except Exception as e:
+        return False, None, f"failed to open log file: {e}"
+
+    local = model_pool.local
+    if reload or len(local) == 1:
+        results = [_start_replica(r, script_path, reload) for r in local]
+    else:
+        with ThreadPoolExecutor(max_workers=len(local)) as ex:  # cold starts load in parallel
+            results = list(ex.map(lambda r: _start_replica(r, script_path, False), local))
+    main = next((i for i, r in enumerate(local) if r.port == port), 0)
+    ok, pid, msg = results[main]
+    failed = [f"{r.name}: {m}" for r, (r_ok, _, m) in zip(local, results) if not r_ok]
+    if ok and failed:
+        msg = f"{msg} ({len(failed)} of {len(local)} replicas failed: {'; '.join(failed)})"
+    return ok, pid, msg
 
+
+def stop_service(service_name: str) -> Tuple[bool, str]:
+    """Stops the serving processes; the warm standbys are kept for the next start."""
+    results = []
+    for replica in model_pool.local:
         try:
-            proc.wait(timeout=6)
-        except subprocess.TimeoutExpired:
-            if not _is_windows():
-                os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
-            else:
-                proc.kill()
-
-        service_processes[service_name] = None
-        return True, "stopped"
-    except Exception as e:
-        return False, f"stop failed: {e}"
+            results.append(replica.supervisor.stop())
+        except Exception as e:
+            return False, f"stop failed: {e}"
+        replica.health.check_now()
+    ok, msg = results[0]
+    return ok, msg
 
 
 def _png_dataurl_dummy() -> str:
+    from PIL import Image
+
     img = Image.new("RGB", (16, 8), color=(0, 0, 0))
     buf = io.BytesIO()
     img.save(buf, format="PNG")
@@ -370,27 +637,6 @@ def _png_dataurl_dummy() -> str:
     return f"data:image/png;base64,{b64}"
 
 
-def _decode_dataurl_to_jpg_bytes(data: str) -> bytes:
-    """
-    Accepts data URL or base64. Re-encodes to JPEG bytes for consistent storage.
-    """
-    if not isinstance(data, str) or not data.strip():
-        raise ValueError("image must be a non-empty string")
-
-    s = data.strip()
-    if s.startswith("data:"):
-        parts = s.split(",", 1)
-        if len(parts) != 2:
-            raise ValueError("Invalid data URL format")
-        s = parts[1]
-
-    raw = base64.b64decode(s, validate=False)
-    img = Image.open(io.BytesIO(raw)).convert("RGB")
-    buf = io.BytesIO()
-    img.save(buf, format="JPEG", quality=90)
-    return buf.getvalue()
-
-
 def _keys_to_action(keys: List[str]) -> str:
     s = set((k or "").lower() for k in keys if isinstance(k, str))
     if "w" in s:
@@ -414,177 +660,171 @@ def _keys_to_action(keys: List[str]) -> str:
     return "move_forward"
 
 
-def _build_dataset_csv_from_session(session_id: str) -> Path:
+_ACTION_INDEX = {
+    "move_forward": 0,
+    "move_backward": 1,
+    "turn_left": 2,
+    "turn_right": 3,
+    "attack": 4,
+    "jump": 5,
+    "interact": 6,
+    "use_item": 7,
+    "open_inventory": 8,
+    "cast_spell": 9,
+}
+
+
+def _keys_to_action_index(keys: List[str]) -> int:
+    return _ACTION_INDEX.get(_keys_to_action(keys), 0)
+
+
+def _build_dataset_from_session(
+    session_id: str, progress=None, out_dir: Optional[Path] = None, workers: Optional[int] = None
+) -> Path:
     """
-    Builds a CSV dataset with 128 features + action_index.
-    Uses deployment.feature_extractor.image_to_features_128.
+    Builds a dataset with 128 features + action_index (deployment/dataset_builder.py) as the
+    binary dataset directory <out_dir>/<session>__dataset.agbds the training script memory-maps.
+    out_dir defaults to PROCESSED_DIR; progress(done, total, fps) is forwarded to the builder.
     """
-    from deployment.feature_extractor import image_to_features_128
-
     sess_dir = RAW_DIR / session_id
-    frames_dir = sess_dir / "frames"
-    inputs_path = sess_dir / "inputs.jsonl"
-    out_csv = PROCESSED_DIR / f"{session_id}__dataset.csv"
-
-    if not frames_dir.exists():
-        raise RuntimeError("frames directory missing")
-    if not inputs_path.exists():
+    if not sess_dir.exists():
+        raise RuntimeError("session directory missing")
+    if not (sess_dir / "inputs.jsonl").exists():
         raise RuntimeError("inputs.jsonl missing")
 
-    inputs: Dict[int, List[str]] = {}
-    for line in inputs_path.read_text(encoding="utf-8", errors="replace").splitlines():
-        try:
-            obj = json.loads(line)
-            ts = int(obj.get("timestamp", 0))
-            keys = obj.get("keys", [])
-            if ts:
-                inputs[ts] = keys if isinstance(keys, list) else []
-        except Exception:
-            continue
-
-    frame_files = sorted(frames_dir.glob("frame_*.jpg"))
-    rows: List[Dict[str, Any]] = []
-    input_ts_sorted = sorted(inputs.keys())
-
-    def nearest_ts(target: int) -> Optional[int]:
-        if not input_ts_sorted:
-            return None
-        import bisect
-
-        i = bisect.bisect_left(input_ts_sorted, target)
-        candidates = []
-        if 0 <= i < len(input_ts_sorted):
-            candidates.append(input_ts_sorted[i])
-        if 0 <= i - 1 < len(input_ts_sorted):
-            candidates.append(input_ts_sorted[i - 1])
-        if not candidates:
-            return None
-        best = min(candidates, key=lambda t: abs(t - target))
-        return best if abs(best - target) <= 250 else None
-
-    action_map = {
-        "move_forward": 0,
-        "move_backward": 1,
-        "turn_left": 2,
-        "turn_right": 3,
-        "attack": 4,
-        "jump": 5,
-        "interact": 6,
-        "use_item": 7,
-        "open_inventory": 8,
-        "cast_spell": 9,
-    }
-
-    for fp in frame_files:
-        try:
-            ts = int(fp.stem.split("_", 1)[1])
-        except Exception:
-            continue
+    from deployment.dataset_builder import build_session_dataset  # numpy + process pool: first build only
 
-        ts2 = ts if ts in inputs else nearest_ts(ts)
-        keys = inputs.get(ts2, []) if ts2 is not None else []
-        action_str = _keys_to_action(keys)
-        action_idx = action_map.get(action_str, 0)
+    kw = {"workers": workers} if workers else {}
+    result = build_session_dataset(
+        sess_dir,
+        Path(out_dir or PROCESSED_DIR) / f"{session_id}__dataset.agbds",
+        _keys_to_action_index,
+        progress=progress,
+        **kw,
+    )
+    return Path(str(result["dataset_path"]))
 
-        b64 = base64.b64encode(fp.read_bytes()).decode("utf-8")
-        feats = image_to_features_128(b64)
 
-        row: Dict[str, Any] = {f"f{i}": feats[i] for i in range(128)}
-        row["action"] = action_idx
-        row["timestamp"] = ts
-        rows.append(row)
+def _job_log(job_id: str) -> LogRing:
+    with _jobs_lock:
+        log = _job_logs.get(job_id)
+        if log is None:
+            log = _job_logs[job_id] = LogRing()
+        return log
 
-    import csv
 
-    out_csv.parent.mkdir(parents=True, exist_ok=True)
-    with out_csv.open("w", newline="", encoding="utf-8") as f:
-        fieldnames = [f"f{i}" for i in range(128)] + ["action", "timestamp"]
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
+def _set_job(job_id: str, **kw) -> None:
+    with _jobs_lock:
+        log = _job_logs.get(job_id)
+    terminal = kw.get("status") in _TERMINAL_JOB_STATES
+    if log is not None and terminal:
+        kw["log_tail"] = log.tail(300)  # kept with the record once the ring is released
+    job_registry.update(job_id, **kw)
+    if log is not None and terminal:
+        log.close()  # releases SSE followers
 
-    return out_csv
 
+def _run_training_job(ctx: JobContext, dataset_session: str, model_type: str, epochs: int) -> None:
+    """
+    Scheduler runner: dataset + training subprocess inside ctx.workdir, limited to ctx.threads.
+    Failures raise so the scheduler records them and keeps the workdir; the workdir (dataset
+    included) is removed once the model has been moved into the blob store.
+    """
+    job_id = ctx.job_id
 
-def _run_training_job(job_id: str, dataset_session: str, model_type: str, epochs: int) -> None:
     def set_job(**kw):
-        with _jobs_lock:
-            _jobs[job_id].update(**kw)
-
-    try:
-        set_job(status="building_dataset")
-        csv_path = _build_dataset_csv_from_session(dataset_session)
-        set_job(status="training", dataset_csv=str(csv_path))
-
-        if model_type not in ("transformer", "tf"):
-            raise ValueError("Only 'transformer' model type is supported")
-        
-        expected_csv = PROCESSED_DIR / "transformer_dataset.csv"
-        shutil.copy2(csv_path, expected_csv)
-        cmd = [sys.executable, str(ROOT_DIR / "models" / "transformer" / "transformer_training.py")]
-        produced = TR_ACTIVE_WEIGHTS
-        updir = TR_UPLOADS_DIR
-
-        env = os.environ.copy()
-        proc = subprocess.Popen(
-            cmd,
-            cwd=str(ROOT_DIR),
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-        )
-
-        log_lines: List[str] = []
-        while True:
-            line = proc.stdout.readline() if proc.stdout else ""
-            if not line and proc.poll() is not None:
-                break
-            if line:
-                log_lines.append(line.rstrip("\n"))
-                if len(log_lines) > 300:
-                    log_lines = log_lines[-300:]
-                set_job(log="\n".join(log_lines))
-
-        rc = proc.wait()
-        if rc != 0:
-            set_job(status="failed", error=f"training script exited with code {rc}")
-            return
-
-        set_job(status="saving_model")
+        _set_job(job_id, **kw)
+
+    if model_type not in ("transformer", "tf"):
+        raise ValueError("Only 'transformer' model type is supported")
+
+    set_job(status="building_dataset")
+
+    def dataset_progress(done: int, total: int, fps: float) -> None:
+        ctx.check()
+        set_job(dataset_frames_done=done, dataset_frames_total=total, dataset_fps=round(fps, 1))
+
+    dataset_path = _build_dataset_from_session(
+        dataset_session, progress=dataset_progress, out_dir=ctx.workdir, workers=ctx.threads
+    )
+    ctx.check()
+    set_job(status="training", dataset_path=_rel_to_root(dataset_path))
+
+    produced = ctx.workdir / "model.pth"
+    updir = TR_UPLOADS_DIR
+    cmd = [
+        sys.executable,
+        str(ROOT_DIR / "models" / "transformer" / "transformer_training.py"),
+        "--dataset", str(dataset_path),
+        "--epochs", str(epochs),
+        "--save-dir", str(ctx.workdir),
+        "--model-name", produced.name,
+    ]
+    env = ctx.env()
+    env["PYTHONUNBUFFERED"] = "1"
+    proc = ctx.popen(
+        cmd,
+        cwd=str(ROOT_DIR),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    set_job(pid=proc.pid)
+
+    # raw chunks into the ring: no per-line job update, "\r" progress bars collapse there
+    log = _job_log(job_id)
+    fd = proc.stdout.fileno()
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        log.feed(chunk)
+    proc.stdout.close()
+
+    rc = proc.wait()
+    ctx.check()
+    if rc != 0:
+        raise RuntimeError(f"training script exited with code {rc}")
+
+    set_job(status="saving_model")
+
+    if not produced.exists():
+        raise RuntimeError(f"Expected weights not found at {produced}")
 
-        if not produced.exists():
-            set_job(status="failed", error=f"Expected weights not found at {produced}")
-            return
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    out_name = f"{stamp}__{model_type}__trained_from_{dataset_session}.pth"
+    out_path = updir / out_name
+    digest, _, _ = model_store.ingest_file(produced, move=True)
+    model_store.link(digest, out_path)
+
+    meta = {
+        "trained_from_session": dataset_session,
+        "epochs": epochs,
+        "created": int(time.time()),
+        "job_id": job_id,
+    }
+    out_path.with_suffix(out_path.suffix + ".json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    model_catalog.add(out_path, sha256=digest, meta=meta)
 
-        stamp = time.strftime("%Y%m%d-%H%M%S")
-        out_name = f"{stamp}__{model_type}__trained_from_{dataset_session}.pth"
-        out_path = updir / out_name
-        shutil.copy2(produced, out_path)
+    set_job(status="completed", output_model=_rel_to_root(out_path))
 
-        meta = {
-            "trained_from_session": dataset_session,
-            "epochs": epochs,
-            "created": int(time.time()),
-            "source_csv": str(csv_path.resolve().relative_to(ROOT_DIR.resolve()).as_posix()),
-        }
-        out_path.with_suffix(out_path.suffix + ".json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
 
-        set_job(status="completed", output_model=str(out_path.resolve().relative_to(ROOT_DIR.resolve()).as_posix()))
-    except Exception as e:
-        set_job(status="failed", error=str(e))
+def _rel_to_root(p: Path) -> str:
+    try:
+        return p.resolve().relative_to(ROOT_DIR.resolve()).as_posix()
+    except ValueError:
+        return str(p)
 
 
 # ---------------------------------------------------------------------
 # Frontend routes
 # ---------------------------------------------------------------------
-@app.route("/", methods=["GET"])
+@bp.route("/", methods=["GET"])
 def index():
     return send_from_directory(str(FRONTEND_DIR), "index.html")
 
 
-@app.route("/<path:asset_path>", methods=["GET"])
+@bp.route("/<path:asset_path>", methods=["GET"])
 def frontend_assets(asset_path: str):
     target = FRONTEND_DIR / asset_path
     if target.exists() and target.is_file():
@@ -595,41 +835,60 @@ def frontend_assets(asset_path: str):
 # ---------------------------------------------------------------------
 # System & Orchestration APIs
 # ---------------------------------------------------------------------
-@app.before_request
-def _track_rps_before():
-    if request.path.startswith("/api/"):
-        _record_request_for_rps()
-
-
-@app.route("/api/health", methods=["GET"])
+@bp.before_app_request
+def _track_request_start():
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    g.telemetry_key = RequestTelemetry.route_key(request.method, rule)
+    request_telemetry.begin(g.telemetry_key)
+    g.request_t0 = time.perf_counter()
+
+
+@bp.after_app_request
+def _track_request_end(response):
+    t0 = g.pop("request_t0", None)
+    key = g.pop("telemetry_key", None)
+    if t0 is not None and key is not None:
+        latency_ms = (time.perf_counter() - t0) * 1000.0
+        request_telemetry.end(key, response.status_code, latency_ms, request.content_length or 0)
+        if request.path.startswith("/api/"):
+            metrics_sampler.requests.record(latency_ms)
+    return response
+
+
+@bp.route("/api/health", methods=["GET"])
 def api_health():
     return jsonify({"status": "healthy", "uptime": int(time.time() - START_TIME)}), 200
 
 
-@app.route("/api/status", methods=["GET"])
+@bp.route("/api/status", methods=["GET"])
 def api_status():
     return jsonify(
         {
-            "transformer_running": is_service_running(TRANSFORMER_PORT),
+            "transformer_running": any(r.health.state == "up" for r in model_pool.replicas),
+            "transformer_health": model_pool.replicas[0].health.snapshot(),
+            "transformer_service": model_pool.local[0].supervisor.stats(),
+            "transformer_replicas": model_pool.snapshot(),
             "active_model": active_model,
             "timestamp": time.time(),
         }
     ), 200
 
 
-@app.route("/api/start_transformer", methods=["POST"])
+@bp.route("/api/start_transformer", methods=["POST"])
 def api_start_transformer():
     ok, pid, msg = start_service("transformer", TRANSFORMER_SCRIPT, TRANSFORMER_PORT)
-    return jsonify({"success": ok, "pid": pid, "message": msg}), (200 if ok else 500)
+    return jsonify({"success": ok, "pid": pid, "message": msg, "start": model_pool.local[0].supervisor.last_start}), (
+        200 if ok else 500
+    )
 
 
-@app.route("/api/stop_transformer", methods=["POST"])
+@bp.route("/api/stop_transformer", methods=["POST"])
 def api_stop_transformer():
     ok, msg = stop_service("transformer")
     return jsonify({"success": ok, "message": msg}), (200 if ok else 500)
 
 
-@app.route("/api/set_active_model", methods=["POST"])
+@bp.route("/api/set_active_model", methods=["POST"])
 def api_set_active_model():
     global active_model
     data = request.get_json(silent=True) or {}
@@ -643,12 +902,63 @@ def api_set_active_model():
 # ---------------------------------------------------------------------
 # Model Repository APIs
 # ---------------------------------------------------------------------
-@app.route("/api/models", methods=["GET"])
+@bp.route("/api/models", methods=["GET"])
 def api_models():
-    return jsonify({"models": _list_models_flat()}), 200
+    """
+    Indexed checkpoints, newest first. ?offset=&limit= returns one page (with "total");
+    ?sha256=<hex> returns the checkpoints with that content hash.
+    """
+    digest = request.args.get("sha256")
+    if digest:
+        models = model_catalog.by_hash(digest.strip())
+        return jsonify({"models": models, "total": len(models)}), 200
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit = request.args.get("limit")
+        limit_n = int(limit) if limit is not None else None
+    except ValueError:
+        return jsonify({"success": False, "message": "offset and limit must be integers"}), 400
+    models, total = model_catalog.list(offset, limit_n)
+    return jsonify({"models": models, "total": total, "offset": offset, "limit": limit_n}), 200
+
+
+def _upload_model_type(raw: Optional[str]) -> Optional[str]:
+    model_type = (raw or "transformer").strip().lower() or "transformer"
+    if model_type == "tf":
+        model_type = "transformer"
+    return model_type if model_type in ("transformer",) else None
+
+
+def _parse_meta(raw: Optional[str]) -> Optional[dict]:
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except Exception:
+        return {"raw_meta": raw}
+
+
+def _finalize_model_upload(model_type: str, filename: str, digest: str, created: bool, meta_obj: Optional[dict]):
+    """Alias a stored blob under uploads/, write the meta sidecar, index it. Returns the response body."""
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    dest = _uploads_dir_for(model_type) / f"{stamp}__{filename}"
+    model_store.link(digest, dest)
+    if meta_obj is not None:
+        try:
+            dest.with_suffix(dest.suffix + ".json").write_text(json.dumps(meta_obj, indent=2), encoding="utf-8")
+        except Exception:
+            pass
+    entry = _catalog_for(model_type).add(dest, sha256=digest) or {}
+    return {
+        "success": True,
+        "path": _rel_to_root(dest),
+        "sha256": digest,
+        "size_bytes": entry.get("size_bytes"),
+        "deduplicated": not created,
+    }
 
 
-@app.route("/api/upload_model", methods=["POST"])
+@bp.route("/api/upload_model", methods=["POST"])
 def api_upload_model():
     if "file" not in request.files:
         return jsonify({"success": False, "message": "Missing file field 'file'"}), 400
@@ -657,44 +967,24 @@ def api_upload_model():
     if not f or not f.filename:
         return jsonify({"success": False, "message": "Empty upload"}), 400
 
-    model_type = (request.form.get("model_type") or request.form.get("type") or "transformer").strip().lower()
-    if model_type == "tf":
-        model_type = "transformer"
-    if model_type not in ("transformer",):
+    model_type = _upload_model_type(request.form.get("model_type") or request.form.get("type"))
+    if model_type is None:
         return jsonify({"success": False, "message": "model_type must be 'transformer'"}), 400
-    if model_type == "":
-        model_type = "transformer"
 
     filename = secure_filename(f.filename)
     ext = Path(filename).suffix.lower()
     if ext not in ALLOWED_MODEL_EXTENSIONS:
         return jsonify({"success": False, "message": f"Unsupported extension {ext}"}), 400
 
-    stamp = time.strftime("%Y%m%d-%H%M%S")
-    dest_dir = _uploads_dir_for(model_type)
-    dest_dir.mkdir(parents=True, exist_ok=True)
-    dest = dest_dir / f"{stamp}__{filename}"
-
     try:
-        f.save(dest)
+        if isinstance(f.stream, HashingSpool):  # already on disk and hashed by the form parser
+            digest, _, created = model_store.commit_spool(f.stream)
+        else:
+            digest, _, created = model_store.ingest_stream(f.stream)
     except Exception as e:
         return jsonify({"success": False, "message": f"save failed: {e}"}), 500
 
-    meta_obj: Optional[dict] = None
-    meta_json = request.form.get("meta_json")
-    if meta_json:
-        try:
-            meta_obj = json.loads(meta_json)
-        except Exception:
-            meta_obj = {"raw_meta": meta_json}
-    else:
-        meta_str = request.form.get("meta")
-        if meta_str:
-            try:
-                meta_obj = json.loads(meta_str)
-            except Exception:
-                meta_obj = {"raw_meta": meta_str}
-
+    meta_obj = _parse_meta(request.form.get("meta_json") or request.form.get("meta"))
     meta_file = request.files.get("meta") or request.files.get("meta_file")
     if meta_file:
         try:
@@ -702,16 +992,97 @@ def api_upload_model():
         except Exception:
             pass
 
-    if meta_obj is not None:
+    try:
+        body = _finalize_model_upload(model_type, filename, digest, created, meta_obj)
+    except Exception as e:
+        return jsonify({"success": False, "message": f"save failed: {e}"}), 500
+    return jsonify(body), 200
+
+
+@bp.route("/api/upload_model/init", methods=["POST"])
+def api_upload_model_init():
+    """
+    Starts a resumable upload: {filename, model_type?, size?, sha256?, meta?}.
+    When sha256 names content the store already has, the upload completes at once (no bytes sent).
+    """
+    data = request.get_json(silent=True) or {}
+    model_type = _upload_model_type(data.get("model_type") or data.get("type"))
+    if model_type is None:
+        return jsonify({"success": False, "message": "model_type must be 'transformer'"}), 400
+    filename = secure_filename(str(data.get("filename") or ""))
+    if Path(filename).suffix.lower() not in ALLOWED_MODEL_EXTENSIONS:
+        return jsonify({"success": False, "message": "filename must be a .pth file"}), 400
+    meta = data.get("meta")
+    meta_obj = meta if isinstance(meta, dict) or meta is None else _parse_meta(str(meta))
+    digest = str(data.get("sha256") or "").strip() or None
+    if digest is not None and not is_sha256(digest):
+        return jsonify({"success": False, "message": "sha256 must be 64 lowercase hex characters"}), 400
+
+    if digest and model_store.has(digest):
+        body = _finalize_model_upload(model_type, filename, digest, False, meta_obj)
+        body["complete"] = True
+        return jsonify(body), 200
+
+    try:
+        size = int(data["size"]) if data.get("size") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "size must be an integer"}), 400
+    state = model_store.begin(
+        {"filename": filename, "model_type": model_type, "size": size, "sha256": digest, "meta": meta_obj}
+    )
+    return jsonify({"success": True, "complete": False, "upload_id": state["upload_id"], "offset": 0}), 200
+
+
+def _upload_error(e: UploadError):
+    body = {"success": False, "message": str(e)}
+    if e.offset is not None:
+        body["offset"] = e.offset
+    return jsonify(body), e.status
+
+
+@bp.route("/api/upload_model/<upload_id>", methods=["GET", "PUT", "DELETE"])
+def api_upload_model_chunk(upload_id: str):
+    """
+    GET: current offset (resume point). DELETE: abort.
+    PUT ?offset=N (or Upload-Offset header): raw bytes appended at N; N must equal the current offset
+    (409 with the current offset otherwise).
+    """
+    try:
+        if request.method == "GET":
+            state = model_store.upload_state(upload_id)
+            return jsonify({
+                "success": True, "upload_id": upload_id, "offset": state["offset"], "size": state.get("size"),
+            }), 200
+        if request.method == "DELETE":
+            model_store.upload_state(upload_id)
+            model_store.abort(upload_id)
+            return jsonify({"success": True}), 200
+        raw_offset = request.args.get("offset", request.headers.get("Upload-Offset"))
+        if raw_offset is None:
+            return jsonify({"success": False, "message": "offset is required"}), 400
         try:
-            dest.with_suffix(dest.suffix + ".json").write_text(json.dumps(meta_obj, indent=2), encoding="utf-8")
-        except Exception:
-            pass
+            offset = int(raw_offset)
+        except ValueError:
+            return jsonify({"success": False, "message": "offset must be an integer"}), 400
+        new_offset = model_store.append(upload_id, offset, request.stream)
+        return jsonify({"success": True, "upload_id": upload_id, "offset": new_offset}), 200
+    except UploadError as e:
+        return _upload_error(e)
+
 
-    return jsonify({"success": True, "path": str(dest.resolve().relative_to(ROOT_DIR.resolve()).as_posix())}), 200
+@bp.route("/api/upload_model/<upload_id>/complete", methods=["POST"])
+def api_upload_model_complete(upload_id: str):
+    data = request.get_json(silent=True) or {}
+    try:
+        digest, _, created, state = model_store.complete(upload_id, data.get("sha256"))
+    except UploadError as e:
+        return _upload_error(e)
+    body = _finalize_model_upload(str(state["model_type"]), str(state["filename"]), digest, created, state.get("meta"))
+    body["complete"] = True
+    return jsonify(body), 200
 
 
-@app.route("/api/load_model", methods=["POST"])
+@bp.route("/api/load_model", methods=["POST"])
 def api_load_model():
     data = request.get_json(silent=True) or {}
     model_type = (data.get("model_type") or data.get("type") or "transformer").strip().lower()
@@ -728,19 +1099,31 @@ def api_load_model():
     if src is None:
         return jsonify({"success": False, "message": "model file not found"}), 404
 
+    catalog = _catalog_for(model_type)
     dst = _active_weights_for(model_type)
     try:
-        _atomic_copy(src, dst)
+        known = (catalog.get(catalog.rel(src)) or {}).get("sha256")
+        digest, _ = model_store.activate(src, dst, sha256=known)  # link + atomic rename, no byte copy
+        catalog.add(src, sha256=digest)
+        catalog.add(dst, sha256=digest)
     except Exception as e:
         return jsonify({"success": False, "message": f"failed to activate model: {e}"}), 500
 
-    stop_service("transformer")
-    start_service("transformer", TRANSFORMER_SCRIPT, TRANSFORMER_PORT)
+    # each replica's standby loads the new weights while the current process keeps serving, then takes over
+    ok, pid, msg = start_service("transformer", TRANSFORMER_SCRIPT, TRANSFORMER_PORT, reload=True)
 
-    return jsonify({"success": True, "message": "Model reloaded", "active_path": str(dst)}), 200
+    return jsonify(
+        {
+            "success": True,
+            "message": "Model reloaded" if ok else f"Model activated, service restart failed: {msg}",
+            "active_path": str(dst),
+            "pid": pid,
+            "start": model_pool.local[0].supervisor.last_start if ok else None,
+        }
+    ), 200
 
 
-@app.route("/api/delete_model", methods=["DELETE"])
+@bp.route("/api/delete_model", methods=["DELETE"])
 def api_delete_model():
     data = request.get_json(silent=True) or {}
     model_type = (data.get("type") or data.get("model_type") or "").strip().lower()
@@ -753,24 +1136,25 @@ def api_delete_model():
     if not filename:
         return jsonify({"success": False, "message": "filename is required"}), 400
 
-    name = Path(filename).name
-    base = _model_dir_for(model_type)
-    matches = [p for p in base.rglob(name) if p.is_file() and p.suffix.lower() in ALLOWED_MODEL_EXTENSIONS]
-    if not matches:
+    match = _resolve_model_file(model_type, filename)
+    if match is None:
         return jsonify({"success": False, "message": "not found"}), 404
 
-    active_path = _active_weights_for(model_type).resolve()
-    target = matches[0].resolve()
-    if target == active_path:
+    catalog = _catalog_for(model_type)
+    if catalog.rel(match) == catalog.rel(_active_weights_for(model_type)):  # not resolve(): aliases may be symlinks
         return jsonify({"success": False, "message": "Refusing to delete active weights file"}), 400
 
+    digest = (catalog.get(catalog.rel(match)) or {}).get("sha256")
     try:
-        matches[0].unlink(missing_ok=True)
-        sidecar = matches[0].with_suffix(matches[0].suffix + ".json")
+        match.unlink(missing_ok=True)
+        sidecar = match.with_suffix(match.suffix + ".json")
         if sidecar.exists():
             sidecar.unlink(missing_ok=True)
     except Exception as e:
         return jsonify({"success": False, "message": f"delete failed: {e}"}), 500
+    catalog.remove(match)
+    if digest:
+        model_store.release(digest)  # last alias gone: free the blob
 
     return jsonify({"success": True}), 200
 
@@ -778,7 +1162,7 @@ def api_delete_model():
 # ---------------------------------------------------------------------
 # Dojo (Training & Capture) APIs
 # ---------------------------------------------------------------------
-@app.route("/api/start_capture", methods=["POST"])
+@bp.route("/api/start_capture", methods=["POST"])
 def api_start_capture():
     data = request.get_json(silent=True) or {}
     session_name = (data.get("session_name") or "session").strip()
@@ -788,7 +1172,9 @@ def api_start_capture():
 
     session_id = f"sess_{uuid.uuid4().hex[:8]}"
     sess_dir = RAW_DIR / session_id
-    (sess_dir / "frames").mkdir(parents=True, exist_ok=True)
+    sess_dir.mkdir(parents=True, exist_ok=True)
+    if CAPTURE_STORAGE == "files":
+        (sess_dir / "frames").mkdir(exist_ok=True)
     (sess_dir / "inputs.jsonl").write_text("", encoding="utf-8")
 
     info = {
@@ -798,9 +1184,10 @@ def api_start_capture():
         "created": int(time.time()),
         "frames": 0,
         "inputs": 0,
+        "storage": CAPTURE_STORAGE,
+        "status": "recording",
     }
-    with _sessions_lock:
-        _sessions[session_id] = info
+    capture_sessions.put(session_id, info)
 
     global _last_session_id
     _last_session_id = session_id
@@ -808,7 +1195,7 @@ def api_start_capture():
     return jsonify({"session_id": session_id, "status": "recording"}), 200
 
 
-@app.route("/api/ingest_frame", methods=["POST"])
+@bp.route("/api/ingest_frame", methods=["POST"])
 def api_ingest_frame():
     """
     Accepts:
@@ -823,31 +1210,125 @@ def api_ingest_frame():
     if not session_id:
         return jsonify({"status": "error", "message": "missing session_id"}), 400
 
-    with _sessions_lock:
-        if session_id not in _sessions:
-            return jsonify({"status": "error", "message": "invalid session_id"}), 400
+    rejected = _not_recording(session_id)
+    if rejected:
+        return rejected
 
     if not image_str:
         return jsonify({"status": "error", "message": "missing image"}), 400
 
     try:
-        jpg = _decode_dataurl_to_jpg_bytes(image_str)
-    except Exception as e:
+        b64 = strip_dataurl(image_str)
+    except ValueError as e:
         return jsonify({"status": "error", "message": str(e)}), 400
 
-    sess_dir = RAW_DIR / session_id
-    frames_dir = sess_dir / "frames"
-    frames_dir.mkdir(parents=True, exist_ok=True)
-    fp = frames_dir / f"frame_{ts}.jpg"
-    fp.write_bytes(jpg)
-
-    with _sessions_lock:
-        _sessions[session_id]["frames"] = int(_sessions[session_id].get("frames", 0)) + 1
+    # decode / re-encode / write happen on the writer pool
+    fp = _frame_path(session_id, ts)
+    if not ingest_writer.submit(session_id, fp, b64):
+        resp = jsonify({"status": "error", "message": "ingest queue full, retry later"})
+        resp.headers["Retry-After"] = "1"
+        return resp, 429
 
     return jsonify({"status": "queued"}), 200
 
 
-@app.route("/api/ingest_input", methods=["POST"])
+def _frame_path(session_id: str, ts: int) -> Path:
+    return RAW_DIR / session_id / "frames" / f"frame_{ts}.jpg"
+
+
+def _multipart_frames(default_ts: int):
+    """Yield (timestamp, bytes) from multipart parts named "frames" (or "frame")."""
+    files = request.files.getlist("frames") or request.files.getlist("frame")
+    raw_ts = request.form.get("timestamps")
+    timestamps: List[int] = []
+    if raw_ts:
+        try:
+            parsed = json.loads(raw_ts) if raw_ts.strip().startswith("[") else raw_ts.split(",")
+            timestamps = [int(t) for t in parsed]
+        except (TypeError, ValueError):
+            raise ValueError("timestamps must be a JSON list or comma-separated integers")
+        if len(timestamps) != len(files):
+            raise ValueError("timestamps length must match number of frames")
+
+    for i, f in enumerate(files):
+        if timestamps:
+            ts = timestamps[i]
+        else:
+            ts = frame_ts_from_path(Path(f.filename or ""))
+            if ts is None:
+                ts = default_ts + i
+        yield ts, f.read()
+
+
+@bp.route("/api/ingest_frames", methods=["POST"])
+def api_ingest_frames():
+    """
+    Bulk frame upload. session_id comes from the query string (or multipart form field).
+      - multipart/form-data: parts "frames" (binary image files); timestamps from the
+        "timestamps" field (JSON list / comma-separated, same order) or frame_<ts>.jpg filenames
+        (other names get the request time + their index)
+      - application/octet-stream: repeated [int64 BE timestamp_ms][uint32 BE length][bytes]
+    Frames go through the same writer pool and file layout as /api/ingest_frame.
+    """
+    session_id = (request.args.get("session_id") or request.form.get("session_id") or _last_session_id or "").strip()
+    if not session_id:
+        return jsonify({"status": "error", "message": "missing session_id"}), 400
+    rejected = _not_recording(session_id)
+    if rejected:
+        return rejected
+
+    ctype = (request.mimetype or "").lower()
+    if ctype == "multipart/form-data":
+        frames = _multipart_frames(int(time.time() * 1000))
+    elif ctype in ("application/octet-stream", "application/x-frame-stream"):
+        frames = iter_packed_frames(request.stream)
+    else:
+        return jsonify({"status": "error", "message": "use multipart/form-data or application/octet-stream"}), 415
+
+    accepted = 0
+    status, body = 200, {"status": "queued"}
+    try:
+        for ts, data in frames:
+            if not data:
+                continue
+            path = _frame_path(session_id, ts)
+            if not ingest_writer.submit(session_id, path, data, block_timeout=INGEST_BATCH_BLOCK_SEC):
+                status = 429
+                body = {"status": "partial", "message": "ingest queue full, retry remaining frames"}
+                break
+            accepted += 1
+    except ValueError as e:
+        status, body = 400, {"status": "error", "message": str(e)}
+
+    body["accepted"] = accepted
+    resp = jsonify(body)
+    if status == 429:
+        resp.headers["Retry-After"] = "1"
+    return resp, status
+
+
+def _input_record(ev: Any, default_ts: int) -> Tuple[Optional[dict], Optional[str]]:
+    if not isinstance(ev, dict):
+        return None, "event must be an object"
+    keys = ev.get("keys", [])
+    if not isinstance(keys, list):
+        return None, "keys must be a list"
+    try:
+        ts = int(ev.get("timestamp") or default_ts)
+    except (TypeError, ValueError):
+        return None, "timestamp must be an integer"
+    return {"timestamp": ts, "keys": keys}, None
+
+
+def _append_inputs(session_id: str, records: List[dict]) -> int:
+    """Append to the session's input log and keep its "inputs" counter current (written behind)."""
+    n = input_logs.append(session_id, RAW_DIR / session_id / "inputs.jsonl", records)
+    if n:
+        capture_sessions.incr(session_id, "inputs", n)
+    return n
+
+
+@bp.route("/api/ingest_input", methods=["POST"])
 def api_ingest_input():
     """
     Accepts:
@@ -856,33 +1337,65 @@ def api_ingest_input():
     """
     data = request.get_json(silent=True) or {}
     session_id = (data.get("session_id") or _last_session_id or "").strip()
-    ts = int(data.get("timestamp") or int(time.time() * 1000))
-    keys = data.get("keys", [])
 
     if not session_id:
         return jsonify({"status": "error", "message": "missing session_id"}), 400
 
-    with _sessions_lock:
-        if session_id not in _sessions:
-            return jsonify({"status": "error", "message": "invalid session_id"}), 400
+    # the registry lookup is an in-memory hit
+    rejected = _not_recording(session_id)
+    if rejected:
+        return rejected
 
-    if not isinstance(keys, list):
-        return jsonify({"status": "error", "message": "keys must be a list"}), 400
+    rec, err = _input_record(data, int(time.time() * 1000))
+    if err:
+        return jsonify({"status": "error", "message": err}), 400
 
-    sess_dir = RAW_DIR / session_id
-    inputs_path = sess_dir / "inputs.jsonl"
-    rec = {"timestamp": ts, "keys": keys}
+    try:
+        _append_inputs(session_id, [rec])
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
 
-    with inputs_path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(rec) + "\n")
+    return jsonify({"status": "logged"}), 200
 
-    with _sessions_lock:
-        _sessions[session_id]["inputs"] = int(_sessions[session_id].get("inputs", 0)) + 1
 
-    return jsonify({"status": "logged"}), 200
+@bp.route("/api/ingest_input_batch", methods=["POST"])
+def api_ingest_input_batch():
+    """
+    Accepts:
+      { "session_id": "sess_xxx", "events": [ {"keys": ["w"], "timestamp": 12345}, ... ] }
+    All events are validated before any is written.
+    """
+    data = request.get_json(silent=True) or {}
+    session_id = (data.get("session_id") or _last_session_id or "").strip()
+    events = data.get("events")
+
+    if not session_id:
+        return jsonify({"status": "error", "message": "missing session_id"}), 400
+    rejected = _not_recording(session_id)
+    if rejected:
+        return rejected
+    if not isinstance(events, list):
+        return jsonify({"status": "error", "message": "events must be a list"}), 400
+    if len(events) > INPUT_BATCH_MAX:
+        return jsonify({"status": "error", "message": f"too many events (max {INPUT_BATCH_MAX})"}), 413
+
+    now_ms = int(time.time() * 1000)
+    records: List[dict] = []
+    for i, ev in enumerate(events):
+        rec, err = _input_record(ev, now_ms)
+        if err:
+            return jsonify({"status": "error", "message": f"events[{i}]: {err}"}), 400
+        records.append(rec)
+
+    try:
+        n = _append_inputs(session_id, records)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+    return jsonify({"status": "logged", "count": n}), 200
 
 
-@app.route("/api/stop_capture", methods=["POST"])
+@bp.route("/api/stop_capture", methods=["POST"])
 def api_stop_capture():
     data = request.get_json(silent=True) or {}
     session_id = (data.get("session_id") or _last_session_id or "").strip()
@@ -890,26 +1403,90 @@ def api_stop_capture():
     if not session_id:
         return jsonify({"success": False, "message": "missing session_id"}), 400
 
-    with _sessions_lock:
-        if session_id not in _sessions:
-            return jsonify({"success": False, "message": "invalid session_id"}), 400
+    if session_id not in capture_sessions:
+        return jsonify({"success": False, "message": "invalid session_id"}), 400
+
+    # refuse new frames/events (409), then make sure every acknowledged one is on disk before exporting
+    capture_sessions.update(session_id, status="stopping")
+    ingest_writer.wait_idle(session_id, timeout=30.0)
+    archive = frame_archives.close(session_id)
+    input_logs.close(session_id)  # the "inputs" counter is kept current by _append_inputs
+    capture_sessions.update(session_id, status="stopped", stopped=int(time.time()))
+
+    sess_dir = RAW_DIR / session_id
+    zip_path = RAW_DIR / f"{session_id}.zip"
+
+    body = {"success": True, "dataset_path": str(sess_dir), "zip": str(zip_path)}
+    if archive is not None:
+        body["frames_stored"] = len(archive)
+    # zip is written in the background; poll /api/export_status/<id> or stream /api/export/<id>
+    if bool(data.get("export", True)):
+        body["export"] = session_exports.start(session_id, sess_dir, zip_path)
+    return jsonify(body), 200
+
+
+@bp.route("/api/export_status/<session_id>", methods=["GET"])
+def api_export_status(session_id: str):
+    job = session_exports.status(session_id)
+    if not job:
+        return jsonify({"success": False, "message": "no export for session"}), 404
+    return jsonify(job), 200
+
 
+@bp.route("/api/export/<session_id>", methods=["GET"])
+def api_export_download(session_id: str):
+    """Finished export -> the file; otherwise the ZIP is built on the fly while it downloads."""
     sess_dir = RAW_DIR / session_id
+    if not session_id.startswith("sess_") or not sess_dir.is_dir():
+        return jsonify({"success": False, "message": "unknown session"}), 404
+
+    job = session_exports.status(session_id)
     zip_path = RAW_DIR / f"{session_id}.zip"
+    if job and job["status"] == "completed" and zip_path.exists():
+        return send_file(str(zip_path), mimetype="application/zip", as_attachment=True, download_name=zip_path.name)
+
+    # still recording: make acknowledged frames visible first
+    ingest_writer.wait_idle(session_id, timeout=30.0)
+    frame_archives.flush(session_id)
+    input_logs.flush(session_id)
+    resp = Response(stream_with_context(iter_session_zip(sess_dir)), mimetype="application/zip")
+    resp.headers["Content-Disposition"] = f'attachment; filename="{session_id}.zip"'
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
 
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        for p in sess_dir.rglob("*"):
-            if p.is_file():
-                z.write(p, arcname=str(p.relative_to(sess_dir)))
 
-    return jsonify({"success": True, "dataset_path": str(sess_dir), "zip": str(zip_path)}), 200
+REGISTRY_QUERY_MAX = 500
 
 
-@app.route("/api/train_offline", methods=["POST"])
+def _registry_query(registry: RecordRegistry, key: str):
+    """?status=a,b&since=&until=(unix ts)&offset=&limit= over a registry's history, newest first."""
+    try:
+        since = request.args.get("since")
+        until = request.args.get("until")
+        since_ts = float(since) if since else None
+        until_ts = float(until) if until else None
+        offset = max(int(request.args.get("offset", 0)), 0)
+        limit = min(max(int(request.args.get("limit", 50)), 0), REGISTRY_QUERY_MAX)
+    except ValueError:
+        return jsonify({"success": False, "message": "since/until must be unix timestamps, offset/limit integers"}), 400
+    items, total = registry.query(request.args.get("status"), since_ts, until_ts, limit, offset)
+    for item in items:
+        item.pop("log_tail", None)
+    return jsonify({key: items, "total": total, "offset": offset, "limit": limit}), 200
+
+
+@bp.route("/api/sessions", methods=["GET"])
+def api_sessions():
+    """Capture sessions (recording/stopped), including those from previous runs."""
+    return _registry_query(capture_sessions, "sessions")
+
+
+@bp.route("/api/train_offline", methods=["POST"])
 def api_train_offline():
     """
     Accepts:
-      { "dataset": "sess_xxx", "model_type": "nn"|"transformer", "epochs": 10 }
+      { "dataset": "sess_xxx", "model_type": "nn"|"transformer", "epochs": 10, "priority": 0 }
+    Jobs run through training_scheduler (higher priority first, FIFO within a priority).
     """
     data = request.get_json(silent=True) or {}
     dataset = (data.get("dataset") or _last_session_id or "").strip()
@@ -925,72 +1502,217 @@ def api_train_offline():
         return jsonify({"success": False, "message": "dataset must be provided"}), 400
 
     # dataset can be a known session OR an existing raw folder
-    with _sessions_lock:
-        known = dataset in _sessions
+    known = dataset in capture_sessions
     if (not known) and not (RAW_DIR / dataset).exists():
         return jsonify({"success": False, "message": "dataset must be a valid session_id"}), 400
 
+    try:
+        priority = int(data.get("priority") or 0)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "priority must be an integer"}), 400
+
     job_id = f"job_{uuid.uuid4().hex[:8]}"
     with _jobs_lock:
-        _jobs[job_id] = {"job_id": job_id, "status": "queued", "created": int(time.time())}
-
-    t = Thread(target=_run_training_job, args=(job_id, dataset, model_type, epochs), daemon=True)
-    t.start()
-
-    return jsonify({"job_id": job_id, "status": "started"}), 200
+        _job_logs[job_id] = LogRing()
+    job_registry.put(
+        job_id,
+        {
+            "job_id": job_id,
+            "status": "queued",
+            "created": int(time.time()),
+            "dataset": dataset,
+            "epochs": epochs,
+            "priority": priority,
+        },
+    )
+
+    info = training_scheduler.submit(
+        job_id,
+        lambda ctx: _run_training_job(ctx, dataset, model_type, epochs),
+        priority=priority,
+        units=epochs,
+    )
+    status = "started" if info.get("queue_position") == 0 else "queued"
+    return jsonify({"job_id": job_id, "status": status, **info}), 200
+
+
+def _cursor_arg(name: str = "cursor") -> Optional[int]:
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return None
+    try:
+        return max(int(raw), 0)
+    except ValueError:
+        return None
 
 
-@app.route("/api/train_status/<job_id>", methods=["GET"])
+@bp.route("/api/train_status/<job_id>", methods=["GET"])
 def api_train_status(job_id: str):
-    with _jobs_lock:
-        job = _jobs.get(job_id)
+    """
+    ?cursor=N[&limit=M] -> log_lines after line offset N, log_cursor for the next call;
+    without a cursor the legacy "log" field (last 300 lines) is returned.
+    """
+    job = job_registry.get(job_id)
     if not job:
         return jsonify({"success": False, "message": "job not found"}), 404
+    with _jobs_lock:
+        log = _job_logs.get(job_id)
+    log_tail = job.pop("log_tail", None)
+    job.update(training_scheduler.info(job_id))
+    if log is None and log_tail is not None:
+        job["log"] = "\n".join(log_tail)  # finished job whose ring was released
+    elif log is not None:
+        cursor = _cursor_arg()
+        if cursor is None:
+            job["log"] = "\n".join(log.tail(300))
+            job["log_cursor"] = log.next_offset
+            job["log_progress"] = log.progress
+        else:
+            job.update(log.snapshot(cursor, _cursor_arg("limit")))
     return jsonify(job), 200
 
 
+@bp.route("/api/train_log/<job_id>/events", methods=["GET"])
+def api_train_log_events(job_id: str):
+    """
+    SSE follow of a training log from ?cursor=N (or Last-Event-ID). Events:
+      {"type":"log","offset":first,"lines":[...]} (id: next cursor), {"type":"progress","line":...},
+      {"type":"done","status":...}
+    """
+    with _jobs_lock:
+        log = _job_logs.get(job_id)
+    if log is None:
+        if job_id in job_registry:
+            return jsonify({"success": False, "message": "job log is no longer followable, see /api/train_status"}), 410
+        return jsonify({"success": False, "message": "job not found"}), 404
+    cursor = _cursor_arg()
+    if cursor is None:
+        try:
+            cursor = max(int(request.headers.get("Last-Event-ID", "0")), 0)
+        except ValueError:
+            cursor = 0
+
+    def gen(cur: int):
+        progress = None
+        while True:
+            lines, nxt, dropped = log.read(cur, 500)
+            if dropped:
+                yield f"data: {json.dumps({'type': 'dropped', 'count': dropped})}\n\n"
+            if lines:
+                yield f"id: {nxt}\ndata: {json.dumps({'type': 'log', 'offset': nxt - len(lines), 'lines': lines})}\n\n"
+                cur = nxt
+                continue
+            cur = nxt
+            if log.closed:
+                status = (job_registry.get(job_id) or {}).get("status")
+                yield f"data: {json.dumps({'type': 'done', 'status': status})}\n\n"
+                return
+            if log.progress != progress:
+                progress = log.progress
+                yield f"data: {json.dumps({'type': 'progress', 'line': progress})}\n\n"
+            if not log.wait(cur, timeout=15.0, progress=progress):
+                yield ": ping\n\n"
+
+    return _sse_response(gen(cursor))
+
+
+def _train_signal(job_id: str, hard: bool):
+    if job_id not in job_registry:
+        return jsonify({"success": False, "message": "job not found"}), 404
+    state = training_scheduler.cancel(job_id, hard=hard)
+    if state is None:
+        return jsonify({"success": False, "message": "job is not queued or running"}), 409
+    return jsonify({"success": True, "job_id": job_id, "status": state}), 200
+
+
+@bp.route("/api/train_cancel/<job_id>", methods=["POST"])
+def api_train_cancel(job_id: str):
+    """Queued: removed. Running: SIGTERM to the training process group."""
+    return _train_signal(job_id, hard=False)
+
+
+@bp.route("/api/train_kill/<job_id>", methods=["POST"])
+def api_train_kill(job_id: str):
+    """Running: SIGKILL to the training process group."""
+    return _train_signal(job_id, hard=True)
+
+
+@bp.route("/api/train_queue", methods=["GET"])
+def api_train_queue():
+    return jsonify(training_scheduler.stats()), 200
+
+
+@bp.route("/api/jobs", methods=["GET"])
+def api_jobs():
+    """Training job history; ?status=queued,training for active ones."""
+    return _registry_query(job_registry, "jobs")
+
+
 # ---------------------------------------------------------------------
 # Inference Lab APIs
 # ---------------------------------------------------------------------
-@app.route("/api/predict", methods=["POST"])
+@bp.route("/api/predict", methods=["POST"])
 def api_predict():
-    data = request.get_json(silent=True)
-    if not isinstance(data, dict):
+    """
+    Proxies the request body (a JSON object, or raw float32 features as application/x-float32) as-is
+    to the replica with the fewest outstanding requests (?session_id= or X-Session-Id pins a session
+    to one replica) over a pooled keep-alive connection, or the shared-memory ring for local replicas
+    with MODEL_TRANSPORT=shm, and streams the response back unparsed. Router metadata is returned in headers:
+      X-Active-Model, X-Model-Replica, X-Router-Latency-Ms (time to upstream response headers)
+    """
+    body = request.get_data(cache=False)
+    if request.mimetype != FEATURES_CONTENT_TYPE and not body.lstrip().startswith(b"{"):
         return jsonify({"success": False, "error": "payload must be JSON object"}), 400
+    session_id = request.args.get("session_id") or request.headers.get("X-Session-Id")
 
-    if not is_service_running(TRANSFORMER_PORT):
-        ok, _, msg = start_service("transformer", TRANSFORMER_SCRIPT, TRANSFORMER_PORT)
-        if not ok:
-            return jsonify({"success": False, "error": "transformer not available", "details": msg}), 503
-    port = TRANSFORMER_PORT
+    if not model_pool.available():
+        if not model_pool.check_all():
+            ok, _, msg = start_service("transformer", TRANSFORMER_SCRIPT, TRANSFORMER_PORT)
+            if not ok:
+                return jsonify({"success": False, "error": "transformer not available", "details": msg}), 503
 
-    t0 = time.time()
+    t0 = time.perf_counter()
     try:
-        resp = requests.post(_predict_url(port), json=data, timeout=8)
-        latency_ms = int((time.time() - t0) * 1000)
-        if resp.status_code != 200:
-            return (
-                jsonify(
-                    {
-                        "success": False,
-                        "error": "model service error",
-                        "status_code": resp.status_code,
-                        "details": resp.text,
-                        "router_latency_ms": latency_ms,
-                        "active_model": active_model,
-                    }
-                ),
-                502,
-            )
-        payload = resp.json()
-        payload["active_model"] = active_model
-        payload["router_latency_ms"] = latency_ms
-        return jsonify(payload), 200
-    except Exception as e:
+        replica, resp = model_pool.forward("/predict", body, session_id, request.content_type or "application/json")
+    except NoReplicaError as e:
+        return jsonify({"success": False, "error": "transformer not available", "details": str(e)}), 503
+    except requests.RequestException as e:
         return jsonify({"success": False, "error": "failed to reach model service", "details": str(e)}), 502
+    latency_ms = int((time.perf_counter() - t0) * 1000)
+
+    if resp.status_code != 200:
+        try:
+            details = resp.text  # error bodies are small; reading also returns the connection
+        finally:
+            model_pool.release(replica, ok=False)
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": "model service error",
+                    "status_code": resp.status_code,
+                    "details": details,
+                    "replica": replica.name,
+                    "router_latency_ms": latency_ms,
+                    "active_model": active_model,
+                }
+            ),
+            502,
+        )
+
+    out = Response(
+        stream_with_context(model_pool.relay(replica, resp)), status=200, content_type=resp.headers.get("Content-Type")
+    )
+    for h in ("Content-Length", "Content-Encoding"):
+        if h in resp.headers:
+            out.headers[h] = resp.headers[h]
+    out.headers["X-Active-Model"] = active_model
+    out.headers["X-Model-Replica"] = replica.name
+    out.headers["X-Router-Latency-Ms"] = str(latency_ms)
+    return out
 
 
-@app.route("/api/test_predict", methods=["POST"])
+@bp.route("/api/test_predict", methods=["POST"])
 def api_test_predict():
     data = request.get_json(silent=True) or {}
     model = (data.get("model") or "transformer").strip().lower()
@@ -1008,7 +1730,7 @@ def api_test_predict():
 
     t0 = time.time()
     try:
-        resp = requests.post(_predict_url(port), json=dummy, timeout=8)
+        _, resp = model_pool.request("/predict", json.dumps(dummy).encode("utf-8"))
         latency_ms = int((time.time() - t0) * 1000)
         if resp.status_code != 200:
             return jsonify({"success": False, "message": f"service returned {resp.status_code}", "latency_ms": latency_ms, "details": resp.text}), 502
@@ -1018,50 +1740,250 @@ def api_test_predict():
         return jsonify({"success": False, "message": str(e)}), 502
 
 
+# ---------------------------------------------------------------------
+# Stream Session APIs
+# ---------------------------------------------------------------------
+def _sse_response(gen) -> Response:
+    """Unbuffered text/event-stream response (no proxy buffering, no caching)."""
+    resp = Response(stream_with_context(gen), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.headers["Connection"] = "keep-alive"
+    return resp
+
+
+@bp.route("/api/stream/start", methods=["POST"])
+def api_stream_start():
+    """
+    Accepts:
+      { "url": "https://...|file://...|synthetic://...", "mode": "infer"|"train",
+        "model_type": "transformer", "session_id": "opt", "include_frames": true, "max_fps": 8 }
+    Returns immediately; the session resolves its source in the background (status="resolving").
+    Local sources (file://, dir://, paths) are refused unless they lie under STREAM_LOCAL_ROOT.
+    """
+    data = request.get_json(silent=True) or {}
+    session_id = str(data.get("session_id") or f"stream_{uuid.uuid4().hex[:8]}").strip()
+    try:
+        max_fps = float(data.get("max_fps", 8.0))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "max_fps must be a number"}), 400
+    try:
+        check_session_id(session_id)
+        check_client_source((data.get("url") or "").strip(), STREAM_LOCAL_ROOT)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        sess = stream_manager.create_session(
+            session_id=session_id,
+            mode=data.get("mode") or "infer",
+            url=data.get("url") or "",
+            model_type=data.get("model_type") or "transformer",
+            include_frames=bool(data.get("include_frames", True)),
+            max_fps=max_fps,
+        )
+    except StreamCapacityError as e:
+        return jsonify({"success": False, "message": str(e), "capacity": stream_manager.capacity()}), 429
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    return jsonify({"success": True, "session": sess.to_dict()}), 200
+
+
+@bp.route("/api/stream/sessions", methods=["GET"])
+def api_stream_sessions():
+    return jsonify({"sessions": stream_manager.list_sessions(), "capacity": stream_manager.capacity()}), 200
+
+
+@bp.route("/api/stream/history", methods=["GET"])
+def api_stream_history():
+    """Every stream session ever started (final state of finished ones), newest first."""
+    return _registry_query(stream_history, "sessions")
+
+
+@bp.route("/api/stream/<session_id>", methods=["GET"])
+def api_stream_session(session_id: str):
+    info = stream_manager.get_record(session_id)
+    if info is None:
+        return jsonify({"success": False, "message": "stream session not found"}), 404
+    return jsonify(info), 200
+
+
+@bp.route("/api/stream/stop", methods=["POST"])
+def api_stream_stop():
+    data = request.get_json(silent=True) or {}
+    session_id = (data.get("session_id") or "").strip()
+    if not session_id:
+        return jsonify({"success": False, "message": "missing session_id"}), 400
+    if not stream_manager.stop_session(session_id):
+        return jsonify({"success": False, "message": "stream session not found"}), 404
+    return jsonify({"success": True, "session_id": session_id}), 200
+
+
+@bp.route("/api/stream/events/<session_id>", methods=["GET"])
+def api_stream_events(session_id: str):
+    sess = stream_manager.get_session(session_id)
+    if sess is None:
+        return jsonify({"success": False, "message": "stream session not found"}), 404
+    return _sse_response(sess.iter_sse())
+
+
 # ---------------------------------------------------------------------
 # Analytics & Logs APIs
 # ---------------------------------------------------------------------
-@app.route("/api/metrics", methods=["GET"])
+@bp.route("/api/metrics", methods=["GET"])
 def api_metrics():
-    cpu = psutil.cpu_percent(interval=0.1)
-    ram = psutil.virtual_memory().percent
+    """
+    Latest background sample (no probing on the request thread).
+    ?since=<unix ts> adds "series": the sampled history newer than ts as columns; ?limit=N caps it.
+    """
+    latest = metrics_sampler.latest() or metrics_sampler.sample()
+    payload: Dict[str, Any] = dict(latest)
+    payload["sampled_at"] = payload.pop("ts")
+    payload["sampler"] = metrics_sampler.stats()
+    payload["ingest"] = ingest_writer.stats()
+    payload["input_logs"] = input_logs.stats()
+
+    since = request.args.get("since")
+    if since is not None:
+        try:
+            since_ts = float(since)
+            limit = request.args.get("limit")
+            limit_n = int(limit) if limit is not None else None
+        except ValueError:
+            return jsonify({"success": False, "error": "since must be a unix timestamp, limit an integer"}), 400
+        payload["series"] = metrics_sampler.since(since_ts, limit_n)
+    return jsonify(payload), 200
+
+
+@bp.route("/api/telemetry", methods=["GET"])
+def api_telemetry():
+    """Per-route request telemetry. ?format=prometheus for the text exposition format."""
+    if request.args.get("format") == "prometheus":
+        return Response(request_telemetry.prometheus(), mimetype="text/plain; version=0.0.4")
+    return jsonify(request_telemetry.snapshot()), 200
 
-    gpu = None
-    try:
-        if shutil.which("nvidia-smi"):
-            out = subprocess.check_output(
-                ["nvidia-smi", "--query-gpu=utilization.gpu", "--format=csv,noheader,nounits"],
-                text=True,
-            )
-            gpu = float(out.strip().splitlines()[0])
-    except Exception:
-        gpu = None
 
-    rps = _compute_rps(window_sec=5)
-    return jsonify({"cpu": cpu, "ram": ram, "gpu": gpu, "rps": rps}), 200
+SERVICE_LOG_TAIL_LINES = 200
+SERVICE_LOG_MAX_LINES = 5000
+SERVICE_LOG_POLL_SEC = float(os.environ.get("SERVICE_LOG_POLL_SEC", "0.5"))
 
 
-@app.route("/api/service_log/<service_name>", methods=["GET"])
+@bp.route("/api/service_log/<service_name>", methods=["GET"])
 def api_service_log(service_name: str):
+    """
+    Without offset: the last ?lines=N (default 200) lines. With ?offset=<byte>&file_id=<id>: the lines
+    written after that offset. Both return "offset"/"file_id" to pass to the next call; "reset"
+    means the log was rotated or truncated and reading restarted from its beginning.
+    """
     if service_name not in ("transformer",):
         return jsonify({"error": "invalid service"}), 400
     p = _service_log_path(service_name)
     if not p.exists():
-        return jsonify({"log": "", "note": "no log yet"}), 200
-    lines = p.read_text(encoding="utf-8", errors="replace").splitlines()[-200:]
-    return jsonify({"log": "\n".join(lines)}), 200
+        return jsonify({"log": "", "lines": [], "offset": 0, "file_id": None, "note": "no log yet"}), 200
+    try:
+        offset = request.args.get("offset")
+        n = min(max(int(request.args.get("lines", SERVICE_LOG_TAIL_LINES)), 0), SERVICE_LOG_MAX_LINES)
+        out = read_since(p, int(offset), request.args.get("file_id")) if offset is not None else tail(p, n)
+    except ValueError:
+        return jsonify({"error": "offset and lines must be integers"}), 400
+    out["log"] = "\n".join(out["lines"])
+    return jsonify(out), 200
+
+
+@bp.route("/api/service_log/<service_name>/events", methods=["GET"])
+def api_service_log_events(service_name: str):
+    """
+    SSE follow from ?offset=&file_id= (or Last-Event-ID "<file_id>:<offset>"; default: the current end).
+    Events: {"type":"log","lines":[...]} (id: "<file_id>:<offset>"), {"type":"reset"} on rotation/truncation.
+    """
+    if service_name not in ("transformer",):
+        return jsonify({"error": "invalid service"}), 400
+    fid = request.args.get("file_id")
+    offset_arg = request.args.get("offset")
+    last_id = request.headers.get("Last-Event-ID", "")
+    if offset_arg is None and ":" in last_id:
+        fid, _, offset_arg = last_id.rpartition(":")
+    try:
+        offset = int(offset_arg) if offset_arg is not None else None
+    except ValueError:
+        return jsonify({"error": "offset must be an integer"}), 400
+    follower = LogFollower(_service_log_path(service_name), offset, fid)
+
+    def gen():
+        idle = 0.0
+        try:
+            while True:
+                out = follower.poll()
+                if out["reset"]:
+                    yield f"data: {json.dumps({'type': 'reset', 'file_id': out['file_id']})}\n\n"
+                if out["lines"]:
+                    idle = 0.0
+                    event = {"type": "log", "lines": out["lines"]}
+                    yield f"id: {out['file_id']}:{out['offset']}\ndata: {json.dumps(event)}\n\n"
+                    continue
+                time.sleep(SERVICE_LOG_POLL_SEC)
+                idle += SERVICE_LOG_POLL_SEC
+                if idle >= 15.0:
+                    idle = 0.0
+                    yield ": ping\n\n"
+        finally:
+            follower.close()
+
+    return _sse_response(gen())
 
 
 # ---------------------------------------------------------------------
 # Legacy health
 # ---------------------------------------------------------------------
-@app.route("/health", methods=["GET"])
+@bp.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy", "timestamp": time.time()}), 200
+    return jsonify({"status": "healthy", "timestamp": time.time(), "startup": profile.report()}), 200
+
+
+# ---------------------------------------------------------------------
+# App factory / 应用工厂
+# ---------------------------------------------------------------------
+def create_app() -> Flask:
+    """
+    Flask app with every route of this module. The first call also builds the background
+    services (_init_state); later calls share them.
+    """
+    with profile.phase("init_state"):
+        _init_state()
+    with profile.phase("create_app"):
+        app = Flask(__name__, static_folder=str(FRONTEND_DIR), static_url_path="")
+        app.request_class = ControlRequest
+        CORS(app, resources={r"/api/*": {"origins": "*"}})
+        app.register_blueprint(bp)
+    profile.mark_ready()
+    return app
+
+
+_default_app: Optional[Flask] = None
+
+
+def __getattr__(name: str) -> Any:
+    # `control_backend:app` (gunicorn, scripts/benchmark_ingest.py) is created on first access
+    global _default_app
+    if name == "app":
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def cleanup():
-    stop_service("transformer")
+    metrics_sampler.stop()
+    model_catalog.stop()
+    stream_manager.stop_all()
+    training_scheduler.shutdown()
+    model_pool.shutdown()
+    ingest_writer.close()
+    frame_archives.close_all()
+    input_logs.close_all()
+    for registry in (capture_sessions, job_registry, stream_history):
+        registry.stop()  # flushes write-behind counters
     for k, f in list(service_logs.items()):
         try:
             if f and not f.closed:
@@ -1072,10 +1994,10 @@ def cleanup():
         service_logs[k] = None
 
 
-atexit.register(cleanup)
-
-
 if __name__ == "__main__":
+    app = create_app()
     print(f"Starting Control Backend on {BACKEND_HOST}:{BACKEND_PORT}")
     print(f"UI: http://localhost:{BACKEND_PORT}/")
-    app.run(host=BACKEND_HOST, port=BACKEND_PORT, debug=False)
+    model_pool.warm_standby()  # the first /api/start_transformer promotes them
+    # threaded=True: SSE subscribers hold a connection each
+    app.run(host=BACKEND_HOST, port=BACKEND_PORT, debug=False, threaded=True)
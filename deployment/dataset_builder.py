@@ -0,0 +1,179 @@
+"""
+deployment/dataset_builder.py
+
+Capture session -> training dataset:
+- Frames are streamed as raw JPEG bytes (frames.pack or frames/) and featurized directly
+  with feature_extractor.image_bytes_to_features (no base64 round trip)
+- Featurization fans out over a process pool in chunks (bounded number in flight);
+  small sessions and workers<=1 run in-process
+- Inputs are aligned to frames with one vectorized searchsorted over the sorted input
+  timestamps (exact match, else nearest within tolerance_ms), chunk by chunk as results arrive
+- Output: a binary dataset directory (models/transformer/dataset_store.py: features f0..f{n-1}
+  float32 + action int64, memory-mapped by the training script), written through DatasetWriter
+  and published atomically once every frame is in; export_csv=<path> also writes it as CSV
+  (f0..f{n-1}, action) for tools that want a table
+- progress(done, total, fps) is called after every chunk
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from deployment.feature_extractor import image_bytes_to_features
+from deployment.frame_archive import iter_session_frames, session_frame_count
+from models.transformer.dataset_store import DatasetWriter, export_csv as export_dataset_csv
+
+BUILD_WORKERS = int(os.environ.get("DATASET_BUILD_WORKERS", str(max(1, min(8, (os.cpu_count() or 2) - 1)))))
+BUILD_CHUNK = int(os.environ.get("DATASET_BUILD_CHUNK", "64"))
+MP_START_METHOD = os.environ.get("DATASET_BUILD_MP_START", "spawn")  # fork is unsafe in the threaded backend
+
+ProgressFn = Callable[[int, int, float], None]
+
+
+def _featurize_chunk(frames: List[bytes], feature_len: int) -> np.ndarray:
+    out = np.zeros((len(frames), feature_len), dtype=np.float32)
+    for i, data in enumerate(frames):
+        try:
+            out[i] = image_bytes_to_features(data, feature_len)
+        except ValueError:
+            pass  # undecodable frame -> zero row, keeps alignment with timestamps
+    return out
+
+
+def load_inputs(inputs_path: Path) -> Tuple[np.ndarray, List[list]]:
+    """Sorted input timestamps and their key lists (later lines win for duplicate timestamps)."""
+    inputs: Dict[int, list] = {}
+    if inputs_path.exists():
+        with inputs_path.open("r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    obj = json.loads(line)
+                    ts = int(obj.get("timestamp", 0))
+                    keys = obj.get("keys", [])
+                except Exception:
+                    continue
+                if ts:
+                    inputs[ts] = keys if isinstance(keys, list) else []
+    ts_sorted = np.array(sorted(inputs), dtype=np.int64)
+    return ts_sorted, [inputs[int(t)] for t in ts_sorted]
+
+
+def align_nearest(frame_ts: np.ndarray, input_ts: np.ndarray, tolerance_ms: int = 250) -> np.ndarray:
+    """
+    Index into input_ts for every frame: exact match, else the nearest input within
+    tolerance_ms (ties go to the later input); -1 when none.
+    """
+    frame_ts = np.asarray(frame_ts, dtype=np.int64)
+    out = np.full(frame_ts.shape[0], -1, dtype=np.int64)
+    if input_ts.shape[0] == 0 or frame_ts.shape[0] == 0:
+        return out
+    right = np.searchsorted(input_ts, frame_ts, side="left")
+    left = right - 1
+    ri = np.clip(right, 0, input_ts.shape[0] - 1)
+    li = np.clip(left, 0, input_ts.shape[0] - 1)
+    d_right = np.where(right < input_ts.shape[0], np.abs(input_ts[ri] - frame_ts), np.iinfo(np.int64).max)
+    d_left = np.where(left >= 0, np.abs(input_ts[li] - frame_ts), np.iinfo(np.int64).max)
+    best = np.where(d_right <= d_left, ri, li)
+    dist = np.minimum(d_right, d_left)
+    ok = dist <= tolerance_ms
+    out[ok] = best[ok]
+    return out
+
+
+def _chunks(session_dir: Path, size: int) -> Iterator[Tuple[List[int], List[bytes]]]:
+    ts_buf: List[int] = []
+    data_buf: List[bytes] = []
+    for ts, data in iter_session_frames(session_dir):
+        ts_buf.append(ts)
+        data_buf.append(data)
+        if len(data_buf) >= size:
+            yield ts_buf, data_buf
+            ts_buf, data_buf = [], []
+    if data_buf:
+        yield ts_buf, data_buf
+
+
+def build_session_dataset(
+    session_dir: Path,
+    out_path: Path,
+    label_fn: Callable[[list], int],
+    feature_len: int = 128,
+    tolerance_ms: int = 250,
+    workers: int = BUILD_WORKERS,
+    chunk: int = BUILD_CHUNK,
+    progress: Optional[ProgressFn] = None,
+    export_csv: Optional[Path] = None,
+) -> Dict[str, object]:
+    """
+    Featurize every frame of a capture session, label it from inputs.jsonl and write the
+    binary dataset directory out_path.
+    label_fn maps one input event's key list to an action index (applied once per input event;
+    frames with no input within tolerance get label_fn([])).
+    """
+    session_dir = Path(session_dir)
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    total = session_frame_count(session_dir)
+    if total == 0:
+        raise RuntimeError("no frames captured")
+
+    input_ts, input_keys = load_inputs(session_dir / "inputs.jsonl")
+    input_labels = np.array([label_fn(k) for k in input_keys], dtype=np.int64)
+    default_label = label_fn([])
+
+    t0 = time.perf_counter()
+    done = 0
+    matched = 0
+
+    with DatasetWriter(out_path, [f"f{i}" for i in range(feature_len)], source=session_dir.name) as writer:
+
+        def _store(ts: List[int], feats: np.ndarray) -> None:
+            nonlocal done, matched
+            n = min(len(ts), total - done)  # frames appended after counting are ignored
+            match = align_nearest(np.asarray(ts[:n], dtype=np.int64), input_ts, tolerance_ms)
+            actions = np.full(n, default_label, dtype=np.int64)
+            actions[match >= 0] = input_labels[match[match >= 0]]
+            writer.append(feats[:n], actions)
+            matched += int((match >= 0).sum())
+            done += n
+            if progress is not None:
+                progress(done, total, done / max(time.perf_counter() - t0, 1e-9))
+
+        use_pool = workers > 1 and total > chunk * 2
+        if not use_pool:
+            for ts, frames in _chunks(session_dir, chunk):
+                _store(ts, _featurize_chunk(frames, feature_len))
+        else:
+            ctx = mp.get_context(MP_START_METHOD)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                pending: List[Tuple[List[int], object]] = []
+                for ts, frames in _chunks(session_dir, chunk):
+                    pending.append((ts, pool.submit(_featurize_chunk, frames, feature_len)))
+                    while len(pending) > workers * 2:  # bounded memory, results kept in order
+                        done_ts, fut = pending.pop(0)
+                        _store(done_ts, fut.result())
+                for done_ts, fut in pending:
+                    _store(done_ts, fut.result())
+    elapsed = time.perf_counter() - t0
+
+    result: Dict[str, object] = {
+        "frames": done,
+        "dataset_path": str(out_path),
+        "matched_inputs": matched,
+        "featurize_sec": round(elapsed, 3),
+        "fps": round(done / max(elapsed, 1e-9), 1),
+        "workers": workers if use_pool else 1,
+    }
+    if export_csv is not None:
+        export_dataset_csv(out_path, export_csv)
+        result["csv_path"] = str(export_csv)
+    return result
@@ -1,3 +1,27 @@
+"""
+deployment/deploy_transformer.py
+
+Transformer inference service (Flask). Started by the control backend's ServiceSupervisor
+(deployment/service_supervisor.py), which passes:
+- SERVICE_READY_FD: pipe for readiness events (JSON lines): "warm" once the weights are loaded,
+  "serving" once the port is bound
+- SERVICE_STANDBY=1: after "warm", wait on stdin for "serve" (bind the port and take over) or
+  "reload" (load the active weights again, then "warm"); exits when stdin closes
+Run directly, it loads the weights and serves right away.
+
+create_app() builds the Flask app and the model; importing this module does neither, and torch is
+only imported by init_model(). GET /health carries the startup report (deployment/startup_profile.py:
+import times, model build/load phases, time to ready).
+
+Weights are a mappable checkpoint (models/transformer/checkpoint.py: architecture, action names and
+feature spec in the file, zero-copy load, hash checked in the background) or a legacy pickled .pth,
+built with the TRANSFORMER_* architecture.
+
+/predict takes a JSON object ("features"/"state"/"image") or a raw float32 body
+(Content-Type: application/x-float32). With MODEL_TRANSPORT=shm the serving process also answers
+/predict over the same-host shared-memory ring (deployment/shm_transport.py).
+"""
+
 from __future__ import annotations
 
 import json
@@ -6,18 +30,21 @@ import os
 import sys
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-
-import torch
-from flask import Flask, jsonify, request
-from flask_cors import CORS
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 # Imports / paths / 导入和路径
 ROOT_DIR = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT_DIR))
 
-from models.transformer.transformer_model import GameplayTransformer
-from deployment.feature_extractor import safe_features_from_payload
+from deployment.startup_profile import profile  # first: times the imports below
+
+from flask import Blueprint, Flask, jsonify, request
+from flask_cors import CORS
+
+from deployment.feature_extractor import FEATURES_CONTENT_TYPE, features_from_bytes, safe_features_from_payload
+
+if TYPE_CHECKING:
+    import torch
 
 # Logging / 日志配置
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -34,7 +61,8 @@ NUM_LAYERS = int(os.environ.get("TRANSFORMER_NUM_LAYERS", "2"))  # Transformer
 
 HOST = os.environ.get("TRANSFORMER_HOST", "0.0.0.0")  # 服务主机
 PORT = int(os.environ.get("TRANSFORMER_PORT", "5001"))  # 服务端口
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"  # 计算设备（GPU或CPU）
+MODEL_TRANSPORT = os.environ.get("MODEL_TRANSPORT", "http").strip().lower()  # 传输方式 "http" | "shm"
+DEVICE = "cpu"  # 计算设备（init_model() 检测 GPU）
 
 # 从配置文件加载动作映射 / Load action mapping from config file
 def load_action_mapping_from_config() -> Dict[int, str]:
@@ -73,23 +101,56 @@ def load_action_mapping_from_config() -> Dict[int, str]:
 # 动作映射字典 / Action mapping dictionary
 ACTION_MAPPING = load_action_mapping_from_config()
 OUTPUT_SIZE = len(ACTION_MAPPING)  # 输出类别数（自动从配置获取）/ Output size (auto from config)
-
-# -----------------------------------------------------------------------------
-# Flask app / Flask应用
-# -----------------------------------------------------------------------------
-app = Flask(__name__)
-CORS(app)
+_CONFIG = (INPUT_SIZE, ACTION_MAPPING)  # 旧格式 .pth 使用的配置 / used for pickled .pth weights
 
 # -----------------------------------------------------------------------------
 # Model / 模型
 # -----------------------------------------------------------------------------
-model = GameplayTransformer(INPUT_SIZE, NUM_HEADS, HIDDEN_SIZE, NUM_LAYERS, OUTPUT_SIZE).to(DEVICE)
+model = None  # GameplayTransformer, built by init_model()
 model_loaded: bool = False
 model_error: Optional[str] = None
+checkpoint = None  # models.transformer.checkpoint.Checkpoint of the loaded weights (None for a pickled .pth)
+INITIAL_LOAD_MS = 0.0
+_torch_imported = False
 
 
-def load_weights() -> None:
+def init_model() -> None:
+    """Import torch, then build the model and load the weights; a no-op once that has run."""
+    global DEVICE, INITIAL_LOAD_MS, _torch_imported
+    if _torch_imported:
+        return
+    with profile.phase("import_torch"):
+        import torch
+
+        import models.transformer.transformer_model  # noqa: F401
+    DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+    _torch_imported = True
+    t0 = time.perf_counter()
+    with profile.phase("load_weights"):
+        load_weights()
+    INITIAL_LOAD_MS = (time.perf_counter() - t0) * 1000.0
+
+
+def _on_verified(ckpt, ok: bool) -> None:
     global model_loaded, model_error
+    if not ok and ckpt is checkpoint:
+        model_loaded = False
+        model_error = f"Checkpoint integrity check failed (sha256 mismatch): {ckpt.path}"
+
+
+def load_weights() -> None:
+    """
+    Build a model for MODEL_PATH and swap it in. A mappable checkpoint brings its architecture, action
+    names and input size and is mapped zero-copy, loaded strictly and hashed in the background; a pickled
+    .pth gets the TRANSFORMER_* architecture and a non-strict load.
+    """
+    global model, model_loaded, model_error, checkpoint, INPUT_SIZE, ACTION_MAPPING
+    if not _torch_imported:
+        init_model()  # imports torch, then loads through here
+        return
+    from models.transformer.checkpoint import build_model, load_state_dict
+    from models.transformer.transformer_model import GameplayTransformer
+
     if not MODEL_PATH.exists():
         model_loaded = False
         model_error = f"Model weights not found at: {MODEL_PATH}"
@@ -97,19 +158,29 @@ def load_weights() -> None:
         return
 
     try:
-        state = torch.load(str(MODEL_PATH), map_location=DEVICE)
-        if isinstance(state, dict) and "state_dict" in state and isinstance(state["state_dict"], dict):
-            state = state["state_dict"]
-
-        missing, unexpected = model.load_state_dict(state, strict=False)
-        if missing:
-            logger.warning("Missing keys (strict=False): %s", missing)
-        if unexpected:
-            logger.warning("Unexpected keys (strict=False): %s", unexpected)
-
-        model.eval()
+        state, ckpt = load_state_dict(MODEL_PATH, DEVICE)
+        with profile.phase("build_model"):
+            if ckpt is not None:
+                new_model = build_model(GameplayTransformer, ckpt.architecture, state)
+            else:
+                new_model = GameplayTransformer(_CONFIG[0], NUM_HEADS, HIDDEN_SIZE, NUM_LAYERS, OUTPUT_SIZE)
+                missing, unexpected = new_model.load_state_dict(state, strict=False)
+                if missing:
+                    logger.warning("Missing keys (strict=False): %s", missing)
+                if unexpected:
+                    logger.warning("Unexpected keys (strict=False): %s", unexpected)
+            new_model = new_model.to(DEVICE).eval()
+
+        INPUT_SIZE, ACTION_MAPPING = _CONFIG
+        if ckpt is not None:
+            INPUT_SIZE = ckpt.architecture["input_size"]
+            if ckpt.actions:
+                ACTION_MAPPING = dict(enumerate(ckpt.actions))
+        model, checkpoint = new_model, ckpt
         model_loaded = True
         model_error = None
+        if ckpt is not None:
+            ckpt.verify_async(lambda ok: _on_verified(ckpt, ok))
         logger.info("Transformer weights loaded: %s (device=%s)", MODEL_PATH, DEVICE)
     except Exception as e:
         model_loaded = False
@@ -117,8 +188,6 @@ def load_weights() -> None:
         logger.exception("Failed to load Transformer weights: %s", e)
 
 
-load_weights()
-
 # -----------------------------------------------------------------------------
 # Payload -> features (production-safe)
 # -----------------------------------------------------------------------------
@@ -160,11 +229,15 @@ def _to_model_input(features: List[float]) -> torch.Tensor:
     If your GameplayTransformer expects (B, F), it can still handle reshape internally,
     but (1,1,F) avoids the common rank mismatch.
     """
+    import torch
+
     x = torch.tensor(features, dtype=torch.float32, device=DEVICE)
     return x.view(1, 1, -1)  # (F,) -> (1, 1, F)
 
 
 def infer(features: List[float]) -> Dict[str, Any]:
+    import torch
+
     x = _to_model_input(features)
     with torch.no_grad():
         out = model(x)
@@ -203,20 +276,19 @@ def infer(features: List[float]) -> Dict[str, Any]:
         }
 
 
-# -----------------------------------------------------------------------------
-# Routes
-# -----------------------------------------------------------------------------
-@app.route("/predict", methods=["POST"])
-def predict():
+def _predict(payload: Optional[dict] = None, raw: Optional[bytes] = None) -> Tuple[Dict[str, Any], int]:
+    """Prediction for a JSON payload or a raw float32 body: (response body, status code)."""
     t0 = time.time()
-    payload = request.get_json(silent=True) or {}
 
     if not model_loaded:
-        return jsonify({"error": "Model not loaded", "details": model_error}), 503
+        return {"error": "Model not loaded", "details": model_error}, 503
 
-    features, err = _extract_and_validate_features(payload)
+    if raw is not None:
+        features, err = features_from_bytes(raw, INPUT_SIZE)
+    else:
+        features, err = _extract_and_validate_features(payload)
     if err:
-        return jsonify({"error": err}), 400
+        return {"error": err}, 400
 
     try:
         out = infer(features)
@@ -224,13 +296,28 @@ def predict():
         out["model_path"] = str(MODEL_PATH)
         out["model_loaded"] = model_loaded
         out["input_size"] = INPUT_SIZE
-        return jsonify(out), 200
+        return out, 200
     except Exception as e:
         logger.exception("Prediction failed: %s", e)
-        return jsonify({"error": "Prediction failed", "details": str(e)}), 500
+        return {"error": "Prediction failed", "details": str(e)}, 500
+
+
+# -----------------------------------------------------------------------------
+# Routes
+# -----------------------------------------------------------------------------
+bp = Blueprint("transformer", __name__)
 
 
-@app.route("/reload", methods=["POST"])
+@bp.route("/predict", methods=["POST"])
+def predict():
+    if request.mimetype == FEATURES_CONTENT_TYPE:
+        out, code = _predict(raw=request.get_data())
+    else:
+        out, code = _predict(request.get_json(silent=True) or {})
+    return jsonify(out), code
+
+
+@bp.route("/reload", methods=["POST"])
 def reload_model():
     load_weights()
     if not model_loaded:
@@ -238,7 +325,13 @@ def reload_model():
     return jsonify({"success": True, "model_path": str(MODEL_PATH)}), 200
 
 
-@app.route("/health", methods=["GET"])
+def _checkpoint_info() -> Optional[Dict[str, Any]]:
+    if checkpoint is not None:
+        return checkpoint.describe()
+    return {"format": "pickle"} if model_loaded else None
+
+
+@bp.route("/health", methods=["GET"])
 def health():
     return (
         jsonify(
@@ -250,12 +343,110 @@ def health():
                 "device": DEVICE,
                 "input_size": INPUT_SIZE,
                 "error": model_error,
+                "checkpoint": _checkpoint_info(),
+                "startup": profile.report(),
             }
         ),
         (200 if model_loaded else 503),
     )
 
 
+# -----------------------------------------------------------------------------
+# App factory / 应用工厂
+# -----------------------------------------------------------------------------
+def create_app(load_model: bool = True) -> Flask:
+    """Flask app for the service; builds the model and loads the weights unless load_model=False."""
+    with profile.phase("create_app"):
+        app = Flask(__name__)
+        CORS(app)
+        app.register_blueprint(bp)
+    if load_model:
+        init_model()
+    profile.mark_ready()
+    return app
+
+
+# -----------------------------------------------------------------------------
+# Supervised startup (readiness pipe / warm standby)
+# -----------------------------------------------------------------------------
+READY_FD = int(os.environ.get("SERVICE_READY_FD", "-1"))
+
+
+def _signal(event: str, **fields: Any) -> None:
+    if READY_FD < 0:
+        return
+    line = json.dumps({"event": event, "pid": os.getpid(), **fields}) + "\n"
+    try:
+        os.write(READY_FD, line.encode("utf-8"))
+    except OSError:
+        pass
+
+
+def _signal_warm(load_ms: float) -> None:
+    _signal("warm", load_ms=round(load_ms, 1), model_loaded=model_loaded, error=model_error, device=DEVICE)
+
+
+def _standby_loop() -> bool:
+    """Stay warm until told to serve; False when the supervisor went away."""
+    logger.info("Standby ready (pid=%s), waiting for promotion", os.getpid())
+    for line in sys.stdin:
+        cmd = line.strip()
+        if cmd == "serve":
+            return True
+        if cmd == "reload":
+            t0 = time.perf_counter()
+            load_weights()
+            _signal_warm((time.perf_counter() - t0) * 1000.0)
+    return False
+
+
+def _shm_predict(content_type: str, body: bytes) -> Tuple[int, bytes]:
+    if content_type == FEATURES_CONTENT_TYPE:
+        out, code = _predict(raw=body)
+    else:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = {}
+        out, code = _predict(payload if isinstance(payload, dict) else {})
+    return code, json.dumps(out).encode("utf-8")
+
+
+def start_shm_transport() -> None:
+    """Answer /predict over the shared-memory ring as well (MODEL_TRANSPORT=shm); HTTP keeps serving."""
+    if MODEL_TRANSPORT != "shm":
+        return
+    from deployment.shm_transport import ShmServer, socket_path, supported  # HTTP-only services never load it
+
+    if not supported():
+        logger.warning("MODEL_TRANSPORT=shm is not supported on this platform; serving HTTP only")
+        return
+    server = ShmServer(socket_path(PORT), _shm_predict).start()
+    logger.info("Shared-memory transport on %s", server.path)
+
+
+def serve_supervised(app: Flask) -> None:
+    from werkzeug.serving import make_server
+
+    try:
+        server = make_server(HOST, PORT, app, threaded=True)
+    except OSError as e:
+        _signal("error", error=f"bind {HOST}:{PORT} failed: {e}")
+        raise SystemExit(1)
+    start_shm_transport()
+    logger.info("Serving Transformer on %s:%s (device=%s)", HOST, PORT, DEVICE)
+    _signal("serving", port=PORT)
+    server.serve_forever()
+
+
 if __name__ == "__main__":
-    logger.info("Starting Transformer service on %s:%s (device=%s)", HOST, PORT, DEVICE)
-    app.run(host=HOST, port=PORT, debug=False)
+    app = create_app()
+    if READY_FD >= 0:
+        _signal_warm(INITIAL_LOAD_MS)
+        if os.environ.get("SERVICE_STANDBY") == "1" and not _standby_loop():
+            sys.exit(0)
+        serve_supervised(app)
+    else:
+        logger.info("Starting Transformer service on %s:%s (device=%s)", HOST, PORT, DEVICE)
+        start_shm_transport()
+        app.run(host=HOST, port=PORT, debug=False, threaded=True)
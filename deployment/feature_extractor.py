@@ -2,19 +2,24 @@
 deployment/feature_extractor.py
 
 Shared utilities:
-- decode base64/data-url images
+- decode base64/data-url images (or raw image bytes: image_bytes_to_features)
 - convert to feature vector (default 128) as grayscale normalized
 - accept legacy payload key "state" as alias for "features"
+- raw little-endian float32 feature bodies (FEATURES_CONTENT_TYPE), no JSON involved
 """
 
 from __future__ import annotations
 
 import base64
 import io
-from typing import Optional, Tuple, List
+from typing import TYPE_CHECKING, Optional, Tuple, List
 
 import numpy as np
-from PIL import Image
+
+if TYPE_CHECKING:
+    from PIL import Image  # imported on first decode
+
+FEATURES_CONTENT_TYPE = "application/x-float32"
 
 
 def decode_image_to_pil(image_str: str) -> Image.Image:
@@ -24,6 +29,8 @@ def decode_image_to_pil(image_str: str) -> Image.Image:
       - data URL: data:image/jpeg;base64,...
     Returns PIL Image (RGB).
     """
+    from PIL import Image
+
     if not isinstance(image_str, str) or not image_str.strip():
         raise ValueError("image must be a non-empty string")
 
@@ -47,37 +54,58 @@ def decode_image_to_pil(image_str: str) -> Image.Image:
     return img
 
 
-def image_to_features(image_str: str, feature_len: int = 128) -> List[float]:
-    """
-    Convert an image to a feature vector of length feature_len:
-      - grayscale
-      - resize to (W,H) such that W*H == feature_len (best-effort)
-      - flatten and normalize to [0,1]
-    """
+def _feature_shape(feature_len: int) -> Tuple[int, int]:
+    # Choose a stable shape: prefer 16x( feature_len/16 ) if divisible, else near-square
+    if feature_len % 16 == 0:
+        return 16, feature_len // 16
+    w = int(np.floor(np.sqrt(feature_len)))
+    h = int(np.ceil(feature_len / max(w, 1)))
+    # fix if mismatch due rounding
+    while w * h < feature_len:
+        w += 1
+    # we'll crop/pad after resize if needed (rare)
+    return w, h
+
+
+def _pil_to_features(img: Image.Image, feature_len: int) -> np.ndarray:
     if feature_len <= 0:
         raise ValueError("feature_len must be > 0")
 
-    # Choose a stable shape: prefer 16x( feature_len/16 ) if divisible, else near-square
-    if feature_len % 16 == 0:
-        w, h = 16, feature_len // 16
-    else:
-        w = int(np.floor(np.sqrt(feature_len)))
-        h = int(np.ceil(feature_len / max(w, 1)))
-        # fix if mismatch due rounding
-        while w * h < feature_len:
-            w += 1
-        # we'll crop/pad after resize if needed (rare)
-
-    img = decode_image_to_pil(image_str).convert("L")
-    img = img.resize((w, h))
+    w, h = _feature_shape(feature_len)
+    img = img.convert("L").resize((w, h))
     arr = np.asarray(img, dtype=np.float32).reshape(-1) / 255.0
 
     if arr.size < feature_len:
         arr = np.pad(arr, (0, feature_len - arr.size), mode="constant", constant_values=0.0)
     elif arr.size > feature_len:
         arr = arr[:feature_len]
+    return arr
+
+
+def image_bytes_to_features(data: bytes, feature_len: int = 128) -> np.ndarray:
+    """
+    Same features as image_to_features, from raw encoded image bytes (no base64 round trip).
+    Returns float32 array of shape (feature_len,).
+    """
+    from PIL import Image
 
-    return arr.tolist()
+    try:
+        img = Image.open(io.BytesIO(data)).convert("RGB")
+    except Exception as e:
+        raise ValueError("Decoded bytes are not a valid image") from e
+    return _pil_to_features(img, feature_len)
+
+
+def image_to_features(image_str: str, feature_len: int = 128) -> List[float]:
+    """
+    Convert an image to a feature vector of length feature_len:
+      - grayscale
+      - resize to (W,H) such that W*H == feature_len (best-effort)
+      - flatten and normalize to [0,1]
+    """
+    if feature_len <= 0:
+        raise ValueError("feature_len must be > 0")
+    return _pil_to_features(decode_image_to_pil(image_str), feature_len).tolist()
 
 
 def safe_features_from_payload(payload: dict, expected_len: int = 128) -> Tuple[Optional[List[float]], Optional[str]]:
@@ -113,3 +141,13 @@ def safe_features_from_payload(payload: dict, expected_len: int = 128) -> Tuple[
             return None, str(e)
 
     return None, f"Provide either 'image' (base64/data-url) or 'features'/'state' (len={expected_len})."
+
+
+def features_from_bytes(data: bytes, expected_len: int = 128) -> Tuple[Optional[List[float]], Optional[str]]:
+    """Features from a raw little-endian float32 body. Returns (features, error_message)."""
+    if len(data) != expected_len * 4:
+        return None, f"float32 body must be {expected_len * 4} bytes ({expected_len} features), got {len(data)}"
+    arr = np.frombuffer(data, dtype="<f4")
+    if not np.isfinite(arr).all():
+        return None, "features must be finite"
+    return arr.tolist(), None
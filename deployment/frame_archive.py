@@ -0,0 +1,316 @@
+"""
+deployment/frame_archive.py
+
+Packed frame storage for capture sessions:
+- <session>/frames.pack : JPEG bytes appended back to back
+- <session>/frames.idx  : fixed 20-byte records (int64 timestamp_ms, uint64 offset, uint32 length)
+- Random access by timestamp (exact or nearest) via a sorted in-memory index
+- Sequential streaming reads in timestamp order
+- Import from / export to the per-file layout (<session>/frames/frame_<ts>.jpg)
+
+A crash can leave a partial tail; readers ignore index records that point past the end
+of the pack file and pack bytes that have no index record, and a writer reopening the archive
+truncates both files back to the last complete frame before appending.
+
+CLI:
+  python deployment/frame_archive.py info   data/raw/sess_xxx
+  python deployment/frame_archive.py import data/raw/sess_xxx   # frames/ -> frames.pack
+  python deployment/frame_archive.py export data/raw/sess_xxx   # frames.pack -> frames/
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+import numpy as np
+
+PACK_NAME = "frames.pack"
+INDEX_NAME = "frames.idx"
+FRAMES_DIR_NAME = "frames"
+
+INDEX_DTYPE = np.dtype([("ts", "<i8"), ("offset", "<u8"), ("length", "<u4")])
+
+FLUSH_EVERY = int(os.environ.get("FRAME_ARCHIVE_FLUSH_EVERY", "32"))
+
+
+def has_archive(session_dir: Path) -> bool:
+    return (Path(session_dir) / INDEX_NAME).exists()
+
+
+def frame_ts_from_path(p: Path) -> Optional[int]:
+    """frame_<ts>.jpg -> ts (None for anything else)."""
+    prefix, _, ts = p.stem.partition("_")
+    if prefix != "frame" or not ts.isdigit():
+        return None
+    return int(ts)
+
+
+class FrameArchive:
+    """One session's packed frames. Appends are thread-safe; reads use their own file handle."""
+
+    def __init__(self, session_dir: Path, flush_every: int = FLUSH_EVERY) -> None:
+        self.session_dir = Path(session_dir)
+        self.pack_path = self.session_dir / PACK_NAME
+        self.index_path = self.session_dir / INDEX_NAME
+        self.flush_every = max(1, int(flush_every))
+        self._lock = threading.Lock()
+        self._pack = None
+        self._idx = None
+        self._offset = 0
+        self._unflushed = 0
+        self._index_cache: Optional[np.ndarray] = None
+        self._sealed = False  # close(seal=True): no more appends through this handle
+
+    # ---------------------------------------------------------------- writing
+    def _repair_tail(self) -> None:
+        """
+        Cut what a crash left behind before appending again: a partial index record, records that
+        point past the end of the pack, and pack bytes no record points at. Without this, every
+        record appended after a partial one would be misaligned and unreadable.
+        """
+        pack_size = self.pack_path.stat().st_size if self.pack_path.exists() else 0
+        end = 0
+        if self.index_path.exists():
+            raw = self.index_path.read_bytes()
+            idx = np.frombuffer(raw[: len(raw) - len(raw) % INDEX_DTYPE.itemsize], dtype=INDEX_DTYPE)
+            ends = idx["offset"] + idx["length"].astype(np.uint64)
+            past = np.flatnonzero(ends > pack_size)
+            keep = int(past[0]) if past.size else idx.shape[0]  # records are written in pack order
+            if keep * INDEX_DTYPE.itemsize != len(raw):
+                os.truncate(self.index_path, keep * INDEX_DTYPE.itemsize)
+            end = int(ends[:keep].max()) if keep else 0
+        if pack_size > end:
+            os.truncate(self.pack_path, end)
+
+    def _open_for_append(self) -> None:
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        self._repair_tail()
+        self._pack = open(self.pack_path, "ab")
+        self._idx = open(self.index_path, "ab")
+        self._offset = self._pack.tell()
+
+    def append(self, ts: int, data: bytes) -> None:
+        rec = np.array([(int(ts), 0, len(data))], dtype=INDEX_DTYPE)
+        with self._lock:
+            if self._sealed:
+                raise ValueError(f"frame archive is closed: {self.session_dir}")
+            if self._pack is None:
+                self._open_for_append()
+            rec["offset"] = self._offset
+            self._pack.write(data)
+            self._idx.write(rec.tobytes())
+            self._offset += len(data)
+            self._unflushed += 1
+            self._index_cache = None
+            if self._unflushed >= self.flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._pack is not None:
+            # data before index so an index record never points at unwritten bytes
+            self._pack.flush()
+            self._idx.flush()
+        self._unflushed = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self, seal: bool = False) -> None:
+        with self._lock:
+            self._sealed = self._sealed or seal
+            self._flush_locked()
+            for f in (self._pack, self._idx):
+                if f is not None:
+                    f.close()
+            self._pack = self._idx = None
+
+    # ---------------------------------------------------------------- reading
+    def index(self) -> np.ndarray:
+        """Valid index records sorted by timestamp (stable for duplicates)."""
+        with self._lock:
+            self._flush_locked()
+            if self._index_cache is not None:
+                return self._index_cache
+        if not self.index_path.exists():
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        raw = self.index_path.read_bytes()
+        usable = len(raw) - (len(raw) % INDEX_DTYPE.itemsize)
+        idx = np.frombuffer(raw[:usable], dtype=INDEX_DTYPE)
+        pack_size = self.pack_path.stat().st_size if self.pack_path.exists() else 0
+        idx = idx[idx["offset"] + idx["length"] <= pack_size]
+        idx = idx[np.argsort(idx["ts"], kind="stable")]
+        with self._lock:
+            self._index_cache = idx
+        return idx
+
+    def __len__(self) -> int:
+        return int(self.index().shape[0])
+
+    def timestamps(self) -> np.ndarray:
+        return self.index()["ts"].copy()
+
+    def _read(self, f, offset: int, length: int) -> bytes:
+        f.seek(int(offset))
+        return f.read(int(length))
+
+    def get(self, ts: int) -> Optional[bytes]:
+        """Exact timestamp lookup (latest write wins for duplicates)."""
+        idx = self.index()
+        i = int(np.searchsorted(idx["ts"], int(ts), side="right")) - 1
+        if i < 0 or int(idx["ts"][i]) != int(ts):
+            return None
+        with open(self.pack_path, "rb") as f:
+            return self._read(f, idx["offset"][i], idx["length"][i])
+
+    def nearest(self, ts: int, tolerance: Optional[int] = None) -> Optional[Tuple[int, bytes]]:
+        """Closest frame to ts (optionally within tolerance ms)."""
+        idx = self.index()
+        if idx.shape[0] == 0:
+            return None
+        tss = idx["ts"]
+        i = int(np.searchsorted(tss, int(ts)))
+        cands = [j for j in (i - 1, i) if 0 <= j < tss.shape[0]]
+        j = min(cands, key=lambda k: abs(int(tss[k]) - int(ts)))
+        if tolerance is not None and abs(int(tss[j]) - int(ts)) > tolerance:
+            return None
+        with open(self.pack_path, "rb") as f:
+            return int(tss[j]), self._read(f, idx["offset"][j], idx["length"][j])
+
+    def iter_frames(self) -> Iterator[Tuple[int, bytes]]:
+        """Stream (timestamp, jpeg_bytes) in timestamp order through one file handle."""
+        idx = self.index()
+        if idx.shape[0] == 0:
+            return
+        with open(self.pack_path, "rb") as f:
+            pos = -1
+            for rec in idx:
+                off, length = int(rec["offset"]), int(rec["length"])
+                if off != pos:
+                    f.seek(off)
+                data = f.read(length)
+                pos = off + length
+                yield int(rec["ts"]), data
+
+    # ---------------------------------------------------------------- conversion
+    def import_dir(self, frames_dir: Optional[Path] = None, remove: bool = False) -> int:
+        """Append frames/frame_<ts>.jpg files (timestamp order). Returns the number imported."""
+        frames_dir = Path(frames_dir) if frames_dir else self.session_dir / FRAMES_DIR_NAME
+        files = [(ts, p) for p in frames_dir.glob("frame_*.jpg") if (ts := frame_ts_from_path(p)) is not None]
+        files.sort()
+        for ts, p in files:
+            self.append(ts, p.read_bytes())
+        self.flush()
+        if remove:
+            for _, p in files:
+                p.unlink(missing_ok=True)
+        return len(files)
+
+    def export_dir(self, frames_dir: Optional[Path] = None) -> int:
+        """Write every frame back out as frames/frame_<ts>.jpg. Returns the number exported."""
+        frames_dir = Path(frames_dir) if frames_dir else self.session_dir / FRAMES_DIR_NAME
+        frames_dir.mkdir(parents=True, exist_ok=True)
+        n = 0
+        for ts, data in self.iter_frames():
+            (frames_dir / f"frame_{ts}.jpg").write_bytes(data)
+            n += 1
+        return n
+
+
+def iter_session_frames(session_dir: Path) -> Iterator[Tuple[int, bytes]]:
+    """(timestamp, jpeg_bytes) for a session in timestamp order, from the archive or the per-file layout."""
+    session_dir = Path(session_dir)
+    if has_archive(session_dir):
+        yield from FrameArchive(session_dir).iter_frames()
+        return
+    frames_dir = session_dir / FRAMES_DIR_NAME
+    files = [(ts, p) for p in frames_dir.glob("frame_*.jpg") if (ts := frame_ts_from_path(p)) is not None]
+    for ts, p in sorted(files):
+        yield ts, p.read_bytes()
+
+
+def session_frame_count(session_dir: Path) -> int:
+    """Number of frames iter_session_frames() will yield (index / directory scan only, no reads)."""
+    session_dir = Path(session_dir)
+    if has_archive(session_dir):
+        return len(FrameArchive(session_dir))
+    return sum(1 for p in (session_dir / FRAMES_DIR_NAME).glob("frame_*.jpg") if frame_ts_from_path(p) is not None)
+
+
+class ArchiveRegistry:
+    """
+    Open FrameArchive per capture session (keeps append handles alive between frames).
+    A closed key stays closed: get() raises ValueError instead of reopening the archive, until
+    forget(key) drops it (once the session record itself refuses new frames).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._archives: Dict[str, FrameArchive] = {}
+        self._closed: Set[str] = set()
+
+    def get(self, key: str, session_dir: Path) -> FrameArchive:
+        arc = self._archives.get(key)
+        if arc is not None:
+            return arc
+        with self._lock:
+            if key in self._closed:
+                raise ValueError(f"frame archive of {key} is closed")
+            arc = self._archives.get(key)
+            if arc is None:
+                arc = FrameArchive(session_dir)
+                self._archives[key] = arc
+            return arc
+
+    def flush(self, key: str) -> None:
+        arc = self._archives.get(key)
+        if arc is not None:
+            arc.flush()
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._closed.discard(key)
+
+    def close(self, key: str) -> Optional[FrameArchive]:
+        with self._lock:
+            self._closed.add(key)
+            arc = self._archives.pop(key, None)
+        if arc is not None:
+            arc.close(seal=True)
+        return arc
+
+    def close_all(self) -> None:
+        with self._lock:
+            archives = list(self._archives.values())
+            self._archives.clear()
+        for arc in archives:
+            arc.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Inspect / convert packed capture-session frames")
+    ap.add_argument("command", choices=["info", "import", "export"])
+    ap.add_argument("session_dir", type=Path)
+    ap.add_argument("--remove", action="store_true", help="import: delete the per-file frames afterwards")
+    args = ap.parse_args()
+
+    arc = FrameArchive(args.session_dir)
+    if args.command == "import":
+        print(f"imported {arc.import_dir(remove=args.remove)} frames -> {arc.pack_path}")
+    elif args.command == "export":
+        print(f"exported {arc.export_dir()} frames -> {args.session_dir / FRAMES_DIR_NAME}")
+    else:
+        idx = arc.index()
+        size = arc.pack_path.stat().st_size if arc.pack_path.exists() else 0
+        span = (int(idx["ts"][0]), int(idx["ts"][-1])) if idx.shape[0] else None
+        print(f"frames={idx.shape[0]} pack_bytes={size} ts_range={span}")
+    arc.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,401 @@
+"""
+deployment/ingest_writer.py
+
+Write-behind frame ingestion for the control backend:
+- The request thread only strips the data-URL header and enqueues the base64 payload
+- A bounded pool of writer threads base64-decodes, re-encodes only non-JPEG payloads
+  (JPEG is detected by magic bytes and stored as-is) and writes the file
+- submit() returns False when the queue is full so the API can answer 429
+- stats() exposes queue depth / backpressure counters for /api/metrics
+
+Batched frame upload framing (length-prefixed binary stream):
+- repeated records of  >q timestamp_ms | >I length | <length> image bytes
+- pack_frames() builds a body, iter_packed_frames() parses one incrementally from a stream
+
+Buffered input event log (InputLogRegistry):
+- One long-lived append-mode file handle per capture session (inputs.jsonl)
+- Lines are buffered and flushed when the buffer passes flush_bytes, by a background
+  flusher every flush_interval seconds, and on flush()/close() (stop_capture)
+- Per-session event counts live on the log itself (no global session lock)
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+WRITER_THREADS = int(os.environ.get("INGEST_WRITER_THREADS", "2"))
+QUEUE_MAX = int(os.environ.get("INGEST_QUEUE_MAX", "256"))
+JPEG_QUALITY = int(os.environ.get("INGEST_JPEG_QUALITY", "90"))
+MAX_FRAME_BYTES = int(os.environ.get("INGEST_MAX_FRAME_BYTES", str(16 * 1024 * 1024)))
+
+_FRAME_HEADER = struct.Struct(">qI")
+
+INPUT_FLUSH_BYTES = int(os.environ.get("INPUT_LOG_FLUSH_BYTES", str(64 * 1024)))
+INPUT_FLUSH_INTERVAL_SEC = float(os.environ.get("INPUT_LOG_FLUSH_INTERVAL_SEC", "1.0"))
+
+
+def strip_dataurl(data: str) -> str:
+    """Return the base64 part of a data URL (or the string itself). Raises ValueError on bad input."""
+    if not isinstance(data, str) or not data.strip():
+        raise ValueError("image must be a non-empty string")
+    s = data.strip()
+    if s.startswith("data:"):
+        parts = s.split(",", 1)
+        if len(parts) != 2 or not parts[1]:
+            raise ValueError("Invalid data URL format")
+        s = parts[1]
+    return s
+
+
+def is_jpeg(raw: bytes) -> bool:
+    return raw[:3] == JPEG_MAGIC
+
+
+def to_jpeg_bytes(raw: bytes, quality: int = JPEG_QUALITY) -> bytes:
+    """Pass JPEG through untouched; decode anything else with PIL and re-encode as JPEG."""
+    if is_jpeg(raw):
+        return raw
+    from PIL import Image  # only non-JPEG frames need it
+
+    img = Image.open(io.BytesIO(raw)).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def pack_frames(frames: Iterable[Tuple[int, bytes]]) -> bytes:
+    """Encode (timestamp_ms, image_bytes) pairs as a length-prefixed stream."""
+    return b"".join(_FRAME_HEADER.pack(int(ts), len(data)) + data for ts, data in frames)
+
+
+def _read_exact(stream: BinaryIO, n: int) -> bytes:
+    chunks = []
+    while n > 0:
+        chunk = stream.read(n)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def iter_packed_frames(stream: BinaryIO, max_frame_bytes: int = MAX_FRAME_BYTES) -> Iterator[Tuple[int, bytes]]:
+    """Yield (timestamp_ms, image_bytes) from a length-prefixed stream. Raises ValueError on truncation."""
+    while True:
+        header = _read_exact(stream, _FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) != _FRAME_HEADER.size:
+            raise ValueError("truncated frame header")
+        ts, length = _FRAME_HEADER.unpack(header)
+        if length > max_frame_bytes:
+            raise ValueError(f"frame too large ({length} bytes)")
+        data = _read_exact(stream, length)
+        if len(data) != length:
+            raise ValueError("truncated frame body")
+        yield ts, data
+
+
+@dataclass
+class _Job:
+    key: str
+    dest: Path
+    payload: object  # base64 str or raw bytes
+    enqueued_at: float
+
+
+class IngestWriter:
+    """
+    Bounded write-behind pool.
+
+    key groups jobs (the capture session id) so wait_idle(key) can flush one session
+    before it is exported. sink(key, dest, jpg_bytes) does the actual write; the default
+    writes a file, callers can swap in another storage backend.
+    """
+
+    def __init__(
+        self,
+        threads: int = WRITER_THREADS,
+        queue_max: int = QUEUE_MAX,
+        sink: Optional[Callable[[str, Path, bytes], None]] = None,
+    ) -> None:
+        self.queue_max = max(1, int(queue_max))
+        self._q: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=self.queue_max)
+        self._sink = sink or self._write_file
+        self._cond = threading.Condition()
+        self._pending: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "accepted": 0,
+            "rejected": 0,
+            "written": 0,
+            "failed": 0,
+            "passthrough": 0,
+            "reencoded": 0,
+            "bytes_written": 0,
+            "max_depth": 0,
+        }
+        self.last_error: Optional[str] = None
+        self._last_write_ms = 0.0
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"ingest-writer-{i}", daemon=True)
+            for i in range(max(1, int(threads)))
+        ]
+        for t in self._threads:
+            t.start()
+
+    @staticmethod
+    def _write_file(key: str, dest: Path, data: bytes) -> None:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+
+    def _bump(self, **kw: int) -> None:
+        with self._stats_lock:
+            for k, v in kw.items():
+                self._stats[k] = self._stats.get(k, 0) + v
+
+    def submit(self, key: str, dest: Path, payload: object, block_timeout: float = 0.0) -> bool:
+        """
+        Enqueue a frame (base64 str or raw bytes). Returns False (backpressure) if the queue is full.
+        block_timeout > 0 waits that long for room first (bulk uploads use this as flow control).
+        """
+        with self._cond:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            job = _Job(key, dest, payload, time.time())
+            if block_timeout > 0:
+                self._q.put(job, timeout=block_timeout)
+            else:
+                self._q.put_nowait(job)
+        except queue.Full:
+            self._done(key)
+            self._bump(rejected=1)
+            return False
+        depth = self._q.qsize()
+        with self._stats_lock:
+            self._stats["accepted"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+        return True
+
+    def _done(self, key: str) -> None:
+        with self._cond:
+            n = self._pending.get(key, 0) - 1
+            if n <= 0:
+                self._pending.pop(key, None)
+                self._cond.notify_all()
+            else:
+                self._pending[key] = n
+
+    def _worker(self) -> None:
+        while True:
+            job = self._q.get()
+            if job is None:
+                self._q.task_done()
+                return
+            try:
+                raw = job.payload
+                if isinstance(raw, str):
+                    raw = base64.b64decode(raw, validate=False)
+                passthrough = is_jpeg(raw)
+                jpg = to_jpeg_bytes(raw)
+                t0 = time.perf_counter()
+                self._sink(job.key, job.dest, jpg)
+                self._last_write_ms = (time.perf_counter() - t0) * 1000.0
+                self._bump(
+                    written=1,
+                    bytes_written=len(jpg),
+                    passthrough=1 if passthrough else 0,
+                    reencoded=0 if passthrough else 1,
+                )
+            except Exception as e:  # bad base64 / undecodable image / disk error
+                self.last_error = f"{job.dest.name}: {e}"
+                self._bump(failed=1)
+            finally:
+                self._done(job.key)
+                self._q.task_done()
+
+    def wait_idle(self, key: Optional[str] = None, timeout: float = 30.0) -> bool:
+        """Block until every queued frame for key (or all keys) is written. Returns False on timeout."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while (self._pending.get(key, 0) if key is not None else sum(self._pending.values())) > 0:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            out = dict(self._stats)
+        out.update(
+            {
+                "queue_depth": self._q.qsize(),
+                "queue_max": self.queue_max,
+                "threads": len(self._threads),
+                "last_write_ms": round(self._last_write_ms, 3),
+                "last_error": self.last_error,
+            }
+        )
+        return out
+
+    def close(self, timeout: float = 10.0) -> None:
+        self.wait_idle(timeout=timeout)
+        for _ in self._threads:
+            try:
+                self._q.put(None, timeout=1.0)
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join(timeout=1.0)
+
+
+class InputEventLog:
+    """Append-only JSONL writer for one session, kept open for the session's lifetime."""
+
+    def __init__(self, path: Path, flush_bytes: int = INPUT_FLUSH_BYTES) -> None:
+        self.path = Path(path)
+        self.flush_bytes = max(1, int(flush_bytes))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "ab", buffering=self.flush_bytes * 2)
+        self._lock = threading.Lock()
+        self._pending = 0  # bytes written since last flush
+        self.count = 0
+        self.flushes = 0
+        self.last_flush = time.time()
+
+    def append(self, records: Iterable[dict]) -> int:
+        """Append records as JSON lines. Returns how many were written."""
+        data = b"".join((json.dumps(r) + "\n").encode("utf-8") for r in records)
+        n = data.count(b"\n")
+        if not n:
+            return 0
+        with self._lock:
+            if self._f.closed:
+                raise ValueError("input log is closed")
+            self._f.write(data)
+            self._pending += len(data)
+            self.count += n
+            if self._pending >= self.flush_bytes:
+                self._flush_locked()
+        return n
+
+    def _flush_locked(self) -> None:
+        if self._f.closed:
+            return
+        self._f.flush()
+        self._pending = 0
+        self.flushes += 1
+        self.last_flush = time.time()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def flush_if_stale(self, max_age: float) -> None:
+        with self._lock:
+            if self._pending and time.time() - self.last_flush >= max_age:
+                self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._flush_locked()
+                self._f.close()
+
+
+class InputLogRegistry:
+    """
+    Per-session InputEventLog handles plus a background time-based flusher.
+    A closed key stays closed: get() raises ValueError instead of reopening the log, until
+    forget(key) drops it (once the session record itself refuses new inputs).
+    """
+
+    def __init__(
+        self, flush_bytes: int = INPUT_FLUSH_BYTES, flush_interval: float = INPUT_FLUSH_INTERVAL_SEC
+    ) -> None:
+        self.flush_bytes = int(flush_bytes)
+        self.flush_interval = max(0.05, float(flush_interval))
+        self._logs: Dict[str, InputEventLog] = {}
+        self._closed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="input-log-flusher", daemon=True)
+        self._flusher.start()
+
+    def get(self, key: str, path: Path) -> InputEventLog:
+        # fast path: plain dict read, no lock
+        log = self._logs.get(key)
+        if log is not None:
+            return log
+        with self._lock:
+            if key in self._closed:
+                raise ValueError("input log is closed")
+            log = self._logs.get(key)
+            if log is None:
+                log = InputEventLog(path, flush_bytes=self.flush_bytes)
+                self._logs[key] = log
+            return log
+
+    def append(self, key: str, path: Path, records: Iterable[dict]) -> int:
+        return self.get(key, path).append(records)
+
+    def count(self, key: str) -> int:
+        log = self._logs.get(key)
+        return log.count if log is not None else 0
+
+    def flush(self, key: str) -> None:
+        log = self._logs.get(key)
+        if log is not None:
+            log.flush()
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._closed.discard(key)
+
+    def close(self, key: str) -> int:
+        """Flush and close one session's log for good. Returns its event count."""
+        with self._lock:
+            self._closed.add(key)
+            log = self._logs.pop(key, None)
+        if log is None:
+            return 0
+        log.close()
+        return log.count
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            for log in list(self._logs.values()):
+                try:
+                    log.flush_if_stale(self.flush_interval)
+                except Exception:
+                    continue
+
+    def stats(self) -> dict:
+        logs = list(self._logs.values())
+        return {
+            "open_logs": len(logs),
+            "events": sum(log.count for log in logs),
+            "flushes": sum(log.flushes for log in logs),
+        }
+
+    def close_all(self) -> None:
+        self._stop.set()
+        with self._lock:
+            logs = list(self._logs.values())
+            self._logs.clear()
+        for log in logs:
+            log.close()
@@ -0,0 +1,277 @@
+"""
+deployment/job_scheduler.py
+
+Training job scheduler for the control backend:
+- A fixed number of concurrent slots (TRAIN_SLOTS); extra jobs wait in a priority queue
+  (higher priority first, FIFO within a priority)
+- Every running job gets a thread allotment (TRAIN_THREADS_PER_JOB, default cores/slots)
+  exported to its subprocess as OMP/MKL/OpenBLAS thread limits, and its own working
+  directory <workdir_root>/<job_id>, removed once the job completes; workdirs of failed, cancelled
+  or killed jobs are kept for TRAIN_KEEP_FAILED_SEC for inspection, then pruned
+- cancel(): drops a queued job, or asks a running job to stop (SIGTERM to its process group);
+  kill(): SIGKILL for a running job
+- ETA: seconds-per-unit (epochs) learned from completed jobs, replayed over the slots to give
+  every queued job an estimated start and every job an estimated finish
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+TRAIN_SLOTS = int(os.environ.get("TRAIN_SLOTS", "1"))
+TRAIN_THREADS_PER_JOB = int(os.environ.get("TRAIN_THREADS_PER_JOB", "0"))  # 0 = cores / slots
+TRAIN_ETA_SEC_PER_EPOCH = float(os.environ.get("TRAIN_ETA_SEC_PER_EPOCH", "30"))
+TRAIN_KEEP_FAILED_SEC = float(os.environ.get("TRAIN_KEEP_FAILED_SEC", "86400"))  # failed job workdirs
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+class JobCancelled(Exception):
+    """Raised inside a runner when its job was cancelled or killed."""
+
+
+@dataclass
+class JobContext:
+    job_id: str
+    threads: int
+    workdir: Path
+    units: float = 1.0
+    started: float = field(default_factory=time.monotonic)
+    cancel_reason: Optional[str] = None  # "cancelled" | "killed"
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+    _proc: Optional[subprocess.Popen] = field(default=None, repr=False)
+
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled(self.cancel_reason or "cancelled")
+
+    def env(self, base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        env = dict(os.environ if base is None else base)
+        for k in _THREAD_ENV_VARS:
+            env[k] = str(self.threads)
+        return env
+
+    def popen(self, cmd: List[str], **kw) -> subprocess.Popen:
+        """Start the job's subprocess in its own process group so cancel/kill reach its children."""
+        if os.name != "nt":
+            kw.setdefault("start_new_session", True)
+        proc = subprocess.Popen(cmd, **kw)
+        self._proc = proc
+        if self._cancel.is_set():  # cancelled while starting
+            _signal_proc(proc, hard=self.cancel_reason == "killed")
+        return proc
+
+
+def _signal_proc(proc: Optional[subprocess.Popen], hard: bool) -> None:
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        if os.name != "nt":
+            os.killpg(os.getpgid(proc.pid), signal.SIGKILL if hard else signal.SIGTERM)
+        elif hard:
+            proc.kill()
+        else:
+            proc.terminate()
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+Runner = Callable[[JobContext], None]
+UpdateFn = Callable[..., None]
+
+
+class TrainingScheduler:
+    """Slot-limited job runner. on_update(job_id, **fields) mirrors state into the job registry."""
+
+    def __init__(
+        self,
+        workdir_root: Path,
+        slots: int = TRAIN_SLOTS,
+        threads_per_job: int = TRAIN_THREADS_PER_JOB,
+        on_update: Optional[UpdateFn] = None,
+        sec_per_unit: float = TRAIN_ETA_SEC_PER_EPOCH,
+        keep_failed_sec: float = TRAIN_KEEP_FAILED_SEC,
+    ) -> None:
+        self.workdir_root = Path(workdir_root)
+        self.slots = max(1, int(slots))
+        self.threads_per_job = int(threads_per_job) or max(1, (os.cpu_count() or 1) // self.slots)
+        self._on_update = on_update or (lambda job_id, **kw: None)
+        self.sec_per_unit = float(sec_per_unit)
+        self.keep_failed_sec = float(keep_failed_sec)
+        self._finished_jobs = 0
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._heap: List[Tuple[int, int, str]] = []
+        self._queued: Dict[str, Tuple[Runner, float]] = {}
+        self._running: Dict[str, JobContext] = {}
+
+    # ---------------------------------------------------------------- queueing
+    def submit(self, job_id: str, runner: Runner, priority: int = 0, units: float = 1.0) -> Dict[str, object]:
+        with self._lock:
+            self._queued[job_id] = (runner, max(float(units), 0.0))
+            heapq.heappush(self._heap, (-int(priority), next(self._seq), job_id))
+            started = self._dispatch_locked()
+        self._launch(started)
+        return self.info(job_id)
+
+    def _order_locked(self) -> List[str]:
+        return [jid for _, _, jid in sorted(self._heap) if jid in self._queued]
+
+    def _dispatch_locked(self) -> List[Tuple[JobContext, Runner]]:
+        """Move queued jobs into free slots; the caller launches them with _launch() after unlocking."""
+        started: List[Tuple[JobContext, Runner]] = []
+        while len(self._running) < self.slots and self._heap:
+            _, _, job_id = heapq.heappop(self._heap)
+            spec = self._queued.pop(job_id, None)
+            if spec is None:  # cancelled while queued
+                continue
+            runner, units = spec
+            workdir = self.workdir_root / job_id
+            ctx = JobContext(job_id=job_id, threads=self.threads_per_job, workdir=workdir, units=units)
+            self._running[job_id] = ctx
+            started.append((ctx, runner))
+        return started
+
+    def _launch(self, started: List[Tuple[JobContext, Runner]]) -> None:
+        # outside the lock: on_update may write to disk (the backend's job registry is SQLite)
+        for ctx, runner in started:
+            ctx.workdir.mkdir(parents=True, exist_ok=True)
+            self._on_update(ctx.job_id, status="starting", threads=ctx.threads, workdir=str(ctx.workdir),
+                            queue_position=0)
+            threading.Thread(target=self._run, args=(ctx, runner), name=f"train-{ctx.job_id}", daemon=True).start()
+
+    def _run(self, ctx: JobContext, runner: Runner) -> None:
+        completed = False
+        try:
+            runner(ctx)
+            if ctx.cancelled():
+                self._on_update(ctx.job_id, status=ctx.cancel_reason)
+            else:
+                completed = True
+        except JobCancelled:
+            self._on_update(ctx.job_id, status=ctx.cancel_reason or "cancelled")
+        except Exception as e:
+            self._on_update(ctx.job_id, status=ctx.cancel_reason or "failed", error=str(e))
+        finally:
+            elapsed = time.monotonic() - ctx.started
+            if completed:
+                shutil.rmtree(ctx.workdir, ignore_errors=True)
+            with self._lock:
+                self._running.pop(ctx.job_id, None)
+                if completed and ctx.units > 0:
+                    # running mean, weighted towards recent jobs once a few have finished
+                    rate = elapsed / ctx.units
+                    self._finished_jobs += 1
+                    alpha = max(1.0 / self._finished_jobs, 0.3)
+                    self.sec_per_unit = (1 - alpha) * self.sec_per_unit + alpha * rate
+                started = self._dispatch_locked()
+                active = set(self._running)
+            self._launch(started)
+            self.prune_workdirs(keep=active)
+            self._on_update(ctx.job_id, finished=int(time.time()), elapsed_sec=round(elapsed, 1))
+
+    def prune_workdirs(self, keep=(), now: Optional[float] = None) -> int:
+        """Remove workdirs left by failed/cancelled jobs once older than keep_failed_sec."""
+        cutoff = (time.time() if now is None else now) - self.keep_failed_sec
+        removed = 0
+        try:
+            entries = list(self.workdir_root.iterdir())
+        except OSError:
+            return 0
+        for path in entries:
+            try:
+                if path.name in keep or not path.is_dir() or path.stat().st_mtime > cutoff:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+    # ---------------------------------------------------------------- control
+    def cancel(self, job_id: str, hard: bool = False) -> Optional[str]:
+        """Cancel/kill a job. Returns the resulting state, or None when the job is not active."""
+        reason = "killed" if hard else "cancelled"
+        with self._lock:
+            dropped = self._queued.pop(job_id, None) is not None
+            ctx = None if dropped else self._running.get(job_id)
+            if ctx is not None:
+                if ctx.cancel_reason != "killed":
+                    ctx.cancel_reason = reason
+                ctx._cancel.set()
+                proc = ctx._proc
+        if dropped:
+            self._on_update(job_id, status="cancelled", queue_position=None)
+            return "cancelled"
+        if ctx is None:
+            return None
+        self._on_update(job_id, status="killing" if hard else "cancelling")
+        _signal_proc(proc, hard=hard)
+        return reason
+
+    def kill(self, job_id: str) -> Optional[str]:
+        return self.cancel(job_id, hard=True)
+
+    # ---------------------------------------------------------------- introspection
+    def info(self, job_id: str) -> Dict[str, object]:
+        """queue_position (1-based, 0 when running, None otherwise), eta_start_sec, eta_sec (to finish)."""
+        now = time.monotonic()
+        with self._lock:
+            spu = self.sec_per_unit
+            ctx = self._running.get(job_id)
+            if ctx is not None:
+                remaining = max(ctx.units * spu - (now - ctx.started), 0.0)
+                return {
+                    "queue_position": 0,
+                    "eta_start_sec": 0.0,
+                    "eta_sec": round(remaining, 1),
+                    "threads": ctx.threads,
+                }
+            order = self._order_locked()
+            if job_id not in order:
+                return {"queue_position": None, "eta_start_sec": None, "eta_sec": None}
+            # replay the queue over the slots: each job starts when the earliest slot frees
+            free_at = [max(c.units * spu - (now - c.started), 0.0) for c in self._running.values()]
+            free_at += [0.0] * (self.slots - len(free_at))
+            heapq.heapify(free_at)
+            for jid in order:
+                start = heapq.heappop(free_at)
+                finish = start + self._queued[jid][1] * spu
+                if jid == job_id:
+                    return {
+                        "queue_position": order.index(jid) + 1,
+                        "eta_start_sec": round(start, 1),
+                        "eta_sec": round(finish, 1),
+                    }
+                heapq.heappush(free_at, finish)
+        return {"queue_position": None, "eta_start_sec": None, "eta_sec": None}
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "threads_per_job": self.threads_per_job,
+                "running": sorted(self._running),
+                "queued": self._order_locked(),
+                "sec_per_epoch_estimate": round(self.sec_per_unit, 2),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            queued = list(self._queued)
+            running = list(self._running)
+        for jid in queued + running:
+            self.kill(jid)
@@ -0,0 +1,137 @@
+"""
+deployment/log_ring.py
+
+Bounded, cursor-addressable log buffer for subprocess output (training jobs):
+- Every committed line gets a monotonically increasing offset; the ring keeps the last
+  `capacity` lines, so memory is bounded and appends are O(1)
+- read(cursor) returns only lines at or after the cursor plus the next cursor; a cursor that
+  fell out of the ring reports how many lines were dropped
+- Carriage-return progress bars (tqdm) are collapsed: "\\r" rewrites the pending line, only its
+  final state is committed on "\\n"; the in-flight state is exposed as `progress`
+- feed() takes raw bytes (incremental UTF-8 decoding, safe across chunk boundaries)
+- wait(cursor) blocks until new lines arrive or the log is closed (for SSE followers)
+"""
+
+from __future__ import annotations
+
+import codecs
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Union
+
+LOG_RING_LINES = int(os.environ.get("TRAIN_LOG_LINES", "2000"))
+MAX_LINE_CHARS = int(os.environ.get("TRAIN_LOG_MAX_LINE_CHARS", "4096"))
+
+
+class LogRing:
+    def __init__(self, capacity: int = LOG_RING_LINES, max_line_chars: int = MAX_LINE_CHARS) -> None:
+        self.capacity = max(1, int(capacity))
+        self.max_line_chars = max(16, int(max_line_chars))
+        self._lines: deque = deque(maxlen=self.capacity)
+        self._next = 0  # offset of the next committed line
+        self._pending = ""  # current (uncommitted) line, already collapsed on "\r"
+        self._cr = False  # text ended with "\r"; resolved by the next feed
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._cond = threading.Condition()
+        self.closed = False
+        self.updated_at = time.time()
+
+    # ---------------------------------------------------------------- writing
+    def feed(self, data: Union[bytes, str]) -> None:
+        text = self._decoder.decode(data) if isinstance(data, (bytes, bytearray)) else data
+        if text:
+            self._append_text(text)
+
+    def _append_text(self, text: str) -> None:
+        with self._cond:
+            if self._cr:
+                text = "\r" + text
+                self._cr = False
+            if text.endswith("\r"):  # could be half of a "\r\n" split across reads
+                text = text[:-1]
+                self._cr = True
+            parts = text.replace("\r\n", "\n").split("\n")
+            for i, part in enumerate(parts):
+                segs = part.split("\r")
+                if len(segs) > 1:
+                    self._pending = segs[-1]  # carriage return rewrites the line
+                else:
+                    self._pending += part
+                if len(self._pending) > self.max_line_chars:
+                    self._pending = self._pending[: self.max_line_chars]
+                if i < len(parts) - 1:
+                    self._commit_locked()
+            self.updated_at = time.time()
+            self._cond.notify_all()
+
+    def _commit_locked(self) -> None:
+        self._lines.append(self._pending)
+        self._pending = ""
+        self._next += 1
+
+    def close(self) -> None:
+        with self._cond:
+            tail = self._decoder.decode(b"", final=True)
+            if tail:
+                self._append_text(tail)
+            if self._pending:
+                self._commit_locked()
+            self.closed = True
+            self._cond.notify_all()
+
+    # ---------------------------------------------------------------- reading
+    @property
+    def next_offset(self) -> int:
+        return self._next
+
+    @property
+    def first_offset(self) -> int:
+        with self._cond:
+            return self._next - len(self._lines)
+
+    @property
+    def progress(self) -> Optional[str]:
+        """In-flight line (e.g. the latest progress-bar state), None when empty."""
+        return self._pending or None
+
+    def read(self, cursor: int = 0, limit: Optional[int] = None) -> Tuple[List[str], int, int]:
+        """(lines, next_cursor, dropped): lines with offset >= cursor; dropped = lines lost to the ring."""
+        with self._cond:
+            first = self._next - len(self._lines)
+            cursor = max(int(cursor), 0)
+            dropped = max(first - cursor, 0)
+            start = max(cursor, first)
+            n = self._next - start
+            if limit is not None:
+                n = min(n, max(int(limit), 0))
+            if n <= 0:
+                return [], start, dropped
+            skip = start - first
+            lines = list(itertools.islice(self._lines, skip, skip + n))
+            return lines, start + n, dropped
+
+    def tail(self, n: int) -> List[str]:
+        with self._cond:
+            n = min(max(int(n), 0), len(self._lines))
+            return list(itertools.islice(self._lines, len(self._lines) - n, None))
+
+    def wait(self, cursor: int, timeout: float = 15.0, progress: Optional[str] = None) -> bool:
+        """Block until a line at offset >= cursor exists, the progress line differs, or the log closes."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._next > cursor or self.closed or (self._pending or None) != progress, timeout=timeout
+            )
+
+    def snapshot(self, cursor: int = 0, limit: Optional[int] = None) -> Dict[str, object]:
+        lines, nxt, dropped = self.read(cursor, limit)
+        return {
+            "log_lines": lines,
+            "log_offset": nxt - len(lines),
+            "log_cursor": nxt,
+            "log_dropped": dropped,
+            "log_progress": self.progress,
+            "log_closed": self.closed,
+        }
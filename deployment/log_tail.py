@@ -0,0 +1,178 @@
+"""
+deployment/log_tail.py
+
+Incremental readers for append-only service logs (logs/<service>.log):
+- tail(path, n): seeks back from the end in blocks until n lines are found; cost depends on n,
+  not on the file size
+- read_since(path, offset, file_id): lines after a byte offset (stateless polling). Offsets always
+  sit just after a "\\n", so decoding never starts inside a multi-byte UTF-8 sequence; a line longer
+  than max_bytes is returned in fragments cut on a character boundary
+- file_id = "<dev>-<inode>" identifies the file: a different id (rename rotation) or a size below
+  the offset (truncation / copytruncate) restarts from 0 and reports reset=True
+- LogFollower: keeps the file open for SSE follow; on rotation it drains the old file before
+  switching to the new one, so no lines are lost
+A trailing line without "\\n" is not returned until it is complete (tail() reports it as `partial`).
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+TAIL_BLOCK = 64 * 1024
+MAX_READ_BYTES = int(os.environ.get("SERVICE_LOG_MAX_READ_BYTES", str(1024 * 1024)))
+
+
+def file_id(st: os.stat_result) -> str:
+    return f"{st.st_dev:x}-{st.st_ino:x}"
+
+
+def _decode(line: bytes) -> str:
+    return line.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def _utf8_cut(buf: bytes) -> int:
+    """Largest cut position <= len(buf) that doesn't split a UTF-8 sequence."""
+    end = len(buf)
+    for back in range(1, min(4, end) + 1):
+        b = buf[end - back]
+        if b < 0x80:  # ASCII: everything before the end is complete
+            return end
+        if b >= 0xC0:  # lead byte of the last sequence
+            need = 2 if b < 0xE0 else 3 if b < 0xF0 else 4
+            return end if back >= need else end - back
+    return end  # not valid UTF-8: any cut will do
+
+
+def _read_lines(f: BinaryIO, offset: int, max_bytes: int) -> Tuple[List[str], int]:
+    """Complete lines from offset (at most max_bytes read) and the offset after them."""
+    f.seek(offset)
+    buf = f.read(max_bytes)
+    nl = buf.rfind(b"\n")
+    if nl >= 0:
+        take = buf[: nl + 1]
+    elif len(buf) >= max_bytes:  # one oversized line: hand out a fragment
+        take = buf[: _utf8_cut(buf) or len(buf)]
+    else:
+        return [], offset
+    parts = take.split(b"\n")
+    if parts[-1] == b"":
+        parts.pop()
+    return [_decode(p) for p in parts], offset + len(take)
+
+
+def tail(path: Path, n: int = 200, max_bytes: int = MAX_READ_BYTES, block: int = TAIL_BLOCK) -> Dict[str, object]:
+    """Last n complete lines, the offset after them, the file id and any unterminated last line."""
+    path = Path(path)
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return {"lines": [], "offset": 0, "file_id": None, "partial": ""}
+    with f:
+        st = os.fstat(f.fileno())
+        pos = size = st.st_size
+        chunks: List[bytes] = []
+        newlines = 0
+        have = 0
+        while pos > 0 and newlines <= n and have < max_bytes:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step)
+            chunks.append(data)
+            newlines += data.count(b"\n")
+            have += len(data)
+    buf = b"".join(reversed(chunks))
+    nl = buf.rfind(b"\n")
+    if nl < 0:
+        return {"lines": [], "offset": pos, "file_id": file_id(st), "partial": _decode(buf) if pos == 0 else ""}
+    parts = buf[:nl].split(b"\n")
+    if pos > 0:
+        parts = parts[1:]  # starts mid-line
+    return {
+        "lines": [_decode(p) for p in parts[-n:]] if n > 0 else [],
+        "offset": size - (len(buf) - nl - 1),
+        "file_id": file_id(st),
+        "partial": _decode(buf[nl + 1 :]),
+    }
+
+
+def read_since(
+    path: Path, offset: int, fid: Optional[str] = None, max_bytes: int = MAX_READ_BYTES
+) -> Dict[str, object]:
+    """Lines after a byte offset; restarts from 0 (reset=True) when the file was rotated or truncated."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return {"lines": [], "offset": 0, "file_id": None, "reset": offset > 0, "size": 0}
+    with f:
+        st = os.fstat(f.fileno())
+        cur = file_id(st)
+        offset = max(int(offset), 0)
+        reset = (fid is not None and fid != cur) or offset > st.st_size
+        if reset:
+            offset = 0
+        lines, nxt = _read_lines(f, offset, max_bytes)
+    return {"lines": lines, "offset": nxt, "file_id": cur, "reset": reset, "size": st.st_size}
+
+
+class LogFollower:
+    """Follows one log path across rotation/truncation. Not thread-safe (one per follower)."""
+
+    def __init__(
+        self, path: Path, offset: Optional[int] = None, fid: Optional[str] = None, max_bytes: int = MAX_READ_BYTES
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._f: Optional[BinaryIO] = None
+        self.file_id: Optional[str] = None
+        self.offset = 0
+        self._pending_reset = False
+        if self._open():
+            size = os.fstat(self._f.fileno()).st_size
+            if offset is None:
+                self.offset = tail(self.path, 0)["offset"]  # start after the last complete line
+            elif (fid is not None and fid != self.file_id) or offset > size:
+                self._pending_reset = True
+            else:
+                self.offset = max(int(offset), 0)
+
+    def _open(self) -> bool:
+        self.offset = 0
+        try:
+            self._f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._f = None
+            self.file_id = None
+            return False
+        self.file_id = file_id(os.fstat(self._f.fileno()))
+        return True
+
+    def poll(self) -> Dict[str, object]:
+        """New complete lines since the last poll (reset=True when the file was replaced/truncated)."""
+        reset, self._pending_reset = self._pending_reset, False
+        if self._f is None and not self._open():
+            self._pending_reset = reset
+            return {"lines": [], "offset": 0, "file_id": None, "reset": False}
+        lines, self.offset = _read_lines(self._f, self.offset, self.max_bytes)
+        if not lines:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                st = None
+            if st is None or file_id(st) != self.file_id:  # rotated: old file fully drained above
+                self.close()
+                self._pending_reset = True  # reported once the new file shows up
+                if self._open():
+                    reset, self._pending_reset = True, False
+                    lines, self.offset = _read_lines(self._f, 0, self.max_bytes)
+            elif st.st_size < self.offset:  # truncated in place
+                reset = True
+                lines, self.offset = _read_lines(self._f, 0, self.max_bytes)
+        return {"lines": lines, "offset": self.offset, "file_id": self.file_id, "reset": reset}
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
@@ -0,0 +1,227 @@
+"""
+deployment/metrics_sampler.py
+
+Background system metrics for the control backend:
+- One sampler thread takes a sample every METRICS_INTERVAL_SEC and appends it to a fixed-size
+  ring (METRICS_HISTORY samples), so /api/metrics answers from memory and costs nothing
+- CPU uses psutil's non-blocking delta since the previous sample (no 100 ms sleep per call)
+- GPU utilization via NVML when pynvml is installed, else nvidia-smi on the sampler thread every
+  METRICS_GPU_EVERY samples (never on a request thread); None when neither is available
+- Model service RSS: the service process and its children, resolved from a pid callback
+- Request rate/latency: RequestStats counts requests between samples (record() is O(1))
+- since(ts) returns the history newer than ts as columns {"ts": [...], "cpu": [...], ...}
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+try:
+    import pynvml  # optional: nvidia-ml-py
+except Exception:  # pragma: no cover - depends on the host
+    pynvml = None
+
+METRICS_INTERVAL_SEC = float(os.environ.get("METRICS_INTERVAL_SEC", "1.0"))
+METRICS_HISTORY = int(os.environ.get("METRICS_HISTORY", "3600"))  # 1 h at 1 s resolution
+METRICS_GPU_EVERY = int(os.environ.get("METRICS_GPU_EVERY", "5"))  # nvidia-smi fallback cadence
+
+FIELDS = ("cpu", "ram", "gpu", "model_rss_mb", "rps", "latency_ms", "latency_max_ms")
+
+
+class RequestStats:
+    """Request count and latency accumulated between two samples."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._since = time.monotonic()
+
+    def record(self, latency_ms: float) -> None:
+        with self._lock:
+            self._count += 1
+            self._total_ms += latency_ms
+            if latency_ms > self._max_ms:
+                self._max_ms = latency_ms
+
+    def drain(self) -> Dict[str, Optional[float]]:
+        """rps, mean and max latency since the previous drain; resets the counters."""
+        now = time.monotonic()
+        with self._lock:
+            count, total, peak, since = self._count, self._total_ms, self._max_ms, self._since
+            self._count, self._total_ms, self._max_ms, self._since = 0, 0.0, 0.0, now
+        return {
+            "rps": round(count / max(now - since, 1e-6), 2),
+            "latency_ms": round(total / count, 2) if count else None,
+            "latency_max_ms": round(peak, 2) if count else None,
+        }
+
+
+class _GpuProbe:
+    def __init__(self, every: int = METRICS_GPU_EVERY) -> None:
+        self.every = max(1, int(every))
+        self._tick = 0
+        self._last: Optional[float] = None
+        self._handle = None
+        self._smi = shutil.which("nvidia-smi")
+        if pynvml is not None:
+            try:
+                pynvml.nvmlInit()
+                self._handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            except Exception:
+                self._handle = None
+
+    @property
+    def available(self) -> bool:
+        return self._handle is not None or self._smi is not None
+
+    def read(self) -> Optional[float]:
+        if self._handle is not None:
+            try:
+                return float(pynvml.nvmlDeviceGetUtilizationRates(self._handle).gpu)
+            except Exception:
+                return None
+        if self._smi is None:
+            return None
+        self._tick += 1
+        if (self._tick - 1) % self.every == 0:
+            try:
+                out = subprocess.check_output(
+                    [self._smi, "--query-gpu=utilization.gpu", "--format=csv,noheader,nounits"],
+                    text=True,
+                    timeout=2.0,
+                )
+                self._last = float(out.strip().splitlines()[0])
+            except Exception:
+                self._last = None
+        return self._last
+
+
+class MetricsSampler:
+    """Samples system metrics on a background thread into a ring buffer."""
+
+    def __init__(
+        self,
+        interval: float = METRICS_INTERVAL_SEC,
+        history: int = METRICS_HISTORY,
+        model_pid: Optional[Callable[[], Optional[int]]] = None,
+        requests: Optional[RequestStats] = None,
+        gpu: bool = True,
+    ) -> None:
+        self.interval = max(0.05, float(interval))
+        self.requests = requests or RequestStats()
+        self._model_pid = model_pid or (lambda: None)
+        self._gpu = _GpuProbe() if gpu else None
+        self._samples: deque = deque(maxlen=max(1, int(history)))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._proc = None  # psutil.Process of the model service, once its pid is known
+        import psutil  # imported when the sampler is created
+
+        psutil.cpu_percent(interval=None)  # prime the delta
+
+    # ---------------------------------------------------------------- sampling
+    def _model_rss_mb(self) -> Optional[float]:
+        import psutil
+
+        pid = self._model_pid()
+        if not pid:
+            self._proc = None
+            return None
+        try:
+            if self._proc is None or self._proc.pid != pid:
+                self._proc = psutil.Process(pid)
+            rss = self._proc.memory_info().rss
+            for child in self._proc.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return round(rss / (1024 * 1024), 1)
+        except psutil.Error:
+            self._proc = None
+            return None
+
+    def sample(self) -> Dict[str, Optional[float]]:
+        """Take one sample now and append it to the history."""
+        import psutil
+
+        s: Dict[str, Optional[float]] = {
+            "ts": round(time.time(), 3),
+            "cpu": psutil.cpu_percent(interval=None),
+            "ram": psutil.virtual_memory().percent,
+            "gpu": self._gpu.read() if self._gpu is not None else None,
+            "model_rss_mb": self._model_rss_mb(),
+        }
+        s.update(self.requests.drain())
+        with self._lock:
+            self._samples.append(s)
+        return s
+
+    def _loop(self) -> None:
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception:
+                pass  # a failed probe must not kill the sampler
+            next_at += self.interval
+            delay = next_at - time.monotonic()
+            if delay < 0:  # fell behind (suspend, slow probe): don't burst to catch up
+                next_at = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self) -> "MetricsSampler":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="metrics-sampler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    # ---------------------------------------------------------------- reading
+    def latest(self) -> Optional[Dict[str, Optional[float]]]:
+        with self._lock:
+            return dict(self._samples[-1]) if self._samples else None
+
+    def since(self, ts: float = 0.0, limit: Optional[int] = None) -> Dict[str, List]:
+        """Samples with timestamp > ts (oldest first, at most `limit` newest) as columns."""
+        with self._lock:
+            rows: List[dict] = []
+            for s in reversed(self._samples):  # newest first: stop at the cutoff
+                if s["ts"] <= ts or (limit is not None and len(rows) >= limit):
+                    break
+                rows.append(s)
+        rows.reverse()
+        cols: Dict[str, List] = {"ts": [s["ts"] for s in rows]}
+        for f in FIELDS:
+            cols[f] = [s.get(f) for s in rows]
+        return cols
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            n = len(self._samples)
+            oldest = self._samples[0]["ts"] if n else None
+        return {
+            "interval_sec": self.interval,
+            "capacity": self._samples.maxlen,
+            "samples": n,
+            "oldest_ts": oldest,
+            "gpu_source": None
+            if self._gpu is None or not self._gpu.available
+            else ("nvml" if self._gpu._handle is not None else "nvidia-smi"),
+        }
@@ -0,0 +1,327 @@
+"""
+deployment/model_catalog.py
+
+In-memory catalog of model checkpoints (*.pth under the model dir) for the control backend:
+- Built once by scanning the tree (os.scandir), then kept current by explicit hooks
+  (add() after upload/training/activation, remove() after delete) and a periodic reconcile
+  every MODEL_CATALOG_RECONCILE_SEC that only re-stats files and re-reads sidecars that changed
+- Indexes: relative path -> entry, filename -> paths (newest first), sha256 -> paths,
+  so resolve(filename) and by_hash(digest) don't touch the filesystem
+- Listing order (newest first) is cached until the catalog changes; list(offset, limit) pages it
+- Content hashes are computed off the request path (reconcile thread) unless the caller already
+  knows them, and persisted in an index file keyed by (size, mtime_ns) so restarts don't rehash
+Entries use the /api/models shape: filename, type, size_bytes, mtime_epoch, meta, path, sha256.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MODEL_CATALOG_RECONCILE_SEC = float(os.environ.get("MODEL_CATALOG_RECONCILE_SEC", "30"))
+MODEL_SUFFIXES = (".pth",)
+HASH_CHUNK = 1024 * 1024
+
+
+def sidecar_path(p: Path) -> Path:
+    return p.with_suffix(p.suffix + ".json")
+
+
+def file_sha256(p: Path, chunk: int = HASH_CHUNK) -> str:
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_sidecar(p: Path) -> Optional[dict]:
+    try:
+        return json.loads(sidecar_path(p).read_text(encoding="utf-8", errors="replace"))
+    except (OSError, ValueError):
+        return None
+
+
+def _mtime_ns(p: Path) -> Optional[int]:
+    try:
+        return os.stat(p).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scan(base: Path) -> Iterator[Tuple[Path, os.stat_result]]:
+    stack = [base]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        stack.append(Path(e.path))
+                    elif e.name.lower().endswith(MODEL_SUFFIXES) and e.is_file():
+                        yield Path(e.path), e.stat()
+                except OSError:
+                    continue
+
+
+class ModelCatalog:
+    """Indexed view of the checkpoints under `base`; paths are reported relative to `rel_root`."""
+
+    def __init__(
+        self,
+        base: Path,
+        rel_root: Path,
+        model_type: str = "transformer",
+        index_path: Optional[Path] = None,
+        reconcile_interval: float = MODEL_CATALOG_RECONCILE_SEC,
+    ) -> None:
+        self.base = Path(base)
+        self.rel_root = Path(os.path.abspath(rel_root))
+        self.model_type = model_type
+        self.index_path = Path(index_path) if index_path else None
+        self.reconcile_interval = max(1.0, float(reconcile_interval))
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._stamp: Dict[str, Tuple[int, int, Optional[int]]] = {}  # size, mtime_ns, sidecar mtime_ns
+        self._by_name: Dict[str, List[str]] = {}
+        self._by_hash: Dict[str, List[str]] = {}
+        self._order: Optional[List[str]] = None
+        self._hash_cache: Dict[str, Tuple[int, int, str]] = self._load_hash_cache()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.version = 0
+
+    # ---------------------------------------------------------------- keys
+    def rel(self, p: Path) -> str:
+        p = Path(os.path.abspath(p))  # not resolve(): a symlinked checkpoint keeps its own key
+        try:
+            return p.relative_to(self.rel_root).as_posix()
+        except ValueError:
+            return p.as_posix()
+
+    def _abs(self, rel: str) -> Path:
+        p = Path(rel)
+        return p if p.is_absolute() else self.rel_root / p
+
+    # ---------------------------------------------------------------- index maintenance
+    def _unindex_locked(self, rel: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.pop(rel, None)
+        self._stamp.pop(rel, None)
+        if entry is None:
+            return None
+        names = self._by_name.get(entry["filename"], [])
+        if rel in names:
+            names.remove(rel)
+        if not names:
+            self._by_name.pop(entry["filename"], None)
+        if entry.get("sha256"):
+            paths = self._by_hash.get(entry["sha256"], [])
+            if rel in paths:
+                paths.remove(rel)
+            if not paths:
+                self._by_hash.pop(entry["sha256"], None)
+        self._order = None
+        self.version += 1
+        return entry
+
+    def _index_locked(self, rel: str, entry: Dict[str, Any], stamp: Tuple[int, int, Optional[int]]) -> None:
+        self._unindex_locked(rel)
+        self._entries[rel] = entry
+        self._stamp[rel] = stamp
+        names = self._by_name.setdefault(entry["filename"], [])
+        names.append(rel)
+        names.sort(key=lambda r: self._entries[r]["mtime_ns"], reverse=True)
+        if entry.get("sha256"):
+            self._by_hash.setdefault(entry["sha256"], []).append(rel)
+        self._order = None
+        self.version += 1
+
+    def _make_entry(self, p: Path, st: os.stat_result, sha256: Optional[str] = None, meta: Any = ...) -> Dict[str, Any]:
+        rel = self.rel(p)
+        if sha256 is None:
+            cached = self._hash_cache.get(rel)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                sha256 = cached[2]
+        return {
+            "filename": p.name,
+            "type": self.model_type,
+            "size_bytes": int(st.st_size),
+            "mtime_epoch": int(st.st_mtime),
+            "mtime_ns": st.st_mtime_ns,
+            "meta": _read_sidecar(p) if meta is ... else meta,
+            "path": rel,
+            "sha256": sha256,
+        }
+
+    # ---------------------------------------------------------------- hooks
+    def add(self, p: Path, sha256: Optional[str] = None, meta: Any = ...) -> Optional[Dict[str, Any]]:
+        """(Re)index one checkpoint; meta defaults to its sidecar. Returns the public entry."""
+        p = Path(p)
+        try:
+            st = os.stat(p)
+        except OSError:
+            self.remove(p)
+            return None
+        entry = self._make_entry(p, st, sha256, meta)
+        with self._lock:
+            self._index_locked(entry["path"], entry, (st.st_size, st.st_mtime_ns, _mtime_ns(sidecar_path(p))))
+            if sha256:
+                self._hash_cache[entry["path"]] = (st.st_size, st.st_mtime_ns, sha256)
+        return self._public(entry)
+
+    def remove(self, p: Path) -> bool:
+        with self._lock:
+            return self._unindex_locked(self.rel(Path(p))) is not None
+
+    # ---------------------------------------------------------------- reconcile
+    def reconcile(self, hash_missing: bool = True) -> Dict[str, int]:
+        """Sync with the filesystem: new, changed and vanished files; hashes for unhashed entries."""
+        seen = set()
+        added = changed = 0
+        for p, st in _scan(self.base):
+            rel = self.rel(p)
+            seen.add(rel)
+            side = _mtime_ns(sidecar_path(p))
+            with self._lock:
+                old = self._stamp.get(rel)
+            if old == (st.st_size, st.st_mtime_ns, side):
+                continue
+            entry = self._make_entry(p, st)
+            with self._lock:
+                self._index_locked(rel, entry, (st.st_size, st.st_mtime_ns, side))
+            if old is None:
+                added += 1
+            else:
+                changed += 1
+        with self._lock:
+            gone = [rel for rel in self._entries if rel not in seen]
+            for rel in gone:
+                self._unindex_locked(rel)
+            unhashed = [rel for rel, e in self._entries.items() if not e.get("sha256")]
+        hashed = 0
+        if hash_missing:
+            for rel in unhashed:
+                if self._stop.is_set():
+                    break
+                hashed += self._hash_one(rel)
+            if hashed or gone:
+                self._save_hash_cache()
+        return {"added": added, "changed": changed, "removed": len(gone), "hashed": hashed, "total": len(self)}
+
+    def _hash_one(self, rel: str) -> int:
+        p = self._abs(rel)
+        try:
+            st = os.stat(p)
+            digest = file_sha256(p)
+        except OSError:
+            return 0
+        with self._lock:
+            entry = self._entries.get(rel)
+            if entry is None or entry["mtime_ns"] != st.st_mtime_ns or entry["size_bytes"] != st.st_size:
+                return 0  # changed while hashing; the next reconcile picks it up
+            self._by_hash.setdefault(digest, []).append(rel)
+            entry["sha256"] = digest
+            self._hash_cache[rel] = (st.st_size, st.st_mtime_ns, digest)
+            self.version += 1
+        return 1
+
+    def _load_hash_cache(self) -> Dict[str, Tuple[int, int, str]]:
+        if self.index_path is None:
+            return {}
+        try:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+            return {k: (int(v[0]), int(v[1]), str(v[2])) for k, v in raw.items()}
+        except Exception:
+            return {}
+
+    def _save_hash_cache(self) -> None:
+        if self.index_path is None:
+            return
+        with self._lock:
+            data = {rel: list(v) for rel, v in self._hash_cache.items() if rel in self._entries}
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(self.index_path.suffix + ".tmp")
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            tmp.replace(self.index_path)
+        except OSError:
+            pass
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception:
+                pass
+
+    def start(self, hash_now: bool = False) -> "ModelCatalog":
+        """Initial scan (hashing deferred to the background thread unless hash_now) + reconcile thread."""
+        self.reconcile(hash_missing=hash_now)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._initial_then_loop, name="model-catalog", daemon=True)
+                self._thread.start()
+        return self
+
+    def _initial_then_loop(self) -> None:
+        try:
+            self.reconcile()
+        except Exception:
+            pass
+        self._loop()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    # ---------------------------------------------------------------- lookups
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in entry.items() if k != "mtime_ns"}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, rel: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            e = self._entries.get(rel)
+            return self._public(e) if e else None
+
+    def resolve(self, filename: str) -> Optional[Path]:
+        """Newest checkpoint with this basename (vanished files are dropped and the next one tried)."""
+        name = Path(filename).name
+        while True:
+            with self._lock:
+                rels = self._by_name.get(name)
+                rel = rels[0] if rels else None
+            if rel is None:
+                return None
+            p = self._abs(rel)
+            if p.is_file():
+                return p
+            with self._lock:
+                self._unindex_locked(rel)
+
+    def by_hash(self, sha256: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._public(self._entries[r]) for r in self._by_hash.get(sha256.lower(), [])]
+
+    def list(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """(page, total), newest first."""
+        with self._lock:
+            if self._order is None:
+                self._order = sorted(self._entries, key=lambda r: self._entries[r]["mtime_ns"], reverse=True)
+            offset = max(int(offset), 0)
+            end = len(self._order) if limit is None else offset + max(int(limit), 0)
+            page = [self._public(self._entries[r]) for r in self._order[offset:end]]
+            return page, len(self._order)
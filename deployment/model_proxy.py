@@ -0,0 +1,212 @@
+"""
+deployment/model_proxy.py
+
+Control backend -> model service transport:
+- ModelServiceClient: one requests.Session with a bounded keep-alive connection pool
+  (MODEL_PROXY_POOL_SIZE), no retries, no proxy/netrc lookups; forward() posts raw request
+  bytes and returns the upstream response unread (stream=True) so the caller can pipe it
+- relay(): iterate an upstream body chunk by chunk and hand the connection back to the pool
+  once it is fully read (closes it instead if the client went away mid-body)
+- HealthMonitor: background /health probe every MODEL_HEALTH_INTERVAL_SEC with a cached state
+    unknown | up (200) | degraded (reachable, non-200) | down (MODEL_HEALTH_FAIL_THRESHOLD
+    consecutive connection failures)
+  proxied calls report success/failure so the state flips without waiting for the next probe;
+  on_change(old, new) is called on every transition (under the monitor lock: keep it cheap)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = int(os.environ.get("MODEL_PROXY_POOL_SIZE", "16"))
+CONNECT_TIMEOUT_SEC = float(os.environ.get("MODEL_PROXY_CONNECT_TIMEOUT_SEC", "1.0"))
+READ_TIMEOUT_SEC = float(os.environ.get("MODEL_PROXY_READ_TIMEOUT_SEC", "8.0"))
+RELAY_CHUNK = 64 * 1024
+
+HEALTH_INTERVAL_SEC = float(os.environ.get("MODEL_HEALTH_INTERVAL_SEC", "1.0"))
+HEALTH_TIMEOUT_SEC = float(os.environ.get("MODEL_HEALTH_TIMEOUT_SEC", "1.0"))
+HEALTH_FAIL_THRESHOLD = int(os.environ.get("MODEL_HEALTH_FAIL_THRESHOLD", "2"))
+
+
+class ModelServiceClient:
+    """Pooled keep-alive HTTP client for one model service."""
+
+    transport = "http"
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = POOL_SIZE,
+        connect_timeout: float = CONNECT_TIMEOUT_SEC,
+        read_timeout: float = READ_TIMEOUT_SEC,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.trust_env = False  # no per-request proxy/netrc environment lookups
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, int(pool_size)), max_retries=0, pool_block=False)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def probe(self, timeout: float = HEALTH_TIMEOUT_SEC) -> requests.Response:
+        """GET /health (body read, connection back in the pool)."""
+        return self.session.get(self.url("/health"), timeout=timeout)
+
+    def forward(
+        self, path: str, body: bytes, content_type: str = "application/json", timeout: Optional[tuple] = None
+    ) -> requests.Response:
+        """POST raw bytes; the response body is left unread for relay()."""
+        return self.session.post(
+            self.url(path),
+            data=body,
+            headers={"Content-Type": content_type or "application/json"},
+            timeout=timeout or self.timeout,
+            stream=True,
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def relay(resp: requests.Response, chunk_size: int = RELAY_CHUNK) -> Iterator[bytes]:
+    """Yield the upstream body as received (content-encoding untouched), then release the connection."""
+    complete = False
+    try:
+        for chunk in resp.raw.stream(chunk_size, decode_content=False):
+            if chunk:
+                yield chunk
+        complete = True
+    finally:
+        if complete:
+            resp.raw.release_conn()  # keep-alive: back to the pool
+        else:
+            resp.close()  # partially read: the connection can't be reused
+
+
+class HealthMonitor:
+    """Cached model-service health, refreshed in the background and by proxied calls."""
+
+    def __init__(
+        self,
+        client: ModelServiceClient,
+        interval: float = HEALTH_INTERVAL_SEC,
+        fail_threshold: int = HEALTH_FAIL_THRESHOLD,
+        on_change: Optional[Callable[[str, str], None]] = None,
+    ) -> None:
+        self.client = client
+        self.on_change = on_change
+        self.interval = max(0.05, float(interval))
+        self.fail_threshold = max(1, int(fail_threshold))
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "unknown"
+        self.since = time.time()
+        self.last_check: Optional[float] = None
+        self.last_latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+        self.checks = 0
+        self.transitions = 0
+
+    # ---------------------------------------------------------------- state
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            old, self.state = self.state, state
+            self.since = time.time()
+            self.transitions += 1
+            if self.on_change is not None:
+                self.on_change(old, state)
+
+    def report_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.last_error = None
+            self._set_state("up")
+
+    def report_status(self, status_code: int) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.last_error = None if status_code == 200 else f"health returned {status_code}"
+            self._set_state("up" if status_code == 200 else "degraded")
+
+    def report_failure(self, error: str) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = error
+            if self.consecutive_failures >= self.fail_threshold or self.state == "unknown":
+                self._set_state("down")
+        self._wake.set()  # re-probe now rather than at the next tick
+
+    def available(self) -> bool:
+        return self.state in ("up", "degraded")
+
+    # ---------------------------------------------------------------- probing
+    def check_now(self) -> str:
+        t0 = time.perf_counter()
+        try:
+            r = self.client.probe()
+            code = r.status_code
+        except requests.RequestException as e:
+            with self._lock:
+                self.checks += 1
+                self.last_check = time.time()
+            self.report_failure(type(e).__name__)
+            return self.state
+        with self._lock:
+            self.checks += 1
+            self.last_check = time.time()
+            self.last_latency_ms = round((time.perf_counter() - t0) * 1000.0, 2)
+        self.report_status(code)
+        return self.state
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.check_now()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self) -> "HealthMonitor":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="model-health", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def wait_available(self, timeout: float) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.check_now() in ("up", "degraded"):
+                return True
+            time.sleep(0.1)
+        return False
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "since": self.since,
+                "last_check": self.last_check,
+                "last_latency_ms": self.last_latency_ms,
+                "last_error": self.last_error,
+                "consecutive_failures": self.consecutive_failures,
+                "checks": self.checks,
+                "transitions": self.transitions,
+            }
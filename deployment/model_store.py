@@ -0,0 +1,367 @@
+"""
+deployment/model_store.py
+
+Content-addressed storage for model checkpoints:
+- Every checkpoint is stored once as blobs/<sha[:2]>/<sha256>.blob; the names users see
+  (uploads/<stamp>__<name>.pth, the active weights file) are hard links to the blob, so a
+  re-upload of the same bytes under a new name costs no disk and no copy
+- Uploads are hashed while they stream to disk: HashingSpool is handed to Werkzeug's multipart
+  parser as the file stream, so the body is written exactly once and committed by rename
+- Resumable chunked uploads: begin() -> append(offset, stream) ... -> complete(); the partial
+  file lives in blobs/uploads/<id>.part and its size is the resume offset
+- activate(): new hard link next to the target + os.replace (atomic, no byte copy); falls back to a
+  symlink, then to a copy, when hard links are not possible (other filesystem, no support)
+- gc() removes blobs no alias links to any more (link count 1)
+Blobs are made read-only so an in-place write through an alias fails instead of silently changing
+every checkpoint that shares the content; writers must replace files (temp + rename).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+UPLOAD_CHUNK = int(os.environ.get("MODEL_UPLOAD_CHUNK", str(1024 * 1024)))
+UPLOAD_TTL_SEC = float(os.environ.get("MODEL_UPLOAD_TTL_SEC", str(24 * 3600)))
+
+
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def is_sha256(value: object) -> bool:
+    """True for exactly 64 lowercase hex characters (what blob names are made of)."""
+    return isinstance(value, str) and _SHA256_RE.fullmatch(value) is not None
+
+
+class UploadError(Exception):
+    """Chunked upload problem; `status` is the HTTP status to report."""
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class HashingSpool:
+    """Writable/readable temp file that hashes everything written to it (a Werkzeug file stream)."""
+
+    def __init__(self, tmp_dir: Path) -> None:
+        fd, name = tempfile.mkstemp(prefix="spool-", suffix=".tmp", dir=str(tmp_dir))
+        self.path = Path(name)
+        self._f = os.fdopen(fd, "w+b")
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        return self._f.write(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def read(self, n: int = -1) -> bytes:
+        return self._f.read(n)
+
+    def readline(self, limit: int = -1) -> bytes:
+        return self._f.readline(limit)
+
+    def seek(self, pos: int, whence: int = 0) -> int:
+        return self._f.seek(pos, whence)
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self._f.closed
+
+    def close(self) -> None:
+        """Close; the temp file is removed unless it was committed to the store."""
+        if not self._f.closed:
+            self._f.close()
+        if not self.committed:
+            self.path.unlink(missing_ok=True)
+
+
+def _file_digest(path: Path, chunk: int = UPLOAD_CHUNK) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ModelBlobStore:
+    def __init__(self, root: Path, upload_ttl: float = UPLOAD_TTL_SEC) -> None:
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.uploads_dir = self.root / "uploads"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.uploads_dir.mkdir(parents=True, exist_ok=True)
+        self.upload_ttl = float(upload_ttl)
+        self._lock = threading.Lock()
+        self._hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}  # upload_id -> (offset, running hash)
+        self._upload_locks: Dict[str, threading.Lock] = {}
+
+    # ---------------------------------------------------------------- blobs
+    def blob_path(self, sha256: str) -> Path:
+        if not is_sha256(sha256):
+            raise ValueError(f"invalid sha256: {sha256!r}")
+        return self.root / sha256[:2] / f"{sha256}.blob"
+
+    def has(self, sha256: str) -> bool:
+        return self.blob_path(sha256).exists()
+
+    def spool(self) -> HashingSpool:
+        return HashingSpool(self.tmp_dir)
+
+    def _commit_file(self, tmp: Path, sha256: str) -> Tuple[Path, bool]:
+        """Move a fully written temp file into place; (blob path, True if new content)."""
+        blob = self.blob_path(sha256)
+        with self._lock:
+            if blob.exists():
+                tmp.unlink(missing_ok=True)
+                return blob, False
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, blob)
+            os.chmod(blob, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            return blob, True
+
+    def commit_spool(self, spool: HashingSpool) -> Tuple[str, int, bool]:
+        """(sha256, size, created) for a spool whose writes are complete."""
+        spool.flush()
+        os.fsync(spool._f.fileno())
+        digest = spool.hexdigest()
+        spool.committed = True
+        spool._f.close()
+        _, created = self._commit_file(spool.path, digest)
+        return digest, spool.size, created
+
+    def ingest_stream(self, stream: BinaryIO, chunk: int = UPLOAD_CHUNK) -> Tuple[str, int, bool]:
+        spool = self.spool()
+        try:
+            for block in iter(lambda: stream.read(chunk), b""):
+                spool.write(block)
+            return self.commit_spool(spool)
+        finally:
+            spool.close()
+
+    def ingest_file(self, src: Path, move: bool = False) -> Tuple[str, int, bool]:
+        """Store an existing file (renamed into the store when move=True and on the same filesystem)."""
+        src = Path(src)
+        digest = _file_digest(src)
+        size = src.stat().st_size
+        if self.has(digest):
+            if move:
+                src.unlink(missing_ok=True)
+            return digest, size, False
+        tmp = self.tmp_dir / f"ingest-{uuid.uuid4().hex}.tmp"
+        if move:
+            try:
+                os.replace(src, tmp)
+            except OSError:  # cross-device
+                shutil.copy2(src, tmp)
+                src.unlink(missing_ok=True)
+        else:
+            shutil.copy2(src, tmp)
+        _, created = self._commit_file(tmp, digest)
+        return digest, size, created
+
+    # ---------------------------------------------------------------- aliases
+    def link(self, sha256: str, dest: Path) -> str:
+        """Point dest at the blob atomically; returns "hardlink" | "symlink" | "copy"."""
+        blob = self.blob_path(sha256)
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with self._lock:  # release() can't drop the blob between the check and the link
+            if not blob.exists():
+                raise FileNotFoundError(f"no blob {sha256}")
+            try:
+                os.link(blob, tmp)
+                mode = "hardlink"
+            except OSError:
+                try:
+                    os.symlink(os.path.relpath(blob, dest.parent), tmp)
+                    mode = "symlink"
+                except OSError:
+                    shutil.copy2(blob, tmp)
+                    os.chmod(tmp, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+                    mode = "copy"
+        os.replace(tmp, dest)
+        return mode
+
+    def activate(self, src: Path, dest: Path, sha256: Optional[str] = None) -> Tuple[str, str]:
+        """Make dest the same content as src (stored first if it isn't a blob yet). (sha256, link mode)."""
+        if sha256 is None or not self.has(sha256):
+            sha256 = self.ingest_file(src)[0]
+            if Path(src).stat().st_nlink == 1:  # not yet an alias of its blob: relink it too
+                self.link(sha256, src)
+        return sha256, self.link(sha256, dest)
+
+    def release(self, sha256: str) -> bool:
+        """Remove one blob if no alias links to it any more."""
+        blob = self.blob_path(sha256)
+        with self._lock:
+            try:
+                if blob.stat().st_nlink <= 1:
+                    blob.unlink()
+                    return True
+            except OSError:
+                pass
+        return False
+
+    def gc(self) -> int:
+        """Remove blobs without any hard-linked alias. Returns the number removed."""
+        removed = 0
+        for blob in self.root.glob("??/*.blob"):
+            try:
+                if blob.stat().st_nlink <= 1:
+                    blob.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    # ---------------------------------------------------------------- chunked uploads
+    def _part(self, upload_id: str) -> Path:
+        if not upload_id or not all(c.isalnum() for c in upload_id):
+            raise UploadError("invalid upload id", 400)
+        return self.uploads_dir / f"{upload_id}.part"
+
+    def _state_path(self, upload_id: str) -> Path:
+        return self.uploads_dir / f"{upload_id}.json"
+
+    def begin(self, info: Dict[str, object]) -> Dict[str, object]:
+        self.expire_uploads()
+        upload_id = uuid.uuid4().hex
+        state = dict(info, upload_id=upload_id, created=time.time())
+        self._part(upload_id).touch()
+        self._state_path(upload_id).write_text(json.dumps(state), encoding="utf-8")
+        with self._lock:
+            self._hashers[upload_id] = (0, hashlib.sha256())
+        state["offset"] = 0
+        return state
+
+    def upload_state(self, upload_id: str) -> Dict[str, object]:
+        part = self._part(upload_id)
+        try:
+            state = json.loads(self._state_path(upload_id).read_text(encoding="utf-8"))
+            state["offset"] = part.stat().st_size
+        except (OSError, ValueError):
+            raise UploadError("upload not found", 404)
+        return state
+
+    def _upload_lock(self, upload_id: str) -> threading.Lock:
+        with self._lock:
+            return self._upload_locks.setdefault(upload_id, threading.Lock())
+
+    def append(self, upload_id: str, offset: int, stream: BinaryIO, chunk: int = UPLOAD_CHUNK) -> int:
+        """Append the request body at `offset` (must equal the current size). Returns the new offset."""
+        part = self._part(upload_id)
+        lock = self._upload_lock(upload_id)
+        if not lock.acquire(blocking=False):
+            raise UploadError("another chunk for this upload is in progress", 409)
+        try:
+            if not part.exists():
+                raise UploadError("upload not found", 404)
+            size = part.stat().st_size
+            if offset != size:
+                raise UploadError("offset mismatch", 409, offset=size)
+            with self._lock:
+                hashed_to, h = self._hashers.get(upload_id, (-1, None))
+            if h is None or hashed_to != size:  # restarted or out of sync: hash what we have so far
+                h = hashlib.sha256()
+                with open(part, "rb") as f:
+                    for block in iter(lambda: f.read(chunk), b""):
+                        h.update(block)
+            with open(part, "ab") as f:
+                for block in iter(lambda: stream.read(chunk), b""):
+                    f.write(block)
+                    h.update(block)
+                    size += len(block)
+            with self._lock:
+                self._hashers[upload_id] = (size, h)
+            return size
+        finally:
+            lock.release()
+
+    def complete(
+        self, upload_id: str, expected_sha256: Optional[str] = None
+    ) -> Tuple[str, int, bool, Dict[str, object]]:
+        """Verify and store a finished upload: (sha256, size, created, state)."""
+        part = self._part(upload_id)
+        lock = self._upload_lock(upload_id)
+        if not lock.acquire(blocking=False):
+            raise UploadError("a chunk for this upload is still in progress", 409)
+        try:
+            state = self.upload_state(upload_id)
+            size = int(state["offset"])
+            if state.get("size") is not None and int(state["size"]) != size:
+                raise UploadError("upload incomplete", 409, offset=size)
+            with self._lock:
+                hashed_to, h = self._hashers.pop(upload_id, (-1, None))
+            digest = h.hexdigest() if h is not None and hashed_to == size else _file_digest(part)
+            expected = expected_sha256 or state.get("sha256")
+            if expected and str(expected).lower() != digest:
+                raise UploadError("sha256 mismatch", 422)
+            with open(part, "rb+") as f:
+                os.fsync(f.fileno())
+            _, created = self._commit_file(part, digest)
+            self._state_path(upload_id).unlink(missing_ok=True)
+            with self._lock:
+                self._upload_locks.pop(upload_id, None)
+            return digest, size, created, state
+        finally:
+            lock.release()
+
+    def abort(self, upload_id: str) -> None:
+        self._part(upload_id).unlink(missing_ok=True)
+        self._state_path(upload_id).unlink(missing_ok=True)
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+            self._upload_locks.pop(upload_id, None)
+
+    def expire_uploads(self) -> int:
+        cutoff = time.time() - self.upload_ttl
+        n = 0
+        for state in self.uploads_dir.glob("*.json"):
+            part = state.with_suffix(".part")
+            try:
+                newest = max(state.stat().st_mtime, part.stat().st_mtime if part.exists() else 0)
+            except OSError:
+                continue
+            if newest < cutoff:
+                self.abort(state.stem)
+                n += 1
+        for tmp in self.tmp_dir.glob("*.tmp"):  # spools orphaned by a crash
+            try:
+                if tmp.stat().st_mtime < cutoff:
+                    tmp.unlink()
+            except OSError:
+                continue
+        return n
@@ -0,0 +1,374 @@
+"""
+deployment/record_store.py
+
+Persistent registries for capture sessions, training jobs and stream session history:
+- RecordDB: one SQLite file in WAL mode (readers never block the writer), table `records`
+  keyed by (kind, id) with the status and created time as indexed columns and the record as JSON
+- RecordRegistry: a bounded in-memory hot set in front of one kind. Records are read and updated
+  in memory; counter-only updates are written behind (every REGISTRY_FLUSH_SEC), status changes
+  and new records are written immediately
+- Eviction: finished records (terminal status) leave memory REGISTRY_TTL_SEC after their last
+  update; when the hot set is over REGISTRY_HOT_MAX the least recently used records go first,
+  finished before active. Evicted records are reloaded from disk on the next get/update
+- query(status, since, until) pages the full history newest first straight from the indexes
+- recover(status): records left active by a previous process (the backend died mid-job) are
+  marked with `status` on startup so history never shows phantom running entries
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+REGISTRY_HOT_MAX = int(os.environ.get("REGISTRY_HOT_MAX", "256"))
+REGISTRY_TTL_SEC = float(os.environ.get("REGISTRY_TTL_SEC", "3600"))
+REGISTRY_FLUSH_SEC = float(os.environ.get("REGISTRY_FLUSH_SEC", "1.0"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    status TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    finished REAL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE INDEX IF NOT EXISTS records_kind_created ON records (kind, created);
+CREATE INDEX IF NOT EXISTS records_kind_status_created ON records (kind, status, created);
+"""
+
+Row = Tuple[str, str, Optional[str], float, float, Optional[float], str]
+
+
+class RecordDB:
+    """Single shared connection (serialized by a lock); WAL keeps writes cheap and crash-safe."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def upsert(self, rows: List[Row]) -> None:
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO records (kind, id, status, created, updated, finished, data) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, id) DO UPDATE SET status = excluded.status, updated = excluded.updated, "
+                "finished = excluded.finished, data = excluded.data",
+                rows,
+            )
+
+    def load(self, kind: str, rid: str) -> Optional[Tuple[Dict[str, Any], Optional[float]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, finished FROM records WHERE kind = ? AND id = ?", (kind, rid)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def query(
+        self,
+        kind: str,
+        statuses: Optional[List[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        where = ["kind = ?"]
+        args: List[Any] = [kind]
+        if statuses:
+            where.append(f"status IN ({', '.join('?' * len(statuses))})")
+            args += statuses
+        if since is not None:
+            where.append("created >= ?")
+            args.append(float(since))
+        if until is not None:
+            where.append("created < ?")
+            args.append(float(until))
+        cond = " AND ".join(where)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM records WHERE {cond}", args).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT data FROM records WHERE {cond} ORDER BY created DESC, id DESC LIMIT ? OFFSET ?",
+                args + [max(int(limit), 0), max(int(offset), 0)],
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows], int(total)
+
+    def active(self, kind: str, terminal: Iterable[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """(id, record) for every record whose status is not terminal."""
+        terminal = list(terminal)
+        cond = f"status IS NULL OR status NOT IN ({', '.join('?' * len(terminal))})" if terminal else "1"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, data FROM records WHERE kind = ? AND ({cond})", [kind] + terminal
+            ).fetchall()
+        return [(r[0], json.loads(r[1])) for r in rows]
+
+    def counts(self, kind: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM records WHERE kind = ? GROUP BY status", (kind,)
+            ).fetchall()
+        return {str(s): int(n) for s, n in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RecordRegistry:
+    """
+    Dict-of-dicts registry for one record kind, persisted in a RecordDB.
+    Records are plain JSON-able dicts; get() returns a copy, so mutate through update()/incr().
+    on_evict(id, record) runs (outside the lock) when a record leaves memory.
+    """
+
+    def __init__(
+        self,
+        db: RecordDB,
+        kind: str,
+        terminal: Iterable[str] = (),
+        time_key: str = "created",
+        hot_max: int = REGISTRY_HOT_MAX,
+        ttl_sec: float = REGISTRY_TTL_SEC,
+        flush_interval: float = REGISTRY_FLUSH_SEC,
+        on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.db = db
+        self.kind = kind
+        self.terminal = frozenset(terminal)
+        self.time_key = time_key
+        self.hot_max = max(1, int(hot_max))
+        self.ttl_sec = float(ttl_sec)
+        self.flush_interval = max(0.05, float(flush_interval))
+        self._on_evict = on_evict
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()  # snapshot + write as one step, so rows reach disk in order
+        self._hot: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # least recently used first
+        self._touched: Dict[str, float] = {}
+        self._finished: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.evicted = 0
+
+    # ---------------------------------------------------------------- persistence
+    def _row_locked(self, rid: str) -> Row:
+        rec = self._hot[rid]
+        try:
+            created = float(rec.get(self.time_key) or 0.0)
+        except (TypeError, ValueError):
+            created = 0.0
+        return (
+            self.kind,
+            rid,
+            rec.get("status"),
+            created,
+            self._touched.get(rid, time.time()),
+            self._finished.get(rid),
+            json.dumps(rec, default=str),
+        )
+
+    def flush(self) -> int:
+        """Write every dirty record now; returns how many were written."""
+        with self._io_lock:
+            with self._lock:
+                rows = [self._row_locked(rid) for rid in self._dirty if rid in self._hot]
+                self._dirty.clear()
+            self.db.upsert(rows)
+        return len(rows)
+
+    def _write_now(self, rid: str) -> None:
+        with self._io_lock:
+            with self._lock:
+                if rid not in self._hot:
+                    return
+                row = self._row_locked(rid)
+                self._dirty.discard(rid)
+            self.db.upsert([row])
+
+    # ---------------------------------------------------------------- hot set
+    def _promote_locked(self, rid: str) -> Optional[Dict[str, Any]]:
+        rec = self._hot.get(rid)
+        if rec is not None:
+            self._hot.move_to_end(rid)
+            return rec
+        loaded = self.db.load(self.kind, rid)
+        if loaded is None:
+            return None
+        rec, finished = loaded
+        self._hot[rid] = rec
+        self._touched[rid] = time.time()
+        if finished is not None:
+            self._finished[rid] = finished
+        return rec
+
+    def _drop_locked(self, rid: str) -> Tuple[Dict[str, Any], Optional[Row]]:
+        row = self._row_locked(rid) if rid in self._dirty else None
+        self._dirty.discard(rid)
+        self._touched.pop(rid, None)
+        self._finished.pop(rid, None)
+        return self._hot.pop(rid), row
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Drop expired finished records, then LRU records (finished first) while over hot_max."""
+        now = time.time() if now is None else now
+        out: List[Tuple[str, Dict[str, Any], Optional[Row]]] = []
+        with self._io_lock, self._lock:
+            for rid in [r for r, t in self._finished.items() if now - max(t, self._touched.get(r, t)) >= self.ttl_sec]:
+                out.append((rid, *self._drop_locked(rid)))
+            excess = len(self._hot) - self.hot_max
+            for finished_only in (True, False):
+                if excess <= 0:
+                    break
+                for rid in [r for r in self._hot if not finished_only or r in self._finished]:
+                    if excess <= 0:
+                        break
+                    out.append((rid, *self._drop_locked(rid)))
+                    excess -= 1
+            self.evicted += len(out)
+            self.db.upsert([row for _, _, row in out if row is not None])
+        if self._on_evict is not None:
+            for rid, rec, _ in out:
+                try:
+                    self._on_evict(rid, rec)
+                except Exception:
+                    pass
+        return len(out)
+
+    # ---------------------------------------------------------------- records
+    def put(self, rid: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert or replace a record (written immediately)."""
+        now = time.time()
+        with self._lock:
+            self._hot.pop(rid, None)
+            self._hot[rid] = dict(record)
+            self._touched[rid] = now
+            if record.get("status") in self.terminal:
+                self._finished[rid] = now
+            else:
+                self._finished.pop(rid, None)
+        self._write_now(rid)
+        if len(self._hot) > self.hot_max:
+            self.evict(now)
+        return dict(record)
+
+    def get(self, rid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rec = self._promote_locked(rid)
+            return dict(rec) if rec is not None else None
+
+    def __contains__(self, rid: object) -> bool:
+        return isinstance(rid, str) and self.get(rid) is not None
+
+    def update(self, rid: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Merge fields into a known record; None when the id is unknown."""
+        now = time.time()
+        with self._lock:
+            rec = self._promote_locked(rid)
+            if rec is None:
+                return None
+            status_changed = "status" in fields and fields["status"] != rec.get("status")
+            rec.update(fields)
+            self._touched[rid] = now
+            if status_changed:
+                if rec.get("status") in self.terminal:
+                    self._finished[rid] = now
+                else:
+                    self._finished.pop(rid, None)
+            self._dirty.add(rid)
+            out = dict(rec)
+        if status_changed:
+            self._write_now(rid)
+        return out
+
+    def incr(self, rid: str, field: str, n: int = 1) -> Optional[int]:
+        """Atomic counter add (written behind); None when the id is unknown."""
+        with self._lock:
+            rec = self._promote_locked(rid)
+            if rec is None:
+                return None
+            rec[field] = int(rec.get(field) or 0) + int(n)
+            self._touched[rid] = time.time()
+            self._dirty.add(rid)
+            return rec[field]
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """(page, total) over the full history, newest first; status may be a comma-separated list."""
+        self.flush()
+        statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+        return self.db.query(self.kind, statuses, since, until, limit, offset)
+
+    def recover(self, status: str, **fields: Any) -> int:
+        """Mark records left active by a previous process (call once at startup)."""
+        stale = self.db.active(self.kind, self.terminal)
+        now = time.time()
+        with self._io_lock, self._lock:
+            rows = []
+            for rid, rec in stale:
+                if rid in self._hot:
+                    continue
+                rec.update(fields, status=status)
+                self._hot[rid] = rec
+                self._touched[rid] = now
+                self._finished[rid] = now
+                rows.append(self._row_locked(rid))
+            self.db.upsert(rows)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hot, finished, dirty = len(self._hot), len(self._finished), len(self._dirty)
+        return {
+            "kind": self.kind,
+            "hot": hot,
+            "hot_finished": finished,
+            "hot_max": self.hot_max,
+            "dirty": dirty,
+            "evicted": self.evicted,
+            "ttl_sec": self.ttl_sec,
+            "by_status": self.db.counts(self.kind),
+        }
+
+    # ---------------------------------------------------------------- background
+    def _loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                self.evict()
+            except Exception:
+                pass
+
+    def start(self) -> "RecordRegistry":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name=f"registry-{self.kind}", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.flush()
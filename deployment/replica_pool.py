@@ -0,0 +1,323 @@
+"""
+deployment/replica_pool.py
+
+Model-service replicas behind the control backend:
+- Local replicas: MODEL_REPLICAS processes on consecutive ports from TRANSFORMER_PORT (or the ports
+  listed in MODEL_REPLICA_PORTS, "5001-5004" / "5001,5003"), each under its own ServiceSupervisor
+  (warm standby, failover). Remote replicas (MODEL_REMOTE_REPLICAS, comma-separated base URLs) are
+  routed to and health-checked the same way but never started or stopped from here
+- acquire(): least outstanding requests among the healthy replicas ("up" before "degraded"; ties go
+  to the replica that has served fewest requests, so an idle pool still spreads); release() once
+  the upstream body has been relayed
+- Session affinity: a session_id sticks to the replica that served it first for as long as that
+  replica is routable (LRU map of MODEL_AFFINITY_MAX entries, dropped after MODEL_AFFINITY_TTL_SEC idle)
+- Ejection: a replica whose HealthMonitor goes "down" (failed probes, or connection errors on proxied
+  calls) gets no new requests and its sessions move to another replica; the next successful
+  background probe re-admits it. A call that could not connect is retried once on another replica
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from deployment.model_proxy import HealthMonitor, ModelServiceClient, relay
+from deployment.service_supervisor import ServiceSupervisor
+
+REPLICAS = int(os.environ.get("MODEL_REPLICAS", "1"))
+REPLICA_PORTS = os.environ.get("MODEL_REPLICA_PORTS", "")
+REMOTE_REPLICAS = os.environ.get("MODEL_REMOTE_REPLICAS", "")
+AFFINITY_TTL_SEC = float(os.environ.get("MODEL_AFFINITY_TTL_SEC", "300"))
+AFFINITY_MAX = int(os.environ.get("MODEL_AFFINITY_MAX", "10000"))
+CONNECT_RETRIES = 1
+
+
+class NoReplicaError(RuntimeError):
+    """No replica is available to take the request."""
+
+
+def replica_ports(base_port: int, count: int = REPLICAS, spec: str = REPLICA_PORTS) -> List[int]:
+    """Local replica ports: the ranges/ports in spec, else `count` (at least 1) ports from base_port."""
+    ports: List[int] = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if part:
+            lo, _, hi = part.partition("-")
+            ports.extend(range(int(lo), int(hi or lo) + 1))
+    if not ports:
+        ports = [base_port + i for i in range(max(1, int(count)))]
+    return list(dict.fromkeys(ports))
+
+
+def remote_replica_urls(spec: str = REMOTE_REPLICAS) -> List[str]:
+    urls = []
+    for part in (spec or "").split(","):
+        part = part.strip().rstrip("/")
+        if part:
+            urls.append(part if "://" in part else f"http://{part}")
+    return list(dict.fromkeys(urls))
+
+
+class Replica:
+    """One model-service endpoint: its pooled client, cached health and routing counters."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        port: Optional[int] = None,
+        supervisor: Optional[ServiceSupervisor] = None,
+        client: Optional[ModelServiceClient] = None,
+        health: Optional[HealthMonitor] = None,
+    ) -> None:
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.port = port
+        self.supervisor = supervisor
+        self.client = client or ModelServiceClient(self.base_url)
+        self.health = health or HealthMonitor(self.client)
+        self.health.on_change = self._on_health
+        self.outstanding = 0  # guarded by the pool lock
+        self.requests = 0
+        self.errors = 0
+        self.ejections = 0
+        self.readmissions = 0
+
+    @property
+    def local(self) -> bool:
+        return self.supervisor is not None
+
+    def _on_health(self, old: str, new: str) -> None:
+        if new == "down" and old in ("up", "degraded"):
+            self.ejections += 1
+        elif old == "down" and new in ("up", "degraded"):
+            self.readmissions += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        primary = self.supervisor.primary if self.supervisor is not None else None
+        out = {
+            "name": self.name,
+            "url": self.base_url,
+            "local": self.local,
+            "port": self.port,
+            "pid": primary.pid if primary is not None and primary.alive() else None,
+            "transport": self.client.transport,
+            "state": self.health.state,
+            "last_latency_ms": self.health.last_latency_ms,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "readmissions": self.readmissions,
+        }
+        if self.client.transport != "http":
+            out["transport_stats"] = self.client.stats()
+        return out
+
+
+class RelayedBody:
+    """Upstream body iterator that hands the replica's slot back once relayed or closed."""
+
+    def __init__(self, pool: "ReplicaPool", replica: Replica, resp: requests.Response) -> None:
+        self._pool = pool
+        self._replica = replica
+        self._resp = resp
+        self._body = relay(resp)
+        self._started = False
+        self._closed = False
+
+    def __iter__(self) -> "RelayedBody":
+        return self
+
+    def __next__(self) -> bytes:
+        self._started = True
+        try:
+            return next(self._body)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._body.close()  # a started relay() returns or drops the connection itself
+            if not self._started:
+                self._resp.close()
+        finally:
+            self._pool.release(self._replica)
+
+
+class ReplicaPool:
+    """Least-outstanding-requests routing with optional session affinity over a fixed replica set."""
+
+    def __init__(
+        self,
+        replicas: Iterable[Replica],
+        affinity_ttl: float = AFFINITY_TTL_SEC,
+        affinity_max: int = AFFINITY_MAX,
+    ) -> None:
+        self.replicas: List[Replica] = list(replicas)
+        if not self.replicas:
+            raise ValueError("replica pool needs at least one replica")
+        self.affinity_ttl = float(affinity_ttl)
+        self.affinity_max = max(0, int(affinity_max))
+        self._lock = threading.Lock()
+        self._affinity: "OrderedDict[str, Tuple[Replica, float]]" = OrderedDict()
+        self.affinity_hits = 0
+        self.affinity_moves = 0
+
+    @property
+    def local(self) -> List[Replica]:
+        return [r for r in self.replicas if r.local]
+
+    def get(self, port: int) -> Optional[Replica]:
+        """The local replica on this port."""
+        for r in self.replicas:
+            if r.local and r.port == port:
+                return r
+        return None
+
+    def available(self) -> bool:
+        return any(r.health.available() for r in self.replicas)
+
+    def check_all(self) -> bool:
+        """Fresh probe of every replica; True if any is available afterwards."""
+        return any([r.health.check_now() in ("up", "degraded") for r in self.replicas])
+
+    # ---------------------------------------------------------------- routing
+    def _pick_locked(self, exclude: List[Replica]) -> Optional[Replica]:
+        for state in ("up", "degraded"):
+            candidates = [r for r in self.replicas if r.health.state == state and r not in exclude]
+            if candidates:
+                return min(candidates, key=lambda r: (r.outstanding, r.requests))
+        return None
+
+    def acquire(self, session_id: Optional[str] = None, exclude: Iterable[Replica] = ()) -> Optional[Replica]:
+        """Reserve a slot on the replica for the next request (None: nothing routable)."""
+        exclude = list(exclude)
+        now = time.monotonic()
+        with self._lock:
+            while self._affinity:  # LRU order is last-use order: expired entries are at the front
+                _, (_, used) = next(iter(self._affinity.items()))
+                if now - used <= self.affinity_ttl:
+                    break
+                self._affinity.popitem(last=False)
+            pinned = self._affinity.get(session_id, (None, 0.0))[0] if session_id else None
+            if pinned is not None and pinned.health.available() and pinned not in exclude:
+                choice = pinned
+                self.affinity_hits += 1
+            else:
+                choice = self._pick_locked(exclude)
+                if choice is None:
+                    return None
+                if pinned is not None:
+                    self.affinity_moves += 1
+            if session_id and self.affinity_max:
+                self._affinity[session_id] = (choice, now)
+                self._affinity.move_to_end(session_id)
+                while len(self._affinity) > self.affinity_max:
+                    self._affinity.popitem(last=False)
+            choice.outstanding += 1
+            choice.requests += 1
+            return choice
+
+    def release(self, replica: Replica, ok: bool = True) -> None:
+        with self._lock:
+            replica.outstanding -= 1
+            if not ok:
+                replica.errors += 1
+
+    def forward(
+        self,
+        path: str,
+        body: bytes,
+        session_id: Optional[str] = None,
+        content_type: str = "application/json",
+        timeout: Optional[tuple] = None,
+    ) -> Tuple[Replica, requests.Response]:
+        """
+        POST to the chosen replica; the response body is left unread and the slot stays reserved
+        until release() (RelayedBody does both). Raises NoReplicaError or requests.RequestException.
+        """
+        tried: List[Replica] = []
+        while True:
+            replica = self.acquire(session_id, exclude=tried)
+            if replica is None:
+                raise NoReplicaError("no model service replica is available")
+            try:
+                resp = replica.client.forward(path, body, content_type, timeout)
+            except requests.RequestException as e:
+                self.release(replica, ok=False)
+                replica.health.report_failure(type(e).__name__)
+                tried.append(replica)
+                # connection errors never reached the service: another replica can take the call
+                if isinstance(e, requests.ConnectionError) and len(tried) <= CONNECT_RETRIES:
+                    continue
+                raise
+            replica.health.report_success()
+            return replica, resp
+
+    def request(
+        self,
+        path: str,
+        body: bytes,
+        session_id: Optional[str] = None,
+        content_type: str = "application/json",
+        timeout: Optional[tuple] = None,
+    ) -> Tuple[Replica, requests.Response]:
+        """forward() with the whole body read and the slot released."""
+        replica, resp = self.forward(path, body, session_id, content_type, timeout)
+        ok = False
+        try:
+            resp.content  # noqa: B018 - reading returns the connection to the pool
+            ok = True
+        finally:
+            self.release(replica, ok=ok)
+        return replica, resp
+
+    def relay(self, replica: Replica, resp: requests.Response) -> RelayedBody:
+        return RelayedBody(self, replica, resp)
+
+    # ---------------------------------------------------------------- lifecycle
+    def start(self) -> "ReplicaPool":
+        for r in self.replicas:
+            r.health.start()
+        return self
+
+    def warm_standby(self) -> None:
+        for r in self.local:
+            r.supervisor.warm_standby()
+
+    def shutdown(self) -> None:
+        for r in self.replicas:
+            r.health.stop()
+        # plain threads: this runs from atexit, where executors no longer accept work
+        stopping = [threading.Thread(target=r.supervisor.shutdown, daemon=True) for r in self.local]
+        for t in stopping:
+            t.start()
+        for t in stopping:
+            t.join()
+        for r in self.replicas:
+            r.client.close()
+
+    # ---------------------------------------------------------------- reporting
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            replicas = [r.snapshot() for r in self.replicas]
+            affinity = len(self._affinity)
+        return {
+            "policy": "least_outstanding",
+            "replicas": replicas,
+            "available": sum(1 for r in replicas if r["state"] in ("up", "degraded")),
+            "outstanding": sum(r["outstanding"] for r in replicas),
+            "affinity_sessions": affinity,
+            "affinity_hits": self.affinity_hits,
+            "affinity_moves": self.affinity_moves,
+        }
@@ -0,0 +1,199 @@
+"""
+deployment/request_telemetry.py
+
+Per-route request telemetry for the control backend:
+- Requests are keyed by "<METHOD> <url rule>" (e.g. "GET /api/train_status/<job_id>"), so path
+  parameters don't multiply the series; unmatched paths share one "<unmatched>" key
+- Every route keeps counts by status class (2xx/3xx/4xx/5xx), request bytes, in-flight requests and
+  a fixed-bucket latency histogram (TELEMETRY_BUCKETS_MS); recording is O(1) and memory is constant
+- Rates come from a rolling window of per-second slots (TELEMETRY_WINDOW_SEC); rps is reported
+  over 10 s and the full window
+- Quantiles (p50/p90/p99) are estimated from the histogram (upper bound of the bucket)
+- snapshot() -> JSON-able dict, prometheus() -> text exposition format
+Latency is measured to the response being returned by the view (time to headers for streams).
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+TELEMETRY_BUCKETS_MS: Tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+TELEMETRY_WINDOW_SEC = int(os.environ.get("TELEMETRY_WINDOW_SEC", "60"))
+SHORT_WINDOW_SEC = 10
+UNMATCHED = "<unmatched>"
+
+
+class RollingCounter:
+    """Event counts in per-second slots over the last `window` seconds."""
+
+    def __init__(self, window: int = TELEMETRY_WINDOW_SEC) -> None:
+        self.window = max(1, int(window))
+        self._counts = [0] * self.window
+        self._stamps = [-1] * self.window
+
+    def add(self, now: float, n: int = 1) -> None:
+        sec = int(now)
+        i = sec % self.window
+        if self._stamps[i] != sec:
+            self._stamps[i] = sec
+            self._counts[i] = 0
+        self._counts[i] += n
+
+    def total(self, now: float, window: Optional[int] = None) -> int:
+        """Events in the last `window` seconds (including the current, partial second)."""
+        window = min(self.window, window or self.window)
+        cutoff = int(now) - window
+        return sum(c for c, s in zip(self._counts, self._stamps) if s > cutoff)
+
+
+class RouteStats:
+    __slots__ = (
+        "count", "errors", "status", "buckets", "sum_ms", "max_ms", "bytes_in", "in_flight", "recent", "recent_errors",
+    )
+
+    def __init__(self, window: int) -> None:
+        self.count = 0
+        self.errors = 0  # 5xx
+        self.status: Dict[str, int] = {}
+        self.buckets = [0] * (len(TELEMETRY_BUCKETS_MS) + 1)  # last bucket: > largest bound
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes_in = 0
+        self.in_flight = 0
+        self.recent = RollingCounter(window)
+        self.recent_errors = RollingCounter(window)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return float(TELEMETRY_BUCKETS_MS[i]) if i < len(TELEMETRY_BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+
+class RequestTelemetry:
+    """Thread-safe per-route counters and latency histograms."""
+
+    def __init__(self, window: int = TELEMETRY_WINDOW_SEC) -> None:
+        self.window = max(SHORT_WINDOW_SEC, int(window))
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._routes: Dict[str, RouteStats] = {}
+
+    @staticmethod
+    def route_key(method: str, rule: Optional[str]) -> str:
+        return f"{method} {rule}" if rule else UNMATCHED
+
+    def _route(self, key: str) -> RouteStats:
+        st = self._routes.get(key)
+        if st is None:
+            st = self._routes[key] = RouteStats(self.window)
+        return st
+
+    # ---------------------------------------------------------------- recording
+    def begin(self, key: str) -> None:
+        with self._lock:
+            self._route(key).in_flight += 1
+
+    def end(self, key: str, status: int, latency_ms: float, bytes_in: int = 0) -> None:
+        now = time.time()
+        cls = f"{status // 100}xx"
+        with self._lock:
+            st = self._route(key)
+            st.in_flight = max(st.in_flight - 1, 0)
+            st.count += 1
+            st.status[cls] = st.status.get(cls, 0) + 1
+            st.buckets[bisect.bisect_left(TELEMETRY_BUCKETS_MS, latency_ms)] += 1
+            st.sum_ms += latency_ms
+            if latency_ms > st.max_ms:
+                st.max_ms = latency_ms
+            st.bytes_in += max(int(bytes_in or 0), 0)
+            st.recent.add(now)
+            if status >= 500:
+                st.errors += 1
+                st.recent_errors.add(now)
+
+    # ---------------------------------------------------------------- reading
+    def _route_snapshot(self, st: RouteStats, now: float) -> Dict[str, object]:
+        window_count = st.recent.total(now)
+        return {
+            "count": st.count,
+            "in_flight": st.in_flight,
+            "status": dict(st.status),
+            "errors": st.errors,
+            "rps_10s": round(st.recent.total(now, SHORT_WINDOW_SEC) / SHORT_WINDOW_SEC, 3),
+            "rps_window": round(window_count / self.window, 3),
+            "error_rate_window": round(st.recent_errors.total(now) / window_count, 4) if window_count else 0.0,
+            "latency_ms": {
+                "mean": round(st.sum_ms / st.count, 2) if st.count else None,
+                "max": round(st.max_ms, 2) if st.count else None,
+                "p50": st.quantile(0.50),
+                "p90": st.quantile(0.90),
+                "p99": st.quantile(0.99),
+            },
+            "busy_ms": round(st.sum_ms, 1),  # total handler time: share of backend capacity
+            "bytes_in": st.bytes_in,
+            "buckets": list(st.buckets),
+        }
+
+    def snapshot(self) -> Dict[str, object]:
+        now = time.time()
+        with self._lock:
+            routes = {k: self._route_snapshot(st, now) for k, st in self._routes.items()}
+        busy_total = sum(r["busy_ms"] for r in routes.values()) or 1.0
+        for r in routes.values():
+            r["busy_share"] = round(r["busy_ms"] / busy_total, 4)
+        return {
+            "uptime_sec": round(now - self.started, 1),
+            "window_sec": self.window,
+            "bucket_bounds_ms": list(TELEMETRY_BUCKETS_MS),
+            "totals": {
+                "count": sum(r["count"] for r in routes.values()),
+                "in_flight": sum(r["in_flight"] for r in routes.values()),
+                "errors": sum(r["errors"] for r in routes.values()),
+                "rps_10s": round(sum(r["rps_10s"] for r in routes.values()), 3),
+                "rps_window": round(sum(r["rps_window"] for r in routes.values()), 3),
+            },
+            "routes": dict(sorted(routes.items(), key=lambda kv: -kv[1]["busy_ms"])),
+        }
+
+    def prometheus(self, prefix: str = "control_backend") -> str:
+        """Prometheus text exposition (counters, histogram, in-flight gauge) for every route."""
+        with self._lock:
+            items: List[Tuple[str, RouteStats]] = sorted(self._routes.items())
+            rows = [(_labels(key), st) for key, st in items]
+            lines = [f"# TYPE {prefix}_requests_total counter"]
+            for labels, st in rows:
+                for cls, n in sorted(st.status.items()):
+                    lines.append(f'{prefix}_requests_total{{{labels},status="{cls}"}} {n}')
+            lines.append(f"# TYPE {prefix}_request_latency_ms histogram")
+            for labels, st in rows:
+                cum = 0
+                for bound, n in zip(TELEMETRY_BUCKETS_MS, st.buckets):
+                    cum += n
+                    lines.append(f'{prefix}_request_latency_ms_bucket{{{labels},le="{bound:g}"}} {cum}')
+                lines.append(f'{prefix}_request_latency_ms_bucket{{{labels},le="+Inf"}} {st.count}')
+                lines.append(f"{prefix}_request_latency_ms_sum{{{labels}}} {st.sum_ms:.3f}")
+                lines.append(f"{prefix}_request_latency_ms_count{{{labels}}} {st.count}")
+            lines.append(f"# TYPE {prefix}_requests_in_flight gauge")
+            lines += [f"{prefix}_requests_in_flight{{{labels}}} {st.in_flight}" for labels, st in rows]
+            lines.append(f"# TYPE {prefix}_request_bytes_total counter")
+            lines += [f"{prefix}_request_bytes_total{{{labels}}} {st.bytes_in}" for labels, st in rows]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: str) -> str:
+    method, _, rule = key.partition(" ")
+    return f'method="{method}",route="{_escape(rule)}"' if rule else f'route="{_escape(key)}"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,360 @@
+"""
+deployment/service_supervisor.py
+
+Model-service process supervision with a warm standby:
+- Every spawned process gets a readiness pipe (SERVICE_READY_FD) and reports JSON lines on it:
+  {"event": "warm"} once torch is imported and the weights are loaded, {"event": "serving"} once
+  its port is bound. The orchestrator blocks on the pipe instead of polling /health
+- The standby (SERVICE_STANDBY=1) stops after "warm" and waits on stdin for "serve" (bind the port
+  and take over) or "reload" (load the active weights again, then "warm" again)
+- start(): promotes the standby when there is one and cold-starts otherwise; a replacement
+  standby is spawned once the new primary is serving
+- start(reload=True) (model switch): the standby loads the new weights while the primary keeps
+  serving, then takes over
+- A watcher thread promotes the standby as soon as the primary exits unexpectedly (failover)
+- stats(): time-to-ready of the last start (cold: spawn -> serving, promoted: "serve" -> serving)
+  and the standby's warm-up time
+Without fd passing (Windows) readiness falls back to polling the health callback and every start is cold.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple
+
+MODEL_STANDBY = os.environ.get("MODEL_STANDBY", "1").strip().lower() not in ("0", "false", "no", "off")
+SERVICE_READY_TIMEOUT_SEC = float(os.environ.get("SERVICE_READY_TIMEOUT_SEC", "60"))
+SERVICE_STOP_TIMEOUT_SEC = 6.0
+WATCH_INTERVAL_SEC = 0.2
+STANDBY_RETRY_MAX_SEC = 60.0
+
+
+class ServiceProcess:
+    """One spawned service process and the readiness events it reported."""
+
+    def __init__(self, proc: subprocess.Popen, role: str, ready_fd: Optional[int] = None) -> None:
+        self.proc = proc
+        self.role = role
+        self.spawned = time.monotonic()
+        self.events: List[Dict[str, Any]] = []
+        self.eof = ready_fd is None
+        self._cond = threading.Condition()
+        if ready_fd is not None:
+            threading.Thread(target=self._read, args=(ready_fd,), name=f"ready-{proc.pid}", daemon=True).start()
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _read(self, fd: int) -> None:
+        with os.fdopen(fd, "rb") as f:
+            for line in f:
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue
+                ev["t"] = time.monotonic()
+                with self._cond:
+                    self.events.append(ev)
+                    self._cond.notify_all()
+        with self._cond:
+            self.eof = True  # process exited (or closed the pipe)
+            self._cond.notify_all()
+
+    def count(self, name: str) -> int:
+        with self._cond:
+            return sum(1 for e in self.events if e.get("event") == name)
+
+    def wait_event(
+        self, name: str, nth: int = 1, timeout: float = SERVICE_READY_TIMEOUT_SEC
+    ) -> Optional[Dict[str, Any]]:
+        """The nth `name` event (1-based), or None on timeout / exit / an "error" event."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                seen = [e for e in self.events if e.get("event") == name]
+                if len(seen) >= nth:
+                    return seen[nth - 1]
+                if self.eof or any(e.get("event") == "error" for e in self.events):
+                    return None
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                self._cond.wait(left)
+
+    def send(self, cmd: str) -> bool:
+        try:
+            self.proc.stdin.write((cmd + "\n").encode("utf-8"))
+            self.proc.stdin.flush()
+            return True
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def terminate(self, timeout: float = SERVICE_STOP_TIMEOUT_SEC) -> None:
+        if self.proc.stdin is not None:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        if not self.alive():
+            return
+        try:
+            if os.name != "nt":
+                os.killpg(os.getpgid(self.pid), signal.SIGTERM)
+            else:
+                self.proc.terminate()
+            try:
+                self.proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                if os.name != "nt":
+                    os.killpg(os.getpgid(self.pid), signal.SIGKILL)
+                else:
+                    self.proc.kill()
+                self.proc.wait(timeout=timeout)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def info(self) -> Dict[str, Any]:
+        warm = self.wait_event("warm", timeout=0)
+        return {
+            "pid": self.pid,
+            "alive": self.alive(),
+            "state": "warm" if warm else ("warming" if self.alive() else "exited"),
+            "warm_ms": round((warm["t"] - self.spawned) * 1000.0, 1) if warm else None,
+            "model_loaded": warm.get("model_loaded") if warm else None,
+        }
+
+
+class ServiceSupervisor:
+    """Primary + warm standby for one service command. All transitions are serialized by one lock."""
+
+    def __init__(
+        self,
+        cmd: List[str],
+        cwd: Path,
+        env_fn: Callable[[], Dict[str, str]],
+        log_fn: Callable[[], IO],
+        standby: bool = MODEL_STANDBY,
+        ready_timeout: float = SERVICE_READY_TIMEOUT_SEC,
+        health_fn: Optional[Callable[[], bool]] = None,
+        on_primary: Optional[Callable[[Optional[subprocess.Popen]], None]] = None,
+    ) -> None:
+        self.cmd = list(cmd)
+        self.cwd = Path(cwd)
+        self.env_fn = env_fn
+        self.log_fn = log_fn
+        self.use_pipe = os.name != "nt"
+        self.standby_enabled = bool(standby) and self.use_pipe
+        self.ready_timeout = float(ready_timeout)
+        self.health_fn = health_fn or (lambda: False)
+        self.on_primary = on_primary or (lambda proc: None)
+        self._lock = threading.RLock()
+        self.primary: Optional[ServiceProcess] = None
+        self.standby: Optional[ServiceProcess] = None
+        self._standby_failures = 0
+        self._standby_retry_at = 0.0
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.last_start: Optional[Dict[str, Any]] = None
+        self.promotions = 0
+        self.cold_starts = 0
+        self.failovers = 0
+
+    # ---------------------------------------------------------------- spawning
+    def _spawn(self, role: str) -> ServiceProcess:
+        env = self.env_fn()
+        env["SERVICE_STANDBY"] = "1" if role == "standby" else "0"
+        log = self.log_fn()
+        kw: Dict[str, Any] = {"cwd": str(self.cwd), "stdout": log, "stderr": log, "stdin": subprocess.PIPE}
+        if os.name != "nt":
+            kw["start_new_session"] = True  # own process group, set without a preexec_fn
+        if not self.use_pipe:
+            return ServiceProcess(subprocess.Popen(self.cmd, env=env, **kw), role)
+        r, w = os.pipe()
+        env["SERVICE_READY_FD"] = str(w)
+        try:
+            proc = subprocess.Popen(self.cmd, env=env, pass_fds=(w,), **kw)
+        except Exception:
+            os.close(r)
+            raise
+        finally:
+            os.close(w)
+        return ServiceProcess(proc, role, r)
+
+    def _wait_serving(self, sp: ServiceProcess, timeout: float) -> bool:
+        if self.use_pipe:
+            return sp.wait_event("serving", timeout=timeout) is not None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not sp.alive():
+                return False
+            if self.health_fn():
+                return True
+            time.sleep(0.35)
+        return False
+
+    def _ensure_standby_locked(self) -> None:
+        if not self.standby_enabled or self._stop.is_set():
+            return
+        if self.standby is not None and self.standby.alive():
+            return
+        if self.standby is not None:  # died on its own: back off before respawning
+            self._standby_failures += 1
+            self._standby_retry_at = time.monotonic() + min(2.0 ** self._standby_failures, STANDBY_RETRY_MAX_SEC)
+            self.standby = None
+        if time.monotonic() < self._standby_retry_at:
+            return
+        try:
+            self.standby = self._spawn("standby")
+        except Exception:
+            self._standby_failures += 1
+            self._standby_retry_at = time.monotonic() + min(2.0 ** self._standby_failures, STANDBY_RETRY_MAX_SEC)
+
+    def _set_primary_locked(self, sp: Optional[ServiceProcess]) -> None:
+        self.primary = sp
+        self.on_primary(sp.proc if sp is not None else None)
+
+    # ---------------------------------------------------------------- transitions
+    def _promote_locked(self, sb: ServiceProcess, reload: bool) -> Tuple[bool, str, float]:
+        """Standby -> primary. Returns (ok, message, ready_ms measured from the "serve" command)."""
+        deadline = time.monotonic() + self.ready_timeout
+        nth = 1
+        if reload:
+            nth = max(sb.count("warm"), 1) + 1  # a reload queued during warm-up answers after it
+            if not sb.send("reload"):
+                return False, "standby is gone", 0.0
+        warm = sb.wait_event("warm", nth=nth, timeout=max(deadline - time.monotonic(), 0.0))
+        if warm is None:
+            return False, "standby did not become warm", 0.0
+        if self.primary is not None:  # the port has to be free before the standby binds it
+            self.primary.terminate()
+            self._set_primary_locked(None)
+        t0 = time.monotonic()
+        if not sb.send("serve") or not self._wait_serving(sb, max(deadline - time.monotonic(), 1.0)):
+            return False, "standby failed to take over the port", 0.0
+        sb.role = "primary"
+        self._standby_failures = 0
+        return True, "promoted standby", (time.monotonic() - t0) * 1000.0
+
+    def _bring_up_locked(self, reason: str, reload: bool = False) -> Tuple[bool, Optional[int], str]:
+        sb, self.standby = self.standby, None
+        mode, msg, ok, ready_ms = "cold", "", False, 0.0
+        if sb is not None and sb.alive():
+            ok, msg, ready_ms = self._promote_locked(sb, reload)
+            if ok:
+                mode = "promoted"
+                self.promotions += 1
+                self._set_primary_locked(sb)
+            else:
+                sb.terminate()
+        if not ok:
+            if self.primary is not None:
+                self.primary.terminate()
+                self._set_primary_locked(None)
+            try:
+                sp = self._spawn("primary")
+            except Exception as e:
+                return False, None, f"failed to spawn: {e}"
+            if not self._wait_serving(sp, self.ready_timeout):
+                rc = sp.proc.poll()
+                sp.terminate()
+                return False, None, (f"exited early (rc={rc})" if rc is not None else "did not become ready in time")
+            ready_ms = (time.monotonic() - sp.spawned) * 1000.0
+            msg = "started"
+            self.cold_starts += 1
+            self._set_primary_locked(sp)
+        self.last_start = {
+            "mode": mode,
+            "reason": reason,
+            "ready_ms": round(ready_ms, 1),
+            "pid": self.primary.pid,
+            "at": time.time(),
+        }
+        self._ensure_standby_locked()
+        return True, self.primary.pid, msg
+
+    def start(self, reload: bool = False) -> Tuple[bool, Optional[int], str]:
+        """Bring the primary up (reload=True: restart it on freshly loaded weights). (ok, pid, message)."""
+        with self._lock:
+            if not reload and self.running():
+                return True, self.primary.pid, "already running (tracked)"
+            ok = self._bring_up_locked("switch" if reload else "start", reload=reload)
+        self._ensure_watcher()
+        return ok
+
+    def stop(self) -> Tuple[bool, str]:
+        """Stop the primary; the standby stays warm for the next start."""
+        with self._lock:
+            if self.primary is None or not self.primary.alive():
+                self._set_primary_locked(None)
+                return True, "already stopped"
+            self.primary.terminate()
+            self._set_primary_locked(None)
+            return True, "stopped"
+
+    def running(self) -> bool:
+        return self.primary is not None and self.primary.alive()
+
+    def warm_standby(self) -> "ServiceSupervisor":
+        """Spawn the standby ahead of the first start."""
+        with self._lock:
+            self._ensure_standby_locked()
+        self._ensure_watcher()
+        return self
+
+    # ---------------------------------------------------------------- failover
+    def _ensure_watcher(self) -> None:
+        if self._watcher is None or not self._watcher.is_alive():
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="service-supervisor", daemon=True)
+            self._watcher.start()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(WATCH_INTERVAL_SEC):
+            if not self._lock.acquire(timeout=WATCH_INTERVAL_SEC):
+                continue  # a start/stop/switch is in progress
+            try:
+                if self.primary is not None and not self.primary.alive():
+                    self.failovers += 1
+                    self._set_primary_locked(None)
+                    self._bring_up_locked("failover")
+                else:
+                    self._ensure_standby_locked()
+            except Exception:
+                pass
+            finally:
+                self._lock.release()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=2.0)
+        with self._lock:
+            for sp in (self.standby, self.primary):
+                if sp is not None:
+                    sp.terminate()
+            self.standby = None
+            self._set_primary_locked(None)
+
+    # ---------------------------------------------------------------- reporting
+    def stats(self) -> Dict[str, Any]:
+        primary, standby = self.primary, self.standby
+        return {
+            "standby_enabled": self.standby_enabled,
+            "readiness": "pipe" if self.use_pipe else "health-poll",
+            "primary": {"pid": primary.pid, "alive": primary.alive()} if primary is not None else None,
+            "standby": standby.info() if standby is not None else None,
+            "last_start": dict(self.last_start) if self.last_start else None,
+            "promotions": self.promotions,
+            "cold_starts": self.cold_starts,
+            "failovers": self.failovers,
+        }
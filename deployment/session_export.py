@@ -0,0 +1,171 @@
+"""
+deployment/session_export.py
+
+Capture-session ZIP export for the control backend:
+- Already-compressed members (JPEG frames, frames.pack, PNG, video) are STORED; text/index
+  members (inputs.jsonl, frames.idx, ...) are DEFLATED
+- Members are copied in chunks, never read whole into memory
+- SessionExporter runs one background job per session writing <session>.zip (via a .part
+  file + atomic rename) with pollable progress (bytes/files done, percent)
+- iter_session_zip() yields the archive as it is produced for a streaming HTTP response;
+  the ZIP is written in non-seekable mode (data descriptors), so nothing is staged on disk
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", str(1024 * 1024)))
+
+STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".mp4", ".zip", ".pack"}
+
+
+def compress_type_for(name: str) -> int:
+    return zipfile.ZIP_STORED if Path(name).suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+
+
+def session_members(sess_dir: Path) -> List[Tuple[Path, str]]:
+    """(path, arcname) for every file under the session, sorted by arcname."""
+    sess_dir = Path(sess_dir)
+    files = [p for p in sess_dir.rglob("*") if p.is_file()]
+    return sorted(((p, p.relative_to(sess_dir).as_posix()) for p in files), key=lambda m: m[1])
+
+
+def _zip_steps(members: List[Tuple[Path, str]], fp, chunk_size: int) -> Iterator[Tuple[int, bool]]:
+    """Write members into a ZIP on fp; yields (bytes_copied, member_finished) as it goes."""
+    with zipfile.ZipFile(fp, "w", allowZip64=True) as z:
+        for path, arcname in members:
+            zi = zipfile.ZipInfo.from_file(path, arcname)
+            zi.compress_type = compress_type_for(arcname)
+            with open(path, "rb") as src, z.open(zi, "w") as dst:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield len(chunk), False
+            yield 0, True
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that the streaming generator drains."""
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def take(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+def iter_session_zip(sess_dir: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the session ZIP in pieces as it is produced (bounded memory, no temp file)."""
+    sink = _ChunkSink()
+    for _ in _zip_steps(session_members(sess_dir), sink, chunk_size):
+        data = sink.take()
+        if data:
+            yield data
+    tail = sink.take()  # central directory, written when the ZipFile closes
+    if tail:
+        yield tail
+
+
+class SessionExporter:
+    """Background ZIP export jobs keyed by capture session id."""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE) -> None:
+        self.chunk_size = max(4096, int(chunk_size))
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, dict] = {}
+        self._done: Dict[str, threading.Event] = {}
+
+    def start(self, key: str, sess_dir: Path, zip_path: Path) -> dict:
+        """Start (or return the running) export for key."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job["status"] in ("queued", "running"):
+                return dict(job)
+            job = {
+                "session_id": key,
+                "status": "queued",
+                "zip": str(zip_path),
+                "files_total": 0,
+                "files_done": 0,
+                "bytes_total": 0,
+                "bytes_done": 0,
+                "progress": 0.0,
+                "started": time.time(),
+                "elapsed_sec": 0.0,
+                "error": None,
+            }
+            self._jobs[key] = job
+            self._done[key] = threading.Event()
+            snapshot = dict(job)  # taken before the worker can move it past "queued"
+        threading.Thread(
+            target=self._run, args=(key, Path(sess_dir), Path(zip_path)), name=f"export-{key}", daemon=True
+        ).start()
+        return snapshot
+
+    def _set(self, key: str, **kw) -> None:
+        with self._lock:
+            job = self._jobs[key]
+            job.update(**kw)
+            job["elapsed_sec"] = round(time.time() - job["started"], 3)
+
+    def _run(self, key: str, sess_dir: Path, zip_path: Path) -> None:
+        part = zip_path.with_name(zip_path.name + ".part")
+        try:
+            members = session_members(sess_dir)
+            total = sum(p.stat().st_size for p, _ in members)
+            self._set(key, status="running", files_total=len(members), bytes_total=total)
+            done_bytes = done_files = 0
+            with open(part, "wb") as fp:
+                for n, finished in _zip_steps(members, fp, self.chunk_size):
+                    done_bytes += n
+                    done_files += int(finished)
+                    self._set(
+                        key,
+                        bytes_done=done_bytes,
+                        files_done=done_files,
+                        progress=round(done_bytes / total, 4) if total else 1.0,
+                    )
+            os.replace(part, zip_path)
+            self._set(key, status="completed", progress=1.0, zip_bytes=zip_path.stat().st_size)
+        except Exception as e:
+            part.unlink(missing_ok=True)
+            self._set(key, status="failed", error=str(e))
+        finally:
+            self._done[key].set()
+
+    def status(self, key: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(key)
+            return dict(job) if job is not None else None
+
+    def wait(self, key: str, timeout: float = 30.0) -> bool:
+        ev = self._done.get(key)
+        return ev.wait(timeout) if ev is not None else True
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = sum(1 for j in self._jobs.values() if j["status"] in ("queued", "running"))
+            return {"jobs": len(self._jobs), "running": running}
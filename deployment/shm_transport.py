@@ -0,0 +1,361 @@
+"""
+deployment/shm_transport.py
+
+Same-host transport between the control backend and a model service (MODEL_TRANSPORT=shm;
+HTTP stays the default and the fallback):
+- The backend owns a shared-memory ring of SHM_SLOTS fixed-size slots (SHM_SLOT_BYTES each). A call
+  copies the request body into a free slot and rings the service's doorbell, a Unix datagram socket
+  (SHM_SOCKET_DIR/agb-model-<port>.sock) carrying (slot, seq, slot size, ring name)
+- ShmServer (in the model service): worker threads block on the doorbell, read the slot, run the
+  handler and write the response into the same slot, then ring the caller's own socket back
+- Slots carry the /predict body as sent: a JSON object, or FEATURES_CONTENT_TYPE (raw little-endian
+  float32 features, no JSON on either side). Responses are JSON
+- ShmModelClient stands in for ModelServiceClient: /predict goes over the ring while the service's
+  doorbell exists, the body fits and a slot is free; everything else (health probes, oversized
+  bodies or responses, a service started without the transport) goes over HTTP. Ring replies come
+  back as requests.Response objects, so relay() and the replica pool work unchanged
+- A call that times out leaves its slot with the service until the late reply arrives (or for
+  SHM_RECLAIM_SEC); the service checks the slot's seq before writing, so it never answers into a
+  slot that has been reused
+Needs AF_UNIX datagram sockets (not available on Windows: HTTP only).
+"""
+
+from __future__ import annotations
+
+import io
+import itertools
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3 import HTTPResponse
+
+from deployment.feature_extractor import FEATURES_CONTENT_TYPE
+from deployment.model_proxy import ModelServiceClient
+
+MODEL_TRANSPORT = os.environ.get("MODEL_TRANSPORT", "http").strip().lower()  # "http" | "shm"
+SHM_SLOTS = int(os.environ.get("SHM_SLOTS", "32"))
+SHM_SLOT_BYTES = int(os.environ.get("SHM_SLOT_BYTES", str(64 * 1024)))
+SHM_SOCKET_DIR = Path(os.environ.get("SHM_SOCKET_DIR", tempfile.gettempdir()))
+SHM_WORKERS = int(os.environ.get("SHM_WORKERS", "4"))
+SHM_RECLAIM_SEC = float(os.environ.get("SHM_RECLAIM_SEC", "30"))
+
+# slot: header (seq, kind, request length, response length, status) then the payload
+HEADER = struct.Struct("<IIIIi")
+HEADER_BYTES = 32
+DOORBELL = struct.Struct("<III")  # slot, seq, slot size; followed by the ring name
+REPLY = struct.Struct("<II")  # slot, seq
+KIND_JSON = 0
+KIND_FEATURES = 1
+STATUS_OVERFLOW = -1  # response larger than the slot: the caller repeats the call over HTTP
+POLL_SEC = 0.5
+
+
+def supported() -> bool:
+    return os.name != "nt" and hasattr(socket, "AF_UNIX")
+
+
+def socket_path(port: int) -> Path:
+    return SHM_SOCKET_DIR / f"agb-model-{port}.sock"
+
+
+def _response(status: int, body: bytes, url: str) -> requests.Response:
+    """A requests.Response over an in-memory body (readable via .content or relay())."""
+    headers = CaseInsensitiveDict({"Content-Type": "application/json", "Content-Length": str(len(body))})
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = headers
+    resp.raw = HTTPResponse(
+        body=io.BytesIO(body), headers=headers, status=status, preload_content=False, decode_content=False
+    )
+    resp.url = url
+    resp.encoding = "utf-8"
+    return resp
+
+
+class ShmServer:
+    """Model-service side: answers doorbell datagrams with handler(content_type, body) -> (status, body)."""
+
+    def __init__(
+        self,
+        path: Path,
+        handler: Callable[[str, bytes], Tuple[int, bytes]],
+        workers: int = SHM_WORKERS,
+    ) -> None:
+        self.path = Path(path)
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self._sock: Optional[socket.socket] = None
+        self._rings: Dict[str, shared_memory.SharedMemory] = {}
+        self._rings_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.calls = 0
+        self.dropped = 0
+
+    def start(self) -> "ShmServer":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.path.unlink()  # left behind by a process that did not exit cleanly
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self.path))
+        os.chmod(self.path, 0o600)
+        sock.settimeout(POLL_SEC)
+        self._sock = sock
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"shm-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def _ring(self, name: str) -> shared_memory.SharedMemory:
+        with self._rings_lock:
+            shm = self._rings.get(name)
+            if shm is None:
+                shm = shared_memory.SharedMemory(name=name)
+                try:  # the backend owns the segment: don't let this process's tracker unlink it
+                    from multiprocessing import resource_tracker
+
+                    resource_tracker.unregister(shm._name, "shared_memory")
+                except Exception:
+                    pass
+                self._rings[name] = shm
+            return shm
+
+    def _work(self) -> None:
+        sock = self._sock
+        while not self._stop.is_set():
+            try:
+                msg, addr = sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                self._serve(sock, msg, addr)
+            except Exception:
+                self.dropped += 1  # the caller times out and falls back
+
+    def _serve(self, sock: socket.socket, msg: bytes, addr: str) -> None:
+        slot, seq, slot_bytes = DOORBELL.unpack_from(msg)
+        buf = self._ring(msg[DOORBELL.size :].decode("utf-8")).buf
+        off = slot * slot_bytes
+        head_seq, kind, req_len, _, _ = HEADER.unpack_from(buf, off)
+        if head_seq != seq:
+            self.dropped += 1
+            return
+        body = bytes(buf[off + HEADER_BYTES : off + HEADER_BYTES + req_len])
+        status, out = self.handler(FEATURES_CONTENT_TYPE if kind == KIND_FEATURES else "application/json", body)
+        if HEADER.unpack_from(buf, off)[0] != seq:  # the caller gave up and the slot was reused
+            self.dropped += 1
+            return
+        if len(out) > slot_bytes - HEADER_BYTES:
+            HEADER.pack_into(buf, off, seq, kind, req_len, 0, STATUS_OVERFLOW)
+        else:
+            buf[off + HEADER_BYTES : off + HEADER_BYTES + len(out)] = out
+            HEADER.pack_into(buf, off, seq, kind, req_len, len(out), status)
+        self.calls += 1
+        sock.sendto(REPLY.pack(slot, seq), addr)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=2 * POLL_SEC)
+        self._threads = []
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        with self._rings_lock:
+            for shm in self._rings.values():
+                shm.close()
+            self._rings.clear()
+
+
+class _Pending:
+    __slots__ = ("seq", "event", "abandoned_at")
+
+    def __init__(self, seq: int) -> None:
+        self.seq = seq
+        self.event = threading.Event()
+        self.abandoned_at: Optional[float] = None
+
+
+class ShmModelClient:
+    """ModelServiceClient-compatible client that sends /predict over the shared-memory ring."""
+
+    transport = "shm"
+
+    def __init__(
+        self,
+        http: ModelServiceClient,
+        path: Path,
+        slots: int = SHM_SLOTS,
+        slot_bytes: int = SHM_SLOT_BYTES,
+        reclaim_sec: float = SHM_RECLAIM_SEC,
+    ) -> None:
+        self.http = http
+        self.base_url = http.base_url
+        self.timeout = http.timeout
+        self.path = Path(path)
+        self.slots = max(1, int(slots))
+        self.slot_bytes = max(HEADER_BYTES + 1024, int(slot_bytes))
+        self.capacity = self.slot_bytes - HEADER_BYTES
+        self.reclaim_sec = float(reclaim_sec)
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._ring: Optional[shared_memory.SharedMemory] = None
+        self._sock: Optional[socket.socket] = None
+        self._sock_path: Optional[Path] = None
+        self._free: List[int] = []
+        self._pending: Dict[int, _Pending] = {}
+        self.shm_calls = 0
+        self.http_calls = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+
+    # ------------------------------------------------------------ ModelServiceClient surface
+    def url(self, path: str) -> str:
+        return self.http.url(path)
+
+    def probe(self, *args, **kwargs) -> requests.Response:
+        return self.http.probe(*args, **kwargs)
+
+    def forward(
+        self, path: str, body: bytes, content_type: str = "application/json", timeout: Optional[tuple] = None
+    ) -> requests.Response:
+        if path.rstrip("/") == "/predict" and len(body) <= self.capacity:
+            resp = self._call(body, content_type, timeout or self.timeout)
+            if resp is not None:
+                return resp
+            self.fallbacks += 1
+        self.http_calls += 1
+        return self.http.forward(path, body, content_type, timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            sock, self._sock = self._sock, None
+            ring, self._ring = self._ring, None
+            self._free, self._pending = [], {}
+        if sock is not None:
+            sock.close()  # the receiver thread exits on the closed socket
+        if self._sock_path is not None:
+            try:
+                self._sock_path.unlink()
+            except FileNotFoundError:
+                pass
+        if ring is not None:
+            ring.close()
+            ring.unlink()
+        self.http.close()
+
+    # ------------------------------------------------------------ ring
+    def _open_locked(self) -> None:
+        if self._ring is not None:
+            return
+        self._ring = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._free = list(range(self.slots))
+        self._sock_path = SHM_SOCKET_DIR / f"agb-client-{os.getpid()}-{uuid.uuid4().hex[:8]}.sock"
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self._sock_path))
+        self._sock = sock
+        threading.Thread(target=self._receive, args=(sock,), name="shm-replies", daemon=True).start()
+
+    def _take_slot_locked(self) -> Optional[int]:
+        if not self._free:  # slots whose reply never came back (service restarted)
+            now = time.monotonic()
+            for slot, p in list(self._pending.items()):
+                if p.abandoned_at is not None and now - p.abandoned_at >= self.reclaim_sec:
+                    del self._pending[slot]
+                    self._free.append(slot)
+        return self._free.pop() if self._free else None
+
+    def _receive(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                msg = sock.recv(64)
+            except OSError:
+                return
+            slot, seq = REPLY.unpack_from(msg)
+            with self._lock:
+                p = self._pending.get(slot)
+                if p is None or p.seq != seq:
+                    continue
+                if p.abandoned_at is not None:  # late reply to a call that timed out: slot is free again
+                    del self._pending[slot]
+                    self._free.append(slot)
+                    continue
+                p.event.set()
+
+    def _call(self, body: bytes, content_type: str, timeout) -> Optional[requests.Response]:
+        """One round trip over the ring; None when the ring can't take the call (use HTTP)."""
+        with self._lock:
+            if not self.path.exists():
+                return None
+            self._open_locked()
+            slot = self._take_slot_locked()
+            if slot is None:
+                return None
+            seq = next(self._seq) & 0xFFFFFFFF
+            pending = self._pending[slot] = _Pending(seq)
+            buf, sock, name = self._ring.buf, self._sock, self._ring.name
+        off = slot * self.slot_bytes
+        kind = KIND_FEATURES if (content_type or "").split(";")[0].strip() == FEATURES_CONTENT_TYPE else KIND_JSON
+        buf[off + HEADER_BYTES : off + HEADER_BYTES + len(body)] = body
+        HEADER.pack_into(buf, off, seq, kind, len(body), 0, 0)
+        try:
+            sock.sendto(DOORBELL.pack(slot, seq, self.slot_bytes) + name.encode("utf-8"), str(self.path))
+        except OSError:  # no service behind the socket (stopped, or started without the transport)
+            self._release(slot)
+            return None
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if not pending.event.wait(read_timeout):
+            with self._lock:
+                if not pending.event.is_set():
+                    pending.abandoned_at = time.monotonic()
+                    self.timeouts += 1
+                    raise requests.ReadTimeout(f"no reply on the shared-memory transport within {read_timeout}s")
+        _, _, _, resp_len, status = HEADER.unpack_from(buf, off)
+        out = bytes(buf[off + HEADER_BYTES : off + HEADER_BYTES + resp_len]) if status != STATUS_OVERFLOW else b""
+        self._release(slot)
+        if status == STATUS_OVERFLOW:
+            return None
+        self.shm_calls += 1
+        return _response(status, out, self.url("/predict"))
+
+    def _release(self, slot: int) -> None:
+        with self._lock:
+            if self._pending.pop(slot, None) is not None:
+                self._free.append(slot)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            in_flight = sum(1 for p in self._pending.values() if p.abandoned_at is None)
+            abandoned = len(self._pending) - in_flight
+        return {
+            "transport": self.transport,
+            "socket": str(self.path),
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "in_flight": in_flight,
+            "abandoned": abandoned,
+            "shm_calls": self.shm_calls,
+            "http_calls": self.http_calls,
+            "fallbacks": self.fallbacks,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,240 @@
+"""
+deployment/startup_profile.py
+
+Startup-time report for the services (the `python -X importtime` numbers, collected in-process):
+- Importing this module installs a meta-path hook that times every module import that follows
+  (self and cumulative time, nested like -X importtime); STARTUP_PROFILE=0 turns the hook off
+- phase(name) times named startup steps (create_app, load_weights, ...); mark_ready() closes startup
+- report(): time to ready, total import time, the slowest imports before ready and the imports
+  that happened after it (heavy dependencies pulled in lazily on first use), served in /health
+- `python deployment/startup_profile.py deployment.control_backend` prints the report for one import
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+ENABLED = os.environ.get("STARTUP_PROFILE", "1").strip().lower() not in ("0", "false", "no", "off")
+MAX_RECORDS = 20000
+TOP_N = 10
+
+
+class _Record:
+    __slots__ = ("name", "depth", "start", "cumulative", "self_ms")
+
+    def __init__(self, name: str, depth: int, start: float) -> None:
+        self.name = name
+        self.depth = depth
+        self.start = start
+        self.cumulative = 0.0
+        self.self_ms = 0.0
+
+
+class _TimedLoader:
+    """Wraps a module's loader for one import; the real loader is put back before the module runs."""
+
+    def __init__(self, loader: Any, profile: "StartupProfile", name: str) -> None:
+        self._loader = loader
+        self._profile = profile
+        self._name = name
+        self._frame: Optional[list] = None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        # extension modules do their dlopen here, so the clock starts before it
+        self._frame = self._profile._enter(self._name)
+        try:
+            return self._loader.create_module(spec)
+        except BaseException:
+            self._profile._exit(self._frame)
+            raise
+
+    def exec_module(self, module) -> None:
+        module.__loader__ = self._loader
+        if getattr(module, "__spec__", None) is not None:
+            module.__spec__.loader = self._loader
+        frame = self._frame or self._profile._enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profile._exit(frame)
+
+
+class _ImportTimer:
+    """Meta-path finder that asks the other finders for the spec and times the load."""
+
+    def __init__(self, profile: "StartupProfile") -> None:
+        self._profile = profile
+        self._local = threading.local()
+
+    def find_spec(self, fullname: str, path=None, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                find = getattr(finder, "find_spec", None)
+                if finder is self or find is None:
+                    continue
+                spec = find(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self._profile, fullname)
+        return spec
+
+
+class StartupProfile:
+    """Import timings and startup phases of this process."""
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self.started_at = time.time()
+        self.phases: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self._records: List[_Record] = []
+        self._dropped = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finder: Optional[_ImportTimer] = None
+        self._startup_cache: Optional[Dict[str, Any]] = None
+
+    def _ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000.0
+
+    # ---------------------------------------------------------------- import hook
+    def install(self) -> "StartupProfile":
+        if self._finder is None:
+            self._finder = _ImportTimer(self)
+            sys.meta_path.insert(0, self._finder)
+        return self
+
+    def uninstall(self) -> None:
+        if self._finder is not None and self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    def _enter(self, name: str) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [_Record(name, len(stack), self._ms()), 0.0]  # record, time spent in nested imports
+        stack.append(frame)
+        return frame
+
+    def _exit(self, frame: list) -> None:
+        stack = self._local.stack
+        while stack:  # a failed import may have left nested frames behind
+            if stack.pop() is frame:
+                break
+        rec, children = frame
+        rec.cumulative = self._ms() - rec.start
+        rec.self_ms = rec.cumulative - children
+        if stack:
+            stack[-1][1] += rec.cumulative
+        with self._lock:
+            if len(self._records) < MAX_RECORDS:
+                self._records.append(rec)
+            else:
+                self._dropped += 1
+
+    # ---------------------------------------------------------------- phases
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(self.phases.get(name, 0.0) + (time.perf_counter() - t0) * 1000.0, 1)
+
+    def mark_ready(self) -> None:
+        """End of startup; imports after this point are reported as lazy."""
+        if self.ready_ms is None:
+            self.ready_ms = self._ms()
+
+    # ---------------------------------------------------------------- reporting
+    @staticmethod
+    def _top(records: List[_Record], n: int) -> List[Dict[str, Any]]:
+        records = sorted(records, key=lambda r: r.cumulative, reverse=True)[:n]
+        return [
+            {"module": r.name, "cumulative_ms": round(r.cumulative, 1), "self_ms": round(r.self_ms, 1)}
+            for r in records
+        ]
+
+    def _startup(self, records: List[_Record], n: int) -> Dict[str, Any]:
+        before = [r for r in records if self.ready_ms is None or r.start < self.ready_ms]
+        outer = min((r.depth for r in before), default=0)
+        return {
+            "import_ms": round(sum(r.cumulative for r in before if r.depth == outer), 1),
+            "modules": len(before),
+            # the first two levels: what the service imports and what those imports pull in
+            "slowest_imports": self._top([r for r in before if r.depth <= outer + 1], n),
+        }
+
+    def report(self, n: int = TOP_N) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self._records)
+            dropped = self._dropped
+        startup = self._startup_cache
+        if startup is None or n != TOP_N:
+            startup = self._startup(records, n)
+            if self.ready_ms is not None and n == TOP_N:
+                self._startup_cache = startup  # nothing before ready changes any more
+        lazy = [r for r in records if self.ready_ms is not None and r.start >= self.ready_ms and r.depth == 0]
+        out: Dict[str, Any] = {
+            "pid": os.getpid(),
+            "started_at": round(self.started_at, 3),
+            "ready_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+            "import_hook": self._finder is not None,
+            "phases": dict(self.phases),
+            **startup,
+            "lazy_imports": [
+                {"module": r.name, "ms": round(r.cumulative, 1), "at_ms": round(r.start, 1)}
+                for r in sorted(lazy, key=lambda r: r.start)[-n:]
+            ],
+        }
+        if dropped:
+            out["records_dropped"] = dropped
+        return out
+
+
+profile = StartupProfile()
+if ENABLED and __name__ != "__main__":
+    profile.install()
+
+
+def main() -> int:
+    import argparse
+    import importlib
+
+    ap = argparse.ArgumentParser(description="Import a module under the startup profiler and print the report")
+    ap.add_argument("module", help="e.g. deployment.control_backend")
+    ap.add_argument("--top", type=int, default=TOP_N)
+    args = ap.parse_args()
+
+    profile.install()
+    with profile.phase("import"):
+        importlib.import_module(args.module)
+    profile.mark_ready()
+    print(json.dumps(profile.report(args.top), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    # run the package module's copy, the one the services report from
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from deployment.startup_profile import main as _main
+
+    raise SystemExit(_main())
@@ -3,33 +3,58 @@ deployment/stream_sessions.py
 
 Stream session manager:
 - Resolve YouTube/Twitch URLs to direct media URLs via yt-dlp
-- Capture frames via OpenCV
+  (asynchronous, cached with TTL, refreshed before expiry, re-resolved on capture failure)
+- Capture frames via pluggable frame sources (make_frame_source):
+    http(s)://...                         -> yt-dlp resolved stream (OpenCV)
+    file://<path> or an existing file     -> local video, looped (?realtime=0 for unthrottled)
+    dir://<path> or an existing directory -> sorted image files, looped (?fps=N to pace)
+    synthetic://?w=640&h=360&fps=30       -> generated frames (offline load tests)
+  Local sources requested over HTTP must lie under STREAM_LOCAL_ROOT (check_client_source)
+- Session ids are [A-Za-z0-9_-]{1,64}: they name the train-mode snapshot file
 - Convert frames -> 128-dim state (16x8 grayscale flattened)
-- Inference by calling existing /predict services (NN/Transformer)
+- Inference by calling existing /predict services (NN/Transformer); with a router (the control
+  backend's deployment/replica_pool.py ReplicaPool) calls go through it with the session id as
+  affinity key, so a session's temporal state stays on one replica, and the state is sent as raw
+  float32 (application/x-float32, answered by the shared-memory transport where it is enabled)
 - Realtime events via Server-Sent Events (SSE)
 
 Train mode (lightweight online finetune):
 - Uses predicted actions as pseudo-labels
-- Performs small online updates on the Transformer weights
+- States + labels go into a fixed-capacity numpy replay buffer (uint8 states)
+- A background OnlineTrainer thread runs capped-rate mini-batch updates on its own
+  copy of the Transformer, so inference is never blocked by training
 - Periodically saves a .pth to models/transformer/uploads/stream_<session>.pth
+
+Finished sessions stay in the manager for STREAM_SESSION_TTL_SEC (at most STREAM_KEEP_STOPPED of
+them), then only their final state remains in the optional history registry
+(deployment/record_store.py RecordRegistry), so the event queues of old sessions are released.
 """
 
 from __future__ import annotations
 
 import base64
+import copy
 import json
+import os
 import queue
+import re
 import subprocess
+import sys
 import threading
 import time
+from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional, Iterator, Tuple, List
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Optional, Iterator, Tuple, List
+from urllib.parse import parse_qs, urlparse
 
-import cv2
 import numpy as np
 import requests
 
+if TYPE_CHECKING:
+    import cv2  # imported by the first source/frame that needs OpenCV
+
 
 ACTION_TO_INDEX = {
     "move_forward": 0,
@@ -62,6 +87,10 @@ ACTION_TO_INDEX = {
 }
 
 
+class StreamCapacityError(RuntimeError):
+    """Raised when a new session would exceed the session-count or total-fps budget."""
+
+
 def _now() -> float:
     return time.time()
 
@@ -91,6 +120,684 @@ def resolve_stream_url(url: str) -> str:
         raise RuntimeError("yt-dlp timed out resolving the stream URL") from e
 
 
+RESOLVE_TTL_SEC = float(os.environ.get("STREAM_RESOLVE_TTL_SEC", "1800"))
+RESOLVE_REFRESH_AHEAD_SEC = float(os.environ.get("STREAM_RESOLVE_REFRESH_AHEAD_SEC", "120"))
+MAX_RERESOLVE_ATTEMPTS = int(os.environ.get("STREAM_MAX_RERESOLVE", "3"))
+
+MAX_SESSIONS = int(os.environ.get("STREAM_MAX_SESSIONS", "4"))
+MAX_TOTAL_FPS = float(os.environ.get("STREAM_MAX_TOTAL_FPS", "32"))
+SESSION_TTL_SEC = float(os.environ.get("STREAM_SESSION_TTL_SEC", "600"))
+KEEP_STOPPED = int(os.environ.get("STREAM_KEEP_STOPPED", "32"))
+
+FEATURES_CONTENT_TYPE = "application/x-float32"  # deploy_transformer /predict raw float32 body
+
+TRAIN_BUFFER_CAPACITY = int(os.environ.get("STREAM_TRAIN_BUFFER", "4096"))
+TRAIN_BATCH_SIZE = int(os.environ.get("STREAM_TRAIN_BATCH", "32"))
+TRAIN_MAX_STEPS_PER_SEC = float(os.environ.get("STREAM_TRAIN_MAX_STEPS_PER_SEC", "2"))
+TRAIN_SAVE_EVERY_SEC = float(os.environ.get("STREAM_TRAIN_SAVE_EVERY_SEC", "60"))
+TRAIN_LR = float(os.environ.get("STREAM_TRAIN_LR", "1e-4"))
+TRAIN_THREADS = int(os.environ.get("STREAM_TRAIN_THREADS", "1"))
+
+
+@dataclass
+class _ResolvedEntry:
+    direct_url: str
+    resolved_at: float
+    expires_at: float
+    last_used: float
+
+
+@dataclass
+class _InflightResolve:
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[BaseException] = None
+
+
+def _reraise_copy(err: BaseException) -> None:
+    """Raise err for another thread: a copy (its own traceback), chained to the original."""
+    try:
+        clone = copy.copy(err)
+    except Exception:
+        clone = RuntimeError(f"stream URL resolution failed: {err}")
+    raise clone from err
+
+
+class StreamResolver:
+    """
+    Caching front-end for a page-URL -> direct-URL resolver.
+
+    - resolve(url) returns a cached direct URL while it is fresh (TTL), otherwise resolves it.
+    - Concurrent resolves of the same URL share a single underlying call.
+    - A background thread refreshes entries that are still in use shortly before they expire.
+    - invalidate(url) drops an entry (used when the capture fails mid-stream).
+
+    resolve_fn defaults to yt-dlp (resolve_stream_url); pass a local stub for offline tests.
+    """
+
+    def __init__(
+        self,
+        resolve_fn: Optional[Callable[[str], str]] = None,
+        ttl_sec: float = RESOLVE_TTL_SEC,
+        refresh_ahead_sec: float = RESOLVE_REFRESH_AHEAD_SEC,
+        clock: Callable[[], float] = _now,
+    ) -> None:
+        self.resolve_fn = resolve_fn or resolve_stream_url
+        self.ttl_sec = float(ttl_sec)
+        self.refresh_ahead_sec = min(float(refresh_ahead_sec), self.ttl_sec / 2.0)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cache: Dict[str, _ResolvedEntry] = {}
+        self._inflight: Dict[str, _InflightResolve] = {}
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry: Optional[_ResolvedEntry], now: float) -> bool:
+        return entry is not None and entry.expires_at > now
+
+    def cached(self, url: str) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            entry = self._cache.get(url)
+            return entry.direct_url if self._fresh(entry, now) else None
+
+    def resolve(self, url: str, force: bool = False) -> str:
+        while True:
+            now = self._clock()
+            with self._lock:
+                entry = self._cache.get(url)
+                if not force and self._fresh(entry, now):
+                    entry.last_used = now
+                    self.hits += 1
+                    return entry.direct_url
+                waiter = self._inflight.get(url)
+                if waiter is None:
+                    waiter = _InflightResolve()
+                    self._inflight[url] = waiter
+                    owner = True
+                    self.misses += 1
+                else:
+                    owner = False
+
+            if not owner:
+                # another thread is resolving this URL; reuse its result (or its error)
+                waiter.done.wait()
+                force = False
+                with self._lock:
+                    if self._fresh(self._cache.get(url), self._clock()):
+                        continue
+                if waiter.error is not None:
+                    _reraise_copy(waiter.error)
+                raise RuntimeError("stream URL resolution failed")
+
+            try:
+                direct = self.resolve_fn(url)
+                now = self._clock()
+                with self._lock:
+                    prev = self._cache.get(url)
+                    # a refresh is not a use: keep last_used so unused entries age out
+                    last_used = prev.last_used if force and prev is not None else now
+                    self._cache[url] = _ResolvedEntry(direct, now, now + self.ttl_sec, last_used)
+                self._ensure_refresher()
+                return direct
+            except BaseException as e:
+                waiter.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._inflight.pop(url, None)
+                waiter.done.set()
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            self._cache.pop(url, None)
+
+    def refresh_due(self) -> int:
+        """Re-resolve entries that are near expiry and were used within the last TTL. Returns refresh count."""
+        now = self._clock()
+        with self._lock:
+            due = [
+                u
+                for u, e in self._cache.items()
+                if e.expires_at - now <= self.refresh_ahead_sec and now - e.last_used <= self.ttl_sec
+            ]
+            # drop long-unused entries instead of refreshing them
+            for u in [u for u, e in self._cache.items() if now - e.last_used > self.ttl_sec and e.expires_at <= now]:
+                self._cache.pop(u, None)
+
+        refreshed = 0
+        for u in due:
+            try:
+                self.resolve(u, force=True)
+                refreshed += 1
+            except Exception:
+                # keep the old entry until it expires; the session re-resolves on failure
+                continue
+        return refreshed
+
+    def _ensure_refresher(self) -> None:
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        interval = max(1.0, self.refresh_ahead_sec / 4.0)
+        while not self._stop.wait(interval):
+            self.refresh_due()
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring buffer of (state, label) pairs backed by preallocated numpy arrays.
+    States are in [0,1] (grayscale / 255) so they are stored losslessly as uint8.
+    """
+
+    def __init__(self, capacity: int, state_dim: int = 128) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = int(capacity)
+        self.state_dim = int(state_dim)
+        self._states = np.zeros((self.capacity, self.state_dim), dtype=np.uint8)
+        self._labels = np.zeros((self.capacity,), dtype=np.int16)
+        self._next = 0
+        self._size = 0
+        self.total_added = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, state, label: int) -> None:
+        vec = np.asarray(state, dtype=np.float32).reshape(-1)
+        if vec.size != self.state_dim:
+            raise ValueError(f"state must have {self.state_dim} values, got {vec.size}")
+        q = np.clip(np.rint(vec * 255.0), 0, 255).astype(np.uint8)
+        with self._lock:
+            self._states[self._next] = q
+            self._labels[self._next] = int(label)
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.total_added += 1
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Uniform sample (with replacement). Returns (states float32 [B,D], labels int64 [B])."""
+        rng = rng or np.random.default_rng()
+        with self._lock:
+            if self._size == 0:
+                raise ValueError("replay buffer is empty")
+            idx = rng.integers(0, self._size, size=int(batch_size))
+            states = self._states[idx].astype(np.float32) / 255.0
+            labels = self._labels[idx].astype(np.int64)
+        return states, labels
+
+
+class OnlineTrainer:
+    """
+    Background trainer for stream train mode.
+
+    Owns its own copy of the Transformer (loaded from the active weights when present),
+    samples mini-batches from the session's ReplayBuffer at no more than max_steps_per_sec,
+    and snapshots weights to models/transformer/uploads/stream_<session>.pth every
+    save_every_sec (and once more on stop). Progress is reported on the session object.
+    """
+
+    def __init__(
+        self,
+        session: "StreamSession",
+        buffer: ReplayBuffer,
+        batch_size: int = TRAIN_BATCH_SIZE,
+        max_steps_per_sec: float = TRAIN_MAX_STEPS_PER_SEC,
+        save_every_sec: float = TRAIN_SAVE_EVERY_SEC,
+        lr: float = TRAIN_LR,
+        num_threads: int = TRAIN_THREADS,
+    ) -> None:
+        self.session = session
+        self.buffer = buffer
+        self.batch_size = int(batch_size)
+        self.min_step_dt = 1.0 / max(0.01, float(max_steps_per_sec))
+        self.save_every_sec = float(save_every_sec)
+        self.lr = float(lr)
+        self.num_threads = int(num_threads)
+        self.last_loss: Optional[float] = None
+        self.error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._model = None
+
+    @property
+    def snapshot_path(self) -> Path:
+        uploads = (self.session.repo_root / "models" / "transformer" / "uploads").resolve()
+        path = (uploads / f"stream_{self.session.session_id}.pth").resolve()
+        if path.parent != uploads:
+            raise ValueError(f"snapshot path escapes {uploads}: {path}")
+        return path
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def _build_model(self):
+        root = str(self.session.repo_root)
+        if root not in sys.path:
+            sys.path.insert(0, root)
+        from models.transformer.checkpoint import build_model, load_state_dict
+        from models.transformer.transformer_model import GameplayTransformer
+
+        weights = self.session.repo_root / "models" / "transformer" / "transformer_model_finetuned.pth"
+        state, ckpt = load_state_dict(weights) if weights.exists() else (None, None)
+        if ckpt is not None:
+            # a mappable checkpoint carries its architecture; training writes copy-on-write pages
+            return build_model(GameplayTransformer, ckpt.architecture, state), ckpt.architecture["output_size"]
+
+        input_size = int(os.environ.get("TRANSFORMER_INPUT_SIZE", str(self.buffer.state_dim)))
+        num_heads = int(os.environ.get("TRANSFORMER_NUM_HEADS", "4"))
+        hidden_size = int(os.environ.get("TRANSFORMER_HIDDEN_SIZE", "64"))
+        num_layers = int(os.environ.get("TRANSFORMER_NUM_LAYERS", "2"))
+
+        # output size follows the checkpoint head when available, else the stream action table
+        output_size = len(ACTION_TO_INDEX)
+        if isinstance(state, dict) and "fc.weight" in state:
+            output_size = int(state["fc.weight"].shape[0])
+
+        model = GameplayTransformer(input_size, num_heads, hidden_size, num_layers, output_size)
+        if state is not None:
+            model.load_state_dict(state, strict=False)
+        return model, output_size
+
+    def _save_snapshot(self) -> None:
+        from models.transformer.checkpoint import save_model
+
+        dst = self.snapshot_path
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        actions = None
+        if self._model.architecture["output_size"] == len(ACTION_TO_INDEX):
+            actions = [name for name, _ in sorted(ACTION_TO_INDEX.items(), key=lambda kv: kv[1])]
+        save_model(dst, self._model, actions, meta={"session_id": self.session.session_id})  # temp file + rename
+        self.session.saved_model_path = str(dst)
+
+    def _run(self) -> None:
+        try:
+            import torch
+
+            torch.set_num_threads(max(1, self.num_threads))
+            self._model, output_size = self._build_model()
+            self._model.train()
+            optimizer = torch.optim.AdamW(self._model.parameters(), lr=self.lr, weight_decay=0.01)
+            criterion = torch.nn.CrossEntropyLoss()
+            rng = np.random.default_rng()
+        except Exception as e:
+            self.error = f"online trainer init failed: {e}"
+            self.session.last_error = self.error
+            return
+
+        last_save = _now()
+        steps_since_save = 0
+        while not self._stop.is_set():
+            t_step = _now()
+            if len(self.buffer) >= self.batch_size:
+                try:
+                    states, labels = self.buffer.sample(self.batch_size, rng)
+                    labels = np.clip(labels, 0, output_size - 1)
+                    x = torch.from_numpy(states)
+                    y = torch.from_numpy(labels)
+                    optimizer.zero_grad()
+                    loss = criterion(self._model(x), y)
+                    loss.backward()
+                    torch.nn.utils.clip_grad_norm_(self._model.parameters(), max_norm=1.0)
+                    optimizer.step()
+                    self.last_loss = float(loss.item())
+                    self.session.training_steps += 1
+                    steps_since_save += 1
+                except Exception as e:
+                    self.error = f"online training step failed: {e}"
+                    self.session.last_error = self.error
+
+            if steps_since_save and _now() - last_save >= self.save_every_sec:
+                try:
+                    self._save_snapshot()
+                    steps_since_save = 0
+                except Exception as e:
+                    self.session.last_error = f"snapshot failed: {e}"
+                last_save = _now()
+
+            # cap the step rate so training never competes with inference
+            self._stop.wait(max(0.0, self.min_step_dt - (_now() - t_step)))
+
+        if steps_since_save:
+            try:
+                self._save_snapshot()
+            except Exception as e:
+                self.session.last_error = f"snapshot failed: {e}"
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+class FrameSource(ABC):
+    """
+    Base class for session frame sources.
+
+    open() raises RuntimeError on failure; read() mirrors cv2.VideoCapture.read();
+    recover() is called after a failed read and returns True if reading can continue.
+    A subclass missing open()/read() fails at construction.
+    """
+
+    kind = "base"
+    direct_url: Optional[str] = None
+
+    @abstractmethod
+    def open(self) -> None:
+        ...
+
+    @abstractmethod
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        ...
+
+    def recover(self) -> bool:
+        return False
+
+    def release(self) -> None:
+        pass
+
+
+class _Pacer:
+    """Sleeps so that successive ticks are at least 1/fps apart (fps <= 0 disables pacing)."""
+
+    def __init__(self, fps: float) -> None:
+        self.dt = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if self.dt <= 0:
+            return
+        now = time.perf_counter()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.dt
+
+
+class UrlFrameSource(FrameSource):
+    """yt-dlp resolved stream; re-resolves (bounded retries) when capture fails mid-stream."""
+
+    kind = "url"
+
+    def __init__(
+        self,
+        url: str,
+        resolver: StreamResolver,
+        on_event: Optional[Callable[[dict], None]] = None,
+        stop_flag: Optional[threading.Event] = None,
+    ) -> None:
+        self.url = url
+        self.resolver = resolver
+        self.on_event = on_event or (lambda ev: None)
+        self.stop_flag = stop_flag or threading.Event()
+        self._cap: Optional["cv2.VideoCapture"] = None
+
+    def _open(self, force_resolve: bool) -> None:
+        import cv2
+
+        self.direct_url = self.resolver.resolve(self.url, force=force_resolve)
+        cap = cv2.VideoCapture(self.direct_url)
+        if not cap.isOpened():
+            cap.release()
+            raise RuntimeError("OpenCV could not open stream URL")
+        self._cap = cap
+
+    def open(self) -> None:
+        self._open(force_resolve=False)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._cap is None:
+            return False, None
+        return self._cap.read()
+
+    def recover(self) -> bool:
+        cap = self._cap
+        if cap is None:
+            return False
+        import cv2
+
+        total = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        at_end = total > 0 and cap.get(cv2.CAP_PROP_POS_FRAMES) >= total - 1
+        cap.release()
+        self._cap = None
+        if at_end:
+            # finite media that reached its end is done; anything else is a mid-stream failure
+            return False
+
+        for attempt in range(1, MAX_RERESOLVE_ATTEMPTS + 1):
+            if self.stop_flag.is_set():
+                return False
+            self.resolver.invalidate(self.url)
+            self.on_event({"type": "reresolving", "attempt": attempt})
+            try:
+                self._open(force_resolve=True)
+                return True
+            except Exception:
+                self.stop_flag.wait(min(2.0 * attempt, 5.0))
+        return False
+
+    def release(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class VideoFileSource(FrameSource):
+    """Local video file, looped. realtime=True paces reads to the file's native fps."""
+
+    kind = "file"
+
+    def __init__(self, path: Path, loop: bool = True, realtime: bool = True) -> None:
+        self.path = Path(path)
+        self.loop = loop
+        self.realtime = realtime
+        self.direct_url = str(self.path)
+        self._cap: Optional["cv2.VideoCapture"] = None
+        self._pacer = _Pacer(0.0)
+
+    def open(self) -> None:
+        if not self.path.is_file():
+            raise RuntimeError(f"video file not found: {self.path}")
+        import cv2
+
+        cap = cv2.VideoCapture(str(self.path))
+        if not cap.isOpened():
+            cap.release()
+            raise RuntimeError(f"OpenCV could not open video file: {self.path}")
+        self._cap = cap
+        native = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        self._pacer = _Pacer(native if self.realtime else 0.0)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._cap is None:
+            return False, None
+        self._pacer.wait()
+        ok, frame = self._cap.read()
+        if (not ok or frame is None) and self.loop:
+            import cv2
+
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._cap.read()
+        return ok, frame
+
+    def release(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class ImageDirSource(FrameSource):
+    """Sorted image files from a directory, looped. fps > 0 paces reads."""
+
+    kind = "dir"
+
+    def __init__(self, path: Path, loop: bool = True, fps: float = 0.0) -> None:
+        self.path = Path(path)
+        self.loop = loop
+        self.direct_url = str(self.path)
+        self._files: List[Path] = []
+        self._i = 0
+        self._pacer = _Pacer(fps)
+
+    def open(self) -> None:
+        if not self.path.is_dir():
+            raise RuntimeError(f"image directory not found: {self.path}")
+        self._files = sorted(p for p in self.path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        if not self._files:
+            raise RuntimeError(f"no images in {self.path}")
+        self._i = 0
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        import cv2
+
+        while True:
+            if self._i >= len(self._files):
+                if not self.loop:
+                    return False, None
+                self._i = 0
+            fp = self._files[self._i]
+            self._i += 1
+            self._pacer.wait()
+            frame = cv2.imread(str(fp), cv2.IMREAD_COLOR)
+            if frame is not None:
+                return True, frame
+
+
+class SyntheticSource(FrameSource):
+    """Generated BGR frames (moving gradient + noise block). fps <= 0 means unthrottled."""
+
+    kind = "synthetic"
+
+    def __init__(self, width: int = 640, height: int = 360, fps: float = 30.0, seed: int = 0) -> None:
+        self.width = max(8, int(width))
+        self.height = max(8, int(height))
+        self.direct_url = f"synthetic://{self.width}x{self.height}"
+        self._pacer = _Pacer(fps)
+        self._rng = np.random.default_rng(seed)
+        self._t = 0
+        self._base: Optional[np.ndarray] = None
+
+    def open(self) -> None:
+        xs = np.linspace(0, 255, self.width, dtype=np.float32)
+        ys = np.linspace(0, 255, self.height, dtype=np.float32)
+        grad = (xs[None, :] * 0.6 + ys[:, None] * 0.4).astype(np.uint8)
+        self._base = np.dstack([grad, np.roll(grad, self.width // 3, axis=1), 255 - grad])
+        self._t = 0
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._base is None:
+            return False, None
+        self._pacer.wait()
+        shift = (self._t * 7) % self.width
+        frame = np.roll(self._base, shift, axis=1)
+        bh, bw = self.height // 4, self.width // 4
+        y0 = (self._t * 3) % (self.height - bh)
+        frame[y0 : y0 + bh, :bw] = self._rng.integers(0, 256, size=(bh, bw, 3), dtype=np.uint8)
+        self._t += 1
+        return True, frame
+
+
+def _q_float(q: Dict[str, List[str]], key: str, default: float) -> float:
+    try:
+        return float(q.get(key, [default])[0])
+    except (TypeError, ValueError):
+        return default
+
+
+def _q_bool(q: Dict[str, List[str]], key: str, default: bool) -> bool:
+    v = q.get(key, [None])[0]
+    if v is None:
+        return default
+    return str(v).strip().lower() not in ("0", "false", "no", "off")
+
+
+def local_source_path(url: str) -> Optional[Path]:
+    """The filesystem path a source URL would read (file://, dir://, bare path); None for synthetic/http(s)."""
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    if scheme in ("synthetic", "http", "https"):
+        return None
+    if scheme in ("file", "dir"):
+        return Path((parsed.netloc + parsed.path) if parsed.netloc else parsed.path).expanduser()
+    return Path(url).expanduser()
+
+
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def check_session_id(session_id: str) -> str:
+    """Session ids end up in file names (train snapshots): letters, digits, _ and -, at most 64."""
+    if not isinstance(session_id, str) or not _SESSION_ID_RE.fullmatch(session_id):
+        raise ValueError("session_id must be 1-64 characters of letters, digits, '_' or '-'")
+    return session_id
+
+
+def check_client_source(url: str, local_root: Optional[str]) -> None:
+    """
+    Gate for source URLs sent by HTTP clients: local files/directories are only allowed under
+    local_root (STREAM_LOCAL_ROOT); with no root, every local source is refused. Raises ValueError.
+    make_frame_source() itself does not check (benchmarks and tests open local sources directly).
+    """
+    path = local_source_path(url)
+    if path is None:
+        return
+    if not local_root:
+        raise ValueError("local stream sources are disabled (set STREAM_LOCAL_ROOT to allow a directory)")
+    root = Path(local_root).expanduser().resolve()
+    if not path.resolve().is_relative_to(root):
+        raise ValueError(f"local stream sources must be under STREAM_LOCAL_ROOT ({root})")
+
+
+def make_frame_source(
+    url: str,
+    resolver: StreamResolver,
+    on_event: Optional[Callable[[dict], None]] = None,
+    stop_flag: Optional[threading.Event] = None,
+) -> FrameSource:
+    """Pick a FrameSource for a session URL (see module docstring for the accepted forms)."""
+    parsed = urlparse(url)
+    q = parse_qs(parsed.query)
+    scheme = parsed.scheme.lower()
+
+    if scheme == "synthetic":
+        return SyntheticSource(
+            width=int(_q_float(q, "w", 640)),
+            height=int(_q_float(q, "h", 360)),
+            fps=_q_float(q, "fps", 30.0),
+            seed=int(_q_float(q, "seed", 0)),
+        )
+    if scheme in ("file", "dir"):
+        path = Path((parsed.netloc + parsed.path) if parsed.netloc else parsed.path).expanduser()
+        if scheme == "dir" or path.is_dir():
+            return ImageDirSource(path, loop=_q_bool(q, "loop", True), fps=_q_float(q, "fps", 0.0))
+        return VideoFileSource(path, loop=_q_bool(q, "loop", True), realtime=_q_bool(q, "realtime", True))
+    if scheme in ("http", "https"):
+        return UrlFrameSource(url, resolver, on_event=on_event, stop_flag=stop_flag)
+
+    local = Path(url).expanduser()
+    if local.is_dir():
+        return ImageDirSource(local)
+    if local.is_file():
+        return VideoFileSource(local)
+    raise ValueError(f"unsupported stream source: {url}")
+
+
 def frame_to_state(frame_bgr: np.ndarray) -> List[float]:
     """
     Convert a BGR frame -> 128-dim feature vector:
@@ -98,6 +805,8 @@ def frame_to_state(frame_bgr: np.ndarray) -> List[float]:
       - resize to (16, 8)
       - flatten to 128 floats in [0,1]
     """
+    import cv2
+
     gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
     small = cv2.resize(gray, (16, 8), interpolation=cv2.INTER_AREA)  # 16*8=128
     vec = (small.astype(np.float32) / 255.0).reshape(-1)
@@ -106,6 +815,8 @@ def frame_to_state(frame_bgr: np.ndarray) -> List[float]:
 
 def jpeg_b64(frame_bgr: np.ndarray, max_w: int = 320) -> str:
     """Encode a small thumbnail as base64 JPEG for UI previews."""
+    import cv2
+
     h, w = frame_bgr.shape[:2]
     if w > max_w:
         scale = max_w / float(w)
@@ -122,11 +833,13 @@ class StreamSession:
     mode: str  # "train" | "infer"
     url: str
     model_type: str  # "transformer"
-    direct_url: str
     tr_port: int
     repo_root: Path
+    resolver: StreamResolver = field(repr=False)
 
     # runtime
+    status: str = "resolving"  # "resolving" | "running" | "stopped" | "error"
+    direct_url: Optional[str] = None
     started_at: float = field(default_factory=_now)
     stopped_at: Optional[float] = None
     last_event_at: Optional[float] = None
@@ -135,12 +848,21 @@ class StreamSession:
     last_action: Optional[str] = None
     last_conf: Optional[float] = None
     last_error: Optional[str] = None
+    last_latency_ms: Optional[float] = None
+    max_fps: float = 8.0
+    source_kind: Optional[str] = None
     training_steps: int = 0
     saved_model_path: Optional[str] = None
+    on_exit: Optional[Callable[["StreamSession"], None]] = field(default=None, repr=False)
+    router: Optional[object] = field(default=None, repr=False)  # request(path, body, session_id=, timeout=)
 
     _stop_flag: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
     _thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
     _events: "queue.Queue[dict]" = field(default_factory=lambda: queue.Queue(maxsize=500), init=False, repr=False)
+    _buffer: Optional[ReplayBuffer] = field(default=None, init=False, repr=False)
+    _trainer: Optional[OnlineTrainer] = field(default=None, init=False, repr=False)
+    _source: Optional[FrameSource] = field(default=None, init=False, repr=False)
+    _latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=2048), init=False, repr=False)
 
     def is_running(self) -> bool:
         return self._thread is not None and self._thread.is_alive()
@@ -148,16 +870,25 @@ class StreamSession:
     def stop(self) -> None:
         self._stop_flag.set()
 
-    def _predict_action(self, state: List[float]) -> Tuple[str, Optional[float]]:
+    def _predict_action(self, state: List[float]) -> Tuple[str, Optional[float], Optional[int]]:
         port = self.tr_port
         try:
-            resp = requests.post(f"http://127.0.0.1:{port}/predict", json={"state": state}, timeout=6)
+            if self.router is not None:
+                body = np.asarray(state, dtype="<f4").tobytes()  # raw float32: no JSON on either side
+                _, resp = self.router.request(
+                    "/predict", body, session_id=self.session_id, content_type=FEATURES_CONTENT_TYPE, timeout=(1.0, 6.0)
+                )
+            else:
+                resp = requests.post(f"http://127.0.0.1:{port}/predict", json={"state": state}, timeout=6)
             if resp.status_code != 200:
                 raise RuntimeError(f"predict HTTP {resp.status_code}")
             data = resp.json()
             action = data.get("action") or "MOVE_FORWARD"
-            # predictors currently return only action string; confidence is unknown
-            return action, None
+            conf = data.get("confidence")
+            idx = data.get("action_index")
+            if idx is None:
+                idx = ACTION_TO_INDEX.get(str(action).lower())
+            return action, (float(conf) if conf is not None else None), (int(idx) if idx is not None else None)
         except Exception as e:
             raise RuntimeError(f"predict failed: {e}") from e
 
@@ -178,6 +909,15 @@ class StreamSession:
             except Exception:
                 pass
 
+    def drain_events(self) -> List[dict]:
+        """Pop every queued event without blocking (for in-process consumers such as benchmarks)."""
+        out: List[dict] = []
+        while True:
+            try:
+                out.append(self._events.get_nowait())
+            except queue.Empty:
+                return out
+
     def iter_sse(self) -> Iterator[str]:
         """
         SSE generator. Yields:
@@ -202,6 +942,7 @@ class StreamSession:
             "mode": self.mode,
             "url": self.url,
             "model_type": self.model_type,
+            "status": self.status,
             "direct_url": self.direct_url,
             "started_at": self.started_at,
             "stopped_at": self.stopped_at,
@@ -211,14 +952,20 @@ class StreamSession:
             "last_action": self.last_action,
             "last_conf": self.last_conf,
             "last_error": self.last_error,
+            "last_latency_ms": self.last_latency_ms,
+            "max_fps": self.max_fps,
+            "source_kind": self.source_kind,
             "training_steps": self.training_steps,
             "saved_model_path": self.saved_model_path,
+            "train_buffer_size": len(self._buffer) if self._buffer is not None else 0,
+            "train_loss": self._trainer.last_loss if self._trainer is not None else None,
             "running": self.is_running(),
         }
 
     def start(self, include_frames: bool = True, max_fps: float = 8.0) -> None:
         if self._thread and self._thread.is_alive():
             return
+        self.max_fps = float(max_fps)
         self._thread = threading.Thread(
             target=self._run_loop,
             kwargs={"include_frames": include_frames, "max_fps": max_fps},
@@ -226,23 +973,39 @@ class StreamSession:
         )
         self._thread.start()
 
+    def latency_samples(self) -> List[float]:
+        """Recent end-to-end latencies (frame read -> inference event), in milliseconds."""
+        return list(self._latencies)
+
     def _run_loop(self, include_frames: bool = True, max_fps: float = 8.0) -> None:
         t0 = _now()
         last_tick = t0
         frames_for_fps = 0
 
-        # online training disabled (transformer only)
-        # NN online trainer support removed in transformer-only version
-
-        # open stream
-        cap = cv2.VideoCapture(self.direct_url)
-        if not cap.isOpened():
-            self.last_error = "OpenCV could not open stream URL"
+        # resolve + open source (off the request thread; session reports status="resolving")
+        self._push_event({"type": "resolving", "url": self.url})
+        try:
+            source = make_frame_source(self.url, self.resolver, on_event=self._push_event, stop_flag=self._stop_flag)
+            self.source_kind = source.kind
+            source.open()
+        except Exception as e:
+            self.last_error = str(e)
+            self.status = "error"
             self._push_event({"type": "error", "message": self.last_error})
             self.stopped_at = _now()
+            self._exited()
             return
+        self._source = source
+        self.direct_url = source.direct_url
+        self.status = "running"
 
-        min_dt = 1.0 / max(0.5, float(max_fps))
+        if self.mode == "train":
+            self._buffer = ReplayBuffer(TRAIN_BUFFER_CAPACITY, state_dim=128)
+            self._trainer = OnlineTrainer(self, self._buffer)
+            self._trainer.start()
+
+        # max_fps <= 0 means unthrottled (benchmarks); otherwise at least 0.5 fps
+        min_dt = 1.0 / max(0.5, float(max_fps)) if max_fps and max_fps > 0 else 0.0
 
         self._push_event(
             {
@@ -262,11 +1025,17 @@ class StreamSession:
                     continue
                 last_tick = now
 
-                ok, frame = cap.read()
+                ok, frame = source.read()
                 if not ok or frame is None:
+                    if source.recover():
+                        self.direct_url = source.direct_url
+                        continue
+                    if self._stop_flag.is_set():
+                        break
                     self.last_error = "stream ended or frame read failed"
                     self._push_event({"type": "ended", "message": self.last_error})
                     break
+                t_frame = time.perf_counter()
 
                 self.frames += 1
                 frames_for_fps += 1
@@ -279,14 +1048,21 @@ class StreamSession:
 
                 state = frame_to_state(frame)
                 try:
-                    action, conf = self._predict_action(state)
+                    action, conf, action_idx = self._predict_action(state)
                     self.last_action, self.last_conf = action, conf
                 except Exception as e:
                     self.last_error = str(e)
                     self._push_event({"type": "error", "message": self.last_error})
                     continue
 
+                if self._buffer is not None and action_idx is not None:
+                    # pseudo-label: the served model's own prediction
+                    self._buffer.add(state, action_idx)
+
                 thumb = jpeg_b64(frame) if include_frames else ""
+                latency_ms = (time.perf_counter() - t_frame) * 1000.0
+                self.last_latency_ms = latency_ms
+                self._latencies.append(latency_ms)
 
                 ev = {
                     "type": "inference",
@@ -294,23 +1070,113 @@ class StreamSession:
                     "action": action,
                     "confidence": conf,
                     "fps": self.fps_est,
+                    "training_steps": self.training_steps,
+                    "latency_ms": round(latency_ms, 2),
                     "thumb_jpeg_b64": thumb,
                 }
                 self._push_event(ev)
 
         finally:
-            cap.release()
+            source.release()
+            if self._trainer is not None:
+                self._trainer.stop()
+            self.status = "stopped"
             self.stopped_at = _now()
             self._push_event({"type": "stopped"})
+            self._exited()
+
+    def _exited(self) -> None:
+        if self.on_exit is not None:
+            try:
+                self.on_exit(self)
+            except Exception:
+                pass
 
 
 class StreamManager:
-    def __init__(self, repo_root: Path, tr_port: int) -> None:
+    """
+    Owns stream sessions. Admission control:
+      - max_sessions: concurrent running sessions (0 = unlimited)
+      - max_total_fps: sum of per-session max_fps across running sessions (0 = unlimited);
+        while a budget is set, unthrottled sessions (max_fps <= 0) are rejected.
+    Stopped sessions are dropped after stopped_ttl (oldest first beyond keep_stopped); with a
+    history registry (put/update/get) their state is recorded on start and on exit.
+    """
+
+    def __init__(
+        self,
+        repo_root: Path,
+        tr_port: int,
+        resolver: Optional[StreamResolver] = None,
+        max_sessions: int = MAX_SESSIONS,
+        max_total_fps: float = MAX_TOTAL_FPS,
+        history=None,
+        stopped_ttl: float = SESSION_TTL_SEC,
+        keep_stopped: int = KEEP_STOPPED,
+        router=None,
+    ) -> None:
         self.repo_root = repo_root
         self.tr_port = tr_port
+        self.router = router
+        self.resolver = resolver or StreamResolver()
+        self.max_sessions = int(max_sessions)
+        self.max_total_fps = float(max_total_fps)
+        self.history = history
+        self.stopped_ttl = float(stopped_ttl)
+        self.keep_stopped = max(0, int(keep_stopped))
         self._lock = threading.Lock()
         self._sessions: Dict[str, StreamSession] = {}
 
+    def _record(self, sess: StreamSession) -> None:
+        if self.history is None:
+            return
+        info = sess.to_dict()
+        if sess.stopped_at is not None:
+            info["running"] = False  # called from the session thread while it exits
+        self.history.put(sess.session_id, info)
+
+    def _record_exit(self, sess: StreamSession) -> None:
+        with self._lock:
+            replaced = self._sessions.get(sess.session_id) not in (None, sess)
+        if not replaced:
+            self._record(sess)
+
+    def _prune_locked(self) -> None:
+        """Forget sessions that stopped more than stopped_ttl ago, and the oldest beyond keep_stopped."""
+        now = _now()
+        stopped = sorted(
+            (s.stopped_at, sid) for sid, s in self._sessions.items() if s.stopped_at is not None and not s.is_running()
+        )
+        for i, (stopped_at, sid) in enumerate(stopped):
+            if now - stopped_at >= self.stopped_ttl or len(stopped) - i > self.keep_stopped:
+                del self._sessions[sid]
+
+    def _running_locked(self, exclude: Optional[str] = None) -> List[StreamSession]:
+        return [s for sid, s in self._sessions.items() if sid != exclude and s.is_running()]
+
+    def _admit_locked(self, session_id: str, max_fps: float) -> None:
+        running = self._running_locked(exclude=session_id)
+        if self.max_sessions > 0 and len(running) >= self.max_sessions:
+            raise StreamCapacityError(f"too many stream sessions (max {self.max_sessions})")
+        if self.max_total_fps > 0:
+            if max_fps <= 0:
+                raise StreamCapacityError("unthrottled sessions (max_fps <= 0) are not allowed with an fps budget")
+            used = sum(s.max_fps for s in running)
+            if used + max_fps > self.max_total_fps + 1e-9:
+                raise StreamCapacityError(
+                    f"fps budget exceeded: {used:g} in use + {max_fps:g} requested > {self.max_total_fps:g}"
+                )
+
+    def capacity(self) -> dict:
+        with self._lock:
+            running = self._running_locked()
+            return {
+                "running_sessions": len(running),
+                "max_sessions": self.max_sessions,
+                "fps_in_use": sum(s.max_fps for s in running),
+                "max_total_fps": self.max_total_fps,
+            }
+
     def create_session(
         self,
         session_id: str,
@@ -323,24 +1189,35 @@ class StreamManager:
         mode = (mode or "").strip().lower()
         model_type = (model_type or "").strip().lower()
 
+        check_session_id(session_id)
         if mode not in ("train", "infer"):
             raise ValueError("mode must be 'train' or 'infer'")
         if model_type not in ("transformer",):
             raise ValueError("model_type must be 'transformer'")
 
-        direct = resolve_stream_url(url)
+        url = (url or "").strip()
+        if not url:
+            raise ValueError("url is required")
+        # validate the source form up front (cheap; nothing is opened or resolved here)
+        make_frame_source(url, self.resolver)
 
+        # resolution happens on the session thread; reuse a fresh cached direct URL if we have one
         sess = StreamSession(
             session_id=session_id,
             mode=mode,
             url=url,
             model_type=model_type,
-            direct_url=direct,
             tr_port=self.tr_port,
             repo_root=self.repo_root,
+            resolver=self.resolver,
+            direct_url=self.resolver.cached(url),
+            on_exit=self._record_exit,
+            router=self.router,
         )
 
         with self._lock:
+            self._prune_locked()
+            self._admit_locked(session_id, float(max_fps))
             # stop and replace if exists
             old = self._sessions.get(session_id)
             if old:
@@ -349,8 +1226,9 @@ class StreamManager:
                 except Exception:
                     pass
             self._sessions[session_id] = sess
-
-        sess.start(include_frames=include_frames, max_fps=max_fps)
+            self._record(sess)  # before start: the exit record always lands after this one
+            # start under the lock so the next admission check sees this session as running
+            sess.start(include_frames=include_frames, max_fps=max_fps)
         return sess
 
     def stop_session(self, session_id: str) -> bool:
@@ -365,10 +1243,40 @@ class StreamManager:
         with self._lock:
             return self._sessions.get(session_id)
 
+    def get_record(self, session_id: str) -> Optional[dict]:
+        """Live session state, else the recorded final state of a forgotten one."""
+        sess = self.get_session(session_id)
+        if sess is not None:
+            return sess.to_dict()
+        return self.history.get(session_id) if self.history is not None else None
+
     def list_sessions(self) -> Dict[str, dict]:
         with self._lock:
+            self._prune_locked()
             return {sid: s.to_dict() for sid, s in self._sessions.items()}
 
+    def stop_all(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for s in sessions:
+            s.stop()
+
 
-def make_default_manager(repo_root: Path, tr_port: int) -> StreamManager:
-    return StreamManager(repo_root=repo_root, tr_port=tr_port)
+def make_default_manager(
+    repo_root: Path,
+    tr_port: int,
+    resolver: Optional[StreamResolver] = None,
+    max_sessions: int = MAX_SESSIONS,
+    max_total_fps: float = MAX_TOTAL_FPS,
+    history=None,
+    router=None,
+) -> StreamManager:
+    return StreamManager(
+        repo_root=repo_root,
+        tr_port=tr_port,
+        resolver=resolver,
+        max_sessions=max_sessions,
+        max_total_fps=max_total_fps,
+        history=history,
+        router=router,
+    )
@@ -0,0 +1,423 @@
+"""
+models/transformer/checkpoint.py
+
+Flat, memory-mappable checkpoint format for GameplayTransformer weights:
+
+    b"AGBCKPT1" | u64 header length | JSON header (space-padded) | tensor data
+
+- The header carries the architecture (GameplayTransformer keyword arguments), the action names by
+  index, the feature spec, free-form meta and, per tensor, dtype/shape/offset/nbytes inside the data
+  section, plus the sha256 of the data section
+- Tensors are contiguous and 64-byte aligned. open_checkpoint() reads only the header; tensors()
+  maps the file copy-on-write and returns views on the mapping, so loading copies nothing (with
+  load_state_dict(..., assign=True), torch >= 2.1, the parameters stay file-backed until a weight
+  is written; older torch copies them once)
+- The hash is checked lazily: verify() hashes the data section once and caches the result,
+  verify_async() does it on a background thread so a service can serve in the meantime
+- Files keep the .pth name (catalog, uploads, activation are unchanged); loaders tell the formats
+  apart by the magic bytes, and load_state_dict()/load_model() read legacy pickled .pth as well
+- `python models/transformer/checkpoint.py info <file>` prints the header;
+  `convert <old.pth> <new.pth> --input-size 128 ...` rewrites a legacy checkpoint
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AGBCKPT1"
+FORMAT = "agb-checkpoint"
+VERSION = 1
+ALIGN = 64
+MAX_HEADER_BYTES = 16 * 1024 * 1024
+ARCH_KEYS = ("input_size", "num_heads", "hidden_size", "num_layers", "output_size")
+
+_PREFIX = struct.Struct("<8sQ")
+_DTYPES = (
+    "float32", "float16", "bfloat16", "float64", "int64", "int32", "int16", "int8", "uint8", "bool",
+)
+
+
+class CheckpointError(ValueError):
+    """Not a checkpoint, a malformed one, or one whose data does not match its hash."""
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _torch_dtype(name: str):
+    import torch
+
+    if name not in _DTYPES:
+        raise CheckpointError(f"unsupported tensor dtype: {name}")
+    return getattr(torch, name)
+
+
+def _dtype_name(dtype) -> str:
+    name = str(dtype).replace("torch.", "")
+    if name not in _DTYPES:
+        raise CheckpointError(f"unsupported tensor dtype: {name}")
+    return name
+
+
+def is_checkpoint(path) -> bool:
+    """True if the file starts with the checkpoint magic (False for pickled .pth and missing files)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def architecture_of(model) -> Dict[str, int]:
+    arch = getattr(model, "architecture", None)
+    if not isinstance(arch, dict):
+        raise CheckpointError(f"{type(model).__name__} does not record its architecture")
+    return {k: int(arch[k]) for k in ARCH_KEYS}
+
+
+# ---------------------------------------------------------------- writing
+def save_checkpoint(
+    path,
+    state_dict: Dict[str, Any],
+    architecture: Dict[str, int],
+    actions: Optional[List[str]] = None,
+    feature_spec: Optional[Dict[str, Any]] = None,
+    meta: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Write the checkpoint atomically (temp file + rename). Returns the sha256 of the data section."""
+    import torch
+
+    missing = [k for k in ARCH_KEYS if k not in architecture]
+    if missing:
+        raise CheckpointError(f"architecture is missing {missing}")
+
+    tensors: Dict[str, Dict[str, Any]] = {}
+    payload: List[Tuple[int, Any]] = []
+    offset = 0
+    for name, t in state_dict.items():
+        if not isinstance(t, torch.Tensor):
+            raise CheckpointError(f"{name} is not a tensor")
+        t = t.detach().to("cpu").contiguous()
+        offset = _align(offset)
+        nbytes = t.numel() * t.element_size()
+        tensors[name] = {"dtype": _dtype_name(t.dtype), "shape": list(t.shape), "offset": offset, "nbytes": nbytes}
+        payload.append((offset, t.reshape(-1).view(torch.uint8).numpy()))
+        offset += nbytes
+    data_bytes = offset
+
+    def chunks():
+        pos = 0
+        for at, raw in payload:
+            if at > pos:
+                yield bytes(at - pos)
+            yield memoryview(raw)
+            pos = at + raw.nbytes
+
+    digest = hashlib.sha256()
+    for chunk in chunks():
+        digest.update(chunk)
+
+    header = {
+        "format": FORMAT,
+        "version": VERSION,
+        "architecture": {k: int(architecture[k]) for k in ARCH_KEYS},
+        "actions": list(actions) if actions is not None else None,
+        "feature_spec": feature_spec or {"length": int(architecture["input_size"]), "dtype": "float32"},
+        "meta": meta or {},
+        "tensors": tensors,
+        "data_bytes": data_bytes,
+        "sha256": digest.hexdigest(),
+    }
+    raw_header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    raw_header += b" " * (_align(_PREFIX.size + len(raw_header)) - _PREFIX.size - len(raw_header))
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(raw_header)))
+        f.write(raw_header)
+        for chunk in chunks():
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return header["sha256"]
+
+
+def save_model(path, model, actions: Optional[List[str]] = None, feature_spec=None, meta=None) -> str:
+    """save_checkpoint() of a model that records its architecture (GameplayTransformer does)."""
+    return save_checkpoint(path, model.state_dict(), architecture_of(model), actions, feature_spec, meta)
+
+
+# ---------------------------------------------------------------- reading
+class Checkpoint:
+    """An opened checkpoint: the parsed header now, the mapping on first tensors(), the hash on verify()."""
+
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        try:
+            with open(self.path, "rb") as f:
+                prefix = f.read(_PREFIX.size)
+                if len(prefix) < _PREFIX.size or prefix[: len(MAGIC)] != MAGIC:
+                    raise CheckpointError(f"not a checkpoint: {self.path}")
+                _, header_len = _PREFIX.unpack(prefix)
+                if header_len > MAX_HEADER_BYTES:
+                    raise CheckpointError(f"checkpoint header too large: {header_len} bytes")
+                raw = f.read(header_len)
+                size = os.fstat(f.fileno()).st_size
+        except OSError as e:
+            raise CheckpointError(f"cannot read checkpoint {self.path}: {e}") from e
+        try:
+            self.header: Dict[str, Any] = json.loads(raw)
+        except ValueError as e:
+            raise CheckpointError(f"checkpoint header is not valid JSON: {e}") from e
+        if self.header.get("format") != FORMAT or self.header.get("version") != VERSION:
+            raise CheckpointError(f"unsupported checkpoint version: {self.header.get('version')}")
+        self.data_start = _PREFIX.size + header_len
+        self.data_bytes = int(self.header["data_bytes"])
+        if size < self.data_start + self.data_bytes:
+            raise CheckpointError(f"checkpoint truncated: {size} of {self.data_start + self.data_bytes} bytes")
+        for name, e in self.header["tensors"].items():
+            if e["offset"] < 0 or e["offset"] + e["nbytes"] > self.data_bytes:
+                raise CheckpointError(f"tensor {name} lies outside the data section")
+        self._map: Optional[mmap.mmap] = None
+        self._verified: Optional[bool] = None
+        self._verify_lock = threading.Lock()
+
+    @property
+    def architecture(self) -> Dict[str, int]:
+        return dict(self.header["architecture"])
+
+    @property
+    def actions(self) -> Optional[List[str]]:
+        return self.header.get("actions")
+
+    @property
+    def feature_spec(self) -> Dict[str, Any]:
+        return dict(self.header.get("feature_spec") or {})
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return dict(self.header.get("meta") or {})
+
+    @property
+    def sha256(self) -> str:
+        return self.header["sha256"]
+
+    @property
+    def verified(self) -> Optional[bool]:
+        """None until verify() has run."""
+        return self._verified
+
+    def tensors(self, device="cpu") -> Dict[str, Any]:
+        """State dict whose CPU tensors are views on a private (copy-on-write) mapping of the file."""
+        import torch
+
+        if self._map is None:
+            with open(self.path, "rb") as f:
+                # ACCESS_COPY: writable for torch, but writes never reach the file
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        out = {}
+        for name, e in self.header["tensors"].items():
+            dtype = _torch_dtype(e["dtype"])
+            count = math.prod(e["shape"])
+            if count == 0:
+                t = torch.empty(e["shape"], dtype=dtype)
+            else:
+                t = torch.frombuffer(self._map, dtype=dtype, count=count, offset=self.data_start + e["offset"])
+                t = t.view(e["shape"])
+            out[name] = t if str(device) == "cpu" else t.to(device)
+        return out
+
+    def verify(self) -> bool:
+        """Hash the data section (from the file, once) and compare it with the header."""
+        with self._verify_lock:
+            if self._verified is None:
+                digest = hashlib.sha256()
+                remaining = self.data_bytes
+                with open(self.path, "rb") as f:
+                    f.seek(self.data_start)
+                    while remaining > 0:
+                        chunk = f.read(min(1 << 20, remaining))
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        remaining -= len(chunk)
+                self._verified = remaining == 0 and digest.hexdigest() == self.sha256
+            return self._verified
+
+    def check(self) -> None:
+        """verify() or raise CheckpointError."""
+        if not self.verify():
+            raise CheckpointError(f"checkpoint data does not match its sha256: {self.path}")
+
+    def verify_async(self, on_result: Optional[Callable[[bool], None]] = None) -> threading.Thread:
+        def run() -> None:
+            ok = self.verify()
+            if not ok:
+                logger.error("Checkpoint integrity check failed: %s", self.path)
+            if on_result is not None:
+                on_result(ok)
+
+        t = threading.Thread(target=run, name="checkpoint-verify", daemon=True)
+        t.start()
+        return t
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "format": FORMAT,
+            "sha256": self.sha256,
+            "verified": self.verified,
+            "architecture": self.architecture,
+            "actions": len(self.actions) if self.actions is not None else None,
+            "feature_spec": self.feature_spec,
+        }
+
+
+def open_checkpoint(path) -> Checkpoint:
+    return Checkpoint(path)
+
+
+def load_state_dict(path, map_location="cpu") -> Tuple[Dict[str, Any], Optional[Checkpoint]]:
+    """(state dict, Checkpoint) for the mappable format, (state dict, None) for a pickled .pth."""
+    if is_checkpoint(path):
+        ckpt = open_checkpoint(path)
+        return ckpt.tensors(map_location), ckpt
+    import torch
+
+    state = torch.load(str(path), map_location=map_location)
+    if isinstance(state, dict) and isinstance(state.get("state_dict"), dict):
+        state = state["state_dict"]
+    return state, None
+
+
+def _can_assign() -> bool:
+    """load_state_dict(assign=...) exists from torch 2.1; the pinned 2.0.x has to copy."""
+    import inspect
+
+    import torch
+
+    return "assign" in inspect.signature(torch.nn.Module.load_state_dict).parameters
+
+
+def build_model(model_cls, architecture: Dict[str, int], state: Dict[str, Any]):
+    """
+    model_cls(**architecture) holding exactly `state`: built on the meta device (no weight init) and
+    loaded strictly with assign=True, so the parameters are the state's tensors, not copies.
+    On torch < 2.1 the model is built normally and the state copied in (still strict).
+    """
+    import torch
+
+    if not _can_assign():
+        model = model_cls(**architecture)
+        model.load_state_dict(state, strict=True)
+        return model
+    with torch.device("meta"):
+        model = model_cls(**architecture)
+    model.load_state_dict(state, strict=True, assign=True)
+    return model
+
+
+def load_model(
+    path,
+    model_cls,
+    device="cpu",
+    architecture: Optional[Dict[str, int]] = None,
+    verify: str = "async",
+) -> Tuple[Any, Optional[Checkpoint]]:
+    """
+    model_cls(**architecture) with the weights from path, in eval mode: (model, Checkpoint or None).
+    A mappable checkpoint brings its own architecture (a different `architecture` argument only
+    logs a warning) and is loaded strictly; a pickled .pth needs `architecture`.
+    verify: "async" (hash on a background thread), "now" (raise CheckpointError on mismatch), "skip".
+    """
+    state, ckpt = load_state_dict(path, device)
+    if ckpt is not None:
+        if architecture and {k: int(architecture[k]) for k in ARCH_KEYS if k in architecture} != {
+            k: v for k, v in ckpt.architecture.items() if k in architecture
+        }:
+            logger.warning("Using the checkpoint's architecture %s instead of %s", ckpt.architecture, architecture)
+        if verify == "now":
+            ckpt.check()
+        elif verify == "async":
+            ckpt.verify_async()
+        model = build_model(model_cls, ckpt.architecture, state)
+    else:
+        if not architecture:
+            raise CheckpointError(f"{path} is a pickled checkpoint without architecture; pass architecture=")
+        model = model_cls(**{k: int(architecture[k]) for k in ARCH_KEYS})
+        model.load_state_dict(state)
+    return model.to(device).eval(), ckpt
+
+
+def load_action_names(config_path) -> Optional[List[str]]:
+    """Action names by id from a game_actions.json ("actions": [{"id", "name"}, ...]); None if unreadable."""
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            actions = json.load(f).get("actions", [])
+        by_id = {int(a["id"]): str(a["name"]) for a in actions}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return [by_id.get(i, f"action_{i}") for i in range(max(by_id) + 1)] if by_id else []
+
+
+def main() -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Inspect or convert GameplayTransformer checkpoints")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    info = sub.add_parser("info", help="print the header and verify the hash")
+    info.add_argument("path")
+    conv = sub.add_parser("convert", help="rewrite a pickled .pth in the mappable format")
+    conv.add_argument("src")
+    conv.add_argument("dst")
+    conv.add_argument("--input-size", type=int, default=int(os.environ.get("TRANSFORMER_INPUT_SIZE", "128")))
+    conv.add_argument("--num-heads", type=int, default=int(os.environ.get("TRANSFORMER_NUM_HEADS", "4")))
+    conv.add_argument("--hidden-size", type=int, default=int(os.environ.get("TRANSFORMER_HIDDEN_SIZE", "64")))
+    conv.add_argument("--num-layers", type=int, default=int(os.environ.get("TRANSFORMER_NUM_LAYERS", "2")))
+    conv.add_argument("--actions-config", default="config/game_actions.json", help="action names by id")
+    args = ap.parse_args()
+
+    if args.cmd == "info":
+        try:
+            ckpt = open_checkpoint(args.path)
+        except CheckpointError as e:
+            print(f"[FAIL] {e}")
+            return 1
+        header = {k: v for k, v in ckpt.header.items() if k != "tensors"}
+        header["tensors"] = len(ckpt.header["tensors"])
+        header["verified"] = ckpt.verify()
+        print(json.dumps(header, indent=2, ensure_ascii=False))
+        return 0 if header["verified"] else 1
+
+    state, ckpt = load_state_dict(args.src)
+    if ckpt is not None:
+        print(f"[OK] {args.src} is already in the mappable format")
+        return 0
+    actions = load_action_names(args.actions_config)
+    arch = {
+        "input_size": args.input_size,
+        "num_heads": args.num_heads,
+        "hidden_size": args.hidden_size,
+        "num_layers": args.num_layers,
+        "output_size": int(state["fc.weight"].shape[0]) if "fc.weight" in state else len(actions or []),
+    }
+    digest = save_checkpoint(args.dst, state, arch, actions, meta={"converted_from": os.path.basename(args.src)})
+    print(f"[OK] wrote {args.dst} (sha256 {digest})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
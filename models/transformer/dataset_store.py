@@ -0,0 +1,255 @@
+"""
+models/transformer/dataset_store.py
+
+Columnar binary format for Transformer training data (feature columns + action), one directory
+per dataset. deployment/dataset_builder.py writes it for capture sessions (backend training jobs),
+scripts/build_transformer_dataset.py --format binary for recordings:
+
+    manifest.json  rows, feature count/columns, dtypes, label class counts, source
+    features.f32   rows x features, float32 little-endian, row-major
+    labels.i64     rows, int64 little-endian
+
+- open_dataset() reads the manifest and maps both arrays with np.memmap (read-only), so opening
+  costs the same for 1k or 1M rows and pages are read on demand
+- DatasetWriter appends row blocks and writes the manifest last; the directory appears atomically
+- convert_csv() streams a CSV through DatasetWriter in chunks, never holding the whole table;
+  export_csv() writes a dataset back out as CSV the same way
+- `python models/transformer/dataset_store.py convert data.csv data.agbds` converts,
+  `export-csv data.agbds data.csv` exports, `info data.agbds` prints the manifest
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+FORMAT = "agb-dataset"
+VERSION = 1
+MANIFEST = "manifest.json"
+FEATURES_FILE = "features.f32"
+LABELS_FILE = "labels.i64"
+FEATURE_DTYPE = np.dtype("<f4")
+LABEL_DTYPE = np.dtype("<i8")
+LABEL_COLUMN = "action"
+CSV_CHUNK_ROWS = 2048
+
+
+class DatasetFormatError(ValueError):
+    """Not a binary dataset, or one whose files do not match its manifest."""
+
+
+def is_binary_dataset(path) -> bool:
+    """True for a dataset directory (or its manifest.json); False for CSV files and missing paths."""
+    path = Path(path)
+    if path.name == MANIFEST:
+        path = path.parent
+    return (path / MANIFEST).is_file()
+
+
+class DatasetWriter:
+    """Append (features, labels) blocks, then close() to publish the directory with its manifest."""
+
+    def __init__(self, path, feature_columns: Sequence[str], source: Optional[str] = None) -> None:
+        self.path = Path(path)
+        self.feature_columns = [str(c) for c in feature_columns]
+        self.source = source
+        self.rows = 0
+        self.class_counts: Dict[int, int] = {}
+        self._tmp = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        self._tmp.mkdir(parents=True)
+        self._features = open(self._tmp / FEATURES_FILE, "wb")
+        self._labels = open(self._tmp / LABELS_FILE, "wb")
+
+    def append(self, features, labels) -> None:
+        features = np.ascontiguousarray(features, dtype=FEATURE_DTYPE)
+        labels = np.ascontiguousarray(labels, dtype=LABEL_DTYPE).reshape(-1)
+        if features.ndim != 2 or features.shape[1] != len(self.feature_columns):
+            raise DatasetFormatError(
+                f"expected features of shape (n, {len(self.feature_columns)}), got {features.shape}"
+            )
+        if features.shape[0] != labels.shape[0]:
+            raise DatasetFormatError(f"{features.shape[0]} feature rows but {labels.shape[0]} labels")
+        if labels.shape[0] == 0:  # memoryview cannot cast an empty block
+            return
+        self._features.write(memoryview(features).cast("B"))
+        self._labels.write(memoryview(labels).cast("B"))
+        values, counts = np.unique(labels, return_counts=True)
+        for v, c in zip(values.tolist(), counts.tolist()):
+            self.class_counts[v] = self.class_counts.get(v, 0) + c
+        self.rows += features.shape[0]
+
+    def close(self) -> Dict[str, Any]:
+        for f in (self._features, self._labels):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        manifest = {
+            "format": FORMAT,
+            "version": VERSION,
+            "rows": self.rows,
+            "feature_count": len(self.feature_columns),
+            "feature_dtype": FEATURE_DTYPE.str,
+            "label_dtype": LABEL_DTYPE.str,
+            "label_column": LABEL_COLUMN,
+            "class_counts": {str(k): v for k, v in sorted(self.class_counts.items())},
+            "source": self.source,
+            "feature_columns": self.feature_columns,
+        }
+        with open(self._tmp / MANIFEST, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(self._tmp, self.path)
+        return manifest
+
+    def abort(self) -> None:
+        for f in (self._features, self._labels):
+            f.close()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def convert_csv(csv_path, out_path, chunk_rows: int = CSV_CHUNK_ROWS) -> Dict[str, Any]:
+    """CSV (feature columns + action) -> binary dataset directory, streamed chunk by chunk."""
+    import pandas as pd
+
+    columns = list(pd.read_csv(csv_path, nrows=0).columns)
+    if LABEL_COLUMN not in columns:
+        raise DatasetFormatError(f"{csv_path} has no '{LABEL_COLUMN}' column")
+    feature_columns = [c for c in columns if c != LABEL_COLUMN]
+    dtypes = {c: np.float32 for c in feature_columns}
+    dtypes[LABEL_COLUMN] = np.int64
+    with DatasetWriter(out_path, feature_columns, source=os.path.basename(str(csv_path))) as writer:
+        for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunk_rows):
+            writer.append(chunk[feature_columns].to_numpy(), chunk[LABEL_COLUMN].to_numpy())
+    return read_manifest(out_path)
+
+
+def read_manifest(path) -> Dict[str, Any]:
+    path = Path(path)
+    if path.name == MANIFEST:
+        path = path.parent
+    try:
+        with open(path / MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise DatasetFormatError(f"cannot read dataset manifest in {path}: {e}") from e
+    if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+        raise DatasetFormatError(f"unsupported dataset version: {manifest.get('version')}")
+    return manifest
+
+
+class BinaryDataset:
+    """An opened dataset directory: `features` (rows, F) and `labels` (rows,) as read-only memmaps."""
+
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        if self.path.name == MANIFEST:
+            self.path = self.path.parent
+        self.manifest = read_manifest(self.path)
+        self.rows = int(self.manifest["rows"])
+        self.feature_count = int(self.manifest["feature_count"])
+        self.features = self._map(FEATURES_FILE, self.manifest["feature_dtype"], (self.rows, self.feature_count))
+        self.labels = self._map(LABELS_FILE, self.manifest["label_dtype"], (self.rows,))
+
+    def _map(self, name: str, dtype: str, shape) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        file = self.path / name
+        expected = int(np.prod(shape)) * dtype.itemsize
+        size = file.stat().st_size if file.exists() else -1
+        if size != expected:
+            raise DatasetFormatError(f"{file}: {size} bytes, manifest expects {expected}")
+        if expected == 0:  # np.memmap cannot map an empty file
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(file, dtype=dtype, mode="r", shape=shape)
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return list(self.manifest.get("feature_columns") or [])
+
+    @property
+    def class_counts(self) -> Dict[int, int]:
+        return {int(k): int(v) for k, v in self.manifest.get("class_counts", {}).items()}
+
+
+def open_dataset(path) -> BinaryDataset:
+    return BinaryDataset(path)
+
+
+def export_csv(path, csv_path, chunk_rows: int = CSV_CHUNK_ROWS) -> int:
+    """Binary dataset directory -> CSV (feature columns + action), chunk by chunk. Returns the row count."""
+    import pandas as pd
+
+    ds = open_dataset(path)
+    columns = ds.feature_columns or [f"f{i}" for i in range(ds.feature_count)]
+    csv_path = Path(csv_path)
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = csv_path.with_name(f"{csv_path.name}.tmp-{os.getpid()}")
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            for start in range(0, max(1, ds.rows), chunk_rows):
+                sl = slice(start, start + chunk_rows)
+                df = pd.DataFrame(np.asarray(ds.features[sl]), columns=columns)
+                df[LABEL_COLUMN] = np.asarray(ds.labels[sl])
+                df.to_csv(f, index=False, header=(start == 0), float_format="%.6g")
+        os.replace(tmp, csv_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return ds.rows
+
+
+def main() -> int:
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Convert or inspect binary Transformer training datasets")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    conv = sub.add_parser("convert", help="CSV (feature columns + action) -> dataset directory")
+    conv.add_argument("csv")
+    conv.add_argument("out", help="output directory, e.g. data/processed/transformer_dataset.agbds")
+    conv.add_argument("--chunk-rows", type=int, default=CSV_CHUNK_ROWS)
+    exp = sub.add_parser("export-csv", help="dataset directory -> CSV (feature columns + action)")
+    exp.add_argument("path")
+    exp.add_argument("csv")
+    exp.add_argument("--chunk-rows", type=int, default=CSV_CHUNK_ROWS)
+    info = sub.add_parser("info", help="print the manifest")
+    info.add_argument("path")
+    args = ap.parse_args()
+
+    try:
+        if args.cmd == "convert":
+            t0 = time.perf_counter()
+            manifest = convert_csv(args.csv, args.out, args.chunk_rows)
+            print(f"[OK] {args.csv} -> {args.out}: {manifest['rows']} rows x {manifest['feature_count']} features "
+                  f"in {time.perf_counter() - t0:.1f}s")
+            return 0
+        if args.cmd == "export-csv":
+            rows = export_csv(args.path, args.csv, args.chunk_rows)
+            print(f"[OK] {args.path} -> {args.csv}: {rows} rows")
+            return 0
+        ds = open_dataset(args.path)
+    except DatasetFormatError as e:
+        print(f"[FAIL] {e}")
+        return 1
+    manifest = dict(ds.manifest, feature_columns=len(ds.feature_columns))
+    print(json.dumps(manifest, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
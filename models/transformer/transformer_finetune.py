@@ -8,6 +8,7 @@ import torch.nn as nn
 from torch.utils.data import DataLoader
 import logging
 import os
+from checkpoint import load_model, save_model
 from transformer_model import GameplayTransformer
 from transformer_training import SequenceGameplayDataset
 
@@ -41,20 +42,17 @@ def finetune_transformer_model(model_path, dataset_path, output_model_path, epoc
 
         # Load pre-trained model
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        model = GameplayTransformer(
-            input_dim=128,
-            num_classes=10,
-            num_heads=4,
-            num_layers=3,
-            hidden_dim=256,
-            sequence_length=10
-        )
+        architecture = dict(input_size=128, num_heads=4, hidden_size=256, num_layers=3, output_size=10)
+        checkpoint = None
 
         if os.path.exists(model_path):
-            model.load_state_dict(torch.load(model_path, map_location=device))
+            # a mappable checkpoint brings its own architecture; a pickled .pth is built from the one above
+            model, checkpoint = load_model(model_path, GameplayTransformer, device, architecture=architecture,
+                                           verify="now")
             logger.info(f"Loaded pre-trained model from {model_path}")
         else:
             logger.warning(f"Model file not found: {model_path}. Using random initialization.")
+            model = GameplayTransformer(**architecture)
 
         model = model.to(device)
         logger.info(f"Model loaded on {device}")
@@ -102,7 +100,11 @@ def finetune_transformer_model(model_path, dataset_path, output_model_path, epoc
             # Save best model
             if accuracy > best_accuracy:
                 best_accuracy = accuracy
-                torch.save(model.state_dict(), output_model_path)
+                save_model(output_model_path, model,
+                           actions=checkpoint.actions if checkpoint else None,
+                           feature_spec=checkpoint.feature_spec if checkpoint else None,
+                           meta={"finetuned_from": os.path.basename(model_path), "epoch": epoch + 1,
+                                 "accuracy": accuracy})
                 logger.info(f"New best model saved with accuracy: {accuracy:.2f}%")
 
         logger.info(f"Fine-tuning complete! Best accuracy: {best_accuracy:.2f}%")
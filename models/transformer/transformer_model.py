@@ -19,6 +19,14 @@ class GameplayTransformer(nn.Module):
           - (batch, output_size) 动作概率 / action probabilities
         """
         super().__init__()
+        # 构造参数（写入检查点）/ constructor arguments, stored in checkpoints (models/transformer/checkpoint.py)
+        self.architecture = {
+            "input_size": int(input_size),
+            "num_heads": int(num_heads),
+            "hidden_size": int(hidden_size),
+            "num_layers": int(num_layers),
+            "output_size": int(output_size),
+        }
 
         self.embedding = nn.Linear(input_size, hidden_size)  # 特征嵌入层 (Feature embedding)
 
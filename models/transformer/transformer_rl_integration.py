@@ -1,5 +1,6 @@
 import torch
 import numpy as np
+from checkpoint import load_model
 from transformer_model import GameplayTransformer
 
 class RLAgent:
@@ -7,10 +8,13 @@ class RLAgent:
         """
         Reinforcement Learning agent using Transformer model for gameplay.
         Args:
-            model_path (str): Path to the pre-trained Transformer model.
+            model_path (str): Path to the pre-trained Transformer model. A mappable checkpoint
+                (checkpoint.py) brings its own architecture; the sizes are used for a pickled .pth.
         """
-        self.model = GameplayTransformer(input_size, num_heads, hidden_size, num_layers, output_size)
-        self.model.load_state_dict(torch.load(model_path))
+        architecture = dict(input_size=input_size, num_heads=num_heads, hidden_size=hidden_size,
+                            num_layers=num_layers, output_size=output_size)
+        self.model, self.checkpoint = load_model(model_path, GameplayTransformer, architecture=architecture)
+        self.model.train()
         self.optimizer = torch.optim.Adam(self.model.parameters(), lr=lr)
         self.gamma = gamma
         self.criterion = torch.nn.MSELoss()
@@ -14,6 +14,8 @@ from tqdm import tqdm
 import json
 from datetime import datetime
 
+from checkpoint import load_action_names, save_model
+from dataset_store import is_binary_dataset, open_dataset
 from transformer_model import GameplayTransformer
 
 
@@ -22,26 +24,57 @@ class SequenceGameplayDataset(Dataset):
     Custom Dataset for loading sequence gameplay data for Transformer.
 
     Args:
-        csv_path (str): Path to the dataset CSV file
+        csv_path (str): Path to the dataset CSV file, or to a binary dataset directory
+            (dataset_store.py), which is memory-mapped instead of parsed
         sequence_length (int): Length of input sequences
         transform (callable, optional): Optional transform to apply to samples
     """
 
     def __init__(self, csv_path, sequence_length=10, transform=None):
-        self.data = pd.read_csv(csv_path)
+        self.path = csv_path
         self.sequence_length = sequence_length
         self.transform = transform
+        self.binary = is_binary_dataset(csv_path)
 
-        # Separate features and labels
-        self.features = self.data.drop('action', axis=1).values.astype(np.float32)
-        self.labels = self.data['action'].values.astype(np.int64)
+        if self.binary:
+            self._open()
+        else:
+            # Separate features and labels (the DataFrame is not kept)
+            data = pd.read_csv(csv_path)
+            self.features = data.drop('action', axis=1).values.astype(np.float32)
+            self.labels = data['action'].values.astype(np.int64)
+
+    def _open(self):
+        store = open_dataset(self.path)
+        self.features, self.labels = store.features, store.labels
+        self._class_counts = store.class_counts
+
+    def __getstate__(self):
+        # DataLoader workers re-map the files instead of receiving pickled copies of the arrays
+        state = self.__dict__.copy()
+        if self.binary:
+            state.pop('features', None)
+            state.pop('labels', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.binary:
+            self._open()
+
+    def class_counts(self):
+        """Samples per action id (from the manifest for a binary dataset)."""
+        if self.binary:
+            return dict(self._class_counts)
+        values, counts = np.unique(self.labels, return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
 
     def __len__(self):
-        return max(0, len(self.data) - self.sequence_length)
+        return max(0, len(self.labels) - self.sequence_length)
 
     def __getitem__(self, idx):
-        # Get sequence of features
-        sequence = self.features[idx:idx + self.sequence_length]
+        # Get sequence of features (a copy, so memory-mapped pages are only read)
+        sequence = np.array(self.features[idx:idx + self.sequence_length], dtype=np.float32)
         label = self.labels[idx + self.sequence_length - 1]
 
         if self.transform:
@@ -60,10 +93,15 @@ class TransformerTrainer:
         val_loader (DataLoader): Validation data loader
         learning_rate (float): Learning rate for optimizer
         device (str): Device to train on ('cuda' or 'cpu')
+        actions (list, optional): Action names by class index, stored in the checkpoint
+        feature_spec (dict, optional): Input feature description, stored in the checkpoint
     """
 
-    def __init__(self, model, train_loader, val_loader=None, learning_rate=0.0001, device='cpu', class_weights=None):
+    def __init__(self, model, train_loader, val_loader=None, learning_rate=0.0001, device='cpu', class_weights=None,
+                 actions=None, feature_spec=None):
         self.model = model.to(device)
+        self.actions = actions
+        self.feature_spec = feature_spec
         self.train_loader = train_loader
         self.val_loader = val_loader
         self.device = device
@@ -161,7 +199,7 @@ class TransformerTrainer:
         Args:
             num_epochs (int): Number of training epochs
             save_dir (str): Directory to save the best model
-            model_name (str): Name of the saved model file
+            model_name (str): Name of the saved model file (mappable checkpoint, see checkpoint.py)
             early_stopping_patience (int): Patience for early stopping (0 to disable)
 
         Returns:
@@ -203,7 +241,8 @@ class TransformerTrainer:
                     best_val_loss = val_loss
                     patience_counter = 0  # Reset patience
                     model_path = os.path.join(save_dir, model_name)
-                    torch.save(self.model.state_dict(), model_path)
+                    save_model(model_path, self.model, self.actions, self.feature_spec,
+                               meta={"epoch": epoch + 1, "val_loss": val_loss, "val_accuracy": val_acc})
                     print(f"✓ Model saved to {model_path} (best val_loss: {val_loss:.4f})")
                 else:
                     patience_counter += 1
@@ -240,7 +279,8 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Train Transformer model')
-    parser.add_argument('--dataset', default='data/processed/transformer_dataset.csv', help='Path to dataset CSV')
+    parser.add_argument('--dataset', default='data/processed/transformer_dataset.csv',
+                        help='Path to dataset CSV or binary dataset directory (dataset_store.py)')
     parser.add_argument('--epochs', type=int, default=30, help='Number of epochs')
     parser.add_argument('--batch-size', type=int, default=16, help='Batch size')
     parser.add_argument('--lr', type=float, default=0.0001, help='Learning rate')
@@ -249,8 +289,12 @@ def main():
     parser.add_argument('--num-heads', type=int, default=4, help='Number of attention heads')
     parser.add_argument('--num-layers', type=int, default=3, help='Number of transformer layers')
     parser.add_argument('--hidden-dim', type=int, default=256, help='Hidden dimension')
+    parser.add_argument('--actions-config', type=str, default='config/game_actions.json',
+                        help='Action names stored in the checkpoint')
     parser.add_argument('--use-class-weights', action='store_true', help='Use class weights to balance loss')
     parser.add_argument('--early-stopping', type=int, default=10, help='Early stopping patience (0 to disable)')
+    parser.add_argument('--save-dir', default='models/transformer', help='Directory for the best model and history')
+    parser.add_argument('--model-name', default='transformer_model.pth', help='File name of the saved best model')
     args = parser.parse_args()
     
     # Configuration
@@ -296,11 +340,11 @@ def main():
     if args.use_class_weights:
         print("\n计算类别权重...")
         # Count samples per class
-        full_data = pd.read_csv(DATASET_PATH)
-        class_counts = full_data['action'].value_counts().sort_index()
+        class_counts = full_dataset.class_counts()
+        total = sum(class_counts.values())
         print("\n类别分布:")
-        for action_id, count in class_counts.items():
-            print(f"  动作 {action_id}: {count} 个样本 ({count/len(full_data)*100:.1f}%)")
+        for action_id, count in sorted(class_counts.items()):
+            print(f"  动作 {action_id}: {count} 个样本 ({count/total*100:.1f}%)")
         
         # Calculate inverse frequency weights
         weights = torch.zeros(NUM_CLASSES)
@@ -312,6 +356,13 @@ def main():
         class_weights = weights
         print(f"\n权重前5项: {weights[:5].numpy()}")
 
+    # Action names stored with the checkpoint (only when they match the class count)
+    actions = load_action_names(args.actions_config)
+    if actions is not None and len(actions) != NUM_CLASSES:
+        print(f"Warning: {args.actions_config} has {len(actions)} actions, model has {NUM_CLASSES} classes; "
+              "saving the checkpoint without action names")
+        actions = None
+
     # Initialize model
     model = GameplayTransformer(
         input_size=INPUT_DIM,
@@ -328,12 +379,16 @@ def main():
         val_loader=val_loader,
         learning_rate=LEARNING_RATE,
         device=device,
-        class_weights=class_weights
+        class_weights=class_weights,
+        actions=actions,
+        feature_spec={"length": INPUT_DIM, "dtype": "float32", "sequence_length": SEQUENCE_LENGTH},
     )
 
     # Train model
     history = trainer.train(
         num_epochs=NUM_EPOCHS,
+        save_dir=args.save_dir,
+        model_name=args.model_name,
         early_stopping_patience=args.early_stopping
     )
 
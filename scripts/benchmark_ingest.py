@@ -0,0 +1,166 @@
+"""
+Frame ingest throughput benchmark (offline):
+
+Runs the control backend in-process on an ephemeral port (RAW_DIR redirected to a temp dir)
+and uploads the same JPEG frames three ways:
+  - single : POST /api/ingest_frame, one base64 data URL per JSON request
+  - multipart : POST /api/ingest_frames, --batch frames per multipart request
+  - binary : POST /api/ingest_frames, --batch frames per length-prefixed octet-stream
+Each run is timed until every frame is on disk (CAPTURE_STORAGE=files for the per-file layout).
+Reports frames/s and bytes sent.
+
+Run:
+  uv run python scripts/benchmark_ingest.py --frames 2000 --batch 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import requests
+from PIL import Image
+from werkzeug.serving import make_server
+
+PROJECT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT))
+
+import deployment.control_backend as cb  # noqa: E402
+from deployment.frame_archive import iter_session_frames  # noqa: E402
+from deployment.ingest_writer import pack_frames  # noqa: E402
+
+
+def _make_frames(n: int, width: int, height: int) -> List[Tuple[int, bytes]]:
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+    img = Image.fromarray(base).resize((width, height))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    jpg = buf.getvalue()
+    t0 = 1_700_000_000_000
+    return [(t0 + i, jpg) for i in range(n)]
+
+
+def _new_session(http: requests.Session, url: str) -> str:
+    return http.post(f"{url}/api/start_capture", json={}, timeout=5).json()["session_id"]
+
+
+def _finish(sid: str) -> None:
+    cb.ingest_writer.wait_idle(sid, timeout=120)
+
+
+def run_single(http: requests.Session, url: str, frames: List[Tuple[int, bytes]]) -> Tuple[str, int]:
+    sid = _new_session(http, url)
+    sent = 0
+    for ts, jpg in frames:
+        image = "data:image/jpeg;base64," + base64.b64encode(jpg).decode("ascii")
+        body = json.dumps({"session_id": sid, "timestamp": ts, "image": image})
+        sent += len(body)
+        r = http.post(f"{url}/api/ingest_frame", data=body, headers={"Content-Type": "application/json"}, timeout=10)
+        r.raise_for_status()
+    _finish(sid)
+    return sid, sent
+
+
+def run_multipart(http: requests.Session, url: str, frames: List[Tuple[int, bytes]], batch: int) -> Tuple[str, int]:
+    sid = _new_session(http, url)
+    sent = 0
+    for i in range(0, len(frames), batch):
+        chunk = frames[i : i + batch]
+        files = [("frames", (f"frame_{ts}.jpg", jpg, "image/jpeg")) for ts, jpg in chunk]
+        req = requests.Request("POST", f"{url}/api/ingest_frames", params={"session_id": sid}, files=files).prepare()
+        sent += len(req.body)
+        r = http.send(req, timeout=30)
+        r.raise_for_status()
+    _finish(sid)
+    return sid, sent
+
+
+def run_binary(http: requests.Session, url: str, frames: List[Tuple[int, bytes]], batch: int) -> Tuple[str, int]:
+    sid = _new_session(http, url)
+    sent = 0
+    for i in range(0, len(frames), batch):
+        body = pack_frames(frames[i : i + batch])
+        sent += len(body)
+        r = http.post(
+            f"{url}/api/ingest_frames",
+            params={"session_id": sid},
+            data=body,
+            headers={"Content-Type": "application/octet-stream"},
+            timeout=30,
+        )
+        r.raise_for_status()
+    _finish(sid)
+    return sid, sent
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare single-frame vs batched frame ingest throughput")
+    ap.add_argument("--frames", type=int, default=1000)
+    ap.add_argument("--batch", type=int, default=50)
+    ap.add_argument("--width", type=int, default=640)
+    ap.add_argument("--height", type=int, default=360)
+    ap.add_argument("--json", action="store_true", help="print the report as JSON only")
+    args = ap.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+    tmp = Path(tempfile.mkdtemp(prefix="ingest_bench_"))
+    cb.RAW_DIR = tmp
+    server = make_server("127.0.0.1", 0, cb.app, threaded=True)
+    url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    frames = _make_frames(args.frames, args.width, args.height)
+    report: Dict[str, dict] = {}
+    try:
+        with requests.Session() as http:
+            runs = {
+                "single": lambda: run_single(http, url, frames),
+                "multipart": lambda: run_multipart(http, url, frames, args.batch),
+                "binary": lambda: run_binary(http, url, frames, args.batch),
+            }
+            for name, fn in runs.items():
+                t0 = time.perf_counter()
+                sid, sent = fn()
+                elapsed = time.perf_counter() - t0
+                cb.frame_archives.close(sid)
+                written = sum(1 for _ in iter_session_frames(tmp / sid))
+                report[name] = {
+                    "frames_per_sec": round(len(frames) / elapsed, 1),
+                    "seconds": round(elapsed, 3),
+                    "bytes_sent": sent,
+                    "frames_written": written,
+                }
+    finally:
+        server.shutdown()
+
+    base = report["single"]["frames_per_sec"]
+    for r in report.values():
+        r["speedup_vs_single"] = round(r["frames_per_sec"] / base, 2) if base else None
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    jpg_kb = len(frames[0][1]) / 1024.0
+    print(f"== Ingest benchmark: {args.frames} frames of {jpg_kb:.1f} KB, batch={args.batch}")
+    for name, r in report.items():
+        print(
+            f"  {name:<9} {r['frames_per_sec']:>9} fps  {r['seconds']:>7}s  sent={r['bytes_sent'] / 1e6:.1f} MB  "
+            f"written={r['frames_written']}  x{r['speedup_vs_single']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+"""
+Model-service transport latency benchmark (offline):
+
+1) Start deploy_transformer.py with MODEL_TRANSPORT=shm (--model weights, or random weights
+   of the configured shape written to a temp file)
+2) Send the same 128-feature /predict request, one at a time, over:
+     - http-json : pooled keep-alive HTTP, JSON body (today's path)
+     - http-f32  : pooled keep-alive HTTP, raw float32 body (application/x-float32)
+     - shm-json  : shared-memory ring + Unix datagram doorbell, JSON body
+     - shm-f32   : shared-memory ring, raw float32 body
+3) Report p50/p99/mean round-trip latency per transport (client side, including inference)
+4) ALWAYS stop the spawned service
+
+Run:
+  uv run python scripts/benchmark_model_transport.py --requests 5000
+  uv run python scripts/benchmark_model_transport.py --model models/transformer/transformer_model_finetuned.pth
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+PROJECT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT))
+
+from deployment.feature_extractor import FEATURES_CONTENT_TYPE  # noqa: E402
+from deployment.model_proxy import ModelServiceClient  # noqa: E402
+from deployment.shm_transport import ShmModelClient, socket_path, supported  # noqa: E402
+
+TIMEOUT_START = 60.0
+
+
+def _random_weights(dest: Path) -> Path:
+    from models.transformer.checkpoint import save_model
+    from models.transformer.transformer_model import GameplayTransformer
+
+    actions = json.loads((PROJECT / "config" / "game_actions.json").read_text(encoding="utf-8"))["actions"]
+    model = GameplayTransformer(
+        int(os.environ.get("TRANSFORMER_INPUT_SIZE", "128")),
+        int(os.environ.get("TRANSFORMER_NUM_HEADS", "4")),
+        int(os.environ.get("TRANSFORMER_HIDDEN_SIZE", "64")),
+        int(os.environ.get("TRANSFORMER_NUM_LAYERS", "2")),
+        len(actions),
+    )
+    save_model(dest, model, [a["name"] for a in sorted(actions, key=lambda a: a["id"])])
+    return dest
+
+
+def _spawn_service(model: Path, port: int) -> subprocess.Popen:
+    env = os.environ.copy()
+    env["PYTHONUNBUFFERED"] = "1"
+    env["PYTHONPATH"] = str(PROJECT)
+    env["TRANSFORMER_MODEL_PATH"] = str(model.resolve())
+    env["TRANSFORMER_PORT"] = str(port)
+    env["TRANSFORMER_HOST"] = "127.0.0.1"
+    env["MODEL_TRANSPORT"] = "shm"
+    preexec = os.setsid if os.name != "nt" else None
+    return subprocess.Popen(
+        [sys.executable, str(PROJECT / "deployment" / "deploy_transformer.py")],
+        cwd=str(PROJECT),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        preexec_fn=preexec,
+    )
+
+
+def _terminate(proc: Optional[subprocess.Popen]) -> None:
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        if os.name != "nt":
+            os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+        else:
+            proc.terminate()
+        proc.wait(timeout=5)
+    except Exception:
+        proc.kill()
+
+
+def _wait_ready(port: int, timeout: float = TIMEOUT_START) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            r = requests.get(f"http://127.0.0.1:{port}/health", timeout=1.5)
+            if r.status_code == 200 and socket_path(port).exists():
+                return True
+        except Exception:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def _measure(client, body: bytes, content_type: str, n: int, warmup: int) -> Dict[str, float]:
+    lat: List[float] = []
+    for i in range(warmup + n):
+        t0 = time.perf_counter()
+        resp = client.forward("/predict", body, content_type)
+        data = resp.content
+        dt = (time.perf_counter() - t0) * 1000.0
+        if resp.status_code != 200:
+            raise RuntimeError(f"predict returned {resp.status_code}: {data[:200]!r}")
+        if i >= warmup:
+            lat.append(dt)
+    arr = np.asarray(lat, dtype=np.float64)
+    p50, p99 = np.percentile(arr, [50, 99])
+    return {"p50": round(float(p50), 3), "p99": round(float(p99), 3), "mean": round(float(arr.mean()), 3)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare HTTP and shared-memory transports to the model service")
+    ap.add_argument("--model", type=str, default=None, help="weights .pth (default: random weights)")
+    ap.add_argument("--port", type=int, default=5091)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--warmup", type=int, default=200)
+    ap.add_argument("--json", action="store_true", help="print the report as JSON only")
+    args = ap.parse_args()
+
+    if not supported():
+        print("[FAIL] the shared-memory transport needs AF_UNIX datagram sockets")
+        return 1
+
+    proc = None
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            model = Path(args.model) if args.model else _random_weights(Path(tmp) / "random.pth")
+            if not model.exists():
+                print(f"[FAIL] model not found: {model}")
+                return 1
+            proc = _spawn_service(model, args.port)
+            if not _wait_ready(args.port):
+                print(f"[FAIL] model service not ready on port {args.port}")
+                return 1
+
+            feats = np.random.default_rng(0).random(128, dtype=np.float32)
+            json_body = json.dumps({"features": feats.tolist()}).encode("utf-8")
+            f32_body = feats.astype("<f4").tobytes()
+            http = ModelServiceClient(f"http://127.0.0.1:{args.port}")
+            shm = ShmModelClient(ModelServiceClient(f"http://127.0.0.1:{args.port}"), socket_path(args.port))
+            report = {
+                "requests": args.requests,
+                "http-json": _measure(http, json_body, "application/json", args.requests, args.warmup),
+                "http-f32": _measure(http, f32_body, FEATURES_CONTENT_TYPE, args.requests, args.warmup),
+                "shm-json": _measure(shm, json_body, "application/json", args.requests, args.warmup),
+                "shm-f32": _measure(shm, f32_body, FEATURES_CONTENT_TYPE, args.requests, args.warmup),
+            }
+            report["shm_stats"] = shm.stats()
+            http.close()
+            shm.close()
+        finally:
+            _terminate(proc)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"== Model transport benchmark: {report['requests']} sequential /predict calls (128 features)")
+    for name in ("http-json", "http-f32", "shm-json", "shm-f32"):
+        r = report[name]
+        print(f"  {name:<9}  p50={r['p50']:.3f}ms  p99={r['p99']:.3f}ms  mean={r['mean']:.3f}ms")
+    print(f"  shm fallbacks to HTTP: {report['shm_stats']['fallbacks']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,255 @@
+"""
+Stream session load benchmark (offline):
+
+1) Optionally start deploy_transformer.py with the given weights (--model)
+2) Start N StreamManager sessions against a local frame source
+   (synthetic generator by default; video files / image dirs also work)
+3) After a warmup, measure for --duration seconds:
+     - sustained fps per session and in total
+     - end-to-end latency percentiles (frame read -> inference event)
+     - CPU per session thread, plus model-service CPU
+4) ALWAYS stop sessions and the spawned service
+
+Run:
+  uv run python scripts/benchmark_stream_sessions.py \
+      --model models/transformer/transformer_model_finetuned.pth --sessions 4
+  uv run python scripts/benchmark_stream_sessions.py --port 5001 --source file://data/sample.mp4?realtime=0
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import psutil
+import requests
+
+PROJECT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT))
+
+from deployment.stream_sessions import StreamManager  # noqa: E402
+
+TIMEOUT_START = 30.0
+
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+def _wait_health(port: int, timeout: float = TIMEOUT_START) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            r = requests.get(f"http://127.0.0.1:{port}/health", timeout=1.5)
+            if r.status_code == 200:
+                return True
+        except Exception:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def _spawn_service(model: Path, port: int) -> subprocess.Popen:
+    env = os.environ.copy()
+    env["PYTHONUNBUFFERED"] = "1"
+    env["PYTHONPATH"] = str(PROJECT)
+    env["TRANSFORMER_MODEL_PATH"] = str(model.resolve())
+    env["TRANSFORMER_PORT"] = str(port)
+    env["TRANSFORMER_HOST"] = "127.0.0.1"
+    preexec = os.setsid if os.name != "nt" else None
+    return subprocess.Popen(
+        [sys.executable, str(PROJECT / "deployment" / "deploy_transformer.py")],
+        cwd=str(PROJECT),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        preexec_fn=preexec,
+    )
+
+
+def _terminate(proc: Optional[subprocess.Popen]) -> None:
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        if os.name != "nt":
+            os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+        else:
+            proc.terminate()
+        proc.wait(timeout=5)
+    except Exception:
+        proc.kill()
+
+
+def _thread_cpu_seconds() -> Dict[int, float]:
+    """Native thread id -> user+system CPU seconds (Linux thread ids match threading.native_id)."""
+    try:
+        return {t.id: t.user_time + t.system_time for t in psutil.Process().threads()}
+    except Exception:
+        return {}
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    arr = np.asarray(values, dtype=np.float64)
+    p50, p90, p99 = np.percentile(arr, [50, 90, 99])
+    return {
+        "p50": round(float(p50), 2),
+        "p90": round(float(p90), 2),
+        "p99": round(float(p99), 2),
+        "max": round(float(arr.max()), 2),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Benchmark
+# -----------------------------------------------------------------------------
+def run_benchmark(
+    port: int,
+    sessions: int,
+    source: str,
+    duration: float,
+    warmup: float,
+    max_fps: float,
+    include_frames: bool,
+    service_pid: Optional[int] = None,
+) -> dict:
+    # the benchmark is the load; no admission budget here
+    manager = StreamManager(repo_root=PROJECT, tr_port=port, max_sessions=0, max_total_fps=0)
+    sess_list = [
+        manager.create_session(
+            f"bench_{i}", "infer", source, "transformer", include_frames=include_frames, max_fps=max_fps
+        )
+        for i in range(sessions)
+    ]
+
+    service_proc = psutil.Process(service_pid) if service_pid else None
+    try:
+        time.sleep(warmup)
+        for s in sess_list:
+            s.drain_events()
+
+        frames0 = {s.session_id: s.frames for s in sess_list}
+        cpu0 = _thread_cpu_seconds()
+        svc_cpu0 = sum(service_proc.cpu_times()[:2]) if service_proc else None
+        latencies: Dict[str, List[float]] = {s.session_id: [] for s in sess_list}
+        errors: Dict[str, int] = {s.session_id: 0 for s in sess_list}
+
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < duration:
+            time.sleep(0.1)
+            for s in sess_list:
+                for ev in s.drain_events():
+                    if ev.get("type") == "inference" and ev.get("latency_ms") is not None:
+                        latencies[s.session_id].append(float(ev["latency_ms"]))
+                    elif ev.get("type") == "error":
+                        errors[s.session_id] += 1
+        elapsed = time.perf_counter() - t0
+
+        cpu1 = _thread_cpu_seconds()
+        svc_cpu1 = sum(service_proc.cpu_times()[:2]) if service_proc else None
+
+        per_session = []
+        for s in sess_list:
+            tid = s._thread.native_id if s._thread is not None else None
+            cpu_s = (cpu1.get(tid, 0.0) - cpu0.get(tid, 0.0)) if tid in cpu1 else None
+            per_session.append(
+                {
+                    "session_id": s.session_id,
+                    "status": s.status,
+                    "fps": round((s.frames - frames0[s.session_id]) / elapsed, 2),
+                    "latency_ms": _percentiles(latencies[s.session_id]),
+                    "cpu_percent": round(100.0 * cpu_s / elapsed, 1) if cpu_s is not None else None,
+                    "errors": errors[s.session_id],
+                    "last_error": s.last_error,
+                }
+            )
+
+        all_lat = [v for vals in latencies.values() for v in vals]
+        return {
+            "sessions": sessions,
+            "source": source,
+            "duration_sec": round(elapsed, 2),
+            "total_fps": round(sum(p["fps"] for p in per_session), 2),
+            "latency_ms": _percentiles(all_lat),
+            "service_cpu_percent": (
+                round(100.0 * (svc_cpu1 - svc_cpu0) / elapsed, 1) if svc_cpu0 is not None else None
+            ),
+            "per_session": per_session,
+        }
+    finally:
+        for s in sess_list:
+            s.stop()
+        for s in sess_list:
+            if s._thread is not None:
+                s._thread.join(timeout=5)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark N concurrent stream sessions against a model service")
+    ap.add_argument("--model", type=str, default=None, help="weights .pth; spawns deploy_transformer.py on --port")
+    ap.add_argument("--port", type=int, default=int(os.environ.get("TRANSFORMER_PORT", "5001")))
+    ap.add_argument("--sessions", type=int, default=4)
+    ap.add_argument("--source", type=str, default="synthetic://?w=640&h=360&fps=0")
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--warmup", type=float, default=3.0)
+    ap.add_argument("--max-fps", type=float, default=0.0, help="per-session cap; 0 = unthrottled")
+    ap.add_argument("--include-frames", action="store_true", help="also encode preview thumbnails")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON only")
+    args = ap.parse_args()
+
+    proc = None
+    try:
+        if args.model:
+            model = Path(args.model)
+            if not model.exists():
+                print(f"[FAIL] model not found: {model}")
+                return 1
+            proc = _spawn_service(model, args.port)
+        if not _wait_health(args.port, timeout=TIMEOUT_START if proc else 2.0):
+            print(f"[FAIL] model service not healthy on port {args.port}")
+            return 1
+
+        report = run_benchmark(
+            port=args.port,
+            sessions=args.sessions,
+            source=args.source,
+            duration=args.duration,
+            warmup=args.warmup,
+            max_fps=args.max_fps,
+            include_frames=args.include_frames,
+            service_pid=proc.pid if proc else None,
+        )
+
+        if args.json:
+            print(json.dumps(report, indent=2))
+            return 0
+
+        lat = report["latency_ms"]
+        print(
+            f"== Stream benchmark: {report['sessions']} sessions, {report['duration_sec']}s, "
+            f"source={report['source']}"
+        )
+        print(f"total fps: {report['total_fps']}")
+        print(f"latency ms: p50={lat['p50']} p90={lat['p90']} p99={lat['p99']} max={lat['max']}")
+        if report["service_cpu_percent"] is not None:
+            print(f"model service cpu: {report['service_cpu_percent']}%")
+        for p in report["per_session"]:
+            print(
+                f"  {p['session_id']}: fps={p['fps']} p50={p['latency_ms']['p50']}ms p99={p['latency_ms']['p99']}ms "
+                f"cpu={p['cpu_percent']}% errors={p['errors']} status={p['status']}"
+            )
+        return 0
+    finally:
+        _terminate(proc)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
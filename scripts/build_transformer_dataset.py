@@ -4,10 +4,13 @@
 This script:
 1. 读取所有数据集CSV（帧路径 + 动作ID）
 2. 从图像中提取特征向量
-3. 生成Transformer训练所需的CSV格式（特征列 + action列）
+3. 生成Transformer训练所需的CSV格式（特征列 + action列），或 --format binary 写入可内存映射的
+   二进制数据集目录（models/transformer/dataset_store.py，训练时无需解析文本）
 
 Usage:
     python scripts/build_transformer_dataset.py --input "data/processed/datasets/*.csv" --output "data/processed/transformer_dataset.csv"
+    python scripts/build_transformer_dataset.py --input "data/processed/datasets/*.csv" \\
+        --output "data/processed/transformer_dataset.agbds" --format binary
 """
 
 import cv2
@@ -18,6 +21,11 @@ import argparse
 import logging
 from tqdm import tqdm
 import glob
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.transformer.dataset_store import DatasetWriter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -59,15 +67,19 @@ def extract_image_features(image_path, target_size=(84, 84)):
         return np.zeros(target_size[0] * target_size[1] * 3, dtype=np.float32)
 
 
-def build_dataset(dataset_paths, output_path, target_size=(84, 84), max_samples=None):
+def build_dataset(dataset_paths, output_path, target_size=(84, 84), max_samples=None, output_format="csv"):
     """
     构建Transformer训练数据集
     
     Args:
         dataset_paths: 数据集CSV路径列表（或glob模式）
-        output_path: 输出CSV路径
+        output_path: 输出CSV路径（binary 格式为输出目录）
         target_size: 图像目标尺寸
         max_samples: 最大样本数（用于测试）
+        output_format: "csv" 或 "binary"（逐帧写入，不在内存中保留整个特征矩阵）
+
+    Returns:
+        csv: 特征DataFrame；binary: 数据集清单 (manifest)
     """
     # 收集所有CSV文件
     if isinstance(dataset_paths, str):
@@ -100,6 +112,31 @@ def build_dataset(dataset_paths, output_path, target_size=(84, 84), max_samples=
     feature_dim = target_size[0] * target_size[1] * 3
     logger.info(f"特征维度: {feature_dim}")
     
+    # 创建列名：feature_0, feature_1, ..., feature_N, action
+    feature_columns = [f'feature_{i}' for i in range(feature_dim)]
+
+    if output_format == "binary":
+        logger.info("开始提取图像特征（二进制输出）...")
+        writer = DatasetWriter(output_path, feature_columns, source="build_transformer_dataset")
+        try:
+            block, labels = [], []
+            for _, row in tqdm(combined_df.iterrows(), total=len(combined_df), desc="提取特征"):
+                block.append(extract_image_features(Path(row['frame_path']), target_size))
+                labels.append(int(row['action_id']))
+                if len(block) == 256:  # 按块写入 / write in blocks
+                    writer.append(np.stack(block), labels)
+                    block, labels = [], []
+            if block:
+                writer.append(np.stack(block), labels)
+        except BaseException:
+            writer.abort()
+            raise
+        manifest = writer.close()
+        logger.info(f"数据集构建完成！保存到: {output_path}")
+        logger.info(f"形状: ({manifest['rows']}, {manifest['feature_count']})")
+        logger.info(f"动作分布: {manifest['class_counts']}")
+        return manifest
+
     features_list = []
     actions_list = []
     
@@ -118,9 +155,6 @@ def build_dataset(dataset_paths, output_path, target_size=(84, 84), max_samples=
     logger.info("构建特征DataFrame...")
     features_array = np.array(features_list)
     
-    # 创建列名：feature_0, feature_1, ..., feature_N, action
-    feature_columns = [f'feature_{i}' for i in range(feature_dim)]
-    
     # 构建DataFrame
     df_features = pd.DataFrame(features_array, columns=feature_columns)
     df_features['action'] = actions_list
@@ -150,6 +184,10 @@ def main():
   
   # 指定图像尺寸
   python scripts/build_transformer_dataset.py --input "data/processed/datasets/*.csv" --output "data/processed/transformer_dataset.csv" --image-size 64
+
+  # 二进制格式（训练时内存映射，无需解析CSV）
+  python scripts/build_transformer_dataset.py --input "data/processed/datasets/*.csv" \\
+    --output "data/processed/transformer_dataset.agbds" --format binary
         """
     )
     
@@ -174,6 +212,12 @@ def main():
         type=int,
         help="最大样本数（用于快速测试）"
     )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "binary"],
+        default="csv",
+        help="输出格式：csv 或 binary（可内存映射的数据集目录，见 models/transformer/dataset_store.py）"
+    )
     
     args = parser.parse_args()
     
@@ -185,7 +229,8 @@ def main():
         args.input,
         output_path,
         target_size=target_size,
-        max_samples=args.max_samples
+        max_samples=args.max_samples,
+        output_format=args.format
     )
 
 
@@ -24,6 +24,7 @@ from collections import deque
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from models.transformer.checkpoint import load_model
 from models.transformer.transformer_model import GameplayTransformer
 from scripts.input_mapping import get_action_mapper
 import mss
@@ -46,8 +47,8 @@ class RealtimeGameController:
         Args:
             model_path: 模型路径
             config_path: 游戏动作配置路径
-            input_size: 输入特征维度
-            output_size: 输出动作数
+            input_size: 输入特征维度（可映射检查点自带架构时忽略）
+            output_size: 输出动作数（同上）
             image_size: 图像尺寸
             fps: 预测频率（每秒多少次）
             confidence_threshold: 动作执行的置信度阈值
@@ -62,23 +63,23 @@ class RealtimeGameController:
         
         # 加载模型
         logger.info(f"加载模型: {model_path}")
-        self.model = GameplayTransformer(
-            input_size=input_size,
-            output_size=output_size,
-            num_heads=num_heads,
-            hidden_size=hidden_size,
-            num_layers=num_layers
-        )
-        state_dict = torch.load(model_path, map_location=self.device)
-        self.model.load_state_dict(state_dict)
-        self.model = self.model.to(self.device)
-        self.model.eval()
+        architecture = {
+            "input_size": input_size,
+            "output_size": output_size,
+            "num_heads": num_heads,
+            "hidden_size": hidden_size,
+            "num_layers": num_layers,
+        }
+        # 零拷贝加载，哈希在后台校验 / zero-copy load, hash checked in the background
+        self.model, self.checkpoint = load_model(model_path, GameplayTransformer, self.device, architecture)
         logger.info("✅ 模型加载成功")
         
-        # 加载动作映射
+        # 加载动作映射（优先使用检查点中的动作表）
         with open(config_path, 'r', encoding='utf-8') as f:
             config = json.load(f)
         self.action_mapping = {action['id']: action['name'] for action in config['actions']}
+        if self.checkpoint is not None and self.checkpoint.actions:
+            self.action_mapping = dict(enumerate(self.checkpoint.actions))
         logger.info(f"加载了 {len(self.action_mapping)} 个动作")
         
         # 初始化输入映射器
@@ -24,28 +24,26 @@ logger = logging.getLogger(__name__)
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from models.transformer.checkpoint import load_model as load_checkpoint_model
 from models.transformer.transformer_model import GameplayTransformer
 
 
 def load_model(model_path, input_size, output_size, num_heads=4, hidden_size=256, num_layers=3, device='cuda'):
-    """加载训练好的模型"""
+    """加载训练好的模型（可映射检查点自带架构并先校验哈希；旧 .pth 使用传入的参数）"""
     logger.info(f"加载模型: {model_path}")
     logger.info(f"参数: input_size={input_size}, output_size={output_size}, num_heads={num_heads}, hidden_size={hidden_size}, num_layers={num_layers}")
     
-    # 创建模型
-    model = GameplayTransformer(
-        input_size=input_size,
-        output_size=output_size,
-        num_heads=num_heads,
-        hidden_size=hidden_size,
-        num_layers=num_layers
-    )
-    
-    # 加载权重
-    state_dict = torch.load(model_path, map_location=device)
-    model.load_state_dict(state_dict)
-    model = model.to(device)
-    model.eval()
+    # 创建模型并加载权重（评估前校验检查点哈希）
+    architecture = {
+        "input_size": input_size,
+        "output_size": output_size,
+        "num_heads": num_heads,
+        "hidden_size": hidden_size,
+        "num_layers": num_layers,
+    }
+    model, ckpt = load_checkpoint_model(model_path, GameplayTransformer, device, architecture, verify="now")
+    if ckpt is not None:
+        logger.info(f"检查点架构: {ckpt.architecture} (sha256 {ckpt.sha256[:12]} 已校验)")
     
     logger.info("✅ 模型加载成功")
     return model
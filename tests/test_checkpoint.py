@@ -0,0 +1,119 @@
+"""
+Tests for the memory-mappable Transformer checkpoint format
+"""
+
+import os
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.transformer.checkpoint import (
+    CheckpointError,
+    build_model,
+    is_checkpoint,
+    load_model,
+    load_state_dict,
+    open_checkpoint,
+    save_model,
+)
+from models.transformer.transformer_model import GameplayTransformer
+
+ARCH = {"input_size": 16, "num_heads": 2, "hidden_size": 8, "num_layers": 1, "output_size": 5}
+ACTIONS = ["idle", "left", "right", "jump", "fire"]
+
+
+@pytest.fixture
+def trained(tmp_path):
+    torch.manual_seed(0)
+    model = GameplayTransformer(**ARCH).eval()
+    path = tmp_path / "model.pth"
+    save_model(path, model, ACTIONS, {"length": 16, "dtype": "float32"}, meta={"epoch": 3})
+    return model, path
+
+
+class TestCheckpoint:
+    """Test round trips, zero-copy loading, lazy hash checks and the pickled .pth fallback."""
+
+    def test_round_trip_brings_architecture(self, trained):
+        model, path = trained
+        assert is_checkpoint(path)
+        ckpt = open_checkpoint(path)
+        assert ckpt.architecture == ARCH and ckpt.actions == ACTIONS and ckpt.meta == {"epoch": 3}
+        assert ckpt.verified is None  # nothing hashed yet
+
+        # the caller's architecture is ignored in favour of the file's
+        loaded, ckpt = load_model(path, GameplayTransformer, architecture=dict(ARCH, hidden_size=64), verify="skip")
+        assert loaded.architecture == ARCH
+        x = torch.randn(3, 4, 16)
+        with torch.no_grad():
+            assert torch.allclose(model(x), loaded(x))
+        for name, t in ckpt.header["tensors"].items():
+            assert (ckpt.data_start + t["offset"]) % 64 == 0, name
+
+    def test_tensors_are_views_on_the_mapping(self, trained):
+        _, path = trained
+        before = path.read_bytes()
+        state, ckpt = load_state_dict(path)
+        mapped = torch.frombuffer(ckpt._map, dtype=torch.uint8)
+        lo, hi = mapped.data_ptr(), mapped.data_ptr() + mapped.numel()
+        assert all(lo <= t.data_ptr() < hi for t in state.values() if t.numel())
+
+        model = build_model(GameplayTransformer, ckpt.architecture, state)
+        assert model.fc.weight.requires_grad and model.fc.weight.data_ptr() == state["fc.weight"].data_ptr()
+        with torch.no_grad():
+            model.fc.weight.add_(1.0)  # copy-on-write: the file is untouched
+        assert path.read_bytes() == before and ckpt.verify()
+
+    def test_build_without_assign_copies_strictly(self, trained, monkeypatch):
+        import models.transformer.checkpoint as checkpoint
+
+        model, path = trained
+        monkeypatch.setattr(checkpoint, "_can_assign", lambda: False)  # torch 2.0.x
+        state, ckpt = load_state_dict(path)
+        built = build_model(GameplayTransformer, ckpt.architecture, state)
+        assert torch.equal(built.fc.weight, model.fc.weight)
+        assert built.fc.weight.data_ptr() != state["fc.weight"].data_ptr()
+        state.pop("fc.bias")
+        with pytest.raises(RuntimeError):
+            build_model(GameplayTransformer, ckpt.architecture, state)
+
+    def test_lazy_verify_detects_corruption(self, trained):
+        _, path = trained
+        ckpt = open_checkpoint(path)
+        with open(path, "r+b") as f:
+            f.seek(ckpt.data_start + ckpt.header["tensors"]["fc.bias"]["offset"])
+            f.write(b"\xff\xff\xff\xff")
+
+        loaded, ckpt = load_model(path, GameplayTransformer, verify="skip")  # still loads
+        results = []
+        ckpt.verify_async(results.append).join(timeout=10)
+        assert results == [False] and ckpt.verified is False
+        with pytest.raises(CheckpointError):
+            load_model(path, GameplayTransformer, verify="now")
+
+    def test_pickled_pth_and_bad_files(self, tmp_path):
+        model = GameplayTransformer(**ARCH)
+        legacy = tmp_path / "legacy.pth"
+        torch.save({"state_dict": model.state_dict()}, legacy)
+        assert not is_checkpoint(legacy)
+
+        state, ckpt = load_state_dict(legacy)
+        assert ckpt is None and set(state) == set(model.state_dict())
+        loaded, _ = load_model(legacy, GameplayTransformer, architecture=ARCH)
+        assert torch.equal(loaded.fc.weight, model.fc.weight)
+        with pytest.raises(CheckpointError):
+            load_model(legacy, GameplayTransformer)  # no architecture to build from
+
+        truncated = tmp_path / "truncated.pth"
+        save_model(truncated, model)
+        truncated.write_bytes(truncated.read_bytes()[:-100])
+        with pytest.raises(CheckpointError):
+            open_checkpoint(truncated)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
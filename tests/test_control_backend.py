@@ -0,0 +1,708 @@
+"""
+Integration tests for the Control Backend (Flask test client, no model service)
+"""
+
+import base64
+import io
+import itertools
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("flask")
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import deployment.control_backend as cb
+from deployment.frame_archive import FrameArchive
+
+
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    """The backend app; the first create_app() starts the background services for the session."""
+    app = cb.create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as c:
+        yield c
+
+
+@pytest.fixture(autouse=True)
+def registries(monkeypatch, tmp_path):
+    """Session/job registries on a per-test database (nothing written to data/processed)."""
+    from deployment.record_store import RecordDB, RecordRegistry
+
+    db = RecordDB(tmp_path / "registry.sqlite3")
+    regs = {
+        "capture_sessions": RecordRegistry(db, "capture", terminal=("stopped",), on_evict=cb._forget_capture),
+        "job_registry": RecordRegistry(db, "job", terminal=cb._TERMINAL_JOB_STATES, on_evict=cb._drop_job_log),
+        "stream_history": RecordRegistry(
+            db, "stream", terminal=("stopped", "error", "interrupted"), time_key="started_at"
+        ),
+    }
+    for name, reg in regs.items():
+        monkeypatch.setattr(cb, name, reg)
+    yield regs
+    db.close()
+
+
+@pytest.fixture
+def stream_manager(monkeypatch, tmp_path, registries):
+    """Fresh manager with a small budget so tests don't share sessions."""
+    from deployment.stream_sessions import StreamManager, StreamResolver
+
+    mgr = StreamManager(
+        tmp_path,
+        tr_port=1,
+        resolver=StreamResolver(resolve_fn=lambda u: u),
+        max_sessions=2,
+        max_total_fps=10,
+        history=registries["stream_history"],
+    )
+    monkeypatch.setattr(cb, "stream_manager", mgr)
+    yield mgr
+    mgr.stop_all()
+
+
+class TestStreamEndpoints:
+    """Test stream session lifecycle endpoints."""
+
+    def test_start_list_stop(self, client, stream_manager):
+        r = client.post("/api/stream/start", json={"url": "synthetic://?w=32&h=16&fps=0", "max_fps": 4})
+        assert r.status_code == 200
+        sid = r.get_json()["session"]["session_id"]
+
+        listing = client.get("/api/stream/sessions").get_json()
+        assert sid in listing["sessions"]
+        assert listing["capacity"]["fps_in_use"] == 4
+
+        assert client.get(f"/api/stream/{sid}").status_code == 200
+        assert client.post("/api/stream/stop", json={"session_id": sid}).status_code == 200
+        assert client.post("/api/stream/stop", json={"session_id": "nope"}).status_code == 404
+
+        stream_manager.get_session(sid)._thread.join(timeout=10)
+        stream_manager.stopped_ttl = 0
+        assert sid not in client.get("/api/stream/sessions").get_json()["sessions"]  # live set pruned
+        assert client.get(f"/api/stream/{sid}").get_json()["status"] == "stopped"  # from history
+        history = client.get("/api/stream/history?status=stopped").get_json()
+        assert history["total"] == 1 and history["sessions"][0]["running"] is False
+
+    def test_capacity_limits(self, client, stream_manager):
+        ok = client.post("/api/stream/start", json={"url": "synthetic://", "max_fps": 6})
+        assert ok.status_code == 200
+
+        over_fps = client.post("/api/stream/start", json={"url": "synthetic://", "max_fps": 6})
+        assert over_fps.status_code == 429
+
+        unthrottled = client.post("/api/stream/start", json={"url": "synthetic://", "max_fps": 0})
+        assert unthrottled.status_code == 429
+
+        assert client.post("/api/stream/start", json={"url": "synthetic://", "max_fps": 2}).status_code == 200
+        assert client.post("/api/stream/start", json={"url": "synthetic://", "max_fps": 1}).status_code == 429
+
+    def test_invalid_source_rejected(self, client, stream_manager):
+        r = client.post("/api/stream/start", json={"url": "ftp://nowhere"})
+        assert r.status_code == 400
+
+    def test_session_ids_are_checked(self, client, stream_manager):
+        for sid in ("x/../../../../../tmp/evil", "a b", "x" * 65, ["a"]):
+            r = client.post("/api/stream/start", json={"url": "synthetic://", "mode": "train", "session_id": sid})
+            assert r.status_code == 400
+        assert not stream_manager.list_sessions()
+
+    def test_local_sources_need_allowed_root(self, client, stream_manager, monkeypatch, tmp_path):
+        allowed = tmp_path / "videos"
+        (allowed / "frames").mkdir(parents=True)
+        secret = tmp_path / "secret"
+        secret.mkdir()
+
+        monkeypatch.setattr(cb, "STREAM_LOCAL_ROOT", "")
+        for url in (f"dir://{allowed / 'frames'}", str(allowed / "frames"), f"file://{allowed}/clip.mp4"):
+            assert client.post("/api/stream/start", json={"url": url}).status_code == 400
+
+        monkeypatch.setattr(cb, "STREAM_LOCAL_ROOT", str(allowed))
+        for url in (f"dir://{secret}", f"dir://{allowed}/../secret", str(secret)):
+            assert client.post("/api/stream/start", json={"url": url}).status_code == 400
+        r = client.post("/api/stream/start", json={"url": f"dir://{allowed / 'frames'}", "max_fps": 1})
+        assert r.status_code == 200
+
+    def test_events_are_streamed(self, client, stream_manager):
+        sid = client.post("/api/stream/start", json={"url": "synthetic://?w=32&h=16", "max_fps": 4}).get_json()[
+            "session"
+        ]["session_id"]
+
+        r = client.get(f"/api/stream/events/{sid}")
+        assert r.mimetype == "text/event-stream"
+        assert r.headers["X-Accel-Buffering"] == "no"
+
+        chunks = list(itertools.islice(r.response, 2))
+        first = json.loads(chunks[0].decode().split("data: ", 1)[1])
+        assert first["type"] == "hello"
+        r.close()
+
+
+@pytest.fixture
+def raw_dir(monkeypatch, tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    monkeypatch.setattr(cb, "RAW_DIR", raw)
+    return raw
+
+
+def _jpeg_dataurl():
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 8), color=(1, 2, 3)).save(buf, format="JPEG")
+    return buf.getvalue(), "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+class TestCaptureEndpoints:
+    """Test capture ingestion endpoints."""
+
+    def test_ingest_frame_is_written_behind(self, client, raw_dir):
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        jpg, dataurl = _jpeg_dataurl()
+
+        r = client.post("/api/ingest_frame", json={"session_id": sid, "image": dataurl, "timestamp": 1000})
+        assert r.status_code == 200
+        assert r.get_json()["status"] == "queued"
+
+        r = client.post("/api/stop_capture", json={"session_id": sid})
+        assert r.status_code == 200
+        assert r.get_json()["frames_stored"] == 1
+        # stored untouched (JPEG pass-through)
+        assert FrameArchive(raw_dir / sid).get(1000) == jpg
+
+        metrics = client.get("/api/metrics").get_json()
+        assert "queue_depth" in metrics["ingest"]
+
+    def test_ingest_frame_queue_full_returns_429(self, client, raw_dir, monkeypatch):
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        monkeypatch.setattr(cb.ingest_writer, "submit", lambda *a, **k: False)
+
+        r = client.post("/api/ingest_frame", json={"session_id": sid, "image": _jpeg_dataurl()[1]})
+        assert r.status_code == 429
+        assert r.headers["Retry-After"] == "1"
+
+    def test_ingest_frame_rejects_bad_dataurl(self, client, raw_dir):
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        r = client.post("/api/ingest_frame", json={"session_id": sid, "image": "data:image/jpeg;base64"})
+        assert r.status_code == 400
+
+    def test_bulk_frames_binary_and_multipart(self, client, raw_dir):
+        from deployment.ingest_writer import pack_frames
+
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        jpg, _ = _jpeg_dataurl()
+
+        r = client.post(
+            f"/api/ingest_frames?session_id={sid}",
+            data=pack_frames([(10, jpg), (11, jpg)]),
+            content_type="application/octet-stream",
+        )
+        assert r.status_code == 200 and r.get_json()["accepted"] == 2
+
+        r = client.post(
+            f"/api/ingest_frames?session_id={sid}",
+            data={"frames": [(io.BytesIO(jpg), "a.jpg"), (io.BytesIO(jpg), "b.jpg")], "timestamps": "[20, 21]"},
+            content_type="multipart/form-data",
+        )
+        assert r.status_code == 200 and r.get_json()["accepted"] == 2
+
+        client.post("/api/stop_capture", json={"session_id": sid})
+        assert FrameArchive(raw_dir / sid).timestamps().tolist() == [10, 11, 20, 21]
+        assert not (raw_dir / sid / "frames").exists()
+        assert cb.capture_sessions.get(sid)["frames"] == 4
+
+    def test_stop_capture_exports_in_background(self, client, raw_dir):
+        import zipfile
+
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        jpg, dataurl = _jpeg_dataurl()
+        client.post("/api/ingest_frame", json={"session_id": sid, "image": dataurl, "timestamp": 7})
+        client.post("/api/ingest_input", json={"session_id": sid, "keys": ["w"], "timestamp": 7})
+
+        # streamed on the fly while no finished export exists
+        r = client.get(f"/api/export/{sid}")
+        assert r.status_code == 200 and r.mimetype == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(r.get_data())) as z:
+            assert {"frames.pack", "frames.idx", "inputs.jsonl"} <= set(z.namelist())
+
+        body = client.post("/api/stop_capture", json={"session_id": sid}).get_json()
+        assert body["export"]["status"] in ("queued", "running", "completed")
+        assert cb.session_exports.wait(sid, timeout=30)
+        status = client.get(f"/api/export_status/{sid}").get_json()
+        assert status["status"] == "completed" and status["progress"] == 1.0
+        with zipfile.ZipFile(raw_dir / f"{sid}.zip") as z:
+            assert z.getinfo("frames.pack").compress_type == zipfile.ZIP_STORED
+
+        assert client.get(f"/api/export/{sid}").status_code == 200
+        assert client.get("/api/export/sess_missing").status_code == 404
+        assert client.get("/api/export_status/sess_missing").status_code == 404
+
+    def test_multipart_timestamps_from_frame_names(self, client, raw_dir, monkeypatch):
+        monkeypatch.setattr(cb.time, "time", lambda: 5.0)  # default_ts = 5000
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        jpg, _ = _jpeg_dataurl()
+        names = ["frame_1712345.jpg", "cam2_frame_1712346.jpg", "shot.jpg"]
+        r = client.post(
+            f"/api/ingest_frames?session_id={sid}",
+            data={"frames": [(io.BytesIO(jpg), n) for n in names]},
+            content_type="multipart/form-data",
+        )
+        assert r.status_code == 200 and r.get_json()["accepted"] == 3
+        client.post("/api/stop_capture", json={"session_id": sid, "export": False})
+        assert FrameArchive(raw_dir / sid).timestamps().tolist() == [5001, 5002, 1712345]
+
+    def test_frames_count_stored_and_stop_closes_ingest(self, client, raw_dir):
+        from deployment.ingest_writer import pack_frames
+
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        jpg, dataurl = _jpeg_dataurl()
+        client.post("/api/ingest_frame", json={"session_id": sid, "image": dataurl, "timestamp": 1})
+        not_an_image = "data:image/png;base64,bm90IGFuIGltYWdl"
+        bad = client.post("/api/ingest_frame", json={"session_id": sid, "image": not_an_image})
+        assert bad.status_code == 200  # accepted, then fails to decode on the writer
+
+        client.post("/api/stop_capture", json={"session_id": sid})
+        assert cb.capture_sessions.get(sid)["frames"] == 1
+
+        r = client.post("/api/ingest_frame", json={"session_id": sid, "image": dataurl, "timestamp": 2})
+        assert r.status_code == 409
+        r = client.post(
+            f"/api/ingest_frames?session_id={sid}",
+            data=pack_frames([(3, jpg)]),
+            content_type="application/octet-stream",
+        )
+        assert r.status_code == 409
+        with pytest.raises(ValueError):
+            cb.frame_archives.get(sid, raw_dir / sid)  # a straggler cannot reopen the archive
+        assert FrameArchive(raw_dir / sid).timestamps().tolist() == [1]
+
+    def test_per_file_storage_mode(self, client, raw_dir, monkeypatch):
+        from deployment.frame_archive import iter_session_frames
+
+        monkeypatch.setattr(cb, "CAPTURE_STORAGE", "files")
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        jpg, dataurl = _jpeg_dataurl()
+        client.post("/api/ingest_frame", json={"session_id": sid, "image": dataurl, "timestamp": 5})
+
+        client.post("/api/stop_capture", json={"session_id": sid})
+        assert (raw_dir / sid / "frames" / "frame_5.jpg").read_bytes() == jpg
+        assert list(iter_session_frames(raw_dir / sid)) == [(5, jpg)]
+
+    def test_bulk_frames_rejects_truncated_stream(self, client, raw_dir):
+        from deployment.ingest_writer import pack_frames
+
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        body = pack_frames([(1, b"\xff\xd8\xffabc"), (2, b"\xff\xd8\xffdef")])[:-1]
+        r = client.post(f"/api/ingest_frames?session_id={sid}", data=body, content_type="application/octet-stream")
+        assert r.status_code == 400
+        assert r.get_json()["accepted"] == 1
+
+    def test_input_batch_and_single(self, client, raw_dir):
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+
+        r = client.post("/api/ingest_input", json={"session_id": sid, "keys": ["w"], "timestamp": 1})
+        assert r.status_code == 200
+        r = client.post(
+            "/api/ingest_input_batch",
+            json={"session_id": sid, "events": [{"keys": ["a"], "timestamp": 2}, {"keys": [], "timestamp": 3}]},
+        )
+        assert r.status_code == 200 and r.get_json()["count"] == 2
+
+        bad = client.post("/api/ingest_input_batch", json={"session_id": sid, "events": [{"keys": "w"}]})
+        assert bad.status_code == 400
+        assert cb.capture_sessions.get(sid)["inputs"] == 3  # current while recording
+
+        assert client.post("/api/stop_capture", json={"session_id": sid}).status_code == 200
+        lines = (raw_dir / sid / "inputs.jsonl").read_text().splitlines()
+        assert [json.loads(line)["timestamp"] for line in lines] == [1, 2, 3]
+        session = cb.capture_sessions.get(sid)
+        assert session["inputs"] == 3 and session["status"] == "stopped"
+        assert client.get("/api/sessions?status=stopped").get_json()["sessions"][0]["session_id"] == sid
+        assert client.get("/api/sessions?status=recording").get_json()["total"] == 0
+
+    def test_inputs_rejected_after_stop(self, client, raw_dir):
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        client.post("/api/ingest_input", json={"session_id": sid, "keys": ["w"], "timestamp": 1})
+        client.post("/api/stop_capture", json={"session_id": sid, "export": False})
+
+        assert client.post("/api/ingest_input", json={"session_id": sid, "keys": ["a"]}).status_code == 409
+        r = client.post("/api/ingest_input_batch", json={"session_id": sid, "events": [{"keys": ["a"]}]})
+        assert r.status_code == 409
+        with pytest.raises(ValueError):
+            cb.input_logs.get(sid, raw_dir / sid / "inputs.jsonl")  # a straggler cannot reopen the log
+        assert sid not in cb.input_logs._logs
+        assert (raw_dir / sid / "inputs.jsonl").read_text().count("\n") == 1
+        assert cb.capture_sessions.get(sid)["inputs"] == 1
+
+    def test_closed_markers_leave_with_the_session_record(self, client, raw_dir):
+        import time
+
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        client.post("/api/stop_capture", json={"session_id": sid, "export": False})
+        assert sid in cb.input_logs._closed and sid in cb.frame_archives._closed
+
+        sessions = cb.capture_sessions
+        sessions.evict(now=time.time() + sessions.ttl_sec + 1)
+        assert sid not in cb.input_logs._closed and sid not in cb.frame_archives._closed
+        # the stored record still refuses stragglers
+        assert client.post("/api/ingest_input", json={"session_id": sid, "keys": ["a"]}).status_code == 409
+        r = client.post("/api/ingest_frame", json={"session_id": sid, "image": _jpeg_dataurl()[1]})
+        assert r.status_code == 409
+
+
+class TestPredictProxy:
+    """Test /api/predict forwarding through the replica pool."""
+
+    def test_predict_streams_upstream_body(self, client, monkeypatch):
+        from deployment.model_proxy import ModelServiceClient
+        from deployment.replica_pool import Replica, ReplicaPool
+
+        mc = ModelServiceClient("http://model.invalid")
+        idle = Replica("idle", "http://idle.invalid")
+        pool = ReplicaPool([Replica("busy", "http://model.invalid", client=mc), idle])
+        busy = pool.replicas[0]
+        busy.health.report_success()
+        monkeypatch.setattr(cb, "model_pool", pool)
+
+        sent = {}
+
+        class _Raw:
+            def stream(self, n, decode_content=False):
+                yield b'{"action":'
+                yield b'"attack"}'
+
+            def release_conn(self):
+                sent["released"] = True
+
+        class _Resp:
+            status_code = 200
+            headers = {"Content-Type": "application/json"}
+            raw = _Raw()
+
+            def close(self):
+                pass
+
+        def fake_forward(path, body, content_type="application/json", timeout=None):
+            sent.update(path=path, body=body)
+            return _Resp()
+
+        monkeypatch.setattr(mc, "forward", fake_forward)
+        r = client.post("/api/predict", data=b'{"features": [1, 2]}', content_type="application/json")
+        assert r.status_code == 200
+        assert r.get_data() == b'{"action":"attack"}'
+        assert r.headers["X-Active-Model"] == "transformer" and "X-Router-Latency-Ms" in r.headers
+        assert r.headers["X-Model-Replica"] == "busy"
+        assert sent["body"] == b'{"features": [1, 2]}' and sent["path"] == "/predict" and sent["released"]
+        assert busy.outstanding == 0 and busy.requests == 1  # slot returned once the body was relayed
+
+        idle.health.report_success()
+        held = pool.acquire(exclude=[idle])  # one request in flight on busy: the session lands on idle
+        monkeypatch.setattr(idle.client, "forward", fake_forward)
+        r = client.post("/api/predict?session_id=s1", data=b"{}", content_type="application/json")
+        assert r.headers["X-Model-Replica"] == "idle" and r.get_data() == b'{"action":"attack"}'
+        pool.release(held)
+        r = client.post("/api/predict", data=b"{}", headers={"X-Session-Id": "s1"}, content_type="application/json")
+        assert r.headers["X-Model-Replica"] == "idle" and r.get_data() and pool.affinity_hits == 1
+        assert idle.outstanding == 0
+
+        assert client.post("/api/predict", data=b"[1]", content_type="application/json").status_code == 400
+
+    def test_status_uses_cached_health(self, client, monkeypatch):
+        from deployment.replica_pool import Replica, ReplicaPool
+
+        local = cb.model_pool.local[0]
+        pool = ReplicaPool(
+            [
+                Replica(local.name, local.base_url, port=local.port, supervisor=local.supervisor),
+                Replica("remote", "http://model.invalid"),
+            ]
+        )
+        monkeypatch.setattr(cb, "model_pool", pool)
+        for r in pool.replicas:
+            monkeypatch.setattr(r.health, "check_now", lambda: pytest.fail("status must not probe"))
+        body = client.get("/api/status").get_json()
+        assert body["transformer_running"] is False and body["transformer_health"]["state"] == "unknown"
+        replicas = body["transformer_replicas"]["replicas"]
+        assert [(r["name"], r["local"], r["outstanding"]) for r in replicas] == [
+            (f"local:{cb.TRANSFORMER_PORT}", True, 0),
+            ("remote", False, 0),
+        ]
+
+
+class TestMetricsEndpoint:
+    """Test /api/metrics served from the background sampler."""
+
+    def test_metrics_cached_and_since(self, client, monkeypatch):
+        from deployment.metrics_sampler import MetricsSampler
+
+        sampler = MetricsSampler(interval=60, history=10, gpu=False)
+        monkeypatch.setattr(cb, "metrics_sampler", sampler)
+        sampler.sample()
+
+        client.get("/api/health")
+        calls = []
+        import psutil
+
+        monkeypatch.setattr(psutil, "cpu_percent", lambda *a, **k: calls.append(1) or 0.0)
+        body = client.get("/api/metrics").get_json()
+        assert not calls  # answered from the cached sample
+        assert {"cpu", "ram", "gpu", "rps", "sampled_at", "ingest", "input_logs"} <= set(body)
+        assert "series" not in body
+
+        sampler.sample()  # includes the two requests above
+        series = client.get("/api/metrics?since=0").get_json()["series"]
+        assert len(series["ts"]) == 2 and series["latency_ms"][-1] is not None
+        assert client.get("/api/metrics?since=abc").status_code == 400
+
+    def test_telemetry_per_route(self, client, monkeypatch):
+        from deployment.request_telemetry import RequestTelemetry
+
+        monkeypatch.setattr(cb, "request_telemetry", RequestTelemetry())
+        client.get("/api/train_status/job_a")
+        client.get("/api/train_status/job_b")
+        client.get("/api/health")
+
+        body = client.get("/api/telemetry").get_json()
+        route = body["routes"]["GET /api/train_status/<job_id>"]
+        assert route["count"] == 2 and route["status"] == {"4xx": 2}
+        assert body["routes"]["GET /api/health"]["status"] == {"2xx": 1}
+        assert body["routes"]["GET /api/telemetry"]["in_flight"] == 1  # this request
+
+        text = client.get("/api/telemetry?format=prometheus").get_data(as_text=True)
+        assert 'route="/api/train_status/<job_id>",status="4xx"} 2' in text
+
+
+class TestServiceLogEndpoints:
+    """Test incremental service log reads and SSE follow."""
+
+    def test_tail_offset_and_follow(self, client, monkeypatch, tmp_path):
+        monkeypatch.setattr(cb, "LOG_DIR", tmp_path)
+        monkeypatch.setattr(cb, "SERVICE_LOG_POLL_SEC", 0.01)
+        log = tmp_path / "transformer.log"
+        log.write_text("".join(f"boot {i}\n" for i in range(300)), encoding="utf-8")
+
+        body = client.get("/api/service_log/transformer").get_json()
+        assert len(body["lines"]) == 200 and body["lines"][-1] == "boot 299"
+        assert body["log"].endswith("boot 299") and body["offset"] == log.stat().st_size
+
+        with log.open("a", encoding="utf-8") as f:
+            f.write("ready ✓\n")
+        nxt = client.get(f"/api/service_log/transformer?offset={body['offset']}&file_id={body['file_id']}").get_json()
+        assert nxt["lines"] == ["ready ✓"] and not nxt["reset"]
+        assert client.get("/api/service_log/transformer?offset=x").status_code == 400
+
+        r = client.get(
+            f"/api/service_log/transformer/events?offset={body['offset']}&file_id={body['file_id']}", buffered=False
+        )
+        assert r.mimetype == "text/event-stream"
+        first = next(iter(r.response)).decode("utf-8")
+        r.close()
+        assert first.startswith(f"id: {nxt['file_id']}:{nxt['offset']}\n")
+        assert json.loads(first.split("data: ", 1)[1]) == {"type": "log", "lines": ["ready ✓"]}
+
+
+class TestModelEndpoints:
+    """Test the model repository endpoints against the catalog."""
+
+    @pytest.fixture
+    def models_dir(self, monkeypatch, tmp_path):
+        from deployment.model_catalog import ModelCatalog
+        from deployment.model_store import ModelBlobStore
+
+        base = tmp_path / "models"
+        uploads = base / "uploads"
+        uploads.mkdir(parents=True)
+        monkeypatch.setattr(cb, "TR_UPLOADS_DIR", uploads)
+        monkeypatch.setattr(cb, "TR_ACTIVE_WEIGHTS", base / "active.pth")
+        monkeypatch.setattr(cb, "model_catalog", ModelCatalog(base, tmp_path))
+        monkeypatch.setattr(cb, "model_store", ModelBlobStore(base / "blobs"))
+        return base
+
+    def test_upload_list_and_delete_use_catalog(self, client, models_dir, monkeypatch):
+        import io
+
+        for name in ("a.pth", "b.pth"):
+            r = client.post(
+                "/api/upload_model",
+                data={"file": (io.BytesIO(b"w-" + name.encode()), name), "meta_json": '{"note": 1}'},
+                content_type="multipart/form-data",
+            )
+            assert r.status_code == 200
+
+        monkeypatch.setattr(cb.Path, "rglob", lambda *a, **k: pytest.fail("must not rescan"))
+        body = client.get("/api/models?offset=0&limit=1").get_json()
+        assert body["total"] == 2 and len(body["models"]) == 1
+        assert body["models"][0]["meta"] == {"note": 1}
+        filename = body["models"][0]["filename"]
+
+        r = client.delete("/api/delete_model", json={"type": "transformer", "filename": filename})
+        assert r.status_code == 200
+        assert client.get("/api/models").get_json()["total"] == 1
+        assert client.delete("/api/delete_model", json={"type": "transformer", "filename": filename}).status_code == 404
+
+    def test_dedup_activation_and_resumable_upload(self, client, models_dir, monkeypatch):
+        import hashlib
+        import io
+
+        monkeypatch.setattr(cb, "stop_service", lambda name: (True, "stopped"))
+        monkeypatch.setattr(cb, "start_service", lambda *a, **kw: (True, 5001, "started"))
+        data = b"checkpoint-bytes" * 1000
+        digest = hashlib.sha256(data).hexdigest()
+
+        first = client.post(
+            "/api/upload_model", data={"file": (io.BytesIO(data), "a.pth")}, content_type="multipart/form-data"
+        ).get_json()
+        second = client.post(
+            "/api/upload_model", data={"file": (io.BytesIO(data), "b.pth")}, content_type="multipart/form-data"
+        ).get_json()
+        assert first["sha256"] == second["sha256"] == digest
+        assert not first["deduplicated"] and second["deduplicated"]
+        blob = cb.model_store.blob_path(digest)
+        assert blob.stat().st_nlink == 3  # blob + two aliases, one copy of the bytes
+        assert not list(cb.model_store.tmp_dir.iterdir())  # spool committed by rename
+
+        name = first["path"].rsplit("/", 1)[-1]
+        assert client.post("/api/load_model", json={"model_type": "transformer", "filename": name}).status_code == 200
+        active = models_dir / "active.pth"
+        assert active.read_bytes() == data and os.path.samefile(active, blob)
+
+        # resumable: two chunks, a stale offset is rejected with the resume point
+        new = b"x" * 5000 + b"y" * 3000
+        init = client.post("/api/upload_model/init", json={"filename": "c.pth", "size": len(new)}).get_json()
+        uid = init["upload_id"]
+        assert client.put(f"/api/upload_model/{uid}?offset=0", data=new[:5000]).get_json()["offset"] == 5000
+        stale = client.put(f"/api/upload_model/{uid}?offset=0", data=new[5000:])
+        assert stale.status_code == 409 and stale.get_json()["offset"] == 5000
+        assert client.post(f"/api/upload_model/{uid}/complete", json={}).status_code == 409  # incomplete
+        resumed = client.put(f"/api/upload_model/{uid}", data=new[5000:], headers={"Upload-Offset": "5000"})
+        assert resumed.status_code == 200
+        done = client.post(f"/api/upload_model/{uid}/complete", json={}).get_json()
+        assert done["complete"] and done["sha256"] == hashlib.sha256(new).hexdigest()
+
+        for bad in ("../" + digest[3:], digest.upper(), digest[:40]):
+            r = client.post("/api/upload_model/init", json={"filename": "e.pth", "sha256": bad})
+            assert r.status_code == 400
+
+        # known content: init completes without sending bytes
+        again = client.post("/api/upload_model/init", json={"filename": "d.pth", "sha256": digest}).get_json()
+        assert again["complete"] and again["deduplicated"]
+        assert client.get("/api/models").get_json()["total"] == 5  # a, b, c, d, active
+
+
+class TestTrainingEndpoints:
+    """Test training job queueing endpoints."""
+
+    def test_queue_cancel_and_status(self, client, raw_dir, monkeypatch, tmp_path):
+        import threading
+        import time
+
+        from deployment.job_scheduler import TrainingScheduler
+
+        sched = TrainingScheduler(tmp_path / "jobs", slots=1, on_update=lambda j, **kw: cb._set_job(j, **kw))
+        monkeypatch.setattr(cb, "training_scheduler", sched)
+        gate = threading.Event()
+        monkeypatch.setattr(cb, "_run_training_job", lambda ctx, *a: (gate.wait(10), ctx.check()))
+
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        first = client.post("/api/train_offline", json={"dataset": sid}).get_json()
+        second = client.post("/api/train_offline", json={"dataset": sid, "epochs": 3}).get_json()
+        assert first["queue_position"] == 0 and second["queue_position"] == 1
+
+        status = client.get(f"/api/train_status/{second['job_id']}").get_json()
+        assert status["status"] == "queued" and status["eta_sec"] > 0
+        assert client.get("/api/train_queue").get_json()["queued"] == [second["job_id"]]
+
+        assert client.post(f"/api/train_cancel/{second['job_id']}").get_json()["status"] == "cancelled"
+        assert client.post(f"/api/train_cancel/{second['job_id']}").status_code == 409
+        assert client.post("/api/train_kill/job_missing").status_code == 404
+
+        gate.set()
+        deadline = time.time() + 10
+        while sched.stats()["running"] and time.time() < deadline:
+            time.sleep(0.02)
+        assert client.get(f"/api/train_status/{first['job_id']}").get_json()["queue_position"] is None
+
+    def test_log_cursor_and_sse(self, client, raw_dir, monkeypatch, tmp_path):
+        import time
+
+        from deployment.job_scheduler import TrainingScheduler
+
+        sched = TrainingScheduler(tmp_path / "jobs", slots=1, on_update=lambda j, **kw: cb._set_job(j, **kw))
+        monkeypatch.setattr(cb, "training_scheduler", sched)
+
+        def fake_job(ctx, *a):
+            log = cb._job_log(ctx.job_id)
+            log.feed(b"line 1\nline 2\n\r 10%|#\r100%|##\n")
+            cb._set_job(ctx.job_id, status="completed")
+
+        monkeypatch.setattr(cb, "_run_training_job", fake_job)
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        job_id = client.post("/api/train_offline", json={"dataset": sid}).get_json()["job_id"]
+        deadline = time.time() + 10
+        while sched.stats()["running"] and time.time() < deadline:
+            time.sleep(0.02)
+
+        st = client.get(f"/api/train_status/{job_id}?cursor=1").get_json()
+        assert st["log_lines"] == ["line 2", "100%|##"] and st["log_cursor"] == 3 and st["log_closed"]
+        assert client.get(f"/api/train_status/{job_id}").get_json()["log"] == "line 1\nline 2\n100%|##"
+
+        r = client.get(f"/api/train_log/{job_id}/events?cursor=2")
+        assert r.mimetype == "text/event-stream"
+        events = [json.loads(c.split("data: ", 1)[1]) for c in r.get_data(as_text=True).split("\n\n") if "data: " in c]
+        assert events == [{"type": "log", "offset": 2, "lines": ["100%|##"]}, {"type": "done", "status": "completed"}]
+        assert client.get("/api/train_log/job_missing/events").status_code == 404
+
+    def test_finished_jobs_leave_memory_and_survive_restart(self, client, raw_dir, registries, monkeypatch, tmp_path):
+        import time
+
+        from deployment.job_scheduler import TrainingScheduler
+        from deployment.record_store import RecordRegistry
+
+        sched = TrainingScheduler(tmp_path / "jobs", slots=1, on_update=lambda j, **kw: cb._set_job(j, **kw))
+        monkeypatch.setattr(cb, "training_scheduler", sched)
+
+        def fake_job(ctx, *a):
+            cb._job_log(ctx.job_id).feed(b"epoch 1\nepoch 2\n")
+            cb._set_job(ctx.job_id, status="completed")
+
+        monkeypatch.setattr(cb, "_run_training_job", fake_job)
+        sid = client.post("/api/start_capture", json={}).get_json()["session_id"]
+        job_id = client.post("/api/train_offline", json={"dataset": sid}).get_json()["job_id"]
+        deadline = time.time() + 10
+        while sched.stats()["running"] and time.time() < deadline:
+            time.sleep(0.02)
+
+        jobs = cb.job_registry
+        jobs.evict(now=time.time() + jobs.ttl_sec + 1)
+        assert jobs.stats()["hot"] == 0 and job_id not in cb._job_logs  # ring released with the record
+        st = client.get(f"/api/train_status/{job_id}").get_json()
+        assert st["status"] == "completed" and st["log"] == "epoch 1\nepoch 2" and "log_tail" not in st
+        assert client.get(f"/api/train_log/{job_id}/events").status_code == 410
+
+        listing = client.get("/api/jobs?status=completed").get_json()
+        assert listing["total"] == 1 and listing["jobs"][0]["job_id"] == job_id
+        assert "log_tail" not in listing["jobs"][0]
+        assert client.get("/api/jobs?since=abc").status_code == 400
+
+        # a job left "training" by a dead process comes back as interrupted
+        jobs.put("job_stale", {"job_id": "job_stale", "status": "training", "created": int(time.time())})
+        restarted = RecordRegistry(jobs.db, "job", terminal=cb._TERMINAL_JOB_STATES)
+        assert restarted.recover("interrupted") == 1
+        monkeypatch.setattr(cb, "job_registry", restarted)
+        assert client.get("/api/train_status/job_stale").get_json()["status"] == "interrupted"
+        assert client.get("/api/jobs").get_json()["total"] == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
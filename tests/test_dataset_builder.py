@@ -0,0 +1,101 @@
+"""
+Tests for the capture-session dataset builder
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from deployment.dataset_builder import align_nearest, build_session_dataset
+from deployment.feature_extractor import image_bytes_to_features, image_to_features
+from deployment.frame_archive import FrameArchive
+from models.transformer.dataset_store import open_dataset
+
+
+def _jpeg(shade):
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 32), color=(shade, shade, shade)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def session(tmp_path):
+    sess = tmp_path / "sess_t"
+    arc = FrameArchive(sess)
+    for i in range(40):
+        arc.append(1000 + 100 * i, _jpeg(i * 6))
+    arc.close()
+    events = [
+        {"keys": ["a"], "timestamp": 1000},
+        {"keys": ["s"], "timestamp": 1290},
+        {"keys": ["q"], "timestamp": 4000},
+    ]
+    (sess / "inputs.jsonl").write_text("".join(json.dumps(e) + "\n" for e in events))
+    return sess
+
+
+def _label(keys):
+    return {"a": 2, "s": 1, "q": 9}.get(keys[0], 7) if keys else 0
+
+
+class TestDatasetBuilder:
+    """Test featurization, alignment and outputs."""
+
+    def test_bytes_features_match_base64_path(self):
+        jpg = _jpeg(77)
+        b64 = base64.b64encode(jpg).decode("ascii")
+        assert np.allclose(image_bytes_to_features(jpg), np.asarray(image_to_features(b64)))
+
+    def test_align_nearest(self):
+        inputs = np.array([100, 200, 1000], dtype=np.int64)
+        frames = np.array([100, 150, 160, 600, 1240, 1300, 50], dtype=np.int64)
+        # exact, tie -> later input, nearest, none, within tolerance, too far, before first
+        assert align_nearest(frames, inputs, 250).tolist() == [0, 1, 1, -1, 2, -1, 0]
+        assert align_nearest(frames, np.array([], dtype=np.int64)).tolist() == [-1] * 7
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_build_outputs(self, session, tmp_path, workers):
+        seen = []
+        res = build_session_dataset(
+            session,
+            tmp_path / "out" / "ds",
+            _label,
+            workers=workers,
+            chunk=8,
+            progress=lambda d, t, f: seen.append((d, t)),
+        )
+        assert res["frames"] == 40 and seen[-1] == (40, 40) and res["fps"] > 0
+
+        ds = open_dataset(res["dataset_path"])
+        feats = ds.features
+        assert feats.shape == (40, 128) and feats.dtype == np.float32 and feats.flags["C_CONTIGUOUS"]
+        assert np.allclose(feats[3], image_bytes_to_features(_jpeg(18)))
+        assert ds.feature_columns == [f"f{i}" for i in range(128)] and ds.manifest["source"] == "sess_t"
+
+        # ts 1000 -> 'a', 1100 -> nearest 1000 'a', 1200/1300 -> 1290 's', 1400 -> 1290 's', far frames -> default
+        assert ds.labels[:6].tolist() == [2, 2, 1, 1, 1, 1]
+        assert ds.labels[10] == 0 and ds.labels[30] == 9
+        assert res["matched_inputs"] == 11 and sum(ds.class_counts.values()) == 40
+        assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["ds"]  # no temp dir left behind
+
+    def test_optional_csv_export(self, session, tmp_path):
+        res = build_session_dataset(session, tmp_path / "ds", _label, workers=1, export_csv=tmp_path / "ds.csv")
+        df = pd.read_csv(res["csv_path"])
+        assert list(df.columns[-2:]) == ["f127", "action"] and len(df) == 40
+        ds = open_dataset(res["dataset_path"])
+        assert np.allclose(df.iloc[:, :128].to_numpy(), ds.features, atol=1e-5)
+        assert df["action"].tolist() == ds.labels.tolist()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
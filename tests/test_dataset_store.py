@@ -0,0 +1,101 @@
+"""
+Tests for the memory-mapped binary training dataset format
+"""
+
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.transformer.dataset_store import (
+    DatasetFormatError,
+    DatasetWriter,
+    convert_csv,
+    export_csv,
+    is_binary_dataset,
+    open_dataset,
+)
+
+
+@pytest.fixture
+def csv_dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    features = rng.random((37, 6), dtype=np.float32)
+    labels = rng.integers(0, 4, 37)
+    df = pd.DataFrame(features, columns=[f"feature_{i}" for i in range(6)])
+    df["action"] = labels
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return path, features, labels
+
+
+class TestDatasetStore:
+    """Test CSV conversion, memory-mapped reads and the training dataset on both formats."""
+
+    def test_convert_and_map(self, csv_dataset, tmp_path):
+        csv_path, features, labels = csv_dataset
+        out = tmp_path / "data.agbds"
+        manifest = convert_csv(csv_path, out, chunk_rows=10)  # several chunks, last one partial
+        assert manifest["rows"] == 37 and manifest["feature_count"] == 6
+        assert is_binary_dataset(out) and is_binary_dataset(out / "manifest.json") and not is_binary_dataset(csv_path)
+        assert not list(tmp_path.glob("*.tmp-*"))
+
+        ds = open_dataset(out)
+        assert isinstance(ds.features, np.memmap) and not ds.features.flags.writeable
+        np.testing.assert_allclose(ds.features, features, rtol=1e-6)
+        np.testing.assert_array_equal(ds.labels, labels)
+        values, counts = np.unique(labels, return_counts=True)
+        assert ds.class_counts == dict(zip(values.tolist(), counts.tolist()))
+        assert ds.feature_columns == [f"feature_{i}" for i in range(6)]
+
+        back = tmp_path / "back.csv"
+        assert export_csv(out, back, chunk_rows=10) == 37
+        df = pd.read_csv(back)
+        assert list(df.columns) == ds.feature_columns + ["action"]
+        np.testing.assert_allclose(df.iloc[:, :6].to_numpy(), features, rtol=1e-5)
+        np.testing.assert_array_equal(df["action"].to_numpy(), labels)
+
+    def test_writer_validation_and_bad_files(self, tmp_path):
+        out = tmp_path / "bad.agbds"
+        with pytest.raises(DatasetFormatError):
+            with DatasetWriter(out, ["a", "b"]) as writer:
+                writer.append(np.zeros((2, 3)), [0, 1])  # wrong width
+        assert not out.exists() and not list(tmp_path.iterdir())
+
+        with DatasetWriter(out, ["a", "b"]) as writer:
+            writer.append(np.ones((4, 2)), [1, 1, 2, 2])
+        with open(out / "features.f32", "ab") as f:
+            f.write(b"\0" * 4)
+        with pytest.raises(DatasetFormatError):
+            open_dataset(out)
+
+    def test_sequence_dataset_reads_both_formats(self, csv_dataset, tmp_path):
+        torch = pytest.importorskip("torch")
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'models', 'transformer'))
+        from transformer_training import SequenceGameplayDataset
+
+        csv_path, features, labels = csv_dataset
+        out = tmp_path / "data.agbds"
+        convert_csv(csv_path, out)
+        from_csv = SequenceGameplayDataset(str(csv_path), sequence_length=5)
+        mapped = SequenceGameplayDataset(str(out), sequence_length=5)
+        assert mapped.binary and not from_csv.binary and not hasattr(from_csv, "data")
+        assert len(mapped) == len(from_csv) == 32
+        for idx in (0, 17, 31):
+            (xa, ya), (xb, yb) = from_csv[idx], mapped[idx]
+            assert xb.shape == (5, 6) and torch.allclose(xa, xb) and ya == yb == int(labels[idx + 4])
+        assert mapped.class_counts() == from_csv.class_counts()
+
+        blob = pickle.dumps(mapped)  # what a DataLoader worker receives
+        assert len(blob) < features.nbytes
+        clone = pickle.loads(blob)
+        assert isinstance(clone.features, np.memmap) and torch.equal(clone[3][0], mapped[3][0])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,109 @@
+"""
+Tests for packed capture-session frame storage
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from frame_archive import FrameArchive, iter_session_frames
+
+
+def _jpg(i):
+    return b"\xff\xd8\xff" + bytes([i % 256]) * (10 + i)
+
+
+class TestFrameArchive:
+    """Test append / lookup / streaming reads."""
+
+    def test_random_access_and_order(self, tmp_path):
+        arc = FrameArchive(tmp_path, flush_every=4)
+        for ts in (30, 10, 20):  # writer pool can deliver out of order
+            arc.append(ts, _jpg(ts))
+
+        assert arc.timestamps().tolist() == [10, 20, 30]
+        assert arc.get(20) == _jpg(20)
+        assert arc.get(25) is None
+        assert arc.nearest(24) == (20, _jpg(20))
+        assert arc.nearest(100, tolerance=10) is None
+        assert list(arc.iter_frames()) == [(t, _jpg(t)) for t in (10, 20, 30)]
+        arc.close()
+
+        # reopen from disk and keep appending
+        arc2 = FrameArchive(tmp_path)
+        arc2.append(40, _jpg(40))
+        arc2.close()
+        assert len(FrameArchive(tmp_path)) == 4
+
+    def test_concurrent_appends(self, tmp_path):
+        arc = FrameArchive(tmp_path)
+        threads = [
+            threading.Thread(target=lambda k=k: [arc.append(k * 100 + i, _jpg(i)) for i in range(50)]) for k in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        arc.close()
+
+        frames = list(FrameArchive(tmp_path).iter_frames())
+        assert len(frames) == 200
+        assert all(data == _jpg(ts % 100) for ts, data in frames)
+
+    def test_torn_tail_is_ignored(self, tmp_path):
+        arc = FrameArchive(tmp_path)
+        arc.append(1, _jpg(1))
+        arc.append(2, _jpg(2))
+        arc.close()
+        # crash mid-write: half an index record, and a pack cut short of frame 2
+        with open(arc.index_path, "ab") as f:
+            f.write(b"\x00" * 7)
+        with open(arc.pack_path, "r+b") as f:
+            f.truncate(len(_jpg(1)) + 3)
+
+        assert list(FrameArchive(tmp_path).iter_frames()) == [(1, _jpg(1))]
+
+    def test_appends_after_torn_tail_are_readable(self, tmp_path):
+        arc = FrameArchive(tmp_path)
+        for ts in (1, 2):
+            arc.append(ts, _jpg(ts))
+        arc.close()
+        with open(arc.index_path, "ab") as f:
+            f.write(b"\x00" * 3)  # partial record
+        with open(arc.pack_path, "ab") as f:
+            f.write(b"orphan")  # bytes of a frame whose record never made it
+
+        reopened = FrameArchive(tmp_path)
+        for ts in (3, 4):
+            reopened.append(ts, _jpg(ts))
+        reopened.close()
+
+        assert list(FrameArchive(tmp_path).iter_frames()) == [(ts, _jpg(ts)) for ts in (1, 2, 3, 4)]
+        assert arc.index_path.stat().st_size == 4 * 20
+        assert arc.pack_path.stat().st_size == sum(len(_jpg(ts)) for ts in (1, 2, 3, 4))
+
+    def test_import_export_roundtrip(self, tmp_path):
+        src = tmp_path / "sess"
+        (src / "frames").mkdir(parents=True)
+        for ts in (5, 6, 7):
+            (src / "frames" / f"frame_{ts}.jpg").write_bytes(_jpg(ts))
+        (src / "frames" / "notes.txt").write_text("ignored")
+        per_file = list(iter_session_frames(src))
+
+        arc = FrameArchive(src)
+        assert arc.import_dir(remove=True) == 3
+        assert not list((src / "frames").glob("*.jpg"))
+        assert list(iter_session_frames(src)) == per_file
+
+        out = tmp_path / "exported"
+        assert arc.export_dir(out) == 3
+        assert sorted(p.name for p in out.iterdir()) == ["frame_5.jpg", "frame_6.jpg", "frame_7.jpg"]
+        assert (out / "frame_6.jpg").read_bytes() == _jpg(6)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,145 @@
+"""
+Unit tests for the write-behind frame ingest pool
+"""
+
+import base64
+import io
+import os
+import sys
+import json
+import threading
+import time
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from ingest_writer import (
+    InputEventLog,
+    InputLogRegistry,
+    IngestWriter,
+    is_jpeg,
+    iter_packed_frames,
+    pack_frames,
+    strip_dataurl,
+    to_jpeg_bytes,
+)
+
+
+def _image_bytes(fmt):
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 8), color=(10, 20, 30)).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+class TestEncoding:
+    """Test payload handling helpers."""
+
+    def test_strip_dataurl(self):
+        assert strip_dataurl("data:image/jpeg;base64,QUJD") == "QUJD"
+        assert strip_dataurl("QUJD") == "QUJD"
+        with pytest.raises(ValueError):
+            strip_dataurl("data:image/jpeg;base64")
+        with pytest.raises(ValueError):
+            strip_dataurl("")
+
+    def test_jpeg_passthrough(self):
+        jpg = _image_bytes("JPEG")
+        assert is_jpeg(jpg)
+        assert to_jpeg_bytes(jpg) is jpg
+
+    def test_png_reencoded(self):
+        out = to_jpeg_bytes(_image_bytes("PNG"))
+        assert is_jpeg(out)
+
+    def test_packed_frames_roundtrip(self):
+        frames = [(1, b"abc"), (2, b""), (1_700_000_000_000, b"x" * 1000)]
+        assert list(iter_packed_frames(io.BytesIO(pack_frames(frames)))) == frames
+
+    def test_packed_frames_truncated(self):
+        body = pack_frames([(1, b"abcdef")])[:-2]
+        with pytest.raises(ValueError):
+            list(iter_packed_frames(io.BytesIO(body)))
+
+
+class TestIngestWriter:
+    """Test the bounded writer pool."""
+
+    def test_writes_and_counts(self, tmp_path):
+        writer = IngestWriter(threads=2, queue_max=16)
+        jpg = _image_bytes("JPEG")
+        png_b64 = base64.b64encode(_image_bytes("PNG")).decode("ascii")
+
+        assert writer.submit("s", tmp_path / "a.jpg", base64.b64encode(jpg).decode("ascii"))
+        assert writer.submit("s", tmp_path / "b.jpg", png_b64)
+        assert writer.submit("s", tmp_path / "c.jpg", "not-an-image")
+        assert writer.wait_idle("s", timeout=5)
+
+        assert (tmp_path / "a.jpg").read_bytes() == jpg
+        assert is_jpeg((tmp_path / "b.jpg").read_bytes())
+        stats = writer.stats()
+        assert stats["written"] == 2 and stats["failed"] == 1
+        assert stats["passthrough"] == 1 and stats["reencoded"] == 1
+        writer.close()
+
+    def test_backpressure_when_full(self, tmp_path):
+        gate = threading.Event()
+
+        def slow_sink(key, dest, data):
+            gate.wait(5)
+
+        writer = IngestWriter(threads=1, queue_max=1, sink=slow_sink)
+        jpg = _image_bytes("JPEG")
+
+        results = [writer.submit("s", tmp_path / f"{i}.jpg", jpg) for i in range(4)]
+        assert results[0] is True
+        assert False in results
+        assert writer.stats()["rejected"] >= 1
+
+        gate.set()
+        assert writer.wait_idle(timeout=5)
+        writer.close()
+
+
+class TestInputEventLog:
+    """Test the buffered per-session input log."""
+
+    def test_buffers_until_size_threshold(self, tmp_path):
+        path = tmp_path / "inputs.jsonl"
+        log = InputEventLog(path, flush_bytes=256)
+
+        log.append([{"timestamp": 1, "keys": ["w"]}])
+        assert path.read_bytes() == b""
+
+        log.append([{"timestamp": i, "keys": ["w", "space"]} for i in range(20)])
+        assert path.stat().st_size > 0
+        assert log.count == 21
+        log.close()
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 21
+        assert json.loads(lines[0]) == {"timestamp": 1, "keys": ["w"]}
+
+    def test_registry_time_flush_and_close(self, tmp_path):
+        registry = InputLogRegistry(flush_bytes=1 << 20, flush_interval=0.1)
+        path = tmp_path / "s1" / "inputs.jsonl"
+
+        registry.append("s1", path, [{"timestamp": 5, "keys": []}])
+        deadline = time.time() + 3
+        while path.stat().st_size == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        assert path.stat().st_size > 0
+
+        registry.append("s1", path, [{"timestamp": 6, "keys": []}])
+        assert registry.count("s1") == 2
+        assert registry.close("s1") == 2
+        assert len(path.read_text().splitlines()) == 2
+        registry.close_all()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,146 @@
+"""
+Tests for the training job scheduler
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from job_scheduler import TrainingScheduler
+
+
+def _wait(pred, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if pred():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def jobs():
+    return {}
+
+
+@pytest.fixture
+def scheduler(tmp_path, jobs):
+    def update(job_id, **kw):
+        jobs.setdefault(job_id, {}).update(kw)
+
+    s = TrainingScheduler(tmp_path, slots=1, threads_per_job=2, on_update=update, sec_per_unit=10)
+    yield s
+    s.shutdown()
+
+
+class TestTrainingScheduler:
+    """Test slots, ordering, cancellation and ETA."""
+
+    def test_slots_priority_and_eta(self, scheduler, jobs):
+        gate = threading.Event()
+        order = []
+
+        def runner(name):
+            def run(ctx):
+                order.append(name)
+                assert ctx.env()["OMP_NUM_THREADS"] == "2"
+                assert ctx.workdir.is_dir()
+                gate.wait(10)
+
+            return run
+
+        scheduler.submit("a", runner("a"), units=1)
+        scheduler.submit("b", runner("b"), units=2)
+        scheduler.submit("c", runner("c"), priority=5, units=1)
+        assert _wait(lambda: order == ["a"])
+
+        assert scheduler.info("a")["queue_position"] == 0
+        c, b = scheduler.info("c"), scheduler.info("b")
+        assert c["queue_position"] == 1 and b["queue_position"] == 2
+        assert 0 < c["eta_start_sec"] <= 10 and b["eta_start_sec"] == pytest.approx(c["eta_sec"], abs=0.2)
+        assert b["eta_sec"] == pytest.approx(b["eta_start_sec"] + 20, abs=0.2)
+
+        gate.set()
+        assert _wait(lambda: len(order) == 3)
+        assert order == ["a", "c", "b"]
+
+    def test_cancel_queued_and_kill_running(self, scheduler, jobs):
+        def runner(ctx):
+            proc = ctx.popen([sys.executable, "-c", "import time; time.sleep(30)"])
+            proc.wait()
+            ctx.check()
+
+        scheduler.submit("run", runner)
+        scheduler.submit("waiting", runner)
+        assert _wait(lambda: scheduler.stats()["running"] == ["run"])
+
+        assert scheduler.cancel("waiting") == "cancelled"
+        assert jobs["waiting"]["status"] == "cancelled"
+        assert scheduler.info("waiting")["queue_position"] is None
+
+        assert _wait(lambda: scheduler._running["run"]._proc is not None)
+        t0 = time.time()
+        assert scheduler.kill("run") == "killed"
+        assert _wait(lambda: not scheduler.stats()["running"])
+        assert time.time() - t0 < 5
+        assert jobs["run"]["status"] == "killed"
+        assert scheduler.cancel("run") is None
+
+    def test_failure_is_reported(self, scheduler, jobs):
+        def runner(ctx):
+            raise RuntimeError("boom")
+
+        scheduler.submit("x", runner)
+        assert _wait(lambda: jobs.get("x", {}).get("status") == "failed")
+        assert jobs["x"]["error"] == "boom"
+
+    def test_updates_are_sent_without_the_lock(self, tmp_path):
+        held = []
+
+        def update(job_id, **kw):
+            # the lock is not reentrant: this only times out when the caller itself holds it
+            got = sched._lock.acquire(timeout=1)
+            if got:
+                sched._lock.release()
+            held.append(not got)
+
+        sched = TrainingScheduler(tmp_path, slots=1, on_update=update)
+        gate = threading.Event()
+        sched.submit("a", lambda ctx: gate.wait(10))
+        sched.submit("b", lambda ctx: None)
+        sched.cancel("b")
+        gate.set()
+        assert _wait(lambda: not sched.stats()["running"])
+        sched.cancel("a")
+        assert held and not any(held)
+
+    def test_workdirs_and_eta_follow_completion(self, scheduler, jobs):
+        def ok(ctx):
+            (ctx.workdir / "model.pth").write_bytes(b"x")
+
+        def bad(ctx):
+            (ctx.workdir / "train.log").write_text("oops")
+            raise RuntimeError("training script exited with code 1")
+
+        scheduler.submit("bad", bad)
+        assert _wait(lambda: "finished" in jobs.get("bad", {}))
+        assert scheduler.sec_per_unit == 10  # failures do not teach the ETA
+        assert (scheduler.workdir_root / "bad" / "train.log").exists()  # kept for inspection
+
+        scheduler.submit("ok", ok)
+        assert _wait(lambda: "finished" in jobs.get("ok", {}))
+        assert scheduler.sec_per_unit < 10
+        assert not (scheduler.workdir_root / "ok").exists()
+
+        assert scheduler.prune_workdirs() == 0
+        assert scheduler.prune_workdirs(now=time.time() + scheduler.keep_failed_sec + 1) == 1
+        assert not (scheduler.workdir_root / "bad").exists()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,62 @@
+"""
+Tests for the cursor-addressable training log ring
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from log_ring import LogRing
+
+
+class TestLogRing:
+    """Test offsets, cursors and progress-bar collapsing."""
+
+    def test_cursor_reads_and_ring_drop(self):
+        ring = LogRing(capacity=3)
+        ring.feed(b"a\nb\nc\n")
+        lines, cur, dropped = ring.read(0)
+        assert lines == ["a", "b", "c"] and cur == 3 and dropped == 0
+
+        ring.feed("d\ne\n")
+        assert ring.read(cur) == (["d", "e"], 5, 0)
+        assert ring.read(0) == (["c", "d", "e"], 5, 2)  # a, b fell out of the ring
+        assert ring.read(5) == ([], 5, 0)
+        assert ring.read(2, limit=1) == (["c"], 3, 0)
+        assert ring.tail(2) == ["d", "e"]
+
+    def test_progress_bars_collapse(self):
+        ring = LogRing()
+        ring.feed("Epoch 1\n")
+        for pct in (10, 50, 100):
+            ring.feed(f"\r{pct}%|####|")
+            assert ring.progress == f"{pct}%|####|"
+        ring.feed("\n")
+        ring.feed("crlf line\r")
+        ring.feed("\nnext")
+        ring.close()
+        assert ring.read(0)[0] == ["Epoch 1", "100%|####|", "crlf line", "next"]
+        assert ring.closed and ring.progress is None
+
+    def test_utf8_split_across_chunks(self):
+        ring = LogRing()
+        data = "早停触发\n".encode("utf-8")
+        for i in range(len(data)):
+            ring.feed(data[i : i + 1])
+        assert ring.read(0)[0] == ["早停触发"]
+
+    def test_wait_wakes_on_new_lines_and_close(self):
+        ring = LogRing()
+        assert ring.wait(0, timeout=0.05) is False
+        threading.Timer(0.05, lambda: ring.feed("x\n")).start()
+        assert ring.wait(0, timeout=5)
+        threading.Timer(0.05, ring.close).start()
+        assert ring.wait(1, timeout=5) and ring.closed
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,102 @@
+"""
+Tests for the incremental service log tail reader
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from log_tail import LogFollower, _utf8_cut, read_since, tail
+
+
+def _write(path, text, mode="a"):
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(text)
+
+
+class TestTail:
+    """Test seek-from-end tailing."""
+
+    def test_last_lines_small_blocks(self, tmp_path):
+        p = tmp_path / "svc.log"
+        _write(p, "".join(f"line {i} é\n" for i in range(1000)) + "unfinished")
+        out = tail(p, 3, block=7)
+        assert out["lines"] == ["line 997 é", "line 998 é", "line 999 é"]
+        assert out["partial"] == "unfinished"
+        assert out["offset"] == p.stat().st_size - len("unfinished")
+
+    def test_short_and_missing_file(self, tmp_path):
+        p = tmp_path / "svc.log"
+        _write(p, "a\r\nb\n")
+        assert tail(p, 10)["lines"] == ["a", "b"]
+        assert tail(tmp_path / "missing.log", 10)["file_id"] is None
+
+
+class TestReadSince:
+    """Test offset-based incremental reads."""
+
+    def test_incremental_and_partial_lines(self, tmp_path):
+        p = tmp_path / "svc.log"
+        _write(p, "one\ntw")
+        first = read_since(p, 0)
+        assert first["lines"] == ["one"] and first["offset"] == 4
+        _write(p, "o\n")
+        second = read_since(p, first["offset"], first["file_id"])
+        assert second["lines"] == ["two"] and not second["reset"]
+
+    def test_truncation_and_rotation_reset(self, tmp_path):
+        p = tmp_path / "svc.log"
+        _write(p, "old line\n" * 10)
+        cur = read_since(p, 0)
+        _write(p, "new\n", mode="w")  # truncated in place
+        out = read_since(p, cur["offset"], cur["file_id"])
+        assert out["reset"] and out["lines"] == ["new"]
+
+        os.rename(p, tmp_path / "svc.log.1")
+        _write(p, "rotated\n")
+        out = read_since(p, out["offset"], out["file_id"])
+        assert out["reset"] and out["lines"] == ["rotated"]
+
+    def test_oversized_line_split_on_char_boundary(self, tmp_path):
+        p = tmp_path / "svc.log"
+        _write(p, "€" * 10 + "\n")  # 3 bytes per character
+        out = read_since(p, 0, max_bytes=8)
+        assert out["lines"] == ["€€"] and out["offset"] == 6
+        rest = read_since(p, out["offset"], max_bytes=64)
+        assert rest["lines"] == ["€" * 8]
+
+    def test_utf8_cut(self):
+        data = "a€".encode("utf-8")
+        assert _utf8_cut(data) == len(data)
+        assert _utf8_cut(data[:-1]) == 1
+        assert _utf8_cut(data[:2]) == 1
+
+
+class TestLogFollower:
+    """Test following across rotation."""
+
+    def test_follow_drains_old_file_then_switches(self, tmp_path):
+        p = tmp_path / "svc.log"
+        _write(p, "before\n")
+        fol = LogFollower(p)  # starts at the end
+        assert fol.poll()["lines"] == []
+
+        _write(p, "a\nb\n")
+        assert fol.poll()["lines"] == ["a", "b"]
+
+        _write(p, "last of old\n")
+        os.rename(p, tmp_path / "svc.log.1")
+        assert fol.poll()["lines"] == ["last of old"]
+        assert fol.poll() == {"lines": [], "offset": 0, "file_id": None, "reset": False}
+
+        _write(p, "fresh\n")
+        out = fol.poll()
+        assert out["reset"] and out["lines"] == ["fresh"]
+        fol.close()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
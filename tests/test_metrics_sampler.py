@@ -0,0 +1,63 @@
+"""
+Tests for the background metrics sampler
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from metrics_sampler import MetricsSampler, RequestStats
+
+
+class TestRequestStats:
+    """Test per-interval request accounting."""
+
+    def test_drain_resets(self):
+        stats = RequestStats()
+        for ms in (10.0, 20.0, 60.0):
+            stats.record(ms)
+        first = stats.drain()
+        assert first["rps"] > 0
+        assert first["latency_ms"] == 30.0 and first["latency_max_ms"] == 60.0
+
+        second = stats.drain()
+        assert second["latency_ms"] is None and second["latency_max_ms"] is None
+
+
+class TestMetricsSampler:
+    """Test sampling, the ring buffer and time-series queries."""
+
+    def test_ring_is_bounded_and_since_is_columnar(self):
+        sampler = MetricsSampler(interval=60, history=5, model_pid=os.getpid, gpu=False)
+        for _ in range(8):
+            sampler.sample()
+            time.sleep(0.002)
+        assert sampler.stats()["samples"] == 5
+
+        all_cols = sampler.since(0)
+        assert len(all_cols["ts"]) == 5 and all_cols["ts"] == sorted(all_cols["ts"])
+        assert all_cols["model_rss_mb"][-1] > 0
+        assert set(all_cols) >= {"cpu", "ram", "gpu", "rps", "latency_ms"}
+
+        newer = sampler.since(all_cols["ts"][2])
+        assert newer["ts"] == all_cols["ts"][3:]
+        assert sampler.since(0, limit=2)["ts"] == all_cols["ts"][-2:]
+
+    def test_background_thread_samples(self):
+        sampler = MetricsSampler(interval=0.05, history=100, gpu=False).start()
+        try:
+            deadline = time.time() + 5
+            while sampler.stats()["samples"] < 3 and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            sampler.stop()
+        assert sampler.stats()["samples"] >= 3
+        assert sampler.latest()["model_rss_mb"] is None  # no model service pid
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
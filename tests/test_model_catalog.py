@@ -0,0 +1,85 @@
+"""
+Tests for the indexed model catalog
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from model_catalog import ModelCatalog
+
+
+def _ckpt(path, data=b"weights", meta=None, mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if meta is not None:
+        path.with_suffix(".pth.json").write_text(json.dumps(meta), encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+class TestModelCatalog:
+    """Test indexing, lookups and reconciliation."""
+
+    def test_scan_resolve_and_pagination(self, tmp_path):
+        base = tmp_path / "models"
+        _ckpt(base / "a.pth", mtime=1000)
+        _ckpt(base / "uploads" / "b.pth", meta={"epochs": 3}, mtime=3000)
+        _ckpt(base / "old" / "a.pth", mtime=500)
+        (base / "notes.txt").write_text("x")
+
+        cat = ModelCatalog(base, tmp_path)
+        cat.reconcile(hash_missing=False)
+        assert len(cat) == 3
+        assert cat.resolve("a.pth") == base / "a.pth"  # newest of the same name
+        assert cat.resolve("missing.pth") is None
+
+        page, total = cat.list(0, 2)
+        assert total == 3 and [m["path"] for m in page] == ["models/uploads/b.pth", "models/a.pth"]
+        assert page[0]["meta"] == {"epochs": 3} and "mtime_ns" not in page[0]
+        assert [m["path"] for m in cat.list(2, 2)[0]] == ["models/old/a.pth"]
+
+        (base / "a.pth").unlink()
+        assert cat.resolve("a.pth") == base / "old" / "a.pth"  # vanished file skipped
+
+    def test_hooks_and_hash_lookup(self, tmp_path):
+        base = tmp_path / "models"
+        cat = ModelCatalog(base, tmp_path)
+        p = _ckpt(base / "x.pth", b"abc")
+        digest = hashlib.sha256(b"abc").hexdigest()
+        entry = cat.add(p, sha256=digest, meta={"k": 1})
+        assert entry["sha256"] == digest and entry["meta"] == {"k": 1}
+        assert [m["path"] for m in cat.by_hash(digest)] == ["models/x.pth"]
+
+        assert cat.remove(p) and cat.by_hash(digest) == [] and cat.resolve("x.pth") is None
+
+    def test_reconcile_detects_changes_and_persists_hashes(self, tmp_path):
+        base = tmp_path / "models"
+        index = tmp_path / "hashes.json"
+        p = _ckpt(base / "m.pth", b"one")
+        cat = ModelCatalog(base, tmp_path, index_path=index)
+        assert cat.reconcile() == {"added": 1, "changed": 0, "removed": 0, "hashed": 1, "total": 1}
+        assert cat.get("models/m.pth")["sha256"] == hashlib.sha256(b"one").hexdigest()
+
+        assert cat.reconcile()["hashed"] == 0  # nothing changed: no re-stat of sidecars, no rehash
+        p.with_suffix(".pth.json").write_text('{"note": "added later"}', encoding="utf-8")
+        assert cat.reconcile()["changed"] == 1 and cat.get("models/m.pth")["meta"] == {"note": "added later"}
+
+        fresh = ModelCatalog(base, tmp_path, index_path=index)
+        assert fresh.reconcile(hash_missing=False)["hashed"] == 0
+        assert fresh.get("models/m.pth")["sha256"] == hashlib.sha256(b"one").hexdigest()  # from the index file
+
+        _ckpt(base / "n.pth", b"two")
+        p.unlink()
+        result = cat.reconcile()
+        assert result["added"] == 1 and result["removed"] == 1 and cat.resolve("m.pth") is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,88 @@
+"""
+Tests for the pooled model-service proxy and health monitor
+"""
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from model_proxy import HealthMonitor, ModelServiceClient, relay
+
+
+@pytest.fixture
+def fake_service():
+    """Minimal HTTP/1.1 keep-alive model service; records the client port of every request."""
+    state = {"health": 200, "ports": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, body):
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._send(state["health"], json.dumps({"status": "ok"}).encode())
+
+        def do_POST(self):
+            state["ports"].append(self.client_address[1])
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send(200, b'{"action":"jump","echo":' + body + b"}")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+class TestModelProxy:
+    """Test pooled forwarding and cached health."""
+
+    def test_forward_streams_and_reuses_connection(self, fake_service):
+        client = ModelServiceClient(fake_service["url"])
+        for i in range(3):
+            resp = client.forward("/predict", b'{"i": %d}' % i)
+            assert resp.status_code == 200
+            assert b"".join(relay(resp)) == b'{"action":"jump","echo":{"i": %d}}' % i
+        assert len(set(fake_service["ports"])) == 1  # one keep-alive connection
+        client.close()
+
+    def test_health_states(self, fake_service):
+        client = ModelServiceClient(fake_service["url"])
+        mon = HealthMonitor(client, interval=60, fail_threshold=2)
+        assert mon.state == "unknown"
+        assert mon.check_now() == "up" and mon.available()
+
+        fake_service["health"] = 503
+        assert mon.check_now() == "degraded" and mon.available()
+
+        mon.report_failure("ConnectionError")
+        assert mon.state == "degraded"  # below threshold
+        mon.report_failure("ConnectionError")
+        assert mon.state == "down" and not mon.available()
+        mon.report_success()
+        assert mon.snapshot()["state"] == "up" and mon.snapshot()["consecutive_failures"] == 0
+
+    def test_unreachable_service_goes_down(self):
+        mon = HealthMonitor(ModelServiceClient("http://127.0.0.1:9"), interval=60)
+        assert mon.check_now() == "down"
+        assert mon.snapshot()["last_error"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
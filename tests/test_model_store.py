@@ -0,0 +1,106 @@
+"""
+Tests for the content-addressed model blob store
+"""
+
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from model_store import ModelBlobStore, UploadError
+
+
+class TestBlobStore:
+    """Test ingestion, deduplication and aliasing."""
+
+    def test_dedup_and_links(self, tmp_path):
+        store = ModelBlobStore(tmp_path / "blobs")
+        digest, size, created = store.ingest_stream(io.BytesIO(b"abc" * 100), chunk=7)
+        assert digest == hashlib.sha256(b"abc" * 100).hexdigest() and size == 300 and created
+        assert store.ingest_stream(io.BytesIO(b"abc" * 100))[2] is False
+
+        a, b = tmp_path / "a.pth", tmp_path / "b.pth"
+        assert store.link(digest, a) == "hardlink"
+        store.link(digest, b)
+        assert os.path.samefile(a, b) and store.blob_path(digest).stat().st_nlink == 3
+        assert not list(store.tmp_dir.iterdir())
+
+        a.unlink()
+        assert not store.release(digest)  # b still links to it
+        b.unlink()
+        assert store.release(digest) and not store.has(digest)
+
+    def test_activate_legacy_file_relinks_source(self, tmp_path):
+        store = ModelBlobStore(tmp_path / "blobs")
+        legacy = tmp_path / "old.pth"
+        legacy.write_bytes(b"legacy weights")
+        active = tmp_path / "active.pth"
+        active.write_bytes(b"previous")
+
+        digest, mode = store.activate(legacy, active)
+        assert mode == "hardlink" and active.read_bytes() == b"legacy weights"
+        assert os.path.samefile(legacy, store.blob_path(digest))  # stored once, source became an alias
+        assert store.gc() == 0
+
+    def test_abandoned_spool_is_removed(self, tmp_path):
+        store = ModelBlobStore(tmp_path / "blobs")
+        spool = store.spool()
+        spool.write(b"partial")
+        spool.close()
+        assert not list(store.tmp_dir.iterdir())
+
+
+class TestChunkedUpload:
+    """Test resumable uploads."""
+
+    def test_resume_after_restart_and_verify(self, tmp_path):
+        data = os.urandom(10000)
+        store = ModelBlobStore(tmp_path / "blobs")
+        uid = store.begin({"filename": "m.pth", "size": len(data)})["upload_id"]
+        assert store.append(uid, 0, io.BytesIO(data[:4000]), chunk=1000) == 4000
+        with pytest.raises(UploadError) as err:
+            store.append(uid, 100, io.BytesIO(data[4000:]))
+        assert err.value.status == 409 and err.value.offset == 4000
+
+        restarted = ModelBlobStore(tmp_path / "blobs")  # no in-memory hash state
+        assert restarted.upload_state(uid)["offset"] == 4000
+        restarted.append(uid, 4000, io.BytesIO(data[4000:]))
+        with pytest.raises(UploadError) as err:
+            restarted.complete(uid, expected_sha256="0" * 64)
+        assert err.value.status == 422
+
+        digest, size, created, state = restarted.complete(uid)
+        assert digest == hashlib.sha256(data).hexdigest() and size == len(data) and created
+        assert state["filename"] == "m.pth" and restarted.blob_path(digest).read_bytes() == data
+        with pytest.raises(UploadError):
+            restarted.upload_state(uid)
+
+    def test_complete_waits_for_chunks_and_hashes_are_strict(self, tmp_path):
+        store = ModelBlobStore(tmp_path / "blobs")
+        uid = store.begin({"filename": "m.pth"})["upload_id"]
+        store.append(uid, 0, io.BytesIO(b"abc"))
+        lock = store._upload_lock(uid)
+        with lock:  # a PUT for this upload is still streaming
+            with pytest.raises(UploadError) as err:
+                store.complete(uid)
+            assert err.value.status == 409
+        assert store.complete(uid)[0] == hashlib.sha256(b"abc").hexdigest()
+
+        for bad in ("../../etc/passwd", "A" * 64, "0" * 63):
+            with pytest.raises(ValueError):
+                store.blob_path(bad)
+
+    def test_expired_uploads_are_dropped(self, tmp_path):
+        store = ModelBlobStore(tmp_path / "blobs", upload_ttl=-1)
+        uid = store.begin({"filename": "m.pth"})["upload_id"]
+        assert store.expire_uploads() == 1
+        with pytest.raises(UploadError):
+            store.upload_state(uid)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
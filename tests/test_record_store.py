@@ -0,0 +1,81 @@
+"""
+Tests for the persistent session/job registries
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from record_store import RecordDB, RecordRegistry
+
+
+def _registry(path, **kw):
+    kw.setdefault("terminal", ("completed", "failed", "interrupted"))
+    return RecordRegistry(RecordDB(path), "job", **kw)
+
+
+class TestRecordRegistry:
+    """Test the hot set, write-behind, eviction and history queries."""
+
+    def test_updates_persist_across_restart(self, tmp_path):
+        db_path = tmp_path / "reg.sqlite3"
+        reg = _registry(db_path)
+        reg.put("a", {"status": "queued", "created": 100})
+        assert reg.incr("a", "frames", 3) == 3
+        reg.update("a", status="training")  # status change: written immediately, with the counter
+        assert reg.incr("a", "frames") == 4  # write-behind until flush()
+        assert reg.update("missing", status="x") is None and "missing" not in reg
+
+        fresh = _registry(db_path)
+        assert fresh.get("a")["frames"] == 3
+        reg.flush()
+        assert _registry(db_path).get("a") == {"status": "training", "created": 100, "frames": 4}
+
+        restarted = _registry(db_path)
+        assert restarted.recover("interrupted", error="restart") == 1
+        assert restarted.get("a")["status"] == "interrupted"
+        assert restarted.query(status="interrupted")[1] == 1
+        assert _registry(db_path).recover("interrupted") == 0  # interrupted is final once recorded
+
+    def test_finished_records_leave_memory_but_stay_queryable(self, tmp_path):
+        evicted = []
+        reg = _registry(tmp_path / "reg.sqlite3", hot_max=3, ttl_sec=60, on_evict=lambda rid, rec: evicted.append(rid))
+        for i in range(5):
+            reg.put(f"j{i}", {"status": "queued", "created": 1000 + i})
+        assert reg.stats()["hot"] == 3  # LRU cap applies to active records too
+        assert set(evicted) == {"j0", "j1"}
+
+        reg.update("j3", status="completed")
+        reg.incr("j4", "steps")
+        reg.evict(now=time.time() + 30)
+        assert reg.stats()["hot"] == 3
+        reg.evict(now=time.time() + 61)  # TTL: only the finished record goes
+        assert evicted[-1] == "j3" and reg.stats()["hot"] == 2
+
+        assert reg.get("j0") == {"status": "queued", "created": 1000}  # reloaded from disk
+        assert reg.get("j3")["status"] == "completed"
+        assert reg.get("j4")["steps"] == 1  # dirty counter survived its own eviction path
+
+        page, total = reg.query(limit=2)
+        assert total == 5 and [r["created"] for r in page] == [1004, 1003]
+        page, total = reg.query(status="queued", since=1001, until=1004)
+        assert total == 2 and [r["created"] for r in page] == [1002, 1001]
+        assert reg.query(status="completed,failed")[1] == 1
+        assert reg.stats()["by_status"] == {"queued": 4, "completed": 1}
+
+    def test_memory_is_bounded_under_churn(self, tmp_path):
+        reg = _registry(tmp_path / "reg.sqlite3", hot_max=50, ttl_sec=3600)
+        for i in range(2000):
+            reg.put(f"j{i}", {"status": "queued", "created": i})
+            reg.update(f"j{i}", status="completed")
+        reg.evict()
+        assert reg.stats()["hot"] <= 50
+        assert reg.query(status="completed", limit=0)[1] == 2000
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,132 @@
+"""
+Tests for the model-service replica pool (routing, affinity, ejection)
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from deployment.model_proxy import HealthMonitor, ModelServiceClient
+from deployment.replica_pool import NoReplicaError, Replica, ReplicaPool, remote_replica_urls, replica_ports
+
+
+def _serve(name):
+    """Keep-alive fake model service answering with its name; GET /health follows state["health"]."""
+    state = {"health": 200, "name": name}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, body):
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._send(state["health"], b"{}")
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send(200, json.dumps({"replica": state["name"]}).encode())
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}"
+    state["server"] = server
+    return state
+
+
+def _dead_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def _replica(name, url):
+    client = ModelServiceClient(url, connect_timeout=0.5)
+    return Replica(name, url, client=client, health=HealthMonitor(client, interval=60, fail_threshold=1))
+
+
+@pytest.fixture
+def services():
+    started = [_serve("a"), _serve("b")]
+    yield started
+    for s in started:
+        s["server"].shutdown()
+        s["server"].server_close()
+
+
+class TestReplicaPool:
+    """Test least-outstanding routing, session affinity, ejection and re-admission."""
+
+    def test_config_parsing(self):
+        assert replica_ports(5001, count=3) == [5001, 5002, 5003]
+        assert replica_ports(5001, count=0) == [5001]
+        assert replica_ports(5001, spec="6000-6002, 6005") == [6000, 6001, 6002, 6005]
+        urls = remote_replica_urls("10.0.0.2:5001, https://gpu-b:5001/,")
+        assert urls == ["http://10.0.0.2:5001", "https://gpu-b:5001"]
+
+    def test_least_outstanding_and_affinity(self, services):
+        pool = ReplicaPool([_replica(s["name"], s["url"]) for s in services])
+        assert pool.acquire() is None  # nothing probed yet
+        assert pool.check_all()
+        a, b = pool.replicas
+
+        first = pool.acquire()
+        second = pool.acquire()
+        assert {first, second} == {a, b}  # the busy replica is skipped
+        pool.release(second)
+        assert pool.acquire() is second  # fewer outstanding wins
+        pool.release(first)
+        pool.release(second)
+
+        pinned = pool.acquire("sess-1")
+        other = pool.acquire()
+        assert other is not pinned
+        pool.release(other)
+        for _ in range(3):
+            assert pool.acquire("sess-1") is pinned  # the session stays put while its replica is busier
+        assert pool.snapshot()["affinity_hits"] == 3 and pinned.outstanding == 4 and other.outstanding == 0
+        for _ in range(4):
+            pool.release(pinned)
+
+        replica, resp = pool.request("/predict", b"{}", session_id="sess-1")
+        assert replica is pinned and resp.json()["replica"] == pinned.name
+        assert all(r["outstanding"] == 0 for r in pool.snapshot()["replicas"])
+
+    def test_ejection_retry_and_readmission(self, services):
+        dead = _dead_url()
+        pool = ReplicaPool([_replica("dead", dead), _replica("live", services[0]["url"])], affinity_max=10)
+        dead_r, live_r = pool.replicas
+        live_r.health.check_now()
+        dead_r.health.report_success()  # looked healthy until its process went away
+        pool.release(pool.acquire("s"))  # equal load: the session lands on (and is pinned to) the first
+
+        replica, resp = pool.request("/predict", b"{}", session_id="s")
+        assert replica is live_r and resp.json()["replica"] == "a"  # connect failure: retried elsewhere
+        assert dead_r.health.state == "down" and dead_r.ejections == 1 and dead_r.errors == 1
+        assert pool.snapshot()["affinity_moves"] == 1 and pool.acquire("s") is live_r
+        pool.release(live_r)
+
+        live_r.health.report_failure("ConnectionError")
+        with pytest.raises(NoReplicaError):
+            pool.forward("/predict", b"{}")
+        assert live_r.health.check_now() == "up" and live_r.readmissions == 1  # probe re-admits
+        assert pool.request("/predict", b"{}")[0] is live_r
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,69 @@
+"""
+Tests for per-route request telemetry
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from request_telemetry import UNMATCHED, RequestTelemetry, RollingCounter
+
+
+class TestRollingCounter:
+    """Test per-second rolling windows."""
+
+    def test_old_slots_expire(self):
+        rc = RollingCounter(window=10)
+        rc.add(1000.2)
+        rc.add(1000.7, 2)
+        rc.add(1005.0)
+        assert rc.total(1005.5) == 4
+        assert rc.total(1005.5, window=3) == 1
+        assert rc.total(1010.5) == 1  # second 1000 fell out of the window
+        rc.add(1010.1)  # reuses the slot of second 1000
+        assert rc.total(1010.5) == 2
+
+
+class TestRequestTelemetry:
+    """Test per-route counters, histograms and exports."""
+
+    def test_counts_histogram_and_quantiles(self):
+        t = RequestTelemetry(window=60)
+        key = t.route_key("POST", "/api/predict")
+        for ms, status in [(3, 200), (7, 200), (40, 200), (2000, 502)]:
+            t.begin(key)
+            t.end(key, status, ms, bytes_in=100)
+        t.begin(t.route_key("GET", None))
+
+        snap = t.snapshot()
+        r = snap["routes"]["POST /api/predict"]
+        assert r["count"] == 4 and r["status"] == {"2xx": 3, "5xx": 1} and r["errors"] == 1
+        assert r["in_flight"] == 0 and r["bytes_in"] == 400
+        assert sum(r["buckets"]) == 4
+        assert r["latency_ms"]["p50"] == 10.0 and r["latency_ms"]["p99"] == 2500.0
+        assert r["latency_ms"]["max"] == 2000 and r["error_rate_window"] == 0.25
+        assert r["rps_10s"] == pytest.approx(0.4)
+        assert snap["routes"][UNMATCHED]["in_flight"] == 1
+        assert list(snap["routes"])[0] == "POST /api/predict"  # busiest first
+        assert snap["totals"]["count"] == 4
+
+    def test_prometheus_format(self):
+        t = RequestTelemetry()
+        key = t.route_key("GET", "/api/train_status/<job_id>")
+        t.begin(key)
+        t.end(key, 200, 12.0)
+        text = t.prometheus()
+        labels = 'method="GET",route="/api/train_status/<job_id>"'
+        assert f'control_backend_requests_total{{{labels},status="2xx"}} 1' in text
+        assert f'control_backend_request_latency_ms_bucket{{{labels},le="10"}} 0' in text
+        assert f'control_backend_request_latency_ms_bucket{{{labels},le="25"}} 1' in text
+        assert f'control_backend_request_latency_ms_count{{{labels}}} 1' in text
+        types = [line for line in text.splitlines() if line.startswith("# TYPE")]
+        assert len(types) == 4
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
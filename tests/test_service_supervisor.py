@@ -0,0 +1,146 @@
+"""
+Tests for the model-service supervisor (warm standby, pipe readiness, failover)
+"""
+
+import os
+import socket
+import sys
+import time
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from service_supervisor import ServiceSupervisor
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="readiness pipe needs fd passing")
+
+# Same protocol as deploy_transformer.py, without torch: "warm" after a simulated load,
+# standby waits for serve/reload on stdin, "serving" once the port is bound.
+FAKE_SERVICE = r'''
+import json, os, sys, time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+fd = int(os.environ["SERVICE_READY_FD"])
+weights = lambda: open(os.environ["FAKE_WEIGHTS"]).read()
+
+def signal(event, **kw):
+    os.write(fd, (json.dumps({"event": event, "pid": os.getpid(), **kw}) + "\n").encode())
+
+time.sleep(float(os.environ.get("FAKE_LOAD_SEC", "0.3")))  # "import torch + load weights"
+loaded = weights()
+signal("warm", model_loaded=True)
+if os.environ.get("SERVICE_STANDBY") == "1":
+    for line in sys.stdin:
+        if line.strip() == "reload":
+            loaded = weights()
+            signal("warm", model_loaded=True)
+        elif line.strip() == "serve":
+            break
+    else:
+        sys.exit(0)
+
+class H(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = f"{os.getpid()} {loaded}".encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    def log_message(self, *a):
+        pass
+
+HTTPServer.allow_reuse_address = True
+server = HTTPServer(("127.0.0.1", int(os.environ["TRANSFORMER_PORT"])), H)
+signal("serving")
+server.serve_forever()
+'''
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=2) as r:
+        pid, weights = r.read().decode().split(" ", 1)
+        return int(pid), weights
+
+
+@pytest.fixture
+def supervisor(tmp_path):
+    script = tmp_path / "fake_service.py"
+    script.write_text(FAKE_SERVICE)
+    weights = tmp_path / "weights.txt"
+    weights.write_text("v1")
+    port = _free_port()
+    log = open(tmp_path / "service.log", "a")
+
+    def env():
+        e = os.environ.copy()
+        e.update(TRANSFORMER_PORT=str(port), FAKE_WEIGHTS=str(weights))
+        return e
+
+    sup = ServiceSupervisor([sys.executable, str(script)], tmp_path, env_fn=env, log_fn=lambda: log, ready_timeout=15)
+    sup.port, sup.weights = port, weights
+    yield sup
+    sup.shutdown()
+    log.close()
+
+
+def _wait(pred, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if pred():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestServiceSupervisor:
+    """Test cold start, promotion, model switch and failover."""
+
+    def test_cold_start_then_standby_promotion(self, supervisor):
+        ok, pid, msg = supervisor.start()
+        assert ok and msg == "started"
+        assert supervisor.last_start["mode"] == "cold" and supervisor.last_start["ready_ms"] >= 300
+        assert _get(supervisor.port)[0] == pid
+        assert supervisor.start()[2] == "already running (tracked)"
+
+        assert _wait(lambda: (supervisor.stats()["standby"] or {}).get("state") == "warm")
+        standby_pid = supervisor.standby.pid
+        assert supervisor.stop() == (True, "stopped")
+        ok, pid, msg = supervisor.start()
+        assert ok and msg == "promoted standby" and pid == standby_pid
+        assert supervisor.last_start["mode"] == "promoted"
+        assert supervisor.last_start["ready_ms"] < 300  # no load on the start path
+        assert _get(supervisor.port)[0] == standby_pid
+
+    def test_switch_reloads_standby_before_takeover(self, supervisor):
+        supervisor.start()
+        old_pid = supervisor.primary.pid
+        assert _wait(lambda: (supervisor.stats()["standby"] or {}).get("state") == "warm")
+
+        supervisor.weights.write_text("v2")
+        ok, pid, _ = supervisor.start(reload=True)
+        assert ok and pid != old_pid and supervisor.last_start["reason"] == "switch"
+        assert _get(supervisor.port) == (pid, "v2")
+
+    def test_failover_promotes_standby(self, supervisor):
+        supervisor.start()
+        assert _wait(lambda: (supervisor.stats()["standby"] or {}).get("state") == "warm")
+        standby_pid = supervisor.standby.pid
+
+        supervisor.primary.proc.kill()
+        assert _wait(lambda: supervisor.failovers == 1 and supervisor.running())
+        assert supervisor.primary.pid == standby_pid
+        assert supervisor.last_start["reason"] == "failover" and supervisor.last_start["mode"] == "promoted"
+        assert _get(supervisor.port)[0] == standby_pid
+        assert _wait(lambda: supervisor.standby is not None and supervisor.standby.pid != standby_pid)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
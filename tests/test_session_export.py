@@ -0,0 +1,69 @@
+"""
+Tests for capture-session ZIP export
+"""
+
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from session_export import SessionExporter, iter_session_zip
+
+
+@pytest.fixture
+def sess_dir(tmp_path):
+    d = tmp_path / "sess_abc"
+    (d / "frames").mkdir(parents=True)
+    (d / "frames" / "frame_1.jpg").write_bytes(os.urandom(50_000))
+    (d / "frames.pack").write_bytes(os.urandom(200_000))
+    (d / "inputs.jsonl").write_text('{"keys": ["w"], "timestamp": 1}\n' * 500)
+    return d
+
+
+def _check_zip(data, sess_dir):
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        infos = {i.filename: i for i in z.infolist()}
+        assert set(infos) == {"frames/frame_1.jpg", "frames.pack", "inputs.jsonl"}
+        assert infos["frames/frame_1.jpg"].compress_type == zipfile.ZIP_STORED
+        assert infos["frames.pack"].compress_type == zipfile.ZIP_STORED
+        assert infos["inputs.jsonl"].compress_type == zipfile.ZIP_DEFLATED
+        assert z.testzip() is None
+        assert z.read("frames.pack") == (sess_dir / "frames.pack").read_bytes()
+
+
+class TestSessionExport:
+    """Test background and streaming export."""
+
+    def test_streaming_zip_is_valid(self, sess_dir):
+        chunks = list(iter_session_zip(sess_dir, chunk_size=4096))
+        assert len(chunks) > 10  # produced incrementally, not in one piece
+        _check_zip(b"".join(chunks), sess_dir)
+
+    def test_background_job_progress(self, sess_dir, tmp_path):
+        exporter = SessionExporter(chunk_size=4096)
+        zip_path = tmp_path / "sess_abc.zip"
+        job = exporter.start("sess_abc", sess_dir, zip_path)
+        assert job["status"] in ("queued", "running")
+
+        assert exporter.wait("sess_abc", timeout=30)
+        job = exporter.status("sess_abc")
+        assert job["status"] == "completed"
+        assert job["files_done"] == job["files_total"] == 3
+        assert job["bytes_done"] == job["bytes_total"] and job["progress"] == 1.0
+        assert not (tmp_path / "sess_abc.zip.part").exists()
+        _check_zip(zip_path.read_bytes(), sess_dir)
+
+    def test_failed_job_reports_error(self, tmp_path):
+        exporter = SessionExporter()
+        exporter.start("sess_x", tmp_path / "sess_x", tmp_path / "missing_dir" / "sess_x.zip")
+        exporter.wait("sess_x", timeout=10)
+        job = exporter.status("sess_x")
+        assert job["status"] == "failed" and job["error"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,126 @@
+"""
+Tests for the same-host shared-memory model transport
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from deployment.feature_extractor import FEATURES_CONTENT_TYPE
+from deployment.model_proxy import ModelServiceClient, relay
+from deployment.shm_transport import ShmModelClient, ShmServer, supported
+
+pytestmark = pytest.mark.skipif(not supported(), reason="needs AF_UNIX datagram sockets")
+
+
+def _handler(content_type, body):
+    if content_type == FEATURES_CONTENT_TYPE:
+        return 200, json.dumps({"via": "shm", "sum": float(np.frombuffer(body, "<f4").sum())}).encode()
+    payload = json.loads(body)
+    if payload.get("sleep"):
+        time.sleep(payload["sleep"])
+    if payload.get("big"):
+        return 200, json.dumps({"via": "shm", "pad": "x" * payload["big"]}).encode()
+    return 200, json.dumps({"via": "shm", "echo": payload}).encode()
+
+
+@pytest.fixture
+def http_service():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = b'{"via": "http"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def transport(tmp_path, http_service):
+    path = tmp_path / "model.sock"
+    server = ShmServer(path, _handler, workers=4).start()
+    client = ShmModelClient(ModelServiceClient(http_service), path, slots=4, slot_bytes=4096, reclaim_sec=60)
+    yield server, client
+    client.close()
+    server.stop()
+
+
+class TestShmTransport:
+    """Test ring round trips, HTTP fallback and slot reuse after timeouts."""
+
+    def test_round_trips(self, transport):
+        server, client = transport
+        resp = client.forward("/predict", b'{"features": [1, 2]}')
+        assert resp.status_code == 200 and resp.json() == {"via": "shm", "echo": {"features": [1, 2]}}
+
+        feats = np.arange(128, dtype="<f4")
+        resp = client.forward("/predict", feats.tobytes(), content_type=FEATURES_CONTENT_TYPE)
+        assert b"".join(relay(resp)) == json.dumps({"via": "shm", "sum": float(feats.sum())}).encode()
+
+        errors = []
+
+        def worker(n):
+            for i in range(50):
+                out = client.forward("/predict", json.dumps({"n": n, "i": i}).encode()).json()
+                if out != {"via": "http"} and out.get("echo") != {"n": n, "i": i}:  # http: all slots busy
+                    errors.append(out)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]  # more callers than slots
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = client.stats()
+        assert not errors and server.calls == stats["shm_calls"] == 402 - stats["fallbacks"]
+        assert stats["in_flight"] == 0
+
+    def test_falls_back_to_http(self, transport, tmp_path, http_service):
+        server, client = transport
+        assert client.forward("/predict", b'{"x": "' + b"y" * 5000 + b'"}').json() == {"via": "http"}  # body too large
+        assert client.forward("/predict", b'{"big": 5000}').json() == {"via": "http"}  # response too large
+        assert client.probe().status_code == 501  # health stays on HTTP (the fake has no GET)
+
+        orphan = ShmModelClient(ModelServiceClient(http_service), tmp_path / "missing.sock")
+        assert orphan.forward("/predict", b"{}").json() == {"via": "http"}  # service without the transport
+        assert orphan.stats()["fallbacks"] == 1
+        orphan.close()
+        assert client.stats()["fallbacks"] == 1 and client.stats()["http_calls"] == 2
+
+    def test_timed_out_slot_is_reused_after_late_reply(self, transport):
+        server, client = transport
+        with pytest.raises(requests.ReadTimeout):
+            client.forward("/predict", b'{"sleep": 0.3}', timeout=(1.0, 0.05))
+        assert client.stats()["abandoned"] == 1
+        deadline = time.time() + 5
+        while client.stats()["abandoned"] and time.time() < deadline:
+            time.sleep(0.02)
+        assert client.stats()["abandoned"] == 0  # the late reply handed the slot back
+        for i in range(8):  # every slot is usable again
+            assert client.forward("/predict", json.dumps({"i": i}).encode()).json()["echo"] == {"i": i}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
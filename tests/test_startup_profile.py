@@ -0,0 +1,83 @@
+"""
+Tests for the startup profiler and the lazily importing service modules
+"""
+
+import importlib
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from deployment.startup_profile import StartupProfile
+
+PROJECT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def fake_package(tmp_path, monkeypatch):
+    pkg = tmp_path / "slowpkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("import time\ntime.sleep(0.02)\nfrom slowpkg import inner\n")
+    (pkg / "inner.py").write_text("import time\ntime.sleep(0.05)\n")
+    (pkg / "later.py").write_text("import time\ntime.sleep(0.01)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "slowpkg"
+    for name in ("slowpkg", "slowpkg.inner", "slowpkg.later"):
+        sys.modules.pop(name, None)
+
+
+class TestStartupProfile:
+    """Test import timings, phases and the split between startup and lazy imports."""
+
+    def test_nested_import_times_and_lazy_imports(self, fake_package):
+        profile = StartupProfile().install()
+        try:
+            with profile.phase("create_app"):
+                mod = importlib.import_module(fake_package)
+            profile.mark_ready()
+            importlib.import_module("slowpkg.later")
+        finally:
+            profile.uninstall()
+
+        assert mod.__loader__.__class__.__name__ == "SourceFileLoader"  # real loader put back
+        report = profile.report()
+        rows = {r["module"]: r for r in report["slowest_imports"]}
+        assert rows["slowpkg"]["cumulative_ms"] >= 70 and rows["slowpkg.inner"]["cumulative_ms"] >= 50
+        assert rows["slowpkg"]["self_ms"] < rows["slowpkg"]["cumulative_ms"] - 45  # inner is not self time
+        assert report["import_ms"] == rows["slowpkg"]["cumulative_ms"]
+        assert report["phases"]["create_app"] >= 70 and report["ready_ms"] is not None
+        assert [r["module"] for r in report["lazy_imports"]] == ["slowpkg.later"]
+
+    def test_service_modules_import_light(self, tmp_path):
+        """Importing either service loads no torch/OpenCV/PIL/psutil and starts no threads."""
+        code = textwrap.dedent(
+            """
+            import json, sys, threading
+            import deployment.deploy_transformer as dt
+            import deployment.control_backend as cb
+            heavy = [m for m in ("torch", "cv2", "PIL", "psutil") if m in sys.modules]
+            threads = threading.active_count()
+            client = cb.create_app().test_client()
+            startup = client.get("/health").get_json()["startup"]
+            print(json.dumps({"heavy": heavy, "threads": threads, "model": dt.model is None, "startup": startup}))
+            """
+        )
+        env = dict(os.environ, REGISTRY_DB=str(tmp_path / "registry.sqlite3"), PYTHONPATH=PROJECT)
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=PROJECT, env=env, capture_output=True, text=True, timeout=120
+        )
+        assert out.returncode == 0, out.stderr
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        assert result["heavy"] == [] and result["threads"] == 1 and result["model"]
+        startup = result["startup"]
+        assert startup["import_hook"] and startup["ready_ms"] > 0 and "init_state" in startup["phases"]
+        assert startup["slowest_imports"] and startup["modules"] > 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
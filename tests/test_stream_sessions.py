@@ -0,0 +1,354 @@
+"""
+Unit tests for the stream session manager (offline, stub resolver)
+"""
+
+import pytest
+import sys
+import os
+import threading
+import time
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'deployment'))
+
+from stream_sessions import (
+    FrameSource,
+    ImageDirSource,
+    OnlineTrainer,
+    ReplayBuffer,
+    StreamManager,
+    StreamResolver,
+    StreamSession,
+    SyntheticSource,
+    UrlFrameSource,
+    VideoFileSource,
+    make_frame_source,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+class CountingResolver:
+    """Local stub for yt-dlp: maps page URL -> fake direct URL and counts calls."""
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, url):
+        with self.lock:
+            self.calls += 1
+            n = self.calls
+        if self.delay:
+            time.sleep(self.delay)
+        return f"{url}#direct{n}"
+
+
+class TestStreamResolver:
+    """Test cached stream URL resolution."""
+
+    def test_cache_hit_within_ttl(self):
+        stub = CountingResolver()
+        clock = FakeClock()
+        resolver = StreamResolver(resolve_fn=stub, ttl_sec=60, refresh_ahead_sec=10, clock=clock)
+
+        first = resolver.resolve("https://example/live")
+        clock.t += 30
+        second = resolver.resolve("https://example/live")
+
+        assert first == second
+        assert stub.calls == 1
+        assert resolver.hits == 1
+
+    def test_expired_entry_is_resolved_again(self):
+        stub = CountingResolver()
+        clock = FakeClock()
+        resolver = StreamResolver(resolve_fn=stub, ttl_sec=60, refresh_ahead_sec=10, clock=clock)
+
+        resolver.resolve("https://example/live")
+        clock.t += 61
+        assert resolver.cached("https://example/live") is None
+        assert resolver.resolve("https://example/live").endswith("#direct2")
+
+    def test_refresh_due_renews_entries_near_expiry(self):
+        stub = CountingResolver()
+        clock = FakeClock()
+        resolver = StreamResolver(resolve_fn=stub, ttl_sec=60, refresh_ahead_sec=10, clock=clock)
+
+        resolver.resolve("https://example/live")
+        clock.t += 55
+        assert resolver.refresh_due() == 1
+        clock.t += 30
+        assert resolver.cached("https://example/live").endswith("#direct2")
+
+    def test_unused_entry_stops_refreshing_and_is_dropped(self):
+        stub = CountingResolver()
+        clock = FakeClock()
+        resolver = StreamResolver(resolve_fn=stub, ttl_sec=100, refresh_ahead_sec=10, clock=clock)
+
+        resolver.resolve("https://example/live")
+        for _ in range(120):  # 1200s of refresher ticks, no further use
+            clock.t += 10
+            resolver.refresh_due()
+
+        assert stub.calls == 2  # one refresh while the single use was recent, then none
+        assert resolver.cached("https://example/live") is None
+        assert "https://example/live" not in resolver._cache
+
+    def test_invalidate_forces_reresolution(self):
+        stub = CountingResolver()
+        resolver = StreamResolver(resolve_fn=stub)
+
+        resolver.resolve("https://example/live")
+        resolver.invalidate("https://example/live")
+        resolver.resolve("https://example/live")
+        assert stub.calls == 2
+
+    def test_concurrent_resolves_share_one_call(self):
+        stub = CountingResolver(delay=0.2)
+        resolver = StreamResolver(resolve_fn=stub)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(resolver.resolve("u"))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert stub.calls == 1
+        assert len(set(results)) == 1
+
+    def test_waiters_get_the_resolve_error(self):
+        def failing(url):
+            time.sleep(0.2)
+            raise FileNotFoundError("yt-dlp not found")
+
+        resolver = StreamResolver(resolve_fn=failing)
+        errors = []
+
+        def run():
+            try:
+                resolver.resolve("u")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(errors) == 4
+        assert all(isinstance(e, FileNotFoundError) and "yt-dlp not found" in str(e) for e in errors)
+
+
+class TestStreamManager:
+    """Test session creation does not block on resolution."""
+
+    def test_create_session_returns_while_resolving(self, tmp_path):
+        def failing_slow_resolver(url):
+            time.sleep(0.5)
+            raise RuntimeError("offline")
+
+        manager = StreamManager(tmp_path, tr_port=1, resolver=StreamResolver(resolve_fn=failing_slow_resolver))
+
+        t0 = time.time()
+        sess = manager.create_session("s1", "infer", "https://example/live", "transformer", include_frames=False)
+        assert time.time() - t0 < 0.4
+        assert sess.to_dict()["status"] == "resolving"
+
+        sess._thread.join(timeout=5)
+        assert sess.status == "error"
+        assert sess.last_error == "offline"
+
+    def test_invalid_mode_rejected(self, tmp_path):
+        manager = StreamManager(tmp_path, tr_port=1, resolver=StreamResolver(resolve_fn=CountingResolver()))
+        with pytest.raises(ValueError):
+            manager.create_session("s1", "bogus", "https://example/live", "transformer")
+        with pytest.raises(ValueError):
+            manager.create_session("../evil", "train", "https://example/live", "transformer")
+
+    def test_snapshot_path_stays_in_uploads(self, tmp_path):
+        def session(sid):
+            return StreamSession(session_id=sid, mode="train", url="stub://", model_type="transformer", tr_port=1,
+                                 repo_root=tmp_path, resolver=StreamResolver(resolve_fn=lambda u: u))
+
+        buf = ReplayBuffer(capacity=2, state_dim=4)
+        uploads = (tmp_path / "models" / "transformer" / "uploads").resolve()
+        assert OnlineTrainer(session("ok_1"), buf).snapshot_path == uploads / "stream_ok_1.pth"
+        with pytest.raises(ValueError):
+            OnlineTrainer(session("x/../../../../../tmp/evil"), buf).snapshot_path
+
+    def test_stopped_sessions_are_pruned_into_history(self, tmp_path):
+        class History(dict):
+            def put(self, sid, info):
+                self[sid] = info
+
+        history = History()
+        manager = StreamManager(
+            tmp_path, tr_port=1, resolver=StreamResolver(resolve_fn=CountingResolver()), history=history, keep_stopped=1
+        )
+        for sid in ("a", "b"):
+            sess = manager.create_session(
+                sid, "infer", "synthetic://?w=32&h=16&fps=0", "transformer", include_frames=False
+            )
+            assert history[sid]["status"] == "resolving"
+            sess.stop()
+            sess._thread.join(timeout=10)
+            assert history[sid]["status"] == "stopped" and history[sid]["running"] is False
+
+        assert list(manager.list_sessions()) == ["b"]  # only the newest stopped session is kept
+        assert manager.get_record("a") == history["a"]
+        manager.stopped_ttl = 0
+        assert manager.list_sessions() == {}
+
+
+class TestFrameSources:
+    """Test local/offline frame sources."""
+
+    def test_make_frame_source_dispatch(self, tmp_path):
+        resolver = StreamResolver(resolve_fn=CountingResolver())
+        (tmp_path / "clip.mp4").write_bytes(b"")
+
+        assert isinstance(make_frame_source("synthetic://?w=32&h=16&fps=0", resolver), SyntheticSource)
+        assert isinstance(make_frame_source(f"dir://{tmp_path}", resolver), ImageDirSource)
+        assert isinstance(make_frame_source(str(tmp_path), resolver), ImageDirSource)
+        assert isinstance(make_frame_source(f"file://{tmp_path / 'clip.mp4'}?realtime=0", resolver), VideoFileSource)
+        assert isinstance(make_frame_source("https://example/live", resolver), UrlFrameSource)
+        with pytest.raises(ValueError):
+            make_frame_source("ftp://nope", resolver)
+
+    def test_incomplete_source_fails_at_construction(self):
+        class NoRead(FrameSource):
+            def open(self):
+                pass
+
+        with pytest.raises(TypeError):
+            NoRead()
+
+    def test_synthetic_frames_change(self):
+        src = SyntheticSource(width=32, height=16, fps=0)
+        src.open()
+        ok1, f1 = src.read()
+        ok2, f2 = src.read()
+        assert ok1 and ok2
+        assert f1.shape == (16, 32, 3) and f1.dtype == np.uint8
+        assert not np.array_equal(f1, f2)
+
+    def test_image_dir_loops(self, tmp_path):
+        cv2 = pytest.importorskip("cv2")
+        for i in range(3):
+            cv2.imwrite(str(tmp_path / f"img_{i}.png"), np.full((8, 8, 3), i * 50, dtype=np.uint8))
+
+        src = ImageDirSource(tmp_path)
+        src.open()
+        values = [int(src.read()[1][0, 0, 0]) for _ in range(5)]
+        assert values == [0, 50, 100, 0, 50]
+
+    def test_video_file_loops_unthrottled(self, tmp_path):
+        cv2 = pytest.importorskip("cv2")
+        path = tmp_path / "clip.avi"
+        out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (32, 32))
+        for i in range(5):
+            out.write(np.full((32, 32, 3), i * 40, dtype=np.uint8))
+        out.release()
+
+        src = VideoFileSource(path, loop=True, realtime=False)
+        src.open()
+        reads = [src.read()[0] for _ in range(12)]
+        src.release()
+        assert all(reads)
+
+    def test_session_runs_on_synthetic_source(self, tmp_path):
+        manager = StreamManager(tmp_path, tr_port=1, resolver=StreamResolver(resolve_fn=CountingResolver()))
+        sess = manager.create_session(
+            "syn", "infer", "synthetic://?w=64&h=32&fps=0", "transformer", include_frames=False
+        )
+
+        deadline = time.time() + 5
+        while sess.frames < 3 and time.time() < deadline:
+            time.sleep(0.05)
+        sess.stop()
+        sess._thread.join(timeout=10)
+
+        assert sess.frames >= 3
+        assert sess.source_kind == "synthetic"
+        assert sess.status == "stopped"
+
+
+class TestReplayBuffer:
+    """Test the fixed-capacity replay buffer."""
+
+    def test_wraps_at_capacity(self):
+        buf = ReplayBuffer(capacity=4, state_dim=8)
+        for i in range(10):
+            buf.add([i / 10.0] * 8, i)
+
+        assert len(buf) == 4
+        assert buf.total_added == 10
+        assert sorted(buf._labels.tolist()) == [6, 7, 8, 9]
+
+    def test_sample_roundtrips_states(self):
+        buf = ReplayBuffer(capacity=8, state_dim=4)
+        buf.add([0.0, 0.5, 1.0, 0.25], 3)
+
+        states, labels = buf.sample(5)
+        assert states.dtype == np.float32 and states.shape == (5, 4)
+        assert np.allclose(states[0], [0.0, 0.5, 1.0, 0.25], atol=1 / 255.0)
+        assert labels.tolist() == [3] * 5
+
+    def test_rejects_wrong_dim(self):
+        buf = ReplayBuffer(capacity=2, state_dim=4)
+        with pytest.raises(ValueError):
+            buf.add([0.0] * 3, 0)
+
+
+class TestOnlineTrainer:
+    """Test the background online trainer (CPU, random init)."""
+
+    def test_trains_and_snapshots(self, tmp_path):
+        pytest.importorskip("torch")
+        repo_root = os.path.join(os.path.dirname(__file__), '..')
+        if repo_root not in sys.path:
+            sys.path.insert(0, repo_root)
+
+        sess = StreamSession(
+            session_id="unit",
+            mode="train",
+            url="stub://",
+            model_type="transformer",
+            tr_port=1,
+            repo_root=tmp_path,
+            resolver=StreamResolver(resolve_fn=lambda u: u),
+        )
+        buf = ReplayBuffer(capacity=64, state_dim=128)
+        rng = np.random.default_rng(0)
+        for _ in range(32):
+            buf.add(rng.random(128), int(rng.integers(0, 5)))
+
+        trainer = OnlineTrainer(sess, buf, batch_size=8, max_steps_per_sec=20, save_every_sec=0.2)
+        t0 = time.time()
+        trainer.start()
+        deadline = t0 + 30
+        while sess.saved_model_path is None and time.time() < deadline:
+            time.sleep(0.1)
+        trainer.stop()
+        elapsed = time.time() - t0
+
+        assert trainer.error is None
+        # step rate is capped
+        assert 0 < sess.training_steps <= 20 * elapsed + 1
+        assert sess.saved_model_path is not None
+        assert (tmp_path / "models" / "transformer" / "uploads" / "stream_unit.pth").exists()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])